@@ -0,0 +1,28 @@
+"""
+ASGI config for Safeher project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+The I/O-bound pages (chat polling, emergency services, AI assistant,
+telehealth) are served by their async view variants.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Safeher.settings')
+os.environ.setdefault('PREGACARE_ASYNC_VIEWS', '1')
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    # Django 3.1 runs every request's sync middleware on one shared thread;
+    # a context per request gives each request its own thread-sensitive
+    # thread, as Django 3.2 does.
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -73,6 +73,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'Safeher.wsgi.application'
 
+# Serve the async view variants; Safeher/asgi.py switches this on.
+ASYNC_VIEWS = os.environ.get('PREGACARE_ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -80,10 +83,68 @@ WSGI_APPLICATION = 'Safeher.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get('PREGACARE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'OPTIONS': {
+            # Seconds the sqlite3 driver waits on a locked database file.
+            'timeout': 20,
+        },
     }
 }
 
+# Seconds the query-batch threads of women/concurrency.py keep a database
+# connection open between querysets. Request threads follow CONN_MAX_AGE.
+QUERY_BATCH_CONN_MAX_AGE = 60
+
+# SQLite deployment mode, see women/sqlite.py.
+# The PRAGMAs are applied to every new SQLite connection. With
+# SQLITE_SERIALIZE_WRITES on, writes wrapped in women.sqlite.serialized_write()
+# go through a single writer at a time across all worker processes.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+}
+SQLITE_SERIALIZE_WRITES = True
+
+# Optional per-process inverted index for free-text provider search
+# (women/providers.py), rebuilt after PROVIDER_SEARCH_INDEX_TTL seconds.
+PROVIDER_SEARCH_INDEX = False
+PROVIDER_SEARCH_INDEX_TTL = 300
+
+# Channel class for medication reminders sent by the dispatch_reminders
+# command (women/reminders.py).
+REMINDER_CHANNEL = 'women.reminders.EmailChannel'
+
+# Read chat messages older than this many days are moved into compressed
+# monthly blocks by the archive_messages command (chat/archive.py).
+CHAT_RETENTION_DAYS = 180
+
+# Summarizer class folding older AI assistant messages into a conversation's
+# rolling summary (women/assistant.py).
+AI_SUMMARIZER = 'women.assistant.ExtractiveSummarizer'
+
+# Per-process cache of AI assistant answers to repeated questions
+# (women/answer_cache.py): entries, bytes of answer text, seconds to live.
+AI_ANSWER_CACHE_SIZE = 5000
+AI_ANSWER_CACHE_BYTES = 5 * 1024 * 1024
+AI_ANSWER_CACHE_TTL = 86400
+
+# Extract the text of newly accepted uploads for full-text search on a
+# background thread; otherwise run the index_uploads command. The search
+# vocabulary is rebuilt after this many seconds (women/search.py).
+SEARCH_EXTRACT_IN_BACKGROUND = True
+SEARCH_VOCABULARY_TTL = 600
+# Queries matching more uploads than this rank only the newest matches.
+SEARCH_RANK_ALL = 20000
+
+# Seconds a moderator's claim on queued uploads lasts (women/moderation.py).
+MODERATION_CLAIM_TIMEOUT = 1800
+
+# Make thumbnails and text previews of new uploads on this many background
+# threads; otherwise run the generate_previews command (women/previews.py).
+PREVIEW_IN_BACKGROUND = True
+PREVIEW_WORKERS = 2
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -20,6 +20,11 @@ from women.views import *
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views  
+from chat.views import message_list, message_list_async
+from women import api
+
+# Under ASGI (Safeher/asgi.py) the I/O-bound pages are served by their async variants.
+ASYNC = settings.ASYNC_VIEWS
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -30,10 +35,22 @@ urlpatterns = [
     path('nutrition-engine/', nutrition_engine, name='nutrition_engine'),
     path('postpartum-care/', postpartum_care, name='postpartum_care'),
     path('baby-care/', baby_care, name='baby_care'),
-    path('telehealth/', telehealth, name='telehealth'),
-    path('ai-assistant/', ai_assistant, name='ai_assistant'),
-    path('emergency-services/', emergency_services, name='emergency_services'),
+    path('telehealth/', telehealth_async if ASYNC else telehealth, name='telehealth'),
+    path('ai-assistant/', ai_assistant_async if ASYNC else ai_assistant, name='ai_assistant'),
+    path('emergency-services/', emergency_services_async if ASYNC else emergency_services, name='emergency_services'),
     path('pelvic-floor-rehab/', pelvic_floor_rehab, name='pelvic_floor_rehab'),
+    path('api/pelvic-floor/strength/', rehab_strength_chart, name='rehab_strength_chart'),
+    path('api/pelvic-floor/workload/', rehab_workload_chart, name='rehab_workload_chart'),
+    path('api/cycles/', api.api_view(api.CycleList), name='api_cycles'),
+    path('api/pregnancy/', api.api_view(api.PregnancyProfileList), name='api_pregnancy'),
+    path('api/mews/', api.api_view(api.MEWSList), name='api_mews'),
+    path('api/babies/', api.api_view(api.BabyList), name='api_babies'),
+    path('api/growth/', api.api_view(api.GrowthRecordList), name='api_growth'),
+    path('api/vaccinations/', api.api_view(api.VaccinationList), name='api_vaccinations'),
+    path('api/reminders/', api.api_view(api.ReminderList), name='api_reminders'),
+    path('api/sync/', sync_records, name='sync_records'),
+    path('api/symptom-check/', symptom_check, name='symptom_check'),
+    path('api/assistant/<str:conversation_id>/messages/', assistant_messages, name='assistant_messages'),
     path('vaccination-tracker/', vaccination_tracker, name='vaccination_tracker'),
     path('educational-resources/', educational_resources, name='educational_resources'),
     path('signup/', signup1, name='signup'),
@@ -59,6 +76,7 @@ urlpatterns = [
     path('rejected_queries/', rejected_queries, name='rejected_queries'),
     path('all_queries/', all_queries, name='all_queries'),
     path('assign_status/<int:pid>', assign_status, name='assign_status'),
+    path('moderation/', moderation_queue, name='moderation_queue'),
     path('pending_m/', pending_m, name='pending_m'),
     path('accepted_m/', accepted_m, name='accepted_m'),
     path('rejected_m/', rejected_m, name='rejected_m'),
@@ -71,6 +89,7 @@ urlpatterns = [
     path('delete_notes/<int:pid>', delete_notes, name='delete_notes'),
     path('delete_m/<int:pid>', delete_m, name='delete_m'),
     path('chat/', include('chat.urls')),
+    path('api/messages/<int:sender>/<int:receiver>', message_list_async if ASYNC else message_list, name='message_list'),
     #password reset
     path('password_reset/',auth_views.PasswordResetView.as_view(),name='password_reset'),
     path('password_reset/done/',auth_views.PasswordResetDoneView.as_view(),name='password_reset_done'),
@@ -0,0 +1,6 @@
+"""Standalone performance benchmarks.
+
+Run them from the repository root, e.g.::
+
+    python -m benchmarks.sqlite_write_contention
+"""
@@ -0,0 +1,84 @@
+"""Hit rate of the AI assistant answer cache on a stream of paraphrased questions.
+
+Builds T topics (a food, activity or symptom with a question kind) and
+asks N questions. Topics are drawn with Zipf-like popularity, each asked
+through a random phrasing template, and the asker is at a random
+pregnancy week. On a miss, the "generated" answer names its topic and
+trimester and is stored. Reports the hit rate, false hits (answers for a
+different topic or trimester), the rate an exact-text cache would reach,
+lookup latency, and evictions when the cache is smaller than the working
+set. Usage::
+
+    python -m benchmarks.answer_cache --questions 50000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import percentile, print_table, setup_django
+
+ITEMS = ('coffee', 'tea', 'sushi', 'brie', 'blue cheese', 'tuna', 'salmon', 'eggs', 'liver', 'peanuts',
+         'honey', 'chocolate', 'ginger', 'paracetamol', 'ibuprofen', 'hair dye', 'hot baths', 'saunas',
+         'running', 'swimming', 'yoga', 'flying', 'cycling', 'sex', 'massage', 'spicy food', 'energy drinks',
+         'herbal tea', 'pineapple', 'papaya', 'deli meat', 'hot dogs', 'soft cheese', 'raw eggs', 'alcohol',
+         'vitamin a', 'folic acid', 'iron tablets', 'cough syrup', 'antihistamines')
+KINDS = {
+    'safe': ('is {x} safe{w}?', 'can I have {x}{w}', 'is it ok to have {x}{w}', 'Is {x} OK{w}?',
+             '{x}{w} - safe?', 'am I allowed {x}{w}'),
+    'amount': ('how much {x} can I have{w}?', 'how much {x} per day{w}', 'max {x} per day{w}?'),
+    'risks': ('what are the risks of {x}{w}?', 'is {x} dangerous{w}', 'risks of {x}{w}'),
+}
+WEEK_FORMS = ('', ' at {n} weeks', ' in week {n}', ' at week {n}', ' {n} weeks pregnant')
+
+
+def trimester(week):
+    return 1 if week < 14 else 2 if week < 28 else 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=50000)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--size', type=int, default=5000, help='cache entries')
+    args = parser.parse_args()
+
+    setup_django()
+    from women.answer_cache import AnswerCache
+
+    rng = random.Random(11)
+    topics = [(item, kind) for item in ITEMS for kind in KINDS]
+    rng.shuffle(topics)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(topics))]
+    rows = []
+    for size in (args.size, len(topics)):
+        cache = AnswerCache(max_entries=size)
+        seen_text, exact_hits, false_hits, samples = set(), 0, 0, []
+        stream = random.Random(5)
+        for _ in range(args.questions):
+            item, kind = stream.choices(topics, weights)[0]
+            week = stream.randint(5, 40)
+            question = stream.choice(KINDS[kind]).format(
+                x=item, w=stream.choice(WEEK_FORMS).format(n=week))
+            truth = '%s/%s/%s' % (item, kind, trimester(week))
+            key = (question, trimester(week))
+            exact_hits += key in seen_text
+            seen_text.add(key)
+            started = time.perf_counter()
+            answer = cache.get(question, week=week)
+            samples.append(time.perf_counter() - started)
+            if answer is None:
+                cache.put(question, truth, week=week)
+            elif answer != truth:
+                false_hits += 1
+        rows.append({'entries': size, 'topics x trimesters': len(topics) * 3,
+                     'hit rate': '%.1f%%' % (100 * cache.hit_rate),
+                     'false hits': '%.2f%%' % (100 * false_hits / args.questions),
+                     'exact-text hit rate': '%.1f%%' % (100 * exact_hits / args.questions),
+                     'p50 us': round(percentile(samples, 50) * 1e6, 1),
+                     'p99 us': round(percentile(samples, 99) * 1e6, 1), 'evictions': cache.evictions})
+    print_table(rows, ['entries', 'topics x trimesters', 'hit rate', 'false hits', 'exact-text hit rate',
+                       'p50 us', 'p99 us', 'evictions'])
+
+
+if __name__ == '__main__':
+    main()
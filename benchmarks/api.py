@@ -0,0 +1,74 @@
+"""Bytes on the wire and server time: HTML pages vs the JSON API.
+
+Seeds one user with a long growth and cycle history and fetches the same
+data as the HTML page, the full API page, a sparse ``?fields=`` page, the
+sparse page gzipped and a conditional GET answered with 304. Usage::
+
+    python -m benchmarks.api --records 500 --rounds 20
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+
+def seed(records):
+    from django.contrib.auth.models import User
+    from women.models import BabyProfile, GrowthRecord, MenstrualCycle, PostpartumProfile
+    user = User.objects.create(username='mum@example.com')
+    profile = PostpartumProfile.objects.create(user=user, delivery_date=date(2024, 1, 1), delivery_type='vaginal',
+                                               baby_weight=3.3)
+    baby = BabyProfile.objects.create(postpartum_profile=profile, name='Baby', birth_date=date(2024, 1, 1), sex='F',
+                                      birth_weight=3.3, birth_length=50, apgar_score=9)
+    GrowthRecord.objects.bulk_create(
+        GrowthRecord(baby=baby, record_date=date(2024, 1, 1) + timedelta(days=i), weight=3.3 + i * 0.01,
+                     length=50 + i * 0.03, head_circumference=35 + i * 0.01, milestones='Smiles, rolls over',
+                     notes='Routine check, feeding well.')
+        for i in range(records))
+    MenstrualCycle.objects.bulk_create(
+        MenstrualCycle(user=user, period_start_date=date(2010, 1, 1) + timedelta(days=28 * i),
+                       period_end_date=date(2010, 1, 5) + timedelta(days=28 * i), flow_intensity='medium',
+                       symptoms='Mild cramps')
+        for i in range(records))
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django(ALLOWED_HOSTS=['testserver'])
+    migrate()
+    from django.test import Client
+
+    client = Client()
+    client.force_login(seed(args.records))
+    etag = client.get('/api/growth/', {'fields': 'record_date,weight'})['ETag']
+    runs = [
+        ('baby care page (HTML)', '/baby-care/', {}, {}),
+        ('menstrual page (HTML)', '/menstrual-tracking/', {}, {}),
+        ('growth API, all fields', '/api/growth/', {}, {}),
+        ('growth API, 2 fields', '/api/growth/', {'fields': 'record_date,weight'}, {}),
+        ('growth API, 2 fields, gzip', '/api/growth/', {'fields': 'record_date,weight'},
+         {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+        ('growth API, 304', '/api/growth/', {'fields': 'record_date,weight'}, {'HTTP_IF_NONE_MATCH': etag}),
+        ('cycles API, 2 fields, gzip', '/api/cycles/', {'fields': 'period_start_date,cycle_length'},
+         {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+    ]
+    rows = []
+    for name, url, params, headers in runs:
+        samples = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            response = client.get(url, params, **headers)
+            samples.append(time.perf_counter() - started)
+        rows.append({'request': name, 'status': response.status_code, 'bytes': len(response.content),
+                     'p50 ms': round(percentile(samples, 50) * 1000, 1)})
+    print_table(rows, ['request', 'status', 'bytes', 'p50 ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Chat retention: archiving old messages and reading threads afterwards.
+
+Seeds N users and M read messages spread evenly over the last two years,
+each user talking to a handful of contacts. Times a thread read (the
+latest page, then paging back through the whole thread) and the live
+table's size, then runs ``archive_messages()`` with the default retention
+and repeats both. Usage::
+
+    python -m benchmarks.archive --users 10000 --messages 1000000
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+
+def seed(users, messages, rng, now):
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, last_login, is_superuser, username, first_name, last_name, email, '
+            'is_staff, is_active, date_joined) VALUES (%s, NULL, 0, %s, %s, %s, %s, 0, 1, %s)',
+            [('', 'user%d' % i, '', '', '', '2024-01-01') for i in range(users)])
+        contacts = {user: [random.Random(user).randint(1, users) for _ in range(5)] for user in range(1, users + 1)}
+        start = now - timedelta(days=730)
+        step = timedelta(days=730) / messages
+        batch = []
+        for i in range(messages):
+            user = rng.randint(1, users)
+            other = rng.choice(contacts[user])
+            sender, receiver = (user, other) if rng.random() < 0.5 else (other, user)
+            batch.append((sender, receiver, 'Message %d: how are you feeling today?' % i, start + step * i, True))
+            if len(batch) == 50000:
+                cursor.executemany('INSERT INTO chat_message (sender_id, receiver_id, message, timestamp, is_read) '
+                                   'VALUES (%s, %s, %s, %s, %s)', batch)
+                batch = []
+        cursor.executemany('INSERT INTO chat_message (sender_id, receiver_id, message, timestamp, is_read) '
+                           'VALUES (%s, %s, %s, %s, %s)', batch)
+        cursor.execute('ANALYZE')
+    return contacts
+
+
+def table_bytes(name):
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                       [name])
+        return cursor.fetchone()[0] or 0
+
+
+def read_thread(user, other, rounds):
+    from chat.archive import thread
+    samples, pages = [], 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        thread(user, other)
+        samples.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    messages, more = thread(user, other)
+    while more:
+        messages, more = thread(user, other, before=messages[0].id)
+        pages += 1
+    return round(percentile(samples, 50) * 1000, 2), pages + 1, round((time.perf_counter() - started) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.conf import settings
+    from django.db import connection
+    from django.utils import timezone
+    from chat.archive import archive_messages
+    from chat.models import Message
+
+    now = timezone.now()
+    started = time.perf_counter()
+    contacts = seed(args.users, args.messages, random.Random(5), now)
+    print('seeded %d users, %d messages in %.1fs' % (args.users, args.messages, time.perf_counter() - started))
+    user = 1
+    other = max(contacts[user], key=lambda contact: Message.objects.filter(sender_id=user, receiver_id=contact)
+                .count())
+
+    rows = []
+
+    def measure(step):
+        p50, pages, full = read_thread(user, other, args.rounds)
+        rows.append({'step': step, 'live rows': Message.objects.count(),
+                     'message MB': round(table_bytes('chat_message') / 2 ** 20, 1),
+                     'archive MB': round(table_bytes('chat_messagearchive') / 2 ** 20, 1),
+                     'latest page ms': p50, 'pages': pages, 'whole thread ms': full})
+
+    measure('before archiving')
+    started = time.perf_counter()
+    archived, blocks = archive_messages()
+    elapsed = time.perf_counter() - started
+    print('archived %d messages older than %d days into %d blocks in %.1fs (%d messages/s)'
+          % (archived, settings.CHAT_RETENTION_DAYS, blocks, elapsed, archived / elapsed))
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
+    measure('after archiving + VACUUM')
+    print_table(rows, ['step', 'live rows', 'message MB', 'archive MB', 'latest page ms', 'pages',
+                       'whole thread ms'])
+
+
+if __name__ == '__main__':
+    main()
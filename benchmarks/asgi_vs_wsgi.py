@@ -0,0 +1,188 @@
+"""WSGI vs ASGI: how many concurrent requests one process keeps in flight.
+
+Both modes serve the same page against the same SQLite file, with simulated
+database latency on every statement so the pages are I/O-bound.
+
+* ``wsgi`` models a gunicorn sync worker with ``--threads N``: the sync views
+  run on N threads and further requests wait for a free thread.
+* ``asgi`` calls ``Safeher.asgi.application`` (async view variants) on a
+  single event loop, the way uvicorn/daphne would.
+
+Each mode runs in its own process. Usage::
+
+    python -m benchmarks.asgi_vs_wsgi --path /emergency-services/ --concurrency 8 32 128
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import inject_latency, migrate, percentile, print_table, setup_django
+
+USERNAME = 'bench@example.com'
+
+
+def _prepare(db_path):
+    setup_django(db_path)
+    migrate()
+    from django.contrib.auth.models import User
+    from women.models import (AIConversation, AIHealthInsight, AISymptomChecker, EmergencyContact,
+                              HealthcareProvider, MEWS_Assessment, SOS_Alert)
+
+    user = User.objects.create_user(username=USERNAME, password='bench')
+    MEWS_Assessment.objects.bulk_create(
+        MEWS_Assessment(user=user, systolic_bp=118, diastolic_bp=76, heart_rate=72, respiratory_rate=16,
+                        temperature=36.7, oxygen_saturation=98, consciousness_level=4, urine_output=1.1)
+        for _ in range(20))
+    EmergencyContact.objects.create(user=user, name='Asha', relationship='sister', phone_number='5550100')
+    SOS_Alert.objects.create(user=user, alert_type='medical', message='Dizzy spell')
+    AIConversation.objects.create(user=user, conversation_id='bench')
+    AISymptomChecker.objects.create(user=user, symptoms='headache', ai_analysis='-', severity_level='low',
+                                    recommendations='rest')
+    AIHealthInsight.objects.create(user=user, insight_type='sleep', title='Sleep', content='-', priority='low')
+    HealthcareProvider.objects.bulk_create(
+        HealthcareProvider(name='Provider %d' % i, specialization='Obstetrics', experience_years=10)
+        for i in range(20))
+
+
+def _session_cookies():
+    from django.contrib.auth.models import User
+    from django.test import Client
+    client = Client()
+    client.force_login(User.objects.get(username=USERNAME))
+    return client.cookies
+
+
+def _run_wsgi(path, concurrency, total, threads):
+    from django.test import Client
+
+    cookies = _session_cookies()
+    workers = threading.BoundedSemaphore(threads)
+    latencies, lock = [], threading.Lock()
+    in_flight = peak = 0
+    remaining = [total]
+
+    def client_loop():
+        nonlocal in_flight, peak
+        client = Client()
+        client.cookies = cookies
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            with workers:
+                with lock:
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                response = client.get(path)
+                with lock:
+                    in_flight -= 1
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - started)
+
+    loops = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for loop in loops:
+        loop.start()
+    for loop in loops:
+        loop.join()
+    return time.perf_counter() - started, latencies, peak
+
+
+def _run_asgi(path, concurrency, total):
+    from Safeher.asgi import application
+
+    cookies = _session_cookies()
+    headers = [(b'host', b'localhost'),
+               (b'cookie', '; '.join('%s=%s' % (k, m.value) for k, m in cookies.items()).encode())]
+    latencies = []
+    in_flight = peak = 0
+    remaining = [total]
+
+    async def get():
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                 'headers': headers, 'client': ('127.0.0.1', 40000), 'server': ('localhost', 80)}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        await application(scope, receive, send)
+        return sent[0]['status']
+
+    async def client_loop():
+        nonlocal in_flight, peak
+        while remaining[0]:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            in_flight += 1
+            peak = max(peak, in_flight)
+            status = await get()
+            in_flight -= 1
+            assert status == 200, status
+            latencies.append(time.perf_counter() - started)
+
+    async def run():
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - started, latencies, peak
+
+
+def _worker(mode, db_path, path, concurrency, total, threads, latency, results):
+    os.environ['PREGACARE_ASYNC_VIEWS'] = '1' if mode == 'asgi' else '0'
+    setup_django(db_path, DEBUG=False, ALLOWED_HOSTS=['*'])
+    inject_latency(latency)
+    if mode == 'asgi':
+        elapsed, latencies, peak = _run_asgi(path, concurrency, total)
+    else:
+        elapsed, latencies, peak = _run_wsgi(path, concurrency, total, threads)
+    results.put({
+        'mode': mode,
+        'clients': concurrency,
+        'peak in flight': peak,
+        'req/s': round(len(latencies) / elapsed, 1),
+        'p50 ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95 ms': round(percentile(latencies, 95) * 1000, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default='/emergency-services/')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=4, help='WSGI worker threads per process')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated latency per SQL statement')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='pregacare-asgi-'), 'bench.sqlite3')
+    ctx = multiprocessing.get_context('spawn')
+    prepare = ctx.Process(target=_prepare, args=(db_path,))
+    prepare.start()
+    prepare.join()
+
+    rows = []
+    for concurrency in args.concurrency:
+        for mode in ('wsgi', 'asgi'):
+            results = ctx.Queue()
+            proc = ctx.Process(target=_worker, args=(mode, db_path, args.path, concurrency, args.requests,
+                                                     args.threads, args.latency_ms / 1000.0, results))
+            proc.start()
+            rows.append(results.get())
+            proc.join()
+    print_table(rows, ['mode', 'clients', 'peak in flight', 'req/s', 'p50 ms', 'p95 ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Throughput of the telehealth booking path under contention.
+
+Worker processes book random slots through ``women.booking.book_appointment``
+against a shared SQLite file. The ``spread`` scenario spreads attempts over
+many providers and days; ``hot`` sends every attempt at a handful of slots.
+Afterwards the benchmark checks that no slot was booked twice. Usage::
+
+    python -m benchmarks.booking --workers 8 --attempts 300
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+
+def _prepare(db_path, providers, patients):
+    setup_django(db_path)
+    migrate()
+    from django.contrib.auth.models import User
+    from women.models import HealthcareProvider
+    User.objects.bulk_create(User(username='patient%d@example.com' % i) for i in range(patients))
+    HealthcareProvider.objects.bulk_create(
+        HealthcareProvider(name='Provider %d' % i, specialization='Obstetrics', experience_years=5)
+        for i in range(providers))
+
+
+def _worker(db_path, scenario, attempts, seed, results):
+    setup_django(db_path)
+    from datetime import date, timedelta
+    from django.contrib.auth.models import User
+    from women.booking import DAY_SLOTS, SlotUnavailable, book_appointment, _time
+    from women.models import HealthcareProvider
+
+    rng = random.Random(seed)
+    patients = list(User.objects.all())
+    providers = list(HealthcareProvider.objects.all())
+    if scenario == 'hot':
+        providers, days, slots = providers[:1], 1, DAY_SLOTS[:4]
+    else:
+        days, slots = 14, DAY_SLOTS
+    tomorrow = date.today() + timedelta(days=1)
+
+    latencies, booked = [], 0
+    for _ in range(attempts):
+        started = time.perf_counter()
+        try:
+            book_appointment(rng.choice(patients), rng.choice(providers),
+                             tomorrow + timedelta(days=rng.randrange(days)), _time(rng.choice(slots)))
+            booked += 1
+        except SlotUnavailable:
+            pass
+        latencies.append(time.perf_counter() - started)
+    results.put((latencies, booked))
+
+
+def _double_bookings(db_path):
+    setup_django(db_path)
+    from django.db.models import Count
+    from women.models import AppointmentSlot
+    return (AppointmentSlot.objects.values('provider', 'slot_date', 'slot_time')
+            .annotate(n=Count('id')).filter(n__gt=1).count())
+
+
+def run(scenario, workers, attempts, providers):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='pregacare-booking-'), 'bench.sqlite3')
+    ctx = multiprocessing.get_context('spawn')
+    prepare = ctx.Process(target=_prepare, args=(db_path, providers, 200))
+    prepare.start()
+    prepare.join()
+
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(db_path, scenario, attempts, seed, results))
+             for seed in range(workers)]
+    started = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    latencies, booked = [], 0
+    for _ in procs:
+        worker_latencies, worker_booked = results.get()
+        latencies += worker_latencies
+        booked += worker_booked
+    elapsed = time.perf_counter() - started
+    for proc in procs:
+        proc.join()
+
+    with ctx.Pool(1) as pool:
+        doubles = pool.apply(_double_bookings, (db_path,))
+    return {
+        'scenario': scenario,
+        'attempts': len(latencies),
+        'booked': booked,
+        'conflicts': len(latencies) - booked,
+        'attempts/s': round(len(latencies) / elapsed, 1),
+        'p50 ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99 ms': round(percentile(latencies, 99) * 1000, 2),
+        'double-booked': doubles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=300, help='booking attempts per worker')
+    parser.add_argument('--providers', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = [run(scenario, args.workers, args.attempts, args.providers) for scenario in ('spread', 'hot')]
+    print_table(rows, ['scenario', 'attempts', 'booked', 'conflicts', 'attempts/s', 'p50 ms', 'p99 ms',
+                       'double-booked'])
+
+
+if __name__ == '__main__':
+    main()
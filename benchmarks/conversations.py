@@ -0,0 +1,97 @@
+"""Chat sidebar and unread handling at scale.
+
+Seeds N users, each with a handful of contacts, and M messages between
+contacts. The first users are heavy: they have hundreds of contacts and
+take part in a fifth of the traffic. Builds the conversation index with
+``rebuild_conversations()`` and times, for a heavy user: the old sidebar
+query (every other user), the conversation list, polling a thread's unread
+messages and marking a thread read. Usage::
+
+    python -m benchmarks.conversations --users 100000 --messages 1000000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+
+def seed(users, messages, rng):
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, last_login, is_superuser, username, first_name, last_name, email, '
+            'is_staff, is_active, date_joined) VALUES (%s, NULL, 0, %s, %s, %s, %s, 0, 1, %s)',
+            [('', 'user%d' % i, '', '', '', '2026-01-01') for i in range(users)])
+        heavy = max(users // 1000, 1)
+        contacts = {}
+
+        def contacts_of(user):
+            if user not in contacts:
+                own = random.Random(user)
+                contacts[user] = [own.randint(1, users) for _ in range(500 if user <= heavy else 10)]
+            return contacts[user]
+
+        batch = []
+        for i in range(messages):
+            user = rng.randint(1, heavy) if rng.random() < 0.2 else rng.randint(1, users)
+            other = rng.choice(contacts_of(user))
+            sender, receiver = (user, other) if rng.random() < 0.5 else (other, user)
+            batch.append((sender, receiver, 'message %d' % i,
+                          '2026-01-01 00:00:00.%06d' % (i % 1000000), rng.random() < 0.9))
+            if len(batch) == 50000:
+                cursor.executemany('INSERT INTO chat_message (sender_id, receiver_id, message, timestamp, is_read) '
+                                   'VALUES (%s, %s, %s, %s, %s)', batch)
+                batch = []
+        cursor.executemany('INSERT INTO chat_message (sender_id, receiver_id, message, timestamp, is_read) '
+                           'VALUES (%s, %s, %s, %s, %s)', batch)
+        cursor.execute('ANALYZE')
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(percentile(samples, 50) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.contrib.auth.models import User
+    from chat.conversations import conversation_list, mark_read, rebuild_conversations
+    from chat.models import Message
+
+    started = time.perf_counter()
+    seed(args.users, args.messages, random.Random(3))
+    print('seeded %d users, %d messages in %.1fs' % (args.users, args.messages, time.perf_counter() - started))
+    started = time.perf_counter()
+    conversations = rebuild_conversations()
+    print('rebuilt %d conversations in %.1fs' % (conversations, time.perf_counter() - started))
+
+    user = User.objects.get(id=1)
+    sender = Message.objects.filter(receiver=user, is_read=False).values_list('sender_id', flat=True).first()
+    rows = [
+        {'query': 'old sidebar: every other user', 'p50 ms': timed(
+            lambda: list(User.objects.exclude(username=user.username)), 3)},
+        {'query': 'conversation list (50)', 'p50 ms': timed(lambda: conversation_list(user), args.rounds)},
+        {'query': 'poll unread in a thread', 'p50 ms': timed(
+            lambda: list(Message.objects.filter(sender_id=sender, receiver=user, is_read=False).order_by('id')),
+            args.rounds)},
+        {'query': 'mark thread read', 'p50 ms': timed(lambda: mark_read(user.id, sender), args.rounds)},
+    ]
+    print('heavy user: %d messages received, %d conversations'
+          % (Message.objects.filter(receiver=user).count(), user.conversations.count()))
+    print_table(rows, ['query', 'p50 ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Growth percentile scoring throughput.
+
+Times ``women.growth.zscores()`` + ``percentiles()`` on synthetic arrays of
+N measurements (the vectorised scoring on its own), then seeds a database
+with growth histories and times the whole ``faltering()`` batch, including
+the query. Usage::
+
+    python -m benchmarks.growth --measurements 5000000 --babies 20000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+
+def seed(babies, visits, rng):
+    from django.contrib.auth.models import User
+    from women.models import BabyProfile, GrowthRecord, PostpartumProfile
+    User.objects.bulk_create(User(username='mum%d@example.com' % i) for i in range(babies))
+    PostpartumProfile.objects.bulk_create(
+        PostpartumProfile(user_id=user, delivery_date=date(2025, 1, 1), delivery_type='vaginal', baby_weight=3.3)
+        for user in User.objects.values_list('id', flat=True))
+    BabyProfile.objects.bulk_create(
+        BabyProfile(postpartum_profile_id=profile, name='Baby %d' % profile, birth_date=date(2025, 1, 1),
+                    sex=rng.choice('MF'), birth_weight=3.3, birth_length=50, apgar_score=9)
+        for profile in PostpartumProfile.objects.values_list('id', flat=True))
+    batch = []
+    for baby in BabyProfile.objects.values_list('id', flat=True):
+        weight = rng.gauss(3.3, 0.4)
+        for visit in range(visits):
+            batch.append(GrowthRecord(baby_id=baby, record_date=date(2025, 1, 1) + timedelta(days=30 * visit),
+                                      weight=weight, length=50 + 2.5 * visit, head_circumference=35 + visit))
+            weight += rng.gauss(0.6, 0.25) if visit < 6 else rng.gauss(0.3, 0.15)
+        if len(batch) >= 10000:
+            GrowthRecord.objects.bulk_create(batch)
+            batch = []
+    GrowthRecord.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--measurements', type=int, default=5000000)
+    parser.add_argument('--babies', type=int, default=20000)
+    parser.add_argument('--visits', type=int, default=12, help='growth records per baby')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    import numpy as np
+    from women.growth import faltering, percentiles, zscores
+
+    rng = np.random.default_rng(5)
+    n = args.measurements
+    sexes = rng.integers(0, 2, n)
+    ages = rng.integers(0, 731, n)
+    weights = rng.normal(3.3 + ages * 0.012, 0.8)
+    rows = []
+    for measure in ('weight', 'length'):
+        values = weights if measure == 'weight' else rng.normal(50 + ages * 0.05, 3)
+        samples = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            percentiles(zscores(measure, sexes, ages, values))
+            samples.append(time.perf_counter() - started)
+        best = percentile(samples, 50)
+        rows.append({'run': '%s, arrays only' % measure, 'records': n, 'seconds': round(best, 3),
+                     'records/s': int(n / best)})
+
+    seed(args.babies, args.visits, random.Random(5))
+    started = time.perf_counter()
+    flagged = faltering()
+    elapsed = time.perf_counter() - started
+    records = args.babies * args.visits
+    rows.append({'run': 'faltering() with query', 'records': records, 'seconds': round(elapsed, 3),
+                 'records/s': int(records / elapsed)})
+
+    print_table(rows, ['run', 'records', 'seconds', 'records/s'])
+    print('%d of %d babies flagged' % (len(flagged), args.babies))
+
+
+if __name__ == '__main__':
+    main()
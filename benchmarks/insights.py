@@ -0,0 +1,110 @@
+"""Nightly insight generation over N users.
+
+Seeds N users: 30% track cycles (3 each), 15% are pregnant with a
+nutrition plan, 5% logged MEWS readings this week, and 10% are postpartum,
+half of them with check-ins. Runs ``generate_insights()`` in-process and
+with a process pool, then once more to show that deduplication makes a
+re-run write nothing. Usage::
+
+    python -m benchmarks.insights --users 1000000 --workers 4
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+
+def seed(users, rng, today):
+    from django.db import connection
+    now = datetime.combine(today, datetime.min.time())
+
+    def insert(sql, rows):
+        for start in range(0, len(rows), 50000):
+            cursor.executemany(sql, rows[start:start + 50000])
+
+    with connection.cursor() as cursor:
+        insert('INSERT INTO auth_user (password, last_login, is_superuser, username, first_name, last_name, email, '
+               'is_staff, is_active, date_joined) VALUES (%s, NULL, 0, %s, %s, %s, %s, 0, 1, %s)',
+               [('', 'user%d' % i, '', '', '', '2025-01-01') for i in range(users)])
+        cycles, pregnancies, plans, mews, postpartum, checks = [], [], [], [], [], []
+        for user in range(1, users + 1):
+            roll = rng.random()
+            if roll < 0.30:
+                start = today - timedelta(days=rng.randint(0, 50))
+                for _ in range(3):
+                    length = rng.choice((26, 28, 28, 30, 35, 42))
+                    cycles.append((user, start, start + timedelta(days=4), length, 'medium', '', uuid.uuid4().hex, now))
+                    start -= timedelta(days=length)
+            elif roll < 0.45:
+                week = rng.randint(4, 40)
+                lmp = today - timedelta(weeks=week)
+                pregnancies.append((user, lmp, lmp + timedelta(weeks=40), 1 + (week > 13) + (week > 27), 0))
+                plans.append((len(pregnancies), max(week - rng.randint(0, 3), 1)))
+                if rng.random() < 0.33:
+                    for _ in range(3):
+                        mews.append((user, now - timedelta(days=rng.randint(0, 6)), rng.randint(100, 160),
+                                     rng.randint(60, 100), rng.randint(55, 120), rng.randint(12, 24),
+                                     round(rng.uniform(36, 38.6), 1), rng.randint(92, 100), 4, 60.0,
+                                     uuid.uuid4().hex, now))
+            elif roll < 0.55:
+                postpartum.append((user, today - timedelta(days=rng.randint(0, 120)), 'vaginal', 3.3, ''))
+                if rng.random() < 0.5:
+                    for _ in range(3):
+                        checks.append((len(postpartum), today - timedelta(days=rng.randint(0, 13)), 5, 5,
+                                       round(rng.uniform(3, 9), 1), 5, ''))
+        insert('INSERT INTO women_menstrualcycle (user_id, period_start_date, period_end_date, cycle_length, '
+               'flow_intensity, symptoms, client_id, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)', cycles)
+        insert('INSERT INTO women_pregnancyprofile (user_id, last_menstrual_period, due_date, current_trimester, '
+               'is_high_risk) VALUES (%s, %s, %s, %s, %s)', pregnancies)
+        insert("INSERT INTO women_nutritionalplan (pregnancy_profile_id, week, trimester, calories_needed, "
+               "protein_grams, iron_mg, calcium_mg, folic_acid_mcg, foods_recommended, foods_to_avoid, supplements) "
+               "VALUES (%s, %s, 2, 2200, 70, 27, 1000, 600, '', '', '')", plans)
+        insert('INSERT INTO women_mews_assessment (user_id, assessment_date, systolic_bp, diastolic_bp, heart_rate, '
+               'respiratory_rate, temperature, oxygen_saturation, consciousness_level, urine_output, client_id, '
+               'updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)', mews)
+        insert('INSERT INTO women_postpartumprofile (user_id, delivery_date, delivery_type, baby_weight, '
+               'complications) VALUES (%s, %s, %s, %s, %s)', postpartum)
+        insert('INSERT INTO women_mentalhealthcheck (postpartum_profile_id, check_date, mood_score, anxiety_level, '
+               'sleep_hours, appetite_level, notes) VALUES (%s, %s, %s, %s, %s, %s, %s)', checks)
+        cursor.execute('ANALYZE')
+    return len(cycles) + len(pregnancies) + len(plans) + len(mews) + len(postpartum) + len(checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django(USE_TZ=False)
+    migrate()
+    from women.insights import generate_insights
+    from women.models import AIHealthInsight
+
+    today = date(2026, 3, 10)
+    started = time.perf_counter()
+    rows = seed(args.users, random.Random(1), today)
+    print('seeded %d users, %d rows in %.1fs' % (args.users, rows, time.perf_counter() - started))
+    as_of = datetime(2026, 3, 10, 23, 0)
+
+    results = []
+    for step, workers in (('in-process', 1), ('process pool x%d' % args.workers, args.workers),
+                          ('re-run (all duplicates)', 1)):
+        if step.startswith('process'):
+            AIHealthInsight.objects.all().delete()
+        started = time.perf_counter()
+        raised, created = generate_insights(as_of, args.chunk_size, workers)
+        elapsed = time.perf_counter() - started
+        results.append({'run': step, 'raised': raised, 'new': created, 'seconds': round(elapsed, 1),
+                        'users/s': int(args.users / elapsed)})
+    print('%d cores' % os.cpu_count())
+    print_table(results, ['run', 'raised', 'new', 'seconds', 'users/s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""Clinic traffic load test: weighted request mixes at rising concurrency.
+
+Each virtual client is one logged-in population account (see
+``benchmarks/population.py``). It logs in through the real ``/login/`` form,
+then requests the pages and APIs of a ``--mix`` as fast as it can, or with
+``--think-ms`` of pause between requests. The number of clients steps
+through ``--concurrency``, ``--duration`` seconds at each step. Each step
+reports:
+- throughput;
+- the share of failed requests: HTTP errors, connection failures, and
+  pages that bounced to the login page;
+- p50/p95/p99 latency.
+
+The table across steps is the latency curve. The ramp stops after the first
+step past ``--slo-p95-ms`` or ``--max-error-rate``, which is where the server
+saturates.
+
+With no ``--base-url`` the script seeds a database and serves it itself with
+``--server`` (Django's dev server, gunicorn or uvicorn). Give ``--base-url``
+to load a server you started yourself. It must use the ``--db`` file, seeded
+beforehand with ``--seed-only``. Usage::
+
+    python -m benchmarks.load --mix morning_rush --concurrency 1 2 4 8 16
+    python -m benchmarks.load --server gunicorn --workers 4 --output gunicorn.json
+    python -m benchmarks.load --db /tmp/clinic.sqlite3 --seed-only --users 1000
+    PREGACARE_DB_PATH=/tmp/clinic.sqlite3 gunicorn Safeher.wsgi:application --workers 4
+    python -m benchmarks.load --db /tmp/clinic.sqlite3 --base-url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from benchmarks.population import PASSWORD
+from benchmarks.utils import ROOT, migrate, percentile, print_table, setup_django
+
+# Share of requests per action name in each mix.
+MIXES = {
+    # Chat polling, MEWS entry and dashboard loads as a clinic opens.
+    'morning_rush': {'chat_poll': 40, 'dashboard': 15, 'mews_entry': 10, 'mews_history': 5, 'chat_page': 5,
+                     'emergency': 5, 'telehealth': 10, 'menstrual_tracking': 5, 'assistant': 5},
+    # Mothers and babies checked after delivery.
+    'postnatal_clinic': {'baby_care': 15, 'growth': 15, 'vaccinations': 15, 'mews_entry': 10, 'postpartum_care': 10,
+                         'chat_poll': 20, 'dashboard': 10, 'symptom_check': 5},
+    # Members reading at home.
+    'browsing': {'dashboard': 20, 'educational_resources': 20, 'menstrual_tracking': 15, 'nutrition_engine': 10,
+                 'pregnancy_profile': 10, 'assistant': 10, 'faq': 15},
+}
+
+Account = namedtuple('Account', ['username', 'user_id', 'midwife_id', 'conversation_id'])
+Sample = namedtuple('Sample', ['action', 'seconds', 'error'])
+
+
+class Session:
+    """One logged-in client: a cookie jar and its account's ids."""
+
+    def __init__(self, base_url, account, timeout, seed):
+        self.base_url = base_url.rstrip('/')
+        self.account = account
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+        self.sync_token = None
+
+    def cookie(self, name):
+        return next((c.value for c in self.cookies if c.name == name), '')
+
+    def request(self, path, data=None, json_body=None):
+        """``(status, body)`` of a request; redirects are followed."""
+        headers = {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            data = urlencode(data).encode()
+        if data is not None:
+            headers['X-CSRFToken'] = self.cookie('csrftoken')
+        response = self.opener.open(Request(self.base_url + path, data=data, headers=headers), timeout=self.timeout)
+        with response:
+            body = response.read()
+        if urlsplit(response.geturl()).path.startswith('/login') and not path.startswith('/login'):
+            raise LoggedOut(path)
+        return response.status, body
+
+    def login(self):
+        self.request('/login/')
+        self.request('/login/', {'email': self.account.username, 'pwd': PASSWORD,
+                                 'csrfmiddlewaretoken': self.cookie('csrftoken')})
+        if not self.cookie('sessionid'):
+            raise RuntimeError('%s could not log in' % self.account.username)
+
+
+class LoggedOut(Exception):
+    pass
+
+
+def _mews_reading(rng):
+    return {'client_id': str(uuid.uuid4()), 'assessment_date': datetime.now().isoformat(timespec='seconds'),
+            'systolic_bp': rng.randint(100, 150), 'diastolic_bp': rng.randint(60, 95),
+            'heart_rate': rng.randint(60, 110), 'respiratory_rate': rng.randint(12, 22),
+            'temperature': round(rng.uniform(36.2, 38.2), 1), 'oxygen_saturation': rng.randint(94, 100),
+            'consciousness_level': 4, 'urine_output': round(rng.uniform(0.5, 1.5), 2)}
+
+
+def mews_entry(session):
+    """Sync one new MEWS reading, carrying the sync token like the app does."""
+    status, body = session.request('/api/sync/', json_body={
+        'token': session.sync_token, 'changes': {'mews': [_mews_reading(session.rng)]}})
+    session.sync_token = json.loads(body).get('token')
+
+
+def assistant(session):
+    if session.account.conversation_id:
+        session.request('/api/assistant/%s/messages/' % session.account.conversation_id)
+    else:
+        session.request('/ai-assistant/')
+
+
+def _get(path):
+    return lambda session: session.request(path.format(account=session.account))
+
+
+ACTIONS = {
+    'chat_poll': _get('/api/messages/{account.midwife_id}/{account.user_id}'),
+    'chat_page': _get('/chat/chat/{account.user_id}/{account.midwife_id}/'),
+    'dashboard': _get('/dashboard/'),
+    'mews_entry': mews_entry,
+    'mews_history': _get('/api/mews/'),
+    'emergency': _get('/emergency-services/'),
+    'telehealth': _get('/telehealth/'),
+    'menstrual_tracking': _get('/menstrual-tracking/'),
+    'pregnancy_profile': _get('/pregnancy-profile/'),
+    'nutrition_engine': _get('/nutrition-engine/'),
+    'postpartum_care': _get('/postpartum-care/'),
+    'baby_care': _get('/baby-care/'),
+    'growth': _get('/api/growth/'),
+    'vaccinations': _get('/api/vaccinations/'),
+    'educational_resources': _get('/educational-resources/'),
+    'faq': _get('/faq/'),
+    'assistant': assistant,
+    'symptom_check': lambda session: session.request('/api/symptom-check/', {'symptoms': 'headache, swelling'}),
+}
+
+
+def parse_weights(text):
+    """``{'chat_poll': 50.0, ...}`` from ``chat_poll=50,dashboard=50``."""
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError('unknown action %r; choose from %s' % (
+                name.strip(), ', '.join(sorted(ACTIONS))))
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def accounts(count):
+    """The first ``count`` members, with a midwife they chat with and their assistant thread."""
+    from django.contrib.auth.models import User
+    from django.db.models import Q
+    from chat.models import Message
+    from women.models import AIConversation
+
+    midwives = list(User.objects.filter(username__startswith='midwife').order_by('id').values_list('id', flat=True))
+    members = list(User.objects.filter(username__startswith='user').order_by('id').values_list('id', 'username')[:count])
+    if not members or not midwives:
+        raise SystemExit('The database has no population; seed it with --seed-only')
+    threads = {}
+    for sender, receiver in Message.objects.filter(
+            Q(sender__in=midwives) | Q(receiver__in=midwives)).values_list('sender', 'receiver').distinct():
+        member, midwife = (receiver, sender) if sender in midwives else (sender, receiver)
+        threads.setdefault(member, midwife)
+    conversations = dict(AIConversation.objects.filter(user__in=[pk for pk, name in members]).values_list(
+        'user', 'conversation_id'))
+    return [Account(name, pk, threads.get(pk, midwives[0]), conversations.get(pk)) for pk, name in members]
+
+
+def run_step(sessions, weights, duration, think):
+    """Samples of every request the ``sessions`` finish within ``duration`` seconds."""
+    names, shares = list(weights), list(weights.values())
+    deadline = time.perf_counter() + duration
+    per_client = [[] for _ in sessions]
+
+    def client(session, samples):
+        while True:
+            action = session.rng.choices(names, shares)[0]
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            error = None
+            try:
+                ACTIONS[action](session)
+            except HTTPError as failure:
+                error = str(failure.code)
+            except LoggedOut:
+                error = 'logged out'
+            except (URLError, OSError, ValueError) as failure:
+                error = type(failure).__name__
+            samples.append(Sample(action, time.perf_counter() - started, error))
+            if think:
+                time.sleep(session.rng.expovariate(1 / think))
+
+    threads = [threading.Thread(target=client, args=pair) for pair in zip(sessions, per_client)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for samples in per_client for sample in samples]
+
+
+def summarize(samples, seconds):
+    latencies = [s.seconds for s in samples]
+    errors = sum(s.error is not None for s in samples)
+    return {'requests': len(samples), 'req/s': round(len(samples) / seconds, 1),
+            'error %': round(errors / len(samples) * 100, 2) if samples else 0.0,
+            'p50 ms': round(percentile(latencies, 50) * 1000, 1), 'p95 ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99 ms': round(percentile(latencies, 99) * 1000, 1)}
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def start_server(kind, db_path, workers, threads):
+    """Serve ``db_path`` on a free local port; returns ``(process, base_url)``."""
+    port = free_port()
+    address = '127.0.0.1:%d' % port
+    env = dict(os.environ, PREGACARE_DB_PATH=db_path, PREGACARE_ASYNC_VIEWS='1' if kind == 'uvicorn' else '0')
+    if kind == 'runserver':
+        command = [sys.executable, 'manage.py', 'runserver', '--noreload', address]
+    elif kind == 'gunicorn':
+        command = ['gunicorn', 'Safeher.wsgi:application', '--bind', address, '--workers', str(workers),
+                   '--threads', str(threads)]
+    else:
+        command = ['uvicorn', 'Safeher.asgi:application', '--port', str(port), '--workers', str(workers)]
+    if kind != 'runserver' and shutil.which(command[0]) is None:
+        raise SystemExit('%s is not installed' % command[0])
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = 'http://%s' % address
+    for _ in range(300):
+        try:
+            build_opener().open(base_url + '/login/', timeout=1).close()
+            return process, base_url
+        except (URLError, OSError):
+            if process.poll() is not None:
+                raise SystemExit('%s exited with status %d' % (kind, process.returncode))
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit('%s did not start on %s' % (kind, address))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mix', choices=sorted(MIXES), default='morning_rush')
+    parser.add_argument('--weights', type=parse_weights, metavar='ACTION=W,...',
+                        help='Custom mix instead of --mix, from: %s' % ', '.join(sorted(ACTIONS)))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency step')
+    parser.add_argument('--think-ms', type=float, default=0, help='Mean pause between one client\'s requests')
+    parser.add_argument('--slo-p95-ms', type=float, default=1000)
+    parser.add_argument('--max-error-rate', type=float, default=1.0, help='Percent')
+    parser.add_argument('--keep-going', action='store_true', help='Run every step even past saturation')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed')
+    parser.add_argument('--db', help='Database file to seed or load (a fresh temp file by default)')
+    parser.add_argument('--users', type=int, default=200, help='Accounts to seed')
+    parser.add_argument('--seed-only', action='store_true', help='Seed --db and exit')
+    parser.add_argument('--base-url', help='Load this running server instead of starting one')
+    parser.add_argument('--server', choices=['runserver', 'gunicorn', 'uvicorn'], default='runserver')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+    if args.base_url and not args.db:
+        parser.error('--base-url needs --db, the database that server uses, to pick accounts')
+
+    db_path = setup_django(args.db)
+    from django.contrib.auth.models import User
+    from django.db import connection
+    migrate()
+    if not User.objects.exists():
+        from benchmarks.population import build_population
+        started = time.perf_counter()
+        build_population(args.users, seed=args.seed)
+        print('Seeded %d accounts into %s in %.1fs' % (args.users, db_path, time.perf_counter() - started))
+    if args.seed_only:
+        return
+    plans = accounts(max(args.concurrency))
+    connection.close()
+    weights = args.weights or MIXES[args.mix]
+
+    process, base_url = (None, args.base_url) if args.base_url else start_server(
+        args.server, db_path, args.workers, args.threads)
+    steps, saturated = [], None
+    try:
+        sessions = [Session(base_url, plans[i % len(plans)], args.timeout, args.seed + i)
+                    for i in range(max(args.concurrency))]
+        for session in sessions:
+            session.login()
+        for clients in args.concurrency:
+            samples = run_step(sessions[:clients], weights, args.duration, args.think_ms / 1000)
+            step = dict(clients=clients, **summarize(samples, args.duration))
+            by_action = defaultdict(list)
+            for sample in samples:
+                by_action[sample.action].append(sample)
+            step['actions'] = {name: summarize(group, args.duration) for name, group in sorted(by_action.items())}
+            step['errors'] = sorted({s.error for s in samples if s.error})
+            steps.append(step)
+            print('%(clients)d clients: %(req/s)s req/s, %(error %)s%% errors, p95 %(p95 ms)s ms' % step)
+            if saturated is None and (step['p95 ms'] > args.slo_p95_ms or step['error %'] > args.max_error_rate):
+                saturated = clients
+                if not args.keep_going:
+                    break
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    columns = ['clients', 'requests', 'req/s', 'error %', 'p50 ms', 'p95 ms', 'p99 ms']
+    print_table(steps, columns)
+    peak = max(steps, key=lambda step: step['req/s'])
+    print('Peak %.1f req/s at %d clients. Per action at that step:' % (peak['req/s'], peak['clients']))
+    print_table([dict(action=name, **row) for name, row in peak['actions'].items()], ['action'] + columns[1:])
+    if saturated is not None:
+        print('Saturated at %d clients (p95 over %g ms or errors over %g%%)' % (
+            saturated, args.slo_p95_ms, args.max_error_rate))
+    if args.output:
+        meta = {'created': datetime.now().isoformat(timespec='seconds'), 'server': args.base_url or args.server,
+                'workers': args.workers, 'threads': args.threads, 'mix': weights, 'duration': args.duration,
+                'think_ms': args.think_ms, 'accounts': len(plans), 'saturated_at': saturated}
+        with open(args.output, 'w') as output:
+            json.dump({'meta': meta, 'steps': steps}, output, indent=2)
+        print('Wrote %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
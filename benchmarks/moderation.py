@@ -0,0 +1,91 @@
+"""Moderation queue: claiming, bulk transitions and queue depth.
+
+Seeds N pending reports. Times the old path (``save()`` per item, as
+``assign_status`` does) against one ``transition()`` for a batch. It also
+times ``claim()`` and ``queue_depth()``, and has M moderator threads claim at
+once to check that no item is handed out twice. Usage::
+
+    python -m benchmarks.moderation --items 200000 --batch 1000
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+
+def seed(items):
+    from django.db import connection
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, is_staff, "
+            "is_active, date_joined) VALUES ('', 0, %s, '', '', '', 1, 1, '2024-01-01')",
+            [('moderator%d' % i,) for i in range(20)])
+        cursor.executemany(
+            "INSERT INTO women_notes (user_id, uploadingdate, reportfile, filetype, description, status) "
+            "VALUES (1, '2026-01-01 00:00:00', %s, 'report', %s, 'pending')",
+            [('report%d.pdf' % i, 'Report %d on iron levels' % i) for i in range(items)])
+        cursor.execute('ANALYZE')
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--moderators', type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django(SEARCH_EXTRACT_IN_BACKGROUND=False)
+    migrate()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from women.models import Notes
+    from women.moderation import claim, queue_depth, transition
+    from women.sqlite import serialized_write
+
+    seed(args.items)
+    moderators = list(User.objects.order_by('id'))
+    rows = []
+
+    def per_row():
+        for note in Notes.objects.filter(status='pending').order_by('id')[:args.batch]:
+            note.status = 'Accept'
+            with serialized_write():
+                note.save()
+    rows.append({'operation': 'save() x %d (assign_status)' % args.batch, 'ms': timed(per_row)[1]})
+
+    items, ms = timed(lambda: claim('notes', moderators[0], args.batch))
+    rows.append({'operation': 'claim %d' % args.batch, 'ms': ms})
+    changed, ms = timed(lambda: transition('notes', [item.pk for item in items], 'accept', moderators[0]))
+    rows.append({'operation': 'transition %d (one UPDATE)' % changed, 'ms': ms})
+    rows.append({'operation': 'queue_depth', 'ms': timed(queue_depth)[1]})
+
+    claims = {}
+
+    def moderate(moderator):
+        try:
+            claims[moderator.pk] = [item.pk for item in claim('notes', moderator, 50)]
+        finally:
+            connection.close()
+    threads = [threading.Thread(target=moderate, args=(moderator,)) for moderator in moderators[1:args.moderators + 1]]
+
+    def run_all():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    ms = timed(run_all)[1]
+    claimed = [pk for ids in claims.values() for pk in ids]
+    rows.append({'operation': '%d moderators claim 50 at once' % len(threads), 'ms': ms})
+    print_table(rows, ['operation', 'ms'])
+    print('Claimed %d items, %d distinct' % (len(claimed), len(set(claimed))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""Seeded synthetic population for view benchmarks and load tests.
+
+``build_population()`` fills the database with users whose histories look
+like real ones:
+- years of menstrual cycles with per-user cycle lengths;
+- current pregnancies with nutrition plans, medication reminders and MEWS
+  vitals;
+- postpartum profiles with weekly mental-health check-ins and pelvic-floor
+  rehab;
+- babies with growth visits and their vaccination schedule, mostly given
+  on time;
+- telehealth appointments, AI assistant threads, uploads, and chat threads
+  with the clinic's midwives.
+
+Each model has a factory function that returns unsaved instances drawn
+from one ``random.Random(seed)``. The same arguments always produce the
+same data. Rows are written with ``bulk_create``, and the derived state
+that signals would keep is rebuilt afterwards: mental-health trends, chat
+conversations and the search index.
+
+The first user is the "member" the benchmarks log in as. That account has one of
+everything. Every account's password is ``PASSWORD``.
+"""
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+PASSWORD = 'pregacare-bench'
+STAFF_USERNAME = 'clinic-admin'
+MIDWIVES = 5
+
+FIRST_NAMES = 'Aisha Priya Sarah Fatima Mei Olivia Amara Sofia Zara Leila Hannah Grace Nadia Ruth Ana'.split()
+LAST_NAMES = 'Khan Patel Smith Okafor Chen Garcia Mensah Rossi Ahmed Novak Silva Kaur Jones Tanaka'.split()
+SYMPTOMS = ['cramps', 'headache', 'bloating', 'fatigue', 'back pain', 'mood swings', 'breast tenderness']
+SPECIALIZATIONS = ['Obstetrics', 'Gynecology', 'Pediatrics', 'Midwifery', 'Lactation Consultant', 'Nutrition',
+                   'Mental Health', 'Physiotherapy']
+MEDICATIONS = [('Folic acid', '400 mcg'), ('Iron', '65 mg'), ('Prenatal vitamin', '1 tablet'),
+               ('Calcium', '500 mg'), ('Vitamin D', '10 mcg')]
+TOPICS = ('iron folic acid glucose screening blood pressure ultrasound trimester nausea heartburn sleep '
+          'breastfeeding latch postpartum bleeding pelvic floor vaccination growth weight').split()
+QUESTIONS = ['Is it normal to feel this tired in the first trimester?', 'How much iron do I need each day?',
+             'What foods should I avoid while breastfeeding?', 'When should my baby get the MMR vaccine?',
+             'How do I know if my blood pressure is too high?', 'Is spotting normal at 8 weeks?']
+# WHO girls' medians by age in months: (weight kg, length cm, head cm).
+GROWTH_MEDIANS = [(0, 3.2, 49.1, 33.9), (1, 4.2, 53.7, 36.5), (2, 5.1, 57.1, 38.3), (4, 6.4, 62.1, 40.6),
+                  (6, 7.3, 65.7, 42.2), (9, 8.2, 70.1, 43.8), (12, 8.9, 74.0, 45.0), (18, 10.2, 80.7, 46.2),
+                  (24, 11.5, 86.4, 47.2)]
+VISIT_MONTHS = [0, 1, 2, 4, 6, 9, 12, 15, 18, 24]
+
+Population = namedtuple('Population', ['staff', 'member', 'midwife', 'conversation_id', 'note_id',
+                                       'magazine_id', 'counts'])
+
+
+@contextmanager
+def kept_timestamps(*models):
+    """Let ``bulk_create`` keep the dates the factories set on auto_now(_add) fields."""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def numbered(model, objects):
+    """Give ``objects`` consecutive primary keys after the table's highest.
+
+    Django 3.1 does not read back the ids of rows bulk-inserted into SQLite,
+    and child rows need them.
+    """
+    from django.db.models import Max
+    objects = list(objects)
+    start = (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+    for offset, obj in enumerate(objects):
+        obj.pk = start + offset
+    return objects
+
+
+def aware(day, hour=9, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+def clip(value, low, high):
+    return max(low, min(high, value))
+
+
+def growth_median(months):
+    for (m0, *low), (m1, *high) in zip(GROWTH_MEDIANS, GROWTH_MEDIANS[1:]):
+        if months <= m1:
+            share = (months - m0) / (m1 - m0)
+            return [a + (b - a) * share for a, b in zip(low, high)]
+    return GROWTH_MEDIANS[-1][1:]
+
+
+# Factories: each returns unsaved model instances.
+
+def users(rng, count, password_hash, today):
+    from django.contrib.auth.models import User
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield User(username='user%05d' % i, first_name=first, last_name=last, password=password_hash,
+                   email='user%05d@example.com' % i, date_joined=aware(today - timedelta(days=rng.randint(30, 1500))))
+
+
+def cycles(rng, user, start, end):
+    from women.models import MenstrualCycle
+    mean = rng.gauss(28.5, 1.5)
+    day = start
+    while day < end:
+        length = int(clip(round(rng.gauss(mean, 2)), 21, 40))
+        bleed = rng.randint(3, 7)
+        yield MenstrualCycle(user=user, period_start_date=day, period_end_date=day + timedelta(days=bleed - 1),
+                             cycle_length=length, flow_intensity=rng.choices(['light', 'medium', 'heavy'], [3, 5, 2])[0],
+                             symptoms=', '.join(rng.sample(SYMPTOMS, rng.randint(0, 3))),
+                             updated_at=aware(day + timedelta(days=bleed)))
+        day += timedelta(days=length)
+
+
+def pregnancy(rng, user, today, weeks):
+    from women.models import NutritionalPlan, PregnancyProfile
+    lmp = today - timedelta(weeks=weeks)
+    profile = PregnancyProfile(user=user, last_menstrual_period=lmp, due_date=lmp + timedelta(days=280),
+                               current_trimester=1 if weeks < 14 else 2 if weeks < 28 else 3,
+                               is_high_risk=rng.random() < 0.15)
+    plans = [NutritionalPlan(pregnancy_profile=profile, week=week, trimester=(week - 1) // 13 + 1,
+                             calories_needed=2000 + week * 50, protein_grams=50 + week * 2, iron_mg=27 + week,
+                             calcium_mg=1000 + week * 10, folic_acid_mcg=400 + week * 5,
+                             foods_recommended='Leafy greens, lentils, eggs, dairy',
+                             foods_to_avoid='Raw fish, unpasteurised cheese, liver', supplements='Folic acid, iron')
+             for week in range(4, weeks + 1, 4)]
+    return profile, plans
+
+
+def vitals(rng, user, start, end, count):
+    from women.models import MEWS_Assessment
+    span = max((end - start).days, 1)
+    for day in sorted(start + timedelta(days=rng.randrange(span)) for _ in range(count)):
+        unwell = rng.random() < 0.05
+        when = aware(day, rng.randint(7, 19), rng.randint(0, 59))
+        yield MEWS_Assessment(
+            user=user, assessment_date=when, updated_at=when,
+            systolic_bp=int(rng.gauss(165 if unwell else 118, 12)), diastolic_bp=int(rng.gauss(105 if unwell else 76, 8)),
+            heart_rate=int(rng.gauss(115 if unwell else 82, 10)), respiratory_rate=int(rng.gauss(24 if unwell else 16, 2)),
+            temperature=round(rng.gauss(38.2 if unwell else 36.8, 0.3), 1),
+            oxygen_saturation=int(clip(rng.gauss(93 if unwell else 98, 1.5), 85, 100)),
+            consciousness_level=3 if unwell and rng.random() < 0.3 else 4,
+            urine_output=round(abs(rng.gauss(0.8 if unwell else 1.6, 0.3)), 2))
+
+
+def postpartum(rng, user, today, days_since):
+    from women.models import BabyProfile, PostpartumProfile
+    delivered = today - timedelta(days=days_since)
+    profile = PostpartumProfile(user=user, delivery_date=delivered, baby_weight=round(rng.gauss(3.3, 0.5), 2),
+                                delivery_type='c_section' if rng.random() < 0.3 else 'vaginal',
+                                complications='Postpartum haemorrhage' if rng.random() < 0.05 else '')
+    babies = [BabyProfile(postpartum_profile=profile, name=rng.choice(FIRST_NAMES), birth_date=delivered,
+                          sex=rng.choice('FM'), birth_weight=profile.baby_weight,
+                          birth_length=round(rng.gauss(50, 2), 1), apgar_score=rng.randint(7, 10))
+              for _ in range(2 if rng.random() < 0.03 else 1)]
+    return profile, babies
+
+
+def checkins(rng, profile, today):
+    from women.models import MentalHealthCheck
+    weeks = min((today - profile.delivery_date).days // 7, 26)
+    # A tenth of mothers slide towards postnatal depression.
+    slope = -0.25 if rng.random() < 0.1 else 0.05
+    for week in range(1, weeks + 1):
+        mood = clip(round(rng.gauss(6.5 + slope * week, 1)), 1, 10)
+        yield MentalHealthCheck(postpartum_profile=profile, check_date=profile.delivery_date + timedelta(weeks=week),
+                                mood_score=mood, anxiety_level=clip(round(rng.gauss(11 - mood, 1)), 1, 10),
+                                sleep_hours=round(clip(rng.gauss(5.5 + slope * week, 1), 2, 10), 1),
+                                appetite_level=clip(round(rng.gauss(6, 1.5)), 1, 10))
+
+
+def rehab(rng, profile, today):
+    from women.models import ExerciseProgress, PelvicFloorRehab
+    sessions = []
+    for month in range(1, min((today - profile.delivery_date).days // 30, 6) + 1):
+        day = profile.delivery_date + timedelta(days=30 * month)
+        session = PelvicFloorRehab(postpartum_profile=profile, assessment_date=day,
+                                   muscle_strength=clip(month // 2 + rng.randint(1, 2), 1, 5),
+                                   endurance_level=clip(month // 2 + rng.randint(1, 2), 1, 5),
+                                   exercises_prescribed='Kegels, bridges, heel slides')
+        exercises = [ExerciseProgress(rehab=session, exercise_name=name, sets=3, repetitions=rng.randint(8, 15),
+                                      duration_minutes=rng.randint(5, 20), completion_date=day + timedelta(days=i),
+                                      difficulty_level=('beginner', 'intermediate', 'advanced')[min(month // 2, 2)])
+                     for i, name in enumerate(['Kegel holds', 'Glute bridge', 'Heel slides'])]
+        sessions.append((session, exercises))
+    return sessions
+
+
+def growth(rng, baby, today):
+    from women.models import GrowthRecord
+    scale, spread = baby.birth_weight / 3.2, rng.gauss(0, 0.05)
+    for months in VISIT_MONTHS:
+        day = baby.birth_date + timedelta(days=round(months * 30.44))
+        if day > today:
+            break
+        weight, length, head = growth_median(months)
+        yield GrowthRecord(baby=baby, record_date=day, weight=round(weight * (scale + spread + rng.gauss(0, 0.02)), 2),
+                           length=round(length * (1 + spread / 3 + rng.gauss(0, 0.01)), 1),
+                           head_circumference=round(head * (1 + rng.gauss(0, 0.01)), 1),
+                           milestones='Smiles, holds head up' if months == 2 else '', updated_at=aware(day))
+
+
+def vaccinations(rng, baby, today):
+    from women.vaccinations import schedule_records
+    for record in schedule_records(baby):
+        if record.due_date <= today and rng.random() < 0.95:
+            record.administered_date = record.due_date + timedelta(days=rng.randint(0, 14))
+            record.administered_by = 'Nurse %s' % rng.choice(LAST_NAMES)
+            record.batch_number = 'B%06d' % rng.randrange(10 ** 6)
+        yield record
+
+
+def providers(rng, count):
+    from women.models import HealthcareProvider
+    for i in range(count):
+        yield HealthcareProvider(name='%s %s' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)),
+                                 specialization=rng.choice(SPECIALIZATIONS), experience_years=rng.randint(1, 35),
+                                 rating=round(rng.uniform(3.5, 5), 2), availability=rng.random() < 0.8,
+                                 consultation_fee=rng.choice([None, 300, 500, 800, 1200]))
+
+
+def appointments(rng, user, provider_ids, today, taken):
+    from women.models import AppointmentSlot, TelehealthAppointment
+    for _ in range(rng.randint(1, 4)):
+        provider_id = rng.choice(provider_ids)
+        day = today + timedelta(days=rng.randint(-180, 30))
+        slot = time(rng.randint(9, 16), rng.choice([0, 30]))
+        if (provider_id, day, slot) in taken:
+            continue
+        taken.add((provider_id, day, slot))
+        appointment = TelehealthAppointment(patient=user, provider_id=provider_id, appointment_date=day,
+                                            appointment_time=slot, consultation_type=rng.choice(['video', 'audio', 'chat']),
+                                            status='scheduled' if day >= today else rng.choice(['completed', 'cancelled']))
+        yield appointment, AppointmentSlot(provider_id=provider_id, appointment=appointment, slot_date=day, slot_time=slot)
+
+
+def assistant_thread(rng, user, today):
+    from women.models import AIConversation, AIMessage
+    conversation = AIConversation(user=user, conversation_id='conv-%s' % user.username)
+    when = aware(today - timedelta(days=rng.randint(1, 120)), rng.randint(6, 22))
+    messages = []
+    for i in range(rng.randint(2, 20) * 2):
+        when += timedelta(seconds=rng.randint(5, 600))
+        text = rng.choice(QUESTIONS) if i % 2 == 0 else 'Here is some general guidance: ' + ' '.join(rng.sample(TOPICS, 8))
+        messages.append(AIMessage(conversation=conversation, message_text=text, is_from_user=i % 2 == 0, timestamp=when))
+    conversation.message_count, conversation.last_activity = len(messages), when
+    return conversation, messages
+
+
+def chat_thread(rng, user, other, today):
+    from chat.models import Message
+    when = aware(today - timedelta(days=rng.randint(1, 90)), rng.randint(7, 21))
+    count = rng.randint(5, 60)
+    for i in range(count):
+        when += timedelta(minutes=rng.randint(1, 240))
+        sender, receiver = (user, other) if rng.random() < 0.5 else (other, user)
+        yield Message(sender=sender, receiver=receiver, timestamp=when, is_read=i < count - 3 or rng.random() < 0.5,
+                      message=' '.join(rng.sample(TOPICS, rng.randint(3, 10))).capitalize() + '?')
+
+
+def uploads(rng, user, today):
+    from women.models import Magazines, Notes
+    day = aware(today - timedelta(days=rng.randint(0, 700)))
+    status = rng.choices(['Accept', 'pending', 'Reject'], [6, 3, 1])[0]
+    description = ' '.join(rng.sample(TOPICS, 6)).capitalize()
+    if rng.random() < 0.8:
+        return Notes(user=user, uploadingdate=day, reportfile='reports/%s-%d.pdf' % (user.username, rng.randrange(10 ** 6)),
+                     filetype='report', description=description, status=status)
+    return Magazines(user=user, uploadedate=day, magazinesfile='magazines/%s-%d.pdf' % (user.username, rng.randrange(10 ** 6)),
+                     magazinestype='magazine', description=description, status=status)
+
+
+def build_population(users_count=500, years=3, providers_count=300, seed=7, today=None):
+    """Fill the (empty, migrated) database; returns a ``Population``."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from chat.conversations import rebuild_conversations
+    from chat.models import Message
+    from women import search
+    from women.mental_health import backfill_trends
+    from women.models import (AIConversation, AIHealthInsight, AIMedicationReminder, AIMessage, AISymptomChecker,
+                              AppointmentSlot, BabyProfile, EmergencyContact, ExerciseProgress, GrowthRecord,
+                              HealthcareProvider, Magazines, MenstrualCycle, MentalHealthCheck, MEWS_Assessment,
+                              Notes, NutritionalPlan, PelvicFloorRehab, PostpartumProfile, PregnancyProfile, Signup,
+                              SOS_Alert, TelehealthAppointment, VaccinationRecord)
+
+    rng = random.Random(seed)
+    today = today or timezone.localdate()
+    password_hash = make_password(PASSWORD)
+    staff = User.objects.create(username=STAFF_USERNAME, password=password_hash, is_staff=True, is_superuser=True)
+    midwives = User.objects.bulk_create(numbered(User, (
+        User(username='midwife%d' % i, password=password_hash, first_name='Midwife') for i in range(MIDWIVES))))
+    members = User.objects.bulk_create(numbered(User, users(rng, users_count, password_hash, today)))
+    Signup.objects.bulk_create(Signup(user=user, contact='9%09d' % rng.randrange(10 ** 9), role='user')
+                               for user in members)
+    provider_ids = [p.pk for p in HealthcareProvider.objects.bulk_create(
+        numbered(HealthcareProvider, providers(rng, providers_count)))]
+
+    rows = {model: [] for model in (MenstrualCycle, PregnancyProfile, NutritionalPlan, MEWS_Assessment,
+                                    PostpartumProfile, BabyProfile, MentalHealthCheck, PelvicFloorRehab,
+                                    ExerciseProgress, GrowthRecord, VaccinationRecord, EmergencyContact, SOS_Alert,
+                                    TelehealthAppointment, AppointmentSlot, AIConversation, AIMessage,
+                                    AISymptomChecker, AIMedicationReminder, AIHealthInsight, Message, Notes, Magazines)}
+    taken = set()
+    for index, user in enumerate(members):
+        member = index == 0
+        state = rng.random()
+        pregnant, weeks = member or state < 0.25, rng.randint(6, 40)
+        delivered = member or 0.25 <= state < 0.6
+        history_end = today - timedelta(weeks=weeks) if pregnant else today
+        rows[MenstrualCycle].extend(cycles(rng, user, today - timedelta(days=365 * years), history_end))
+        if pregnant:
+            profile, plans = pregnancy(rng, user, today, weeks)
+            rows[PregnancyProfile].append(profile)
+            rows[NutritionalPlan].extend(plans)
+            rows[MEWS_Assessment].extend(vitals(rng, user, today - timedelta(weeks=weeks), today, rng.randint(2, 20)))
+            for name, dose in rng.sample(MEDICATIONS, 2):
+                rows[AIMedicationReminder].append(AIMedicationReminder(
+                    user=user, medication_name=name, dosage=dose, frequency='Once daily',
+                    reminder_time=time(rng.randint(7, 21), rng.choice([0, 15, 30, 45])),
+                    start_date=today - timedelta(weeks=weeks)))
+        if delivered:
+            profile, babies = postpartum(rng, user, today, rng.randint(10, 720))
+            rows[PostpartumProfile].append(profile)
+            rows[BabyProfile].extend(babies)
+            rows[MentalHealthCheck].extend(checkins(rng, profile, today))
+            for session, exercises in rehab(rng, profile, today):
+                rows[PelvicFloorRehab].append(session)
+                rows[ExerciseProgress].extend(exercises)
+            for baby in babies:
+                rows[GrowthRecord].extend(growth(rng, baby, today))
+                rows[VaccinationRecord].extend(vaccinations(rng, baby, today))
+            rows[MEWS_Assessment].extend(vitals(rng, user, profile.delivery_date, profile.delivery_date + timedelta(weeks=6),
+                                                rng.randint(1, 4)))
+        rows[EmergencyContact].extend(
+            EmergencyContact(user=user, name=rng.choice(FIRST_NAMES), relationship=relation,
+                             phone_number='9%09d' % rng.randrange(10 ** 9), is_primary=i == 0)
+            for i, relation in enumerate(rng.sample(['Partner', 'Mother', 'Sister', 'Friend'], rng.randint(1, 2))))
+        if rng.random() < 0.02:
+            rows[SOS_Alert].append(SOS_Alert(user=user, alert_type='medical', message='Severe headache and blurred vision',
+                                             alert_time=aware(today - timedelta(days=rng.randint(1, 300)))))
+        if member or rng.random() < 0.3:
+            for appointment, slot in appointments(rng, user, provider_ids, today, taken):
+                rows[TelehealthAppointment].append(appointment)
+                rows[AppointmentSlot].append(slot)
+        if member or rng.random() < 0.4:
+            conversation, messages = assistant_thread(rng, user, today)
+            rows[AIConversation].append(conversation)
+            rows[AIMessage].extend(messages)
+        if rng.random() < 0.2:
+            rows[AISymptomChecker].append(AISymptomChecker(
+                user=user, symptoms='headache, swelling', ai_analysis='Possible pre-eclampsia warning signs',
+                severity_level=rng.choice(['low', 'medium', 'high']), recommendations='Check your blood pressure',
+                created_at=aware(today - timedelta(days=rng.randint(1, 365)))))
+        rows[AIHealthInsight].extend(
+            AIHealthInsight(user=user, insight_type=rng.choice(['nutrition', 'exercise', 'sleep', 'general']),
+                            title='Tip: ' + ' '.join(rng.sample(TOPICS, 3)), content=' '.join(rng.sample(TOPICS, 12)),
+                            priority=rng.choice(['low', 'medium', 'high']), is_read=rng.random() < 0.6,
+                            created_at=aware(today - timedelta(days=rng.randint(0, 200))))
+            for _ in range(rng.randint(2, 5)))
+        for other in ([midwives[0]] if member else []) + rng.sample(midwives, rng.randint(0, 2)):
+            rows[Message].extend(chat_thread(rng, user, other, today))
+        if member or rng.random() < 0.3:
+            upload = uploads(rng, user, today)
+            rows[type(upload)].append(upload)
+
+    for model, objects in rows.items():
+        numbered(model, objects)
+    with kept_timestamps(*rows):
+        for model, objects in rows.items():
+            # Reassigning each parent copies its new primary key into the
+            # foreign key column.
+            for obj in objects:
+                for field in model._meta.concrete_fields:
+                    if field.is_relation and getattr(obj, field.name, None) is not None:
+                        setattr(obj, field.name, getattr(obj, field.name))
+            model.objects.bulk_create(objects, batch_size=2000)
+    backfill_trends()
+    rebuild_conversations()
+    if search.enabled():
+        search.rebuild_index()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+    member = members[0]
+    return Population(
+        staff=staff, member=member, midwife=midwives[0], conversation_id='conv-%s' % member.username,
+        note_id=Notes.objects.filter(user=member).values_list('id', flat=True).first()
+        or Notes.objects.values_list('id', flat=True).first(),
+        magazine_id=Magazines.objects.values_list('id', flat=True).first(),
+        counts={model.__name__: len(objects) for model, objects in rows.items()})
@@ -0,0 +1,93 @@
+"""Thumbnail and text preview generation for a backlog of uploads.
+
+Writes N PDF reports of about ``--pages`` pages each into a temporary media
+directory, a ``--duplicates`` share of them copies of earlier files. It
+then drains the backlog with ``generate_pending()`` at each worker count and
+compares the bytes a list page of 50 uploads links to: the full files
+against their previews. Usage::
+
+    python -m benchmarks.previews --uploads 2000 --workers 1 2 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+WORDS = 'iron folic acid glucose haemoglobin scan trimester blood pressure midwife placenta growth'.split()
+
+
+def pdf(rng, pages):
+    """A PDF of ``pages`` pages of text, like the built-in reader accepts."""
+    parts = [b'%PDF-1.4\n']
+    for _ in range(pages):
+        lines = b' '.join(b'(%s) Tj T*' % ' '.join(rng.choice(WORDS) for _ in range(12)).encode()
+                          for _ in range(60))
+        stream = zlib.compress(b'BT /F1 10 Tf ' + lines + b' ET')
+        parts.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream\n')
+    return b''.join(parts) + b'%%EOF\n'
+
+
+def seed(uploads, pages, duplicates, media):
+    from django.db import connection
+    rng = random.Random(7)
+    files = []
+    os.makedirs(media, exist_ok=True)
+    for i in range(uploads):
+        name = 'report%d.pdf' % i
+        data = rng.choice(files)[1] if files and rng.random() < duplicates else pdf(rng, pages)
+        with open(os.path.join(media, name), 'wb') as output:
+            output.write(data)
+        files.append((name, data))
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, "
+                       "is_staff, is_active, date_joined) VALUES ('', 0, 'bench', '', '', '', 0, 1, '2024-01-01')")
+        cursor.executemany(
+            "INSERT INTO women_notes (user_id, uploadingdate, reportfile, filetype, description, status) "
+            "VALUES (1, '2026-01-01 00:00:00', %s, 'report', 'Report', 'Accept')", [(name,) for name, data in files])
+    return sum(len(data) for name, data in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='Share of uploads repeating an earlier file')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    media = os.path.join(tempfile.mkdtemp(prefix='pregacare-bench-'), 'media')
+    setup_django(MEDIA_ROOT=media, PREVIEW_IN_BACKGROUND=False)
+    migrate()
+    from django.db import connection
+    from women.models import FilePreview, Notes
+    from women.previews import generate_pending
+    from women.sqlite import serialized_write
+
+    total = seed(args.uploads, args.pages, args.duplicates, media)
+    print('Seeded %d uploads, %.1f MB' % (args.uploads, total / 1e6))
+    rows = []
+    for workers in args.workers:
+        with serialized_write():
+            Notes.objects.update(preview=None)
+            FilePreview.objects.all().delete()
+        started = time.perf_counter()
+        done = generate_pending(workers=workers)
+        seconds = time.perf_counter() - started
+        rows.append({'workers': workers, 'previewed': done, 'previews made': FilePreview.objects.count(),
+                     's': round(seconds, 2), 'uploads/s': round(done / seconds, 1)})
+        connection.close()
+    print_table(rows, ['workers', 'previewed', 'previews made', 's', 'uploads/s'])
+
+    page = list(Notes.objects.select_related('preview').order_by('-id')[:50])
+    files = sum(os.path.getsize(note.reportfile.path) for note in page)
+    previews = sum(len(note.preview.text.encode()) + (os.path.getsize(os.path.join(media, note.preview.thumbnail))
+                                                      if note.preview.thumbnail else 0) for note in page)
+    print('A page of 50 uploads: %.1f KB of files, %.1f KB of previews' % (files / 1e3, previews / 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Telehealth provider search latency at scale.
+
+Seeds N providers (100k by default) and times typical searches through
+``women.providers.search_providers()``: filters only, deep keyset pages, and
+free-text queries with and without the in-memory inverted index. Usage::
+
+    python -m benchmarks.provider_search --providers 100000
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+SPECIALIZATIONS = ['Obstetrics', 'Gynecology', 'Maternal-Fetal Medicine', 'Lactation Consultant',
+                   'Pediatrics', 'Neonatology', 'Perinatal Psychiatry', 'Nutrition', 'Physiotherapy',
+                   'Midwifery', 'Endocrinology', 'Family Medicine']
+FIRST = ['Sarah', 'Emily', 'Maria', 'Aisha', 'Priya', 'Chen', 'Fatima', 'Grace', 'Ana', 'Mei',
+         'Zara', 'Leah', 'Nora', 'Ines', 'Ruth', 'Kofi', 'Ravi', 'Omar', 'Yuki', 'Lars']
+LAST = ['Johnson', 'Chen', 'Rodriguez', 'Khan', 'Patel', 'Okafor', 'Silva', 'Nguyen', 'Kim', 'Ali',
+        'Schmidt', 'Haddad', 'Costa', 'Ivanova', 'Mensah', 'Sato', 'Rossi', 'Dubois', 'Novak', 'Berg']
+
+
+def seed(count, rng):
+    from women.models import HealthcareProvider
+    batch = []
+    for i in range(count):
+        batch.append(HealthcareProvider(
+            name='%s %s %d' % (rng.choice(FIRST), rng.choice(LAST), i),
+            specialization=rng.choice(SPECIALIZATIONS),
+            experience_years=rng.randint(1, 40),
+            rating=Decimal(rng.randint(250, 500)) / 100,
+            availability=rng.random() < 0.7,
+            consultation_fee=Decimal(rng.randint(20, 300)),
+        ))
+        if len(batch) == 5000:
+            HealthcareProvider.objects.bulk_create(batch)
+            batch = []
+    HealthcareProvider.objects.bulk_create(batch)
+
+
+def time_search(params, rounds, pages=1):
+    from women.providers import provider_page, search_providers
+    samples = []
+    for _ in range(rounds):
+        cursor = None
+        started = time.perf_counter()
+        for _ in range(pages):
+            rows = search_providers(cursor=cursor, **params)
+            providers, cursor = provider_page(rows, params.get('sort', 'rating'))
+        samples.append((time.perf_counter() - started) / pages)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--providers', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.conf import settings
+    from django.db import connection
+    from women.providers import get_index
+
+    seed(args.providers, random.Random(7))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    cases = [
+        ('available, top rated', {'available': True}, 1),
+        ('specialization + rating', {'specialization': 'Obstetrics', 'min_rating': Decimal('4.5')}, 1),
+        ('fee range, cheapest', {'min_fee': Decimal('50'), 'max_fee': Decimal('80'), 'sort': 'fee'}, 1),
+        ('specialization, page 1-25', {'specialization': 'Pediatrics', 'available': True}, 25),
+        ('text "priya khan" (LIKE)', {'q': 'priya khan'}, 1),
+    ]
+    rows = []
+    for label, params, pages in cases:
+        samples = time_search(params, args.rounds, pages)
+        rows.append({'search': label, 'p50 ms': round(percentile(samples, 50) * 1000, 2),
+                     'p95 ms': round(percentile(samples, 95) * 1000, 2)})
+
+    settings.PROVIDER_SEARCH_INDEX = True
+    started = time.perf_counter()
+    get_index()
+    build = time.perf_counter() - started
+    for label, params in [('text "priya khan" (index)', {'q': 'priya khan'}),
+                          ('text "lact ali" + available (index)', {'q': 'lact ali', 'available': True})]:
+        samples = time_search(params, args.rounds)
+        rows.append({'search': label, 'p50 ms': round(percentile(samples, 50) * 1000, 2),
+                     'p95 ms': round(percentile(samples, 95) * 1000, 2)})
+
+    print('%d providers, index build %.0f ms' % (args.providers, build * 1000))
+    print_table(rows, ['search', 'p50 ms', 'p95 ms'])
+
+
+if __name__ == '__main__':
+    main()
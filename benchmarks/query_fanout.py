@@ -0,0 +1,72 @@
+"""Sequential vs concurrent evaluation of a page's independent querysets.
+
+Adds simulated network latency to every SQL statement (as a remote database
+would have) and times the query sets of ``ai_assistant`` (4 querysets) and
+``emergency_services`` (3 querysets) evaluated one after another versus with
+``women.concurrency.batch_querysets()``. Usage::
+
+    python -m benchmarks.query_fanout --latency-ms 20 --rounds 20
+"""
+import argparse
+import time
+
+from benchmarks.utils import inject_latency, migrate, percentile, print_table, setup_django
+
+
+def _pages(user):
+    from women.models import (AIConversation, AIHealthInsight, AIMedicationReminder, AISymptomChecker,
+                              EmergencyContact, MEWS_Assessment, SOS_Alert)
+    return {
+        'ai_assistant': lambda: dict(
+            conversations=AIConversation.objects.filter(user=user).order_by('-last_activity'),
+            symptom_checks=AISymptomChecker.objects.filter(user=user).order_by('-created_at'),
+            medication_reminders=AIMedicationReminder.objects.filter(user=user, is_active=True),
+            health_insights=AIHealthInsight.objects.filter(user=user, is_read=False).order_by('-created_at'),
+        ),
+        'emergency_services': lambda: dict(
+            mews_assessments=MEWS_Assessment.objects.filter(user=user).order_by('-assessment_date'),
+            emergency_contacts=EmergencyContact.objects.filter(user=user),
+            sos_alerts=SOS_Alert.objects.filter(user=user).order_by('-alert_time'),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.contrib.auth.models import User
+    from women.concurrency import batch_querysets
+
+    user = User.objects.create_user(username='bench@example.com', password='bench')
+    inject_latency(args.latency_ms / 1000.0)
+
+    rows = []
+    for page, querysets in _pages(user).items():
+        timings = {'sequential': [], 'batched': []}
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            {name: list(qs) for name, qs in querysets().items()}
+            timings['sequential'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            batch_querysets(**querysets())
+            timings['batched'].append(time.perf_counter() - started)
+        for mode, samples in timings.items():
+            rows.append({
+                'page': page,
+                'queries': len(querysets()),
+                'mode': mode,
+                'p50 ms': round(percentile(samples, 50) * 1000, 1),
+                'p95 ms': round(percentile(samples, 95) * 1000, 1),
+            })
+    print('simulated latency per statement: %.1f ms' % args.latency_ms)
+    print_table(rows, ['page', 'queries', 'mode', 'p50 ms', 'p95 ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Medication reminder dispatch throughput.
+
+Seeds N active reminders (plus as many due at other times of day) and times
+``women.reminders.dispatch_due()`` for the minute in which all N fall due,
+then replays the same minute to time the already-sent path. Usage::
+
+    python -m benchmarks.reminders --reminders 1000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+
+class NullChannel:
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, notifications):
+        self.sent += len(notifications)
+
+
+def seed(count, rng):
+    from django.contrib.auth.models import User
+    from women.models import AIMedicationReminder
+    User.objects.bulk_create(User(username='user%d@example.com' % i, email='user%d@example.com' % i)
+                             for i in range(1000))
+    users = list(User.objects.values_list('id', flat=True))
+    start = datetime(2026, 1, 1).date()
+    batch = []
+    for i in range(count * 2):
+        # Half the reminders fall due at 09:00, the rest spread over the day.
+        at = '09:00' if i % 2 == 0 else '%02d:%02d' % (rng.randrange(24), rng.randrange(60))
+        batch.append(AIMedicationReminder(
+            user_id=rng.choice(users), medication_name='Med %d' % i, dosage='1 tablet',
+            frequency='daily', reminder_time=at, start_date=start))
+        if len(batch) == 10000:
+            AIMedicationReminder.objects.bulk_create(batch)
+            batch = []
+    AIMedicationReminder.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reminders', type=int, default=200000, help='reminders due in the timed minute')
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.db import connection
+    from django.utils import timezone
+    from women.reminders import BATCH_SIZE, dispatch_due
+
+    started = time.perf_counter()
+    seed(args.reminders, random.Random(3))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    print('seeded %d reminders in %.0fs' % (args.reminders * 2, time.perf_counter() - started))
+
+    now = timezone.make_aware(datetime(2026, 3, 10, 9, 0))
+    batch_size = args.batch_size or BATCH_SIZE
+    rows = []
+    for label in ('first run', 'replay (already sent)'):
+        channel = NullChannel()
+        started = time.perf_counter()
+        stats = dispatch_due(now=now, since=now - timedelta(minutes=1), channel=channel, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        rows.append({'run': label, 'due': stats['due'], 'sent': channel.sent, 'seconds': round(elapsed, 2),
+                     'reminders/s': int(stats['due'] / elapsed)})
+    print_table(rows, ['run', 'due', 'sent', 'seconds', 'reminders/s'])
+
+
+if __name__ == '__main__':
+    main()
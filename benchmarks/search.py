@@ -0,0 +1,113 @@
+"""Full-text search over accepted reports at scale.
+
+Seeds N accepted ``Notes`` with Zipf-distributed words in the description
+and the extracted file text, filling the FTS5 index directly as
+``extract_pending()`` would. Times the vocabulary build, then ``search()``
+(matching, ranking, highlighting and loading the page of uploads) for
+rare, common, multi-word and prefix queries, against one ``icontains`` scan
+of the descriptions. Usage::
+
+    python -m benchmarks.search --documents 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.utils import migrate, percentile, print_table, setup_django
+
+TOPICS = """
+pregnancy iron folic acid anaemia nausea vomiting heartburn glucose diabetes screening blood pressure
+preeclampsia ultrasound scan trimester labour contractions epidural caesarean breastfeeding latch
+postpartum bleeding stitches pelvic floor exercise nutrition protein calcium vitamin supplements
+sleep fatigue anxiety depression mood midwife appointment vaccination whooping cough flu baby
+movements kicks growth weight swelling headache vision placenta induction waters birth plan
+""".split()
+QUERIES = {
+    'rare word': ['placenta', 'induction', 'waters', 'plan'],
+    'common word': ['pregnancy', 'iron', 'folic', 'acid'],
+    'two words': ['iron anaemia', 'glucose screening', 'pelvic floor', 'blood pressure'],
+    'prefix (2-3 chars)': ['gl', 'pre', 'vi', 'bre'],
+    'long prefix': ['pregn', 'suppl', 'breastf', 'contrac'],
+    'three-word prefix': ['iro fol aci', 'glu scre dia', 'pel flo exer'],
+}
+SPACING = 40
+
+
+def vocabulary(size):
+    """Words by Zipf rank: topic words every ``SPACING`` ranks, filler between."""
+    words = ['w%dx' % i for i in range(size)]
+    for i, topic in enumerate(TOPICS):
+        words[i * SPACING] = topic
+    return words
+
+
+def seed(documents, words, body_words, rng):
+    from django.db import connection
+    vocab = np.array(vocabulary(words))
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, "
+                       "is_staff, is_active, date_joined) VALUES ('', 0, 'bench', '', '', '', 0, 1, '2024-01-01')")
+        for start in range(0, documents, 50000):
+            count = min(50000, documents - start)
+            picks = vocab[rng.choice(len(vocab), (count, 10 + body_words), p=weights)]
+            lengths = rng.randint(4, 11, count)
+            descriptions = [' '.join(row[:n]).capitalize() for row, n in zip(picks, lengths)]
+            bodies = [' '.join(row[10:]) for row in picks]
+            ids = range(start + 1, start + count + 1)
+            cursor.executemany(
+                "INSERT INTO women_notes (id, user_id, uploadingdate, reportfile, filetype, description, status) "
+                "VALUES (%s, 1, '2026-01-01 00:00:00', %s, 'report', %s, 'Accept')",
+                [(pk, 'report%d.pdf' % pk, text) for pk, text in zip(ids, descriptions)])
+            cursor.executemany('INSERT INTO women_notes_search (rowid, description, body) VALUES (%s, %s, %s)',
+                               list(zip(ids, descriptions, bodies)))
+        cursor.execute("INSERT INTO women_notes_search (women_notes_search) VALUES ('optimize')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=1000000)
+    parser.add_argument('--words', type=int, default=20000, help='Vocabulary size')
+    parser.add_argument('--body-words', type=int, default=40, help='Words of file text per document')
+    parser.add_argument('--rounds', type=int, default=25)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.db import connection
+    from women.models import Notes
+    from women.search import get_vocabulary, search
+
+    started = time.perf_counter()
+    seed(args.documents, args.words, args.body_words, np.random.RandomState(7))
+    print('Seeded %d documents in %.1fs' % (args.documents, time.perf_counter() - started))
+    started = time.perf_counter()
+    get_vocabulary('notes')
+    print('Built the vocabulary in %.2fs' % (time.perf_counter() - started))
+
+    rows = []
+    for label, queries in QUERIES.items():
+        samples, matches = [], []
+        for query in queries:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM women_notes_search WHERE women_notes_search MATCH %s',
+                               [' '.join('"%s"*' % term for term in query.split())])
+                matches.append(cursor.fetchone()[0])
+            for _ in range(args.rounds):
+                began = time.perf_counter()
+                search('notes', query)
+                samples.append(time.perf_counter() - began)
+        rows.append({'query': label, 'matches (median)': int(np.median(matches)),
+                     'p50 ms': round(percentile(samples, 50) * 1000, 2),
+                     'p95 ms': round(percentile(samples, 95) * 1000, 2), 'max ms': round(max(samples) * 1000, 2)})
+    began = time.perf_counter()
+    list(Notes.objects.filter(status='Accept', description__icontains='placenta').order_by('-id')[50:100])
+    rows.append({'query': 'icontains scan', 'matches (median)': '-',
+                 'p50 ms': round((time.perf_counter() - began) * 1000, 2), 'p95 ms': '-', 'max ms': '-'})
+    print_table(rows, ['query', 'matches (median)', 'p50 ms', 'p95 ms', 'max ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Multi-process write contention on the embedded SQLite database.
+
+Simulates several gunicorn workers writing MEWS assessments at once (each
+write is a read-then-insert transaction, like a typical form POST) while
+reader processes keep loading the emergency services data. Compares:
+
+* ``rollback``   - stock rollback journal, no write serialization
+* ``wal``        - women.sqlite PRAGMAs only
+* ``wal+queue``  - PRAGMAs plus women.sqlite.serialized_write()
+
+Usage::
+
+    python -m benchmarks.sqlite_write_contention --writers 8 --writes 200
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.utils import percentile, print_table, setup_django, migrate
+
+MODES = {
+    'rollback': {
+        'SQLITE_PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        'SQLITE_SERIALIZE_WRITES': False,
+        'timeout': 5,
+    },
+    'wal': {
+        'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 20000},
+        'SQLITE_SERIALIZE_WRITES': False,
+        'timeout': 20,
+    },
+    'wal+queue': {
+        'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 20000},
+        'SQLITE_SERIALIZE_WRITES': True,
+        'timeout': 20,
+    },
+}
+
+
+def _configure(db_path, mode):
+    config = MODES[mode]
+    setup_django(db_path, SQLITE_PRAGMAS=config['SQLITE_PRAGMAS'],
+                 SQLITE_SERIALIZE_WRITES=config['SQLITE_SERIALIZE_WRITES'])
+    from django.conf import settings
+    settings.DATABASES['default']['OPTIONS'] = {'timeout': config['timeout']}
+
+
+def _writer(db_path, mode, user_id, writes, results):
+    _configure(db_path, mode)
+    from django.db import OperationalError
+    from women.models import MEWS_Assessment
+    from women.sqlite import serialized_write
+
+    latencies, errors = [], 0
+    for i in range(writes):
+        started = time.perf_counter()
+        try:
+            with serialized_write():
+                MEWS_Assessment.objects.filter(user_id=user_id).exists()
+                MEWS_Assessment.objects.create(
+                    user_id=user_id, systolic_bp=120, diastolic_bp=80, heart_rate=70 + i % 30,
+                    respiratory_rate=16, temperature=36.8, oxygen_saturation=98,
+                    consciousness_level=4, urine_output=1.2)
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    results.put(('write', latencies, errors))
+
+
+def _reader(db_path, mode, user_id, stop, results):
+    _configure(db_path, mode)
+    from django.db import OperationalError
+    from women.models import MEWS_Assessment
+
+    latencies, errors = [], 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            list(MEWS_Assessment.objects.filter(user_id=user_id).order_by('-assessment_date')[:20])
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    results.put(('read', latencies, errors))
+
+
+def run_mode(mode, writers, writes, readers):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='pregacare-wal-'), 'bench.sqlite3')
+    ctx = multiprocessing.get_context('spawn')
+    setup_process = ctx.Process(target=_prepare, args=(db_path, mode))
+    setup_process.start()
+    setup_process.join()
+
+    results, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_reader, args=(db_path, mode, 1, stop, results))
+             for _ in range(readers)]
+    procs += [ctx.Process(target=_writer, args=(db_path, mode, 1, writes, results))
+              for _ in range(writers)]
+    started = time.perf_counter()
+    for proc in procs:
+        proc.start()
+
+    # Readers only report once stopped, so the first results are the writers'.
+    write_latencies, write_errors = [], 0
+    for _ in range(writers):
+        _, latencies, errors = results.get()
+        write_latencies += latencies
+        write_errors += errors
+    elapsed = time.perf_counter() - started
+    stop.set()
+    read_latencies, read_errors = [], 0
+    for _ in range(readers):
+        _, latencies, errors = results.get()
+        read_latencies += latencies
+        read_errors += errors
+    for proc in procs:
+        proc.join()
+
+    total = writers * writes
+    return {
+        'mode': mode,
+        'writes/s': round((total - write_errors) / elapsed, 1),
+        'lock errors': write_errors,
+        'write p50 ms': round(percentile(write_latencies, 50) * 1000, 2),
+        'write p99 ms': round(percentile(write_latencies, 99) * 1000, 2),
+        'read p99 ms': round(percentile(read_latencies, 99) * 1000, 2),
+        'read errors': read_errors,
+    }
+
+
+def _prepare(db_path, mode):
+    _configure(db_path, mode)
+    migrate()
+    from django.contrib.auth.models import User
+    User.objects.create_user(username='bench@example.com', password='bench')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    rows = [run_mode(mode, args.writers, args.writes, args.readers) for mode in args.modes]
+    print_table(rows, ['mode', 'writes/s', 'lock errors', 'write p50 ms', 'write p99 ms',
+                       'read p99 ms', 'read errors'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Offline sync of N records: one batched request vs one write per record.
+
+Uploads N cycles, MEWS readings and growth records (a third each) as one
+gzipped batch to ``/api/sync/``, re-uploads them as edits, then downloads
+them on a fresh device by following the sync token page by page. For
+comparison, the same records are saved one ``save()`` per record, the
+floor of the form-per-record flow before any HTTP round trip. Usage::
+
+    python -m benchmarks.sync --records 10000
+"""
+import argparse
+import gzip
+import json
+import time
+import uuid
+from datetime import date, timedelta
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+
+def make_changes(records, baby_id, rng_offset=0):
+    third = records // 3
+    start = date(2020, 1, 1)
+    return {
+        'cycles': [{'client_id': str(uuid.UUID(int=i + 1)), 'period_start_date': str(start + timedelta(days=28 * i)),
+                    'period_end_date': str(start + timedelta(days=28 * i + 4)), 'cycle_length': 28 + rng_offset,
+                    'flow_intensity': 'medium', 'symptoms': 'Mild cramps'} for i in range(third)],
+        'mews': [{'client_id': str(uuid.UUID(int=10 ** 9 + i)),
+                  'assessment_date': '2026-01-01T08:%02d:00+00:00' % (i % 60), 'systolic_bp': 118 + rng_offset,
+                  'diastolic_bp': 76, 'heart_rate': 80, 'respiratory_rate': 16, 'temperature': 36.8,
+                  'oxygen_saturation': 98, 'consciousness_level': 1, 'urine_output': 60} for i in range(third)],
+        'growth': [{'client_id': str(uuid.UUID(int=2 * 10 ** 9 + i)), 'baby_id': baby_id,
+                    'record_date': str(start + timedelta(days=i)), 'weight': 3.3 + i * 0.001 + rng_offset,
+                    'length': 50, 'head_circumference': 35} for i in range(records - 2 * third)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django(ALLOWED_HOSTS=['testserver'])
+    migrate()
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from women import sync
+    from women.models import BabyProfile, GrowthRecord, MEWS_Assessment, MenstrualCycle, PostpartumProfile
+    from women.sqlite import serialized_write
+
+    user = User.objects.create(username='mum@example.com')
+    profile = PostpartumProfile.objects.create(user=user, delivery_date=date(2020, 1, 1), delivery_type='vaginal',
+                                               baby_weight=3.3)
+    baby = BabyProfile.objects.create(postpartum_profile=profile, name='Baby', birth_date=date(2020, 1, 1),
+                                      birth_weight=3.3, birth_length=50, apgar_score=9)
+    client = Client()
+    client.force_login(user)
+    rows = []
+
+    def upload(step, changes):
+        body = gzip.compress(json.dumps({'token': None, 'changes': changes}).encode())
+        started = time.perf_counter()
+        response = client.post('/api/sync/', body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.content
+        rows.append({'step': step, 'requests': 1, 'records': args.records, 'bytes': len(body),
+                     'seconds': round(elapsed, 2), 'records/s': int(args.records / elapsed)})
+
+    upload('upload batch (create)', make_changes(args.records, baby.id))
+    upload('upload batch (update)', make_changes(args.records, baby.id, rng_offset=1))
+
+    # Everything is older than the settle delay from here on.
+    sync.SETTLE = timedelta(0)
+    token, received, requests, size = None, 0, 0, 0
+    started = time.perf_counter()
+    while True:
+        response = client.post('/api/sync/', json.dumps({'token': token, 'changes': {}}),
+                               content_type='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        size += len(response.content)
+        data = json.loads(gzip.decompress(response.content))
+        received += sum(len(changes) for changes in data['changes'].values())
+        token, requests = data['token'], requests + 1
+        if not data['more']:
+            break
+    elapsed = time.perf_counter() - started
+    rows.append({'step': 'download since empty token', 'requests': requests, 'records': received, 'bytes': size,
+                 'seconds': round(elapsed, 2), 'records/s': int(received / elapsed)})
+
+    changes = make_changes(args.records, baby.id, rng_offset=2)
+    for model in (MenstrualCycle, MEWS_Assessment, GrowthRecord):
+        model.objects.all().delete()
+    started = time.perf_counter()
+    for name, model in (('cycles', MenstrualCycle), ('mews', MEWS_Assessment), ('growth', GrowthRecord)):
+        owner = {} if name == 'growth' else {'user': user}
+        for record in changes[name]:
+            with serialized_write():
+                model(**record, **owner).save()
+    elapsed = time.perf_counter() - started
+    rows.append({'step': 'one save() per record', 'requests': args.records, 'records': args.records,
+                 'bytes': '-', 'seconds': round(elapsed, 2), 'records/s': int(args.records / elapsed)})
+
+    print_table(rows, ['step', 'requests', 'records', 'bytes', 'seconds', 'records/s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Symptom triage throughput: compiled trie regex vs one regex per phrase.
+
+Generates N free-text submissions (about 250 characters each, mixing filler
+words with lexicon phrases and negations) and triages them on one core with
+``women.triage``. The baseline searches each lexicon phrase with its own
+precompiled word-boundary regex, the straightforward implementation. Also
+times submissions 10x longer to show matching time grows linearly with the
+text. Usage::
+
+    python -m benchmarks.triage --submissions 20000
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.utils import print_table, setup_django
+
+FILLER = ('i', 'have', 'had', 'since', 'yesterday', 'this', 'morning', 'and', 'a', 'bit', 'of', 'my', 'week',
+          'pregnant', 'weeks', 'baby', 'feel', 'really', 'some', 'the', 'night', 'after', 'feeding', 'also')
+
+
+def make_submission(rng, phrases, words=45):
+    parts = []
+    while len(parts) < words:
+        if rng.random() < 0.12:
+            parts.append(('no ' if rng.random() < 0.2 else '') + rng.choice(phrases))
+        else:
+            parts.append(rng.choice(FILLER))
+        if rng.random() < 0.1:
+            parts[-1] += '.'
+    return ' '.join(parts).capitalize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from women.triage import NEGATIONS, TriageEngine
+
+    rng = random.Random(7)
+    started = time.perf_counter()
+    engine = TriageEngine()
+    compile_ms = (time.perf_counter() - started) * 1000
+    phrases = list(engine.categories)
+    texts = [make_submission(rng, phrases) for _ in range(args.submissions)]
+    long_texts = [make_submission(rng, phrases, words=450) for _ in range(args.submissions // 10)]
+    print('%d phrases compiled in %.1f ms; mean submission %d chars'
+          % (len(phrases), compile_ms, sum(map(len, texts)) / len(texts)))
+
+    per_phrase = [(phrase, re.compile(r'\b%s\b' % re.escape(phrase))) for phrase in phrases]
+
+    def baseline(text):
+        text = engine.normalize(text)
+        found = []
+        for phrase, regex in per_phrase:
+            for match in regex.finditer(text):
+                if not NEGATIONS.intersection(text[max(0, match.start() - 40):match.start()].split()[-3:]):
+                    found.append(phrase)
+        return found
+
+    rows = []
+    for name, fn, batch in (('one regex per phrase', baseline, texts),
+                            ('trie regex (triage)', engine.triage, texts),
+                            ('trie regex, 10x longer text', engine.triage, long_texts)):
+        started = time.perf_counter()
+        for text in batch:
+            fn(text)
+        elapsed = time.perf_counter() - started
+        chars = sum(map(len, batch))
+        rows.append({'matcher': name, 'submissions': len(batch), 'seconds': round(elapsed, 2),
+                     'submissions/s': int(len(batch) / elapsed), 'MB/s': round(chars / elapsed / 1e6, 2)})
+    print_table(rows, ['matcher', 'submissions', 'seconds', 'submissions/s', 'MB/s'])
+
+
+if __name__ == '__main__':
+    main()
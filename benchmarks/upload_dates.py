@@ -0,0 +1,90 @@
+"""Upload date migration and date-indexed admin lists at scale.
+
+Seeds N reports at migration 0013, when upload dates were YYYY-MM-DD
+strings, spread over ``--days`` days. Times migrations 0014-0016 (add the
+column, copy in batches, swap) and tracks peak memory. Then times the
+admin list queries on the new index: the last 7 days, a first page and a
+page far down, and a date-range page. Usage::
+
+    python -m benchmarks.upload_dates --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.utils import percentile, print_table, setup_django
+
+
+def seed(rows, days):
+    from django.db import connection
+    first = date(2026, 1, 1) - timedelta(days=days)
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, "
+                       "is_staff, is_active, date_joined) VALUES ('', 0, 'bench', '', '', '', 1, 1, '2024-01-01')")
+        for start in range(0, rows, 50000):
+            cursor.executemany(
+                "INSERT INTO women_notes (user_id, uploadingdate, reportfile, filetype, description, status) "
+                "VALUES (1, %s, %s, 'report', 'Report', %s)",
+                [((first + timedelta(days=i * days // rows)).isoformat(), 'r%d.pdf' % i,
+                  ('Accept', 'pending', 'Reject')[i % 3]) for i in range(start, min(rows, start + 50000))])
+
+
+def timed(fn, rounds=1):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django(PREVIEW_IN_BACKGROUND=False)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'women', '0013', verbosity=0)
+    seed(args.rows, args.days)
+
+    rows = []
+    for target in ('0014', '0015', '0016'):
+        tracemalloc.start()
+        ms = timed(lambda: call_command('migrate', 'women', target, verbosity=0))[1][0] * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows.append({'step': 'migrate %s' % target, 'ms': round(ms), 'peak MB': round(peak / 1e6, 1)})
+    print_table(rows, ['step', 'ms', 'peak MB'])
+
+    from django.utils import timezone
+    from women.models import Notes
+    from women.moderation import upload_list, upload_page
+    from women.pagination import encode_cursor
+
+    week_ago = Notes.objects.order_by('-uploadingdate').first().uploadingdate - timedelta(days=7)
+    deep = Notes.objects.filter(status='Accept').order_by('-uploadingdate', '-id')[args.rows // 6]
+    cursor = encode_cursor([deep.uploadingdate, deep.pk])
+    middle = timezone.localtime(deep.uploadingdate).date()
+    queries = {
+        'count last 7 days': lambda: Notes.objects.filter(uploadingdate__gte=week_ago).count(),
+        'accepted, first page': lambda: upload_page('notes', upload_list('notes', 'Accept')),
+        'accepted, page at row %d' % (args.rows // 6): lambda: upload_page(
+            'notes', upload_list('notes', 'Accept', cursor=cursor)),
+        'accepted, 30-day range': lambda: upload_page('notes', upload_list(
+            'notes', 'Accept', start=middle - timedelta(days=30), end=middle)),
+    }
+    rows = []
+    for label, query in queries.items():
+        samples = timed(query, args.rounds)[1]
+        rows.append({'query': label, 'p50 ms': round(percentile(samples, 50) * 1000, 2),
+                     'p95 ms': round(percentile(samples, 95) * 1000, 2)})
+    print_table(rows, ['query', 'p50 ms', 'p95 ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(db_path=None, **overrides):
+    """Configure Django against ``db_path`` (a fresh temp file by default).
+
+    ``overrides`` are applied to ``django.conf.settings`` before the first
+    database connection is opened. Returns the database path in use.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='pregacare-bench-'), 'bench.sqlite3')
+    os.environ['PREGACARE_DB_PATH'] = db_path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Safeher.settings')
+
+    import django
+    from django.conf import settings
+    django.setup()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return db_path
+
+
+def migrate():
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0, run_syncdb=True)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(c)), *(len(str(r[c])) for r in rows)) for c in columns]
+    print('  '.join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def inject_latency(seconds):
+    """Add ``seconds`` of simulated network latency to every SQL statement.
+
+    Installed on each new connection, so it also covers connections opened
+    by executor threads.
+    """
+    import time
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    # Reconnect so connections opened before this call get the delay too.
+    from django.db import connections
+    connections.close_all()
+    return delay
@@ -0,0 +1,76 @@
+"""Vaccination schedule generation and the overdue sweep at population scale.
+
+Seeds N babies born over the last two years, generates their schedules with
+``women.vaccinations.backfill_schedules()``, marks most past doses as
+administered and times a full ``overdue_chunks()`` sweep, with its peak
+Python memory. Usage::
+
+    python -m benchmarks.vaccinations --babies 50000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.utils import migrate, print_table, setup_django
+
+
+def seed(count, rng):
+    from django.contrib.auth.models import User
+    from women.models import BabyProfile, PostpartumProfile
+    User.objects.bulk_create(User(username='mum%d@example.com' % i) for i in range(count))
+    users = list(User.objects.values_list('id', flat=True))
+    today = date.today()
+    births = [today - timedelta(days=rng.randrange(730)) for _ in users]
+    PostpartumProfile.objects.bulk_create(
+        PostpartumProfile(user_id=user, delivery_date=born, delivery_type='vaginal', baby_weight=3.2)
+        for user, born in zip(users, births))
+    # bulk_create skips post_save, so schedules are generated separately.
+    BabyProfile.objects.bulk_create(
+        BabyProfile(postpartum_profile_id=profile, name='Baby %d' % profile, birth_date=profile_date,
+                    birth_weight=3.2, birth_length=50, apgar_score=9)
+        for profile, profile_date in PostpartumProfile.objects.values_list('id', 'delivery_date'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--babies', type=int, default=50000)
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    from django.db import connection
+    from women.models import VaccinationRecord
+    from women.vaccinations import backfill_schedules, overdue_chunks
+
+    seed(args.babies, random.Random(11))
+    rows = []
+
+    started = time.perf_counter()
+    created = backfill_schedules()
+    elapsed = time.perf_counter() - started
+    rows.append({'step': 'generate schedules', 'rows': created, 'seconds': round(elapsed, 2),
+                 'rows/s': int(created / elapsed), 'peak MB': '-'})
+
+    # Most past doses were given; leave about one in twenty overdue.
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE women_vaccinationrecord SET administered_date = due_date '
+                       'WHERE due_date < %s AND id %% 20 != 0', [date.today()])
+        cursor.execute('ANALYZE')
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    swept = sum(len(chunk) for chunk in overdue_chunks())
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows.append({'step': 'overdue sweep', 'rows': swept, 'seconds': round(elapsed, 2),
+                 'rows/s': int(swept / elapsed), 'peak MB': round(peak / 2 ** 20, 1)})
+
+    print('%d babies, %d vaccination records' % (args.babies, VaccinationRecord.objects.count()))
+    print_table(rows, ['step', 'rows', 'seconds', 'rows/s', 'peak MB'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Latency, query count and peak memory of every URL in ``Safeher/urls.py``.
+
+Builds a seeded population (``benchmarks/population.py``). Then it walks the
+URL patterns, including ``chat.urls``, and GETs each one ``--rounds`` times
+through the test client as the right kind of user:
+- anonymous for the login and password reset pages;
+- the clinic admin for the admin pages;
+- otherwise the population's member.
+
+Path parameters are filled from the population. The delete URLs get a
+fresh throwaway object each round, so the data stays the same from one
+URL to the next. Timings use ``DEBUG = False``, like production. Query
+counts come from a database execute wrapper. Peak memory is measured by
+``tracemalloc`` over one extra request. URLs that answer GET with 405 are
+listed as skipped. URLs that answer 500 are listed again after the table.
+
+Results go to ``--output`` as JSON, with the git commit and population
+size. ``--compare`` prints the change against an earlier file, and with
+``--max-regression`` exits non-zero when a p50 got slower by more than
+that percentage. Usage::
+
+    python -m benchmarks.views --users 500 --rounds 30 --output before.json
+    python -m benchmarks.views --compare before.json --max-regression 25
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime
+
+from benchmarks.utils import ROOT, percentile, print_table, setup_django
+
+ANONYMOUS = {'signup', 'login', 'login_admin', 'index', 'register', 'password_reset', 'password_reset_done',
+             'password_reset_confirm', 'password_reset_complete'}
+STAFF = {'admin:index', 'admin_home', 'pending_queries', 'accepted_queries', 'rejected_queries', 'all_queries',
+         'assign_status', 'moderation_queue', 'pending_m', 'accepted_m', 'rejected_m', 'all_m', 'assignstatus_m',
+         'view_users', 'delete_user', 'delete_notes', 'delete_m'}
+
+Endpoint = namedtuple('Endpoint', ['name', 'route', 'role', 'prepare'])
+
+
+def patterns(entries=None, prefix=''):
+    """``(route, name, pattern)`` for every URL; included admin sites count once."""
+    from django.urls import URLResolver, get_resolver
+    for entry in get_resolver().url_patterns if entries is None else entries:
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            if entry.app_name == 'admin':
+                yield route, 'admin:index', entry
+            else:
+                yield from patterns(entry.url_patterns, route)
+        else:
+            yield route, entry.name, entry
+
+
+def endpoints(population, clients):
+    """``(endpoints, skipped)`` for the URL patterns, each able to build its URL."""
+    from django.contrib.auth.models import User
+    from django.contrib.auth.tokens import default_token_generator
+    from django.urls import reverse
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+    from women.models import Magazines, Notes
+
+    member, midwife = population.member, population.midwife
+    throwaways = iter(range(10 ** 9))
+    kwargs = {
+        'assistant_messages': {'conversation_id': population.conversation_id},
+        'assign_status': {'pid': population.note_id},
+        'assignstatus_m': {'pid': population.magazine_id},
+        # The member polls for the midwife's messages.
+        'message_list': {'sender': midwife.pk, 'receiver': member.pk},
+        'chat': {'sender': member.pk, 'receiver': midwife.pk},
+        'password_reset_confirm': {'uidb64': urlsafe_base64_encode(force_bytes(member.pk)),
+                                   'token': default_token_generator.make_token(member)},
+    }
+    # Each round deletes a new object rather than the population's.
+    throwaway = {
+        'delete_user': lambda: User.objects.create(username='throwaway%d' % next(throwaways)).pk,
+        'delete_notes': lambda: Notes.objects.create(user=member, reportfile='reports/throwaway.pdf').pk,
+        'delete_m': lambda: Magazines.objects.create(user=member, magazinesfile='magazines/throwaway.pdf').pk,
+    }
+    found, skipped = [], []
+    for route, name, pattern in patterns():
+        if name is None:
+            skipped.append({'route': route, 'reason': 'unnamed (static media)'})
+            continue
+        role = 'anonymous' if name in ANONYMOUS else 'staff' if name in STAFF else 'member'
+        if name in throwaway:
+            def prepare(name=name):
+                return reverse(name, kwargs={'pid': throwaway[name]()})
+        elif name == 'logout':
+            def prepare(client=clients['member']):
+                client.force_login(member)
+                return reverse('logout')
+        else:
+            def prepare(url=reverse(name, kwargs=kwargs.get(name))):
+                return url
+        found.append(Endpoint(name, route, role, prepare))
+    return found, skipped
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(endpoint, client, rounds):
+    """Timings of GETs of ``endpoint``; None when it does not take GET."""
+    from django.db import connection
+    # Also warms up caches and lazy imports.
+    if client.get(endpoint.prepare()).status_code == 405:
+        return None
+    samples, queries = [], []
+    for _ in range(rounds):
+        url = endpoint.prepare()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = client.get(url)
+            samples.append(time.perf_counter() - started)
+        queries.append(counter.count)
+    url = endpoint.prepare()
+    tracemalloc.start()
+    client.get(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'name': endpoint.name, 'route': endpoint.route, 'url': url, 'role': endpoint.role,
+        'status': response.status_code, 'bytes': len(getattr(response, 'content', b'')),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2), 'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+        'queries': max(queries), 'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print the change from ``baseline_path``; return the regressed endpoint names."""
+    with open(baseline_path) as baseline_file:
+        baseline = {row['name']: row for row in json.load(baseline_file)['results']}
+    rows, regressed = [], []
+    for row in results:
+        before = baseline.get(row['name'])
+        if before is None:
+            continue
+        change = (row['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        if max_regression is not None and change > max_regression:
+            regressed.append(row['name'])
+        rows.append({'name': row['name'], 'p50 before': before['p50_ms'], 'p50 now': row['p50_ms'],
+                     'change %': round(change, 1), 'queries before': before['queries'], 'queries now': row['queries']})
+    print_table(rows, ['name', 'p50 before', 'p50 now', 'change %', 'queries before', 'queries now'])
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--years', type=int, default=3, help='Years of cycle history per user')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--only', nargs='+', metavar='NAME', help='Time only these URL names')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', metavar='JSON', help='Print the change from an earlier --output file')
+    parser.add_argument('--max-regression', type=float, metavar='PCT',
+                        help='With --compare, exit 1 if any p50 got slower by more than PCT percent')
+    args = parser.parse_args()
+
+    setup_django(DEBUG=False, ALLOWED_HOSTS=['testserver'], ASYNC_VIEWS=False, PREVIEW_IN_BACKGROUND=False,
+                 SEARCH_EXTRACT_IN_BACKGROUND=False)
+    from benchmarks.utils import migrate
+    migrate()
+    import django
+    from django.db import connection
+    from django.test import Client
+    from benchmarks.population import build_population
+
+    started = time.perf_counter()
+    population = build_population(args.users, args.years, seed=args.seed)
+    print('Built %d users (%d rows) in %.1fs' % (args.users, sum(population.counts.values()),
+                                                  time.perf_counter() - started))
+    clients = {role: Client(raise_request_exception=False) for role in ('anonymous', 'member', 'staff')}
+    clients['member'].force_login(population.member)
+    clients['staff'].force_login(population.staff)
+
+    found, skipped = endpoints(population, clients)
+    results = []
+    for endpoint in found:
+        if args.only and endpoint.name not in args.only:
+            continue
+        result = measure(endpoint, clients[endpoint.role], args.rounds)
+        if endpoint.name == 'logout':
+            clients['member'].force_login(population.member)
+        if result is None:
+            skipped.append({'route': endpoint.route, 'reason': 'does not take GET'})
+        else:
+            results.append(result)
+    print_table(results, ['name', 'role', 'status', 'p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb'])
+    for skip in skipped:
+        print('Skipped %(route)s: %(reason)s' % skip)
+    for row in results:
+        if row['status'] >= 500:
+            print('Server error %(status)d from %(name)s (%(url)s)' % row)
+
+    if args.output:
+        meta = {'created': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor,
+                'users': args.users, 'years': args.years, 'seed': args.seed, 'rounds': args.rounds,
+                'rows': population.counts}
+        with open(args.output, 'w') as output:
+            json.dump({'meta': meta, 'results': results, 'skipped': skipped}, output, indent=2)
+        print('Wrote %s' % args.output)
+    if args.compare:
+        regressed = compare(results, args.compare, args.max_regression)
+        if regressed:
+            print('Slower than allowed: %s' % ', '.join(regressed))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class ChatConfig(AppConfig):
     name = 'chat'
+
+    def ready(self):
+        from .conversations import message_saved
+        from .models import Message
+        post_save.connect(message_saved, sender=Message, dispatch_uid='chat.conversations.message_saved')
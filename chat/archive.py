@@ -0,0 +1,131 @@
+"""Retention and archival of old chat messages.
+
+``archive_messages()`` moves read messages older than
+``settings.CHAT_RETENTION_DAYS`` out of ``Message`` into ``MessageArchive``
+blocks. Each block holds one pair of users' messages from one month as
+zlib-compressed JSON. Old messages are taken in id order, ``batch_size`` at
+a time. Each batch is its own short transaction that inserts the blocks and
+deletes the messages, so other writers are never held up for long and an
+interrupted run resumes where it stopped. Unread messages stay in the live
+table.
+
+``thread()`` reads a conversation from the live table and the archive
+together, newest page first. Callers do not need to know where a message
+lives: archived messages come back as unsaved ``Message`` instances.
+"""
+import json
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from women.sqlite import serialized_write
+
+from .models import Conversation, Message, MessageArchive
+
+BATCH_SIZE = 20000
+THREAD_PAGE = 200
+ARCHIVE_FIELDS = ('id', 'sender_id', 'receiver_id', 'message', 'timestamp', 'is_read')
+
+
+def pack(rows):
+    """Compress ``ARCHIVE_FIELDS`` tuples into a block's ``data``."""
+    payload = [[id, sender, receiver, text, timestamp.isoformat(), is_read]
+               for id, sender, receiver, text, timestamp, is_read in rows]
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+
+
+def unpack(data):
+    """The block's messages as unsaved ``Message`` instances, in id order."""
+    return [Message(id=id, sender_id=sender, receiver_id=receiver, message=text,
+                    timestamp=parse_datetime(timestamp), is_read=is_read)
+            for id, sender, receiver, text, timestamp, is_read in json.loads(zlib.decompress(data))]
+
+
+def archive_messages(days=None, batch_size=BATCH_SIZE, now=None):
+    """Archive read messages older than ``days``; returns ``(messages, blocks)``."""
+    days = settings.CHAT_RETENTION_DAYS if days is None else days
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    old = Message.objects.filter(timestamp__lt=cutoff, is_read=True).order_by('id')
+    archived = blocks = last_id = 0
+    while True:
+        rows = list(old.filter(id__gt=last_id).values_list(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return archived, blocks
+        last_id = rows[-1][0]
+        groups = defaultdict(list)
+        for row in rows:
+            sender, receiver, timestamp = row[1], row[2], row[4]
+            groups[min(sender, receiver), max(sender, receiver), timestamp.date().replace(day=1)].append(row)
+        with serialized_write():
+            MessageArchive.objects.bulk_create(
+                MessageArchive(user_low_id=low, user_high_id=high, month=month, first_id=group[0][0],
+                               last_id=group[-1][0], message_count=len(group), data=pack(group))
+                for (low, high, month), group in groups.items())
+            Message.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+        blocks += len(groups)
+
+
+def thread(user_id, other_id, before=None, limit=THREAD_PAGE):
+    """``(messages, more)``: the latest ``limit`` messages between two users.
+
+    Messages are oldest first, live and archived alike, with ``sender`` and
+    ``receiver`` loaded. ``before`` pages back from a message id, and
+    ``more`` says whether older messages exist.
+    """
+    live = Message.objects.filter(Q(sender_id=user_id, receiver_id=other_id) |
+                                  Q(sender_id=other_id, receiver_id=user_id))
+    if before is not None:
+        live = live.filter(id__lt=before)
+    messages = list(live.order_by('-id')[:limit + 1])
+    if len(messages) <= limit:
+        blocks = MessageArchive.objects.filter(user_low_id=min(user_id, other_id),
+                                               user_high_id=max(user_id, other_id))
+        if before is not None:
+            blocks = blocks.filter(first_id__lt=before)
+        for block in blocks.order_by('-last_id').only('data').iterator():
+            messages.extend(message for message in reversed(unpack(block.data))
+                            if before is None or message.id < before)
+            if len(messages) > limit:
+                break
+        messages.sort(key=lambda message: message.id, reverse=True)
+    more = len(messages) > limit
+    messages = messages[:limit][::-1]
+    users = User.objects.in_bulk({user_id, other_id})
+    for message in messages:
+        message.sender = users[message.sender_id]
+        message.receiver = users[message.receiver_id]
+    return messages, more
+
+
+def restore_archived_conversations():
+    """Add conversations for pairs whose messages are all archived.
+
+    Pairs that still have live messages keep their conversation; the
+    archived messages are older and were all read.
+    """
+    latest = list(MessageArchive.objects.values('user_low', 'user_high').annotate(last_id=Max('last_id'))
+                  .order_by())
+    restored = 0
+    for start in range(0, len(latest), 100):
+        blocks = MessageArchive.objects.filter(reduce(or_, (Q(**row) for row in latest[start:start + 100])))
+        conversations = []
+        for block in blocks:
+            message = max(unpack(block.data), key=lambda message: message.id)
+            for owner, counterpart in ((message.sender_id, message.receiver_id),
+                                       (message.receiver_id, message.sender_id)):
+                conversations.append(Conversation(owner_id=owner, counterpart_id=counterpart,
+                                                  last_message=message.message, last_message_at=message.timestamp,
+                                                  sent_last=owner == message.sender_id))
+        with serialized_write():
+            Conversation.objects.bulk_create(conversations, ignore_conflicts=True)
+        restored += len(conversations)
+    return restored
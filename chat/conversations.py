@@ -0,0 +1,114 @@
+"""Conversation index for the chat sidebar.
+
+Each user has one ``Conversation`` row per person they have exchanged
+messages with. It holds the last message, its time and the number of unread
+messages from that person. Saving a ``Message`` updates both participants'
+rows: two UPDATEs, with an F() increment of the receiver's unread count. The
+sidebar is then one indexed query on ``(owner, -last_message_at)`` however
+many users or messages there are.
+
+``mark_read()`` marks a thread read with a single UPDATE over the partial
+unread index. ``rebuild_conversations()`` recomputes every row from the
+messages with one grouped INSERT ... SELECT, for messages written with
+``bulk_create()`` or before this index existed, then adds pairs whose
+messages have all been archived.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from women.sqlite import serialized_write
+
+from .archive import restore_archived_conversations
+from .models import Conversation, Message
+
+CONVERSATION_PAGE = 50
+
+
+def conversation_list(user, limit=CONVERSATION_PAGE):
+    """The user's most recent conversations, with their counterpart loaded."""
+    return list(Conversation.objects.filter(owner=user).select_related('counterpart')
+                .order_by('-last_message_at')[:limit])
+
+
+def _touch(owner_id, counterpart_id, message, sent):
+    values = dict(last_message=message.message, last_message_at=message.timestamp, sent_last=sent)
+    unread = 0 if sent else 1
+    conversation = Conversation.objects.filter(owner_id=owner_id, counterpart_id=counterpart_id)
+    if conversation.update(unread_count=F('unread_count') + unread, **values):
+        return
+    try:
+        with transaction.atomic():
+            Conversation.objects.create(owner_id=owner_id, counterpart_id=counterpart_id, unread_count=unread,
+                                        **values)
+    except IntegrityError:
+        # Created by a concurrent writer in between.
+        conversation.update(unread_count=F('unread_count') + unread, **values)
+
+
+def record_message(message):
+    """Update both participants' conversations for a new message."""
+    with serialized_write():
+        _touch(message.sender_id, message.receiver_id, message, sent=True)
+        _touch(message.receiver_id, message.sender_id, message, sent=False)
+
+
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    """``post_save`` handler for ``Message``."""
+    if created and not raw:
+        record_message(instance)
+
+
+def mark_read(reader_id, counterpart_id, up_to=None):
+    """Mark the counterpart's messages to the reader read; returns how many.
+
+    ``up_to`` limits it to messages with ids up to that one, e.g. the last
+    message the reader was shown.
+    """
+    unread = Message.objects.filter(sender_id=counterpart_id, receiver_id=reader_id, is_read=False)
+    if up_to is not None:
+        unread = unread.filter(id__lte=up_to)
+    conversation = Conversation.objects.filter(owner_id=reader_id, counterpart_id=counterpart_id)
+    with serialized_write():
+        count = unread.update(is_read=True)
+        if up_to is None:
+            conversation.update(unread_count=0)
+        elif count:
+            conversation.update(unread_count=Greatest(F('unread_count') - count, 0))
+    return count
+
+
+REBUILD_SQL = """
+INSERT INTO {conversation} (owner_id, counterpart_id, last_message, last_message_at, sent_last, unread_count)
+SELECT pair.owner_id, pair.counterpart_id, last.message, last.timestamp, last.sender_id = pair.owner_id, pair.unread
+FROM (
+    SELECT owner_id, counterpart_id, MAX(last_id) AS last_id, SUM(unread) AS unread
+    FROM (
+        SELECT receiver_id AS owner_id, sender_id AS counterpart_id, MAX(id) AS last_id,
+               SUM(CASE WHEN is_read THEN 0 ELSE 1 END) AS unread
+        FROM {message} GROUP BY receiver_id, sender_id
+        UNION ALL
+        SELECT sender_id, receiver_id, MAX(id), 0
+        FROM {message} GROUP BY sender_id, receiver_id
+    ) AS sides
+    GROUP BY owner_id, counterpart_id
+) AS pair
+JOIN {message} AS last ON last.id = pair.last_id
+"""
+
+
+def rebuild_conversations():
+    """Recompute every ``Conversation`` from the messages; returns how many.
+
+    One INSERT ... SELECT over two grouped scans of the messages (received
+    and sent per pair), run as a single write transaction. Pairs with only
+    archived messages come back from their latest archive block.
+    """
+    quote = connection.ops.quote_name
+    sql = REBUILD_SQL.format(conversation=quote(Conversation._meta.db_table), message=quote(Message._meta.db_table))
+    with serialized_write():
+        Conversation.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+        restore_archived_conversations()
+    return Conversation.objects.count()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from chat.archive import BATCH_SIZE, archive_messages
+
+
+class Command(BaseCommand):
+    help = 'Move read chat messages older than the retention period into compressed monthly archive blocks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Retention in days (default: settings.CHAT_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Messages moved per transaction')
+
+    def handle(self, *args, **options):
+        messages, blocks = archive_messages(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write('Archived %d messages into %d blocks' % (messages, blocks))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from chat.conversations import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every chat conversation (sidebar entry and unread count) from the messages.'
+
+    def handle(self, *args, **options):
+        total = rebuild_conversations()
+        self.stdout.write('Rebuilt %d conversations' % total)
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
 
 
 class Message(models.Model):
@@ -14,5 +15,56 @@ class Message(models.Model):
 
     class Meta:
         ordering = ('timestamp',)
+        indexes = [
+            models.Index(fields=['sender', 'receiver', 'timestamp'], name='message_thread_idx'),
+            # Unread messages are few, so the poll and mark-read queries scan
+            # a small partial index instead of the whole thread.
+            models.Index(fields=['receiver', 'sender', 'id'], name='message_unread_idx', condition=Q(is_read=False)),
+        ]
 
 
+class Conversation(models.Model):
+    """One user's side of a chat, kept up to date as messages are saved.
+
+    See chat/conversations.py.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
+    counterpart = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.CharField(max_length=1200)
+    last_message_at = models.DateTimeField()
+    sent_last = models.BooleanField(default=False, help_text="The owner sent the last message")
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.owner.username} - {self.counterpart.username}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'counterpart'], name='unique_conversation'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-last_message_at'], name='conversation_list_idx'),
+        ]
+
+
+class MessageArchive(models.Model):
+    """A compressed block of archived messages between two users in one month.
+
+    ``user_low`` is the participant with the lower id. ``data`` holds the
+    messages as zlib-compressed JSON; see chat/archive.py.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    month = models.DateField()
+    first_id = models.IntegerField()
+    last_id = models.IntegerField()
+    message_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.user_low.username} - {self.user_high.username} ({self.month:%Y-%m})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_low', 'user_high', '-last_id'], name='archive_thread_idx'),
+        ]
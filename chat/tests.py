@@ -1,3 +1,154 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from chat.archive import archive_messages, thread
+from chat.conversations import conversation_list, mark_read
+from chat.models import Conversation, Message, MessageArchive
+
+
+class MessagePollTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pwd')
+        self.bob = User.objects.create_user(username='bob', password='pwd')
+        Message.objects.create(sender=self.alice, receiver=self.bob, message='hello')
+        Message.objects.create(sender=self.alice, receiver=self.bob, message='are you there?')
+
+    def poll(self):
+        return self.client.get('/api/messages/%d/%d' % (self.alice.id, self.bob.id))
+
+    def test_poll_returns_unread_once(self):
+        self.client.force_login(self.bob)
+        first = self.poll().json()
+        self.assertEqual([m['description'] for m in first], ['hello', 'are you there?'])
+        self.assertEqual(self.poll().json(), [])
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+
+    def test_poll_only_for_receiver(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.poll().status_code, 403)
+
+    def test_poll_clears_unread_count(self):
+        self.client.force_login(self.bob)
+        self.assertEqual(Conversation.objects.get(owner=self.bob).unread_count, 2)
+        self.poll()
+        self.assertEqual(Conversation.objects.get(owner=self.bob).unread_count, 0)
+
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob, self.carol, self.dan = (
+            User.objects.create_user(username=name, password='pwd') for name in ('alice', 'bob', 'carol', 'dan'))
+        for text in ('hi alice', 'you there?'):
+            Message.objects.create(sender=self.bob, receiver=self.alice, message=text)
+        Message.objects.create(sender=self.alice, receiver=self.carol, message='lunch?')
+        Message.objects.create(sender=self.carol, receiver=self.alice, message='yes!')
+
+    def test_lists_only_counterparts_with_last_message_and_unread(self):
+        with self.assertNumQueries(1):
+            conversations = conversation_list(self.alice)
+            rows = [(c.counterpart.username, c.last_message, c.sent_last, c.unread_count) for c in conversations]
+        self.assertEqual(rows, [('carol', 'yes!', False, 1), ('bob', 'you there?', False, 2)])
+        carol_side = Conversation.objects.get(owner=self.carol)
+        self.assertEqual((carol_side.counterpart, carol_side.unread_count, carol_side.sent_last), (self.alice, 1, True))
+        self.assertEqual(conversation_list(self.dan), [])
+
+    def test_mark_read_is_one_update(self):
+        with self.assertNumQueries(4):  # savepoint, messages, conversation, release
+            self.assertEqual(mark_read(self.alice.id, self.bob.id), 2)
+        self.assertFalse(Message.objects.filter(receiver=self.alice, sender=self.bob, is_read=False).exists())
+        self.assertEqual(Conversation.objects.get(owner=self.alice, counterpart=self.bob).unread_count, 0)
+        self.assertEqual(Conversation.objects.get(owner=self.alice, counterpart=self.carol).unread_count, 1)
+
+    def test_mark_read_up_to_keeps_newer_unread(self):
+        first = Message.objects.filter(receiver=self.alice, sender=self.bob).order_by('id').first()
+        self.assertEqual(mark_read(self.alice.id, self.bob.id, up_to=first.id), 1)
+        self.assertEqual(Conversation.objects.get(owner=self.alice, counterpart=self.bob).unread_count, 1)
+
+    def test_rebuild_matches_incremental_index(self):
+        expected = set(Conversation.objects.values_list(
+            'owner', 'counterpart', 'last_message', 'sent_last', 'unread_count'))
+        Message.objects.bulk_create([Message(sender=self.dan, receiver=self.alice, message='bulk')])
+        expected.add((self.alice.id, self.dan.id, 'bulk', False, 1))
+        expected.add((self.dan.id, self.alice.id, 'bulk', True, 0))
+        out = StringIO()
+        call_command('rebuild_conversations', stdout=out)
+        self.assertIn('Rebuilt 6 conversations', out.getvalue())
+        self.assertEqual(set(Conversation.objects.values_list(
+            'owner', 'counterpart', 'last_message', 'sent_last', 'unread_count')), expected)
+
+    def test_sidebar_shows_conversations_and_search(self):
+        self.client.force_login(self.alice)
+        response = self.client.get('/chat/chat/')
+        self.assertEqual([c.counterpart for c in response.context['conversations']], [self.carol, self.bob])
+        self.assertNotContains(response, 'dan')
+        response = self.client.get('/chat/chat/', {'q': 'da'})
+        self.assertEqual(list(response.context['matches']), [self.dan])
+        self.client.get('/chat/chat/%d/%d/' % (self.alice.id, self.bob.id))
+        self.assertEqual(Conversation.objects.get(owner=self.alice, counterpart=self.bob).unread_count, 0)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob, self.carol = (
+            User.objects.create_user(username=name, password='pwd') for name in ('alice', 'bob', 'carol'))
+        old = timezone.now() - timedelta(days=400)
+        for i in range(6):
+            sender, receiver = (self.alice, self.bob) if i % 2 else (self.bob, self.alice)
+            Message.objects.create(sender=sender, receiver=receiver, message='old %d' % i, is_read=True)
+        Message.objects.create(sender=self.carol, receiver=self.alice, message='old unread')
+        Message.objects.create(sender=self.carol, receiver=self.bob, message='old to bob', is_read=True)
+        Message.objects.update(timestamp=old)
+        Message.objects.create(sender=self.bob, receiver=self.alice, message='new')
+
+    def test_archives_read_messages_past_retention(self):
+        out = StringIO()
+        call_command('archive_messages', '--batch-size', '4', stdout=out)
+        self.assertIn('Archived 7 messages into 3 blocks', out.getvalue())
+        self.assertEqual(list(Message.objects.order_by('id').values_list('message', flat=True)),
+                         ['old unread', 'new'])
+        self.assertEqual(sum(MessageArchive.objects.values_list('message_count', flat=True)), 7)
+        self.assertEqual(archive_messages(), (0, 0))
+
+    def test_thread_reads_live_and_archived_messages(self):
+        archive_messages()
+        with self.assertNumQueries(3):  # live page, archive blocks, users
+            messages, more = thread(self.alice.id, self.bob.id)
+            senders = [m.sender.username for m in messages]
+        self.assertEqual([m.message for m in messages], ['old %d' % i for i in range(6)] + ['new'])
+        self.assertEqual(senders, ['bob', 'alice'] * 3 + ['bob'])
+        self.assertFalse(more)
+        self.assertTrue(all(m.is_read and m.timestamp < timezone.now() - timedelta(days=399) for m in messages[:6]))
+
+    def test_thread_pages_back_across_the_archive(self):
+        archive_messages(batch_size=2)
+        messages, more = thread(self.bob.id, self.alice.id, limit=3)
+        self.assertEqual([m.message for m in messages], ['old 4', 'old 5', 'new'])
+        self.assertTrue(more)
+        messages, more = thread(self.bob.id, self.alice.id, before=messages[0].id, limit=3)
+        self.assertEqual([m.message for m in messages], ['old 1', 'old 2', 'old 3'])
+        messages, more = thread(self.bob.id, self.alice.id, before=messages[0].id, limit=3)
+        self.assertEqual(([m.message for m in messages], more), (['old 0'], False))
+
+    def test_message_view_links_earlier_messages(self):
+        archive_messages()
+        self.client.force_login(self.alice)
+        url = '/chat/chat/%d/%d/' % (self.alice.id, self.bob.id)
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['messages']), 7)
+        self.assertNotContains(response, 'Load earlier messages')
+        newest = Message.objects.get(message='new')
+        response = self.client.get(url, {'before': newest.id})
+        self.assertEqual([m.message for m in response.context['messages']][-1], 'old 5')
+
+    def test_rebuild_keeps_archived_only_conversations(self):
+        archive_messages()
+        call_command('rebuild_conversations', stdout=StringIO())
+        carol_bob = Conversation.objects.get(owner=self.bob, counterpart=self.carol)
+        self.assertEqual((carol_bob.last_message, carol_bob.sent_last, carol_bob.unread_count),
+                         ('old to bob', False, 0))
+        self.assertEqual(Conversation.objects.get(owner=self.alice, counterpart=self.bob).last_message, 'new')
+        self.assertEqual(Conversation.objects.count(), 6)
@@ -1,9 +1,12 @@
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from chat.models import Message
 from chat.forms import SignUpForm
+from chat.archive import thread
+from chat.conversations import conversation_list, mark_read
+from asgiref.sync import sync_to_async
 
 
 def index(request):
@@ -47,20 +50,55 @@ def register_view(request):
     return render(request, template, context)
 
 
+def _sidebar(request):
+    """Conversations for the sidebar, plus users matching ``?q=`` to start a new one."""
+    query = request.GET.get('q', '').strip()
+    matches = User.objects.filter(username__startswith=query).exclude(id=request.user.id).order_by(
+        'username')[:20] if query else []
+    return {'conversations': conversation_list(request.user), 'matches': matches, 'query': query}
+
+
 def chat_view(request):
     if not request.user.is_authenticated:
         return redirect('index')
     if request.method == "GET":
-        return render(request, 'chat/chat.html',
-                      {'users': User.objects.exclude(username=request.user.username)})
+        return render(request, 'chat/chat.html', _sidebar(request))
 
 
 def message_view(request, sender, receiver):
     if not request.user.is_authenticated:
         return redirect('index')
     else:
+        mark_read(request.user.id, receiver)
+        before = request.GET.get('before')
+        messages, more = thread(request.user.id, receiver, before=int(before) if before and before.isdigit() else None)
         return render(request, "chat/messages.html",
-                      {'users': User.objects.exclude(username=request.user.username),
-                       'receiver': User.objects.get(id=receiver),
-                       'messages': Message.objects.filter(sender_id=sender, receiver_id=receiver) |
-                                   Message.objects.filter(sender_id=receiver, receiver_id=sender)})
+                      dict(_sidebar(request),
+                           receiver=User.objects.get(id=receiver),
+                           messages=messages, more=more))
+
+
+def _fetch_unread(sender, receiver):
+    messages = list(Message.objects.filter(sender_id=sender, receiver_id=receiver, is_read=False).order_by('id'))
+    if messages:
+        mark_read(receiver, sender, up_to=max(m.id for m in messages))
+    return [{'description': m.message, 'time': m.timestamp.strftime('%H:%M:%S')} for m in messages]
+
+
+def message_list(request, sender, receiver):
+    """
+    Polled by the chat page: new messages from sender to the current user
+    """
+    if not request.user.is_authenticated or request.user.id != receiver:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    return JsonResponse(_fetch_unread(sender, receiver), safe=False)
+
+
+async def message_list_async(request, sender, receiver):
+    """
+    Async variant of message_list served under ASGI
+    """
+    user_id = await sync_to_async(lambda: request.user.id)()
+    if user_id is None or user_id != receiver:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    return JsonResponse(await sync_to_async(_fetch_unread)(sender, receiver), safe=False)
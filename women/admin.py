@@ -4,4 +4,9 @@ from .models import *
 # Register your models here.
 admin.site.register(Signup)
 admin.site.register(Notes)
-admin.site.register(Magazines)
\ No newline at end of file
+admin.site.register(Magazines)
+
+@admin.register(BabyProfile)
+class BabyProfileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'birth_date', 'sex', 'postpartum_profile')
+    list_filter = ('sex',)
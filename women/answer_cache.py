@@ -0,0 +1,232 @@
+"""Per-process cache of AI assistant answers, keyed by question fingerprint.
+
+Questions are normalized into a set of terms: lowercased words, stop words
+and question filler dropped, and plurals folded. Safety is implied by
+the question, so "safe", "ok" and the like are dropped too, while "bad" and
+"dangerous" fold into "unsafe". "Is coffee safe in week 12?" and "can I
+drink coffee at 12 weeks" therefore both become ``{coffee}``.
+
+A week mentioned in the question, or else the user's current pregnancy
+week, selects a partition: the trimester, or none. An answer is only ever
+reused within its partition.
+
+Lookups try the exact term set first. Failing that, they use MinHash
+signatures (``PERMUTATIONS`` hashes) banded for locality-sensitive hashing.
+Questions sharing any band are candidates. The best candidate is used if
+its Jaccard similarity, with terms weighted by their rarity among cached
+questions, is at least ``THRESHOLD``. A common term such as "day" counts
+for less than "herbal", so "max herbal tea per day" does not reuse the
+answer for "max tea per day". The question's intent terms (``INTENTS``)
+must match exactly, so "how much hair dye" never reuses "is hair dye safe".
+
+The store is an LRU bounded by ``settings.AI_ANSWER_CACHE_SIZE`` entries and
+``AI_ANSWER_CACHE_BYTES`` of answer text. Entries expire after
+``AI_ANSWER_CACHE_TTL`` seconds.
+"""
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from .models import PregnancyProfile
+
+PERMUTATIONS = 64
+BANDS = 32
+ROWS = PERMUTATIONS // BANDS
+THRESHOLD = 0.8
+PRIME = (1 << 31) - 1
+
+STOP_WORDS = frozenset("""
+a an the i im i'm me my we our you your it its it's is am are was were be been being do does did doing
+can could should would will shall may might must to of in on at for from with by about into during
+and or if then than so this that these those there here what which who whom when how why
+while get getting got please tell know want need any some many really just also
+drink drinking eat eating take taking use using have having consume still yet week weeks wk
+pregnant pregnancy safe ok okay fine alright allowed
+""".split())
+SYNONYMS = {'harmful': 'unsafe', 'dangerous': 'unsafe', 'bad': 'unsafe', 'risk': 'unsafe', 'risky': 'unsafe',
+            'much': 'amount', 'max': 'amount', 'maximum': 'amount', 'limit': 'amount'}
+INTENTS = frozenset({'unsafe', 'amount', 'not', 'no', 'after', 'before', 'instead'})
+
+_WEEK_RE = re.compile(r"\b(?:week|wk)s?\s*(\d{1,2})\b|\b(\d{1,2})\s*(?:weeks?|wks?)\b")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_rng = np.random.RandomState(20240)
+_A = _rng.randint(1, PRIME, PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, PRIME, PERMUTATIONS).astype(np.uint64)
+
+Fingerprint = namedtuple('Fingerprint', ['partition', 'terms', 'signature'])
+Entry = namedtuple('Entry', ['fingerprint', 'answer', 'expires'])
+
+
+def _stem(word):
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def terms(question):
+    """``(week, terms)``: the week mentioned, if any, and the question's terms."""
+    text = question.lower().replace('’', "'")
+    week = None
+    match = _WEEK_RE.search(text)
+    if match:
+        week = int(match.group(1) or match.group(2))
+        text = text[:match.start()] + ' ' + text[match.end():]
+    return week, frozenset(_stem(SYNONYMS.get(word, word)) for word in _WORD_RE.findall(text)
+                           if word not in STOP_WORDS and not word.isdigit())
+
+
+def partition(week):
+    """Trimester for a pregnancy week; None when there is no week."""
+    if week is None:
+        return None
+    return 1 if week < 14 else 2 if week < 28 else 3
+
+
+def signature(term_set):
+    hashes = np.fromiter((zlib.crc32(term.encode()) % PRIME for term in term_set), np.uint64, len(term_set))
+    if not len(hashes):
+        return np.zeros(PERMUTATIONS, np.uint64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME).min(axis=1)
+
+
+def fingerprint(question, week=None):
+    """Fingerprint of ``question``; ``week`` is used when it names none."""
+    mentioned, term_set = terms(question)
+    return Fingerprint(partition(mentioned if mentioned is not None else week), term_set, signature(term_set))
+
+
+def user_week(user_id):
+    """Current pregnancy week from the user's latest profile, or None."""
+    profile = PregnancyProfile.objects.filter(user_id=user_id).order_by('-id').first()
+    return profile.current_week if profile else None
+
+
+class AnswerCache:
+    """LRU + TTL store of answers, looked up by question fingerprint."""
+
+    def __init__(self, max_entries=5000, max_bytes=5 * 1024 * 1024, ttl=86400):
+        self.max_entries, self.max_bytes, self.ttl = max_entries, max_bytes, ttl
+        self._entries = OrderedDict()
+        self._exact = {}
+        self._bands = {}
+        self._df = Counter()
+        self._bytes = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _band_keys(fp):
+        return [(fp.partition, band, fp.signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+    def _find(self, fp):
+        entry_id = self._exact.get((fp.partition, fp.terms))
+        if entry_id is not None or not fp.terms:
+            return entry_id
+        candidates = set()
+        for key in self._band_keys(fp):
+            candidates |= self._bands.get(key, set())
+        best, best_score = None, THRESHOLD
+        for candidate in candidates:
+            score = self._similarity(fp.terms, self._entries[candidate].fingerprint.terms)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _weight(self, term):
+        return math.log((1 + len(self._entries)) / (1 + self._df[term])) + 1
+
+    def _similarity(self, a, b):
+        if a & INTENTS != b & INTENTS:
+            return 0.0
+        union = sum(map(self._weight, a | b))
+        return sum(map(self._weight, a & b)) / union
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        fp = entry.fingerprint
+        if self._exact.get((fp.partition, fp.terms)) == entry_id:
+            del self._exact[fp.partition, fp.terms]
+        self._df.subtract(fp.terms)
+        for term in fp.terms:
+            if not self._df[term]:
+                del self._df[term]
+        for key in self._band_keys(fp):
+            bucket = self._bands[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._bands[key]
+        self._bytes -= len(entry.answer)
+
+    def get(self, question, week=None, now=None):
+        """The cached answer for a matching question, or None."""
+        fp = fingerprint(question, week)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry_id = self._find(fp)
+            if entry_id is not None and self._entries[entry_id].expires <= now:
+                self._remove(entry_id)
+                entry_id = None
+            if entry_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id].answer
+
+    def put(self, question, answer, week=None, now=None):
+        fp = fingerprint(question, week)
+        if not fp.terms or len(answer) > self.max_bytes:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            existing = self._exact.get((fp.partition, fp.terms))
+            if existing is not None:
+                self._remove(existing)
+            entry_id, self._next_id = self._next_id, self._next_id + 1
+            self._entries[entry_id] = Entry(fp, answer, now + self.ttl)
+            self._exact[fp.partition, fp.terms] = entry_id
+            self._df.update(fp.terms)
+            for key in self._band_keys(fp):
+                self._bands.setdefault(key, set()).add(entry_id)
+            self._bytes += len(answer)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._bands.clear()
+            self._df.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide cache, sized from settings."""
+    global _cache
+    if _cache is None:
+        _cache = AnswerCache(max_entries=getattr(settings, 'AI_ANSWER_CACHE_SIZE', 5000),
+                             max_bytes=getattr(settings, 'AI_ANSWER_CACHE_BYTES', 5 * 1024 * 1024),
+                             ttl=getattr(settings, 'AI_ANSWER_CACHE_TTL', 86400))
+    return _cache
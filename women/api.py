@@ -0,0 +1,144 @@
+"""Read-only JSON API for the mobile app.
+
+Every endpoint lists the signed-in user's rows in its ``ordering`` and takes:
+
+* ``?fields=a,b``: only return those fields. When they are all plain
+  columns only those columns are read from the database.
+* ``?expand=name``: embed related objects, loaded with one join or one
+  extra query for the whole page, never one per row.
+* ``?cursor=``/``?page_size=``: cursor pagination, so pages stay stable and
+  cheap to fetch however far the client scrolls.
+
+Responses carry an ETag, answer ``If-None-Match`` with 304 Not Modified and
+are gzip compressed when the client accepts it (``api_view()``).
+"""
+from django.middleware.http import ConditionalGetMiddleware
+from django.utils.decorators import decorator_from_middleware
+from django.views.decorators.gzip import gzip_page
+from rest_framework import generics
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+
+from .models import (AIMedicationReminder, BabyProfile, GrowthRecord, MEWS_Assessment, MenstrualCycle,
+                     PregnancyProfile, VaccinationRecord)
+from .serializers import (BabyProfileSerializer, GrowthRecordSerializer, MEWSAssessmentSerializer,
+                          MedicationReminderSerializer, MenstrualCycleSerializer, PregnancyProfileSerializer,
+                          VaccinationRecordSerializer)
+
+conditional_get = decorator_from_middleware(ConditionalGetMiddleware)
+
+
+def api_view(view_class):
+    """``view_class`` as a view function with ETags and gzip."""
+    return gzip_page(conditional_get(view_class.as_view()))
+
+
+def _names(request, param):
+    return [name for name in request.query_params.get(param, '').split(',') if name]
+
+
+class ApiCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        return view.ordering
+
+
+class OwnedListView(generics.ListAPIView):
+    """The signed-in user's ``model`` rows, filtered through ``owner``.
+
+    ``select`` and ``prefetch`` map expansion names to the relation to load.
+    """
+    model = None
+    owner = 'user'
+    ordering = ('-id',)
+    select = {}
+    prefetch = {}
+    pagination_class = ApiCursorPagination
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        serializer_class = self.get_serializer_class()
+        self.fields = _names(request, 'fields')
+        self.expand = _names(request, 'expand')
+        unknown = set(self.expand) - set(serializer_class.expandable)
+        if unknown:
+            raise ParseError('Cannot expand: %s' % ', '.join(sorted(unknown)))
+        unknown = set(self.fields) - set(serializer_class.Meta.fields)
+        if unknown:
+            raise ParseError('Unknown fields: %s' % ', '.join(sorted(unknown)))
+
+    def get_queryset(self):
+        queryset = self.model.objects.filter(**{self.owner: self.request.user})
+        select = [self.select[name] for name in self.expand if name in self.select]
+        prefetch = [self.prefetch[name] for name in self.expand if name in self.prefetch]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*self.columns(select)) if self.fields else queryset
+
+    def columns(self, select):
+        """Columns to read for ``?fields=``, or all of them when a property needs more."""
+        concrete = {field.name: field.name for field in self.model._meta.concrete_fields}
+        concrete.update((field.attname, field.name) for field in self.model._meta.concrete_fields)
+        if not set(self.fields) <= set(concrete):
+            return [field.name for field in self.model._meta.concrete_fields]
+        ordering = [name.lstrip('-') for name in self.ordering]
+        return {concrete[name] for name in self.fields} | set(ordering) | set(select)
+
+    def get_serializer(self, *args, **kwargs):
+        return super().get_serializer(*args, fields=self.fields, expand=self.expand, **kwargs)
+
+
+class CycleList(OwnedListView):
+    model = MenstrualCycle
+    serializer_class = MenstrualCycleSerializer
+    ordering = ('-period_start_date', '-id')
+
+
+class PregnancyProfileList(OwnedListView):
+    model = PregnancyProfile
+    serializer_class = PregnancyProfileSerializer
+    prefetch = {'nutritional_plans': 'nutritionalplan_set'}
+
+
+class MEWSList(OwnedListView):
+    model = MEWS_Assessment
+    serializer_class = MEWSAssessmentSerializer
+    ordering = ('-assessment_date', '-id')
+
+
+class BabyList(OwnedListView):
+    model = BabyProfile
+    serializer_class = BabyProfileSerializer
+    owner = 'postpartum_profile__user'
+    prefetch = {'growth_records': 'growthrecord_set', 'vaccinations': 'vaccinationrecord_set'}
+
+
+class GrowthRecordList(OwnedListView):
+    model = GrowthRecord
+    serializer_class = GrowthRecordSerializer
+    owner = 'baby__postpartum_profile__user'
+    ordering = ('-record_date', '-id')
+    select = {'baby': 'baby'}
+
+
+class VaccinationList(OwnedListView):
+    model = VaccinationRecord
+    serializer_class = VaccinationRecordSerializer
+    owner = 'baby__postpartum_profile__user'
+    ordering = ('due_date', 'id')
+    select = {'baby': 'baby'}
+
+
+class ReminderList(OwnedListView):
+    model = AIMedicationReminder
+    serializer_class = MedicationReminderSerializer
+    ordering = ('reminder_time', 'id')
@@ -1,5 +1,27 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class WomenConfig(AppConfig):
     name = 'women'
+
+    def ready(self):
+        from .mental_health import checkin_saved
+        from .models import BabyProfile, HealthcareProvider, Magazines, MentalHealthCheck, Notes
+        from .previews import upload_saved as preview_upload
+        from .providers import provider_deleted, provider_saved
+        from .search import upload_deleted, upload_saved
+        from .sqlite import configure_connection
+        from .vaccinations import baby_created
+        connection_created.connect(configure_connection, dispatch_uid='women.sqlite.configure_connection')
+        post_save.connect(provider_saved, sender=HealthcareProvider, dispatch_uid='women.providers.saved')
+        post_delete.connect(provider_deleted, sender=HealthcareProvider, dispatch_uid='women.providers.deleted')
+        post_save.connect(baby_created, sender=BabyProfile, dispatch_uid='women.vaccinations.baby_created')
+        post_save.connect(checkin_saved, sender=MentalHealthCheck, dispatch_uid='women.mental_health.checkin_saved')
+        post_save.connect(upload_saved, sender=Notes, dispatch_uid='women.search.notes_saved')
+        post_delete.connect(upload_deleted, sender=Notes, dispatch_uid='women.search.notes_deleted')
+        post_save.connect(upload_saved, sender=Magazines, dispatch_uid='women.search.magazines_saved')
+        post_delete.connect(upload_deleted, sender=Magazines, dispatch_uid='women.search.magazines_deleted')
+        post_save.connect(preview_upload, sender=Notes, dispatch_uid='women.previews.notes_saved')
+        post_save.connect(preview_upload, sender=Magazines, dispatch_uid='women.previews.magazines_saved')
@@ -0,0 +1,137 @@
+"""AI assistant conversation store.
+
+``append_message()`` saves a message and bumps the conversation's
+``message_count`` with an F() expression in the same write transaction, so
+concurrent appends never lose a count. The assistant works from
+``context_window()``: the conversation's rolling summary plus the messages
+not yet folded into it. That is at most ``CONTEXT_MESSAGES +
+SUMMARY_STEP`` messages, read newest first over ``ai_message_recent_idx``
+(conversation, timestamp), however long the conversation gets.
+
+Once ``CONTEXT_MESSAGES + SUMMARY_STEP`` messages are unsummarized,
+the oldest ``SUMMARY_STEP`` of them are folded into ``summary`` by the class
+named in ``settings.AI_SUMMARIZER``. It has a ``summarize(summary,
+messages)`` method returning the new summary. ``ExtractiveSummarizer`` keeps
+the first sentence of each message, up to ``SUMMARY_CHARS``.
+
+``message_page()`` pages back through the full history with keyset
+pagination for display.
+
+``reply()`` answers a question from the context window. A conversation's
+first question goes through the answer cache (women/answer_cache.py), so a
+repeated opening question skips generation. Later questions are answered
+from their history and never cached, since the cache is shared by all
+users. No view calls ``reply()`` yet: the repo has no answer generator, so
+it is for callers that bring one.
+"""
+import re
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .answer_cache import get_cache, user_week
+from .models import AIConversation, AIMessage
+from .pagination import keyset_page, split_page
+from .sqlite import serialized_write
+
+CONTEXT_MESSAGES = 20
+SUMMARY_STEP = 10
+SUMMARY_CHARS = 2000
+PAGE_SIZE = 50
+NEWEST_FIRST = ('-timestamp', '-id')
+
+Context = namedtuple('Context', ['summary', 'messages'])
+
+
+class ExtractiveSummarizer:
+    """Keeps the first sentence of each message, newest lines last."""
+    line_chars = 160
+
+    def summarize(self, summary, messages):
+        lines = summary.splitlines()
+        for message in messages:
+            sentence = re.split(r'(?<=[.!?])\s', message.message_text.strip(), maxsplit=1)[0]
+            if len(sentence) > self.line_chars:
+                sentence = sentence[:self.line_chars - 3].rstrip() + '...'
+            lines.append('%s: %s' % ('User' if message.is_from_user else 'Assistant', sentence))
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > SUMMARY_CHARS:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+
+def get_summarizer():
+    return import_string(getattr(settings, 'AI_SUMMARIZER', 'women.assistant.ExtractiveSummarizer'))()
+
+
+def start_conversation(user):
+    return AIConversation.objects.create(user=user, conversation_id=uuid.uuid4().hex)
+
+
+def _newest(conversation_id, count):
+    """The conversation's newest ``count`` messages, oldest first."""
+    if count <= 0:
+        return []
+    return list(AIMessage.objects.filter(conversation_id=conversation_id).order_by(*NEWEST_FIRST)[:count])[::-1]
+
+
+def _roll_summary(conversation_id):
+    conversation = AIConversation.objects.only('message_count', 'summarized_count', 'summary').get(
+        pk=conversation_id)
+    unsummarized = conversation.message_count - conversation.summarized_count
+    if unsummarized < CONTEXT_MESSAGES + SUMMARY_STEP:
+        return
+    folded = _newest(conversation_id, unsummarized)[:unsummarized - CONTEXT_MESSAGES]
+    AIConversation.objects.filter(pk=conversation_id).update(
+        summary=get_summarizer().summarize(conversation.summary, folded),
+        summarized_count=F('summarized_count') + len(folded))
+
+
+def append_message(conversation, text, is_from_user=True):
+    """Save a message, count it and roll the summary forward if due."""
+    with serialized_write():
+        message = AIMessage.objects.create(conversation_id=conversation.pk, message_text=text,
+                                           is_from_user=is_from_user)
+        AIConversation.objects.filter(pk=conversation.pk).update(
+            message_count=F('message_count') + 1, last_activity=timezone.now())
+        _roll_summary(conversation.pk)
+    return message
+
+
+def recent_messages(conversation, limit=CONTEXT_MESSAGES):
+    """The last ``limit`` messages, oldest first."""
+    return _newest(conversation.pk, limit)
+
+
+def context_window(conversation):
+    """``Context(summary, messages)``: everything a reply needs to see."""
+    current = AIConversation.objects.only('message_count', 'summarized_count', 'summary').get(pk=conversation.pk)
+    return Context(current.summary, _newest(conversation.pk, current.message_count - current.summarized_count))
+
+
+def message_page(conversation, cursor=None, size=PAGE_SIZE):
+    """``(messages, next_cursor)``: a page of history, newest first."""
+    rows = keyset_page(AIMessage.objects.filter(conversation_id=conversation.pk), NEWEST_FIRST, cursor, size)
+    return split_page(rows, NEWEST_FIRST, size)
+
+
+def reply(conversation, question, generate):
+    """Append ``question`` and its answer; returns the answer's message.
+
+    ``generate(context)`` gets the ``context_window()``. The answer cache
+    is shared by all users, so it is used only for a conversation's first
+    question, whose context holds nothing but the question.
+    """
+    append_message(conversation, question)
+    context = context_window(conversation)
+    if context.summary or len(context.messages) > 1:
+        return append_message(conversation, generate(context), is_from_user=False)
+    cache, week = get_cache(), user_week(conversation.user_id)
+    answer = cache.get(question, week)
+    if answer is None:
+        answer = generate(context)
+        cache.put(question, answer, week)
+    return append_message(conversation, answer, is_from_user=False)
@@ -0,0 +1,161 @@
+"""Telehealth appointment booking.
+
+Provider calendars are a grid of ``SLOT_MINUTES`` slots inside
+``WORKDAY_START``-``WORKDAY_END``. A booking takes one ``AppointmentSlot`` row
+per covered slot, and the unique constraint on (provider, slot_date,
+slot_time) arbitrates races. Booking is a blind insert with no
+read-then-write, no ``select_for_update`` and no table lock: of any number of
+concurrent attempts on a slot exactly one insert succeeds, and the rest get
+``SlotUnavailable``.
+
+``ProviderSchedule`` loads a provider's taken slots for a date range in one
+query and answers free-slot and free-interval questions with bisection
+(``for_providers()`` loads a whole page of providers in one query). The
+telehealth page offers each provider's ``next_free()`` slot and checks a
+requested time with ``is_free()`` before booking. The constraint still
+settles races between the check and the insert.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import AppointmentSlot, TelehealthAppointment
+from .sqlite import serialized_write
+
+SLOT_MINUTES = 30
+WORKDAY_START = time(9, 0)
+WORKDAY_END = time(17, 0)
+
+
+class SlotUnavailable(Exception):
+    """The requested slot is already booked."""
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+DAY_SLOTS = list(range(_minutes(WORKDAY_START), _minutes(WORKDAY_END), SLOT_MINUTES))
+
+
+def slot_times(appointment_time, duration_minutes):
+    """Start times of the slots an appointment covers; ``ValueError`` if off-grid."""
+    start = _minutes(appointment_time)
+    if appointment_time.second or appointment_time.microsecond or start not in DAY_SLOTS:
+        raise ValueError('Appointments start on a %d-minute slot between %s and %s'
+                         % (SLOT_MINUTES, WORKDAY_START, WORKDAY_END))
+    if duration_minutes <= 0 or duration_minutes % SLOT_MINUTES:
+        raise ValueError('Duration must be a multiple of %d minutes' % SLOT_MINUTES)
+    end = start + duration_minutes
+    if end > _minutes(WORKDAY_END):
+        raise ValueError('Appointment runs past the end of the working day')
+    return [_time(m) for m in range(start, end, SLOT_MINUTES)]
+
+
+class ProviderSchedule:
+    """Free slots of one provider for ``days`` days from ``start_date``."""
+
+    def __init__(self, provider, start_date=None, days=7, taken=None):
+        self.provider = provider
+        self.start_date = start_date or date.today()
+        self.days = days
+        if taken is None:
+            taken = {}
+            for slot_date, slot_time in _taken_slots([provider], self.start_date, days).values_list(
+                    'slot_date', 'slot_time'):
+                taken.setdefault(slot_date, set()).add(_minutes(slot_time))
+        # date -> sorted free slot starts, in minutes since midnight
+        self._free = {
+            day: [m for m in DAY_SLOTS if m not in taken.get(day, ())]
+            for day in (self.start_date + timedelta(days=i) for i in range(days))
+        }
+
+    @classmethod
+    def for_providers(cls, providers, start_date=None, days=7):
+        """``{provider_id: ProviderSchedule}`` for ``providers``, from one query."""
+        start_date = start_date or date.today()
+        taken = {}
+        for provider_id, slot_date, slot_time in _taken_slots(providers, start_date, days).values_list(
+                'provider_id', 'slot_date', 'slot_time'):
+            taken.setdefault(provider_id, {}).setdefault(slot_date, set()).add(_minutes(slot_time))
+        return {p.pk: cls(p, start_date, days, taken.get(p.pk, {})) for p in providers}
+
+    def next_free(self, after):
+        """The first free slot starting at or after the naive datetime ``after``, or None."""
+        for offset in range(self.days):
+            day = self.start_date + timedelta(days=offset)
+            if day < after.date():
+                continue
+            earliest = 0
+            if day == after.date():
+                # A slot that has already started is not offered.
+                earliest = _minutes(after.time()) + bool(after.second or after.microsecond)
+            free = self._free[day]
+            i = bisect_left(free, earliest)
+            if i < len(free):
+                return datetime.combine(day, _time(free[i]))
+        return None
+
+    def free_slots(self, day):
+        return [_time(m) for m in self._free.get(day, [])]
+
+    def free_intervals(self, day):
+        """Contiguous free stretches of ``day`` as ``(start, end)`` times."""
+        intervals = []
+        for m in self._free.get(day, []):
+            if intervals and intervals[-1][1] == m:
+                intervals[-1][1] = m + SLOT_MINUTES
+            else:
+                intervals.append([m, m + SLOT_MINUTES])
+        return [(_time(start), _time(end)) for start, end in intervals]
+
+    def is_free(self, day, appointment_time, duration_minutes=SLOT_MINUTES):
+        free = self._free.get(day, [])
+        for t in slot_times(appointment_time, duration_minutes):
+            i = bisect_left(free, _minutes(t))
+            if i == len(free) or free[i] != _minutes(t):
+                return False
+        return True
+
+
+def _taken_slots(providers, start_date, days):
+    return AppointmentSlot.objects.filter(
+        provider__in=providers,
+        slot_date__gte=start_date,
+        slot_date__lt=start_date + timedelta(days=days),
+    )
+
+
+def book_appointment(patient, provider, appointment_date, appointment_time,
+                     consultation_type='video', duration_minutes=SLOT_MINUTES, notes=''):
+    """Book the slot(s) or raise ``SlotUnavailable``; ``ValueError`` if invalid."""
+    times = slot_times(appointment_time, duration_minutes)
+    if datetime.combine(appointment_date, appointment_time) < timezone.localtime().replace(tzinfo=None):
+        raise ValueError('Appointments must be in the future')
+    try:
+        with serialized_write():
+            appointment = TelehealthAppointment.objects.create(
+                patient=patient, provider=provider, appointment_date=appointment_date,
+                appointment_time=appointment_time, consultation_type=consultation_type,
+                duration_minutes=duration_minutes, notes=notes)
+            AppointmentSlot.objects.bulk_create(
+                AppointmentSlot(provider=provider, appointment=appointment,
+                                slot_date=appointment_date, slot_time=t)
+                for t in times)
+    except IntegrityError:
+        raise SlotUnavailable('%s at %s is already booked' % (appointment_date, appointment_time))
+    return appointment
+
+
+def cancel_appointment(appointment):
+    """Cancel and release the appointment's slots."""
+    with serialized_write():
+        appointment.slots.all().delete()
+        TelehealthAppointment.objects.filter(pk=appointment.pk).update(status='cancelled')
+    appointment.status = 'cancelled'
@@ -0,0 +1,93 @@
+"""Helpers for running independent ORM queries concurrently.
+
+Page views such as ``emergency_services`` and ``ai_assistant`` load several
+querysets that don't depend on each other. Evaluating them one after another
+makes the page pay the sum of their latencies; the helpers here evaluate each
+one on its own executor thread (and therefore its own database connection) so
+the page only pays for the slowest.
+
+The executor threads keep their connections from one query to the next, so
+a batch does not pay for connecting. They never see ``request_finished``,
+so each thread closes its own connection once it is broken or older than
+``settings.QUERY_BATCH_CONN_MAX_AGE`` seconds, whatever ``CONN_MAX_AGE`` is.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Threads shared by every batch_querysets() call in the process.
+MAX_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='query-batch')
+
+
+def _evaluate(queryset):
+    connection = connections[queryset.db]
+    opened = connection.connection is None
+    try:
+        return list(queryset)
+    finally:
+        if opened and connection.connection is not None:
+            connection.close_at = time.monotonic() + getattr(settings, 'QUERY_BATCH_CONN_MAX_AGE', 60)
+        connection.close_if_unusable_or_obsolete()
+
+
+async def gather_querysets(using=DEFAULT_DB_ALIAS, **querysets):
+    """Evaluate the keyword querysets concurrently; return a dict of lists.
+
+    The ORM is synchronous, so each queryset runs through ``sync_to_async``
+    with ``thread_sensitive=False``: the thread-sensitive executor is a single
+    thread and would run them back to back again. Inside the caller's atomic
+    block they are evaluated in order on its connection, as in
+    ``batch_querysets()``.
+    """
+    if len(querysets) < 2 or await sync_to_async(_in_atomic_block)(using):
+        return await sync_to_async(_in_order)(querysets)
+    names = list(querysets)
+    results = await asyncio.gather(*(
+        sync_to_async(_evaluate, thread_sensitive=False)(querysets[name])
+        for name in names
+    ))
+    return dict(zip(names, results))
+
+
+def _in_atomic_block(using):
+    return connections[using].in_atomic_block
+
+
+def _in_order(querysets):
+    return {name: list(queryset) for name, queryset in querysets.items()}
+
+
+def batch_querysets(using=DEFAULT_DB_ALIAS, **querysets):
+    """Evaluate the keyword querysets concurrently; return a dict of lists.
+
+    Synchronous counterpart of ``gather_querysets()`` for WSGI views: each
+    queryset runs on a pool thread with its own connection. Inside an atomic
+    block the querysets are evaluated in order on the current connection,
+    since other connections can't see its uncommitted rows.
+    """
+    if len(querysets) < 2 or _in_atomic_block(using):
+        return _in_order(querysets)
+    futures = {name: _executor.submit(_evaluate, queryset) for name, queryset in querysets.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def async_login_required(view):
+    """``login_required`` for ``async def`` views.
+
+    Resolving ``request.user`` hits the session and auth tables, so it is done
+    on the thread-sensitive executor.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,108 @@
+"""Text extraction from uploaded reports and magazines.
+
+``extract_text()`` returns the text of a PDF or plain-text upload. PDFs go
+through ``pypdf`` when it is installed. Otherwise a small built-in reader
+inflates the content streams and collects the strings shown by the ``Tj``
+and ``TJ`` operators. That covers PDFs written with standard fonts, but not
+text in embedded CID fonts, which comes back empty. Other file types have
+no text.
+"""
+import re
+import zlib
+
+try:
+    import pypdf
+except ImportError:  # optional: fall back to the built-in stream reader
+    pypdf = None
+
+MAX_TEXT = 200000
+TEXT_TYPES = ('.txt', '.md', '.csv')
+
+_STREAM_RE = re.compile(rb'<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream', re.S)
+_TEXT_RE = re.compile(rb'\[(.*?)\]\s*TJ|(\((?:\\.|[^\\)])*\))\s*(?:Tj|\'|")|(T\*|Td|TD|Tm|ET)', re.S)
+_ARRAY_RE = re.compile(rb'(\((?:\\.|[^\\)])*\))|(-?\d*\.?\d+)')
+# A TJ adjustment past this many thousandths of an em is a word gap.
+WORD_GAP = 200
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f', b'(': b'(', b')': b')', b'\\': b'\\'}
+_ESCAPE_RE = re.compile(rb'\\([0-7]{1,3}|.)', re.S)
+
+
+def _unescape(literal):
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        return _ESCAPES.get(code, b'' if code in b'\r\n' else code)
+    return _ESCAPE_RE.sub(replace, literal[1:-1]).decode('latin-1')
+
+
+def _page_streams(data):
+    for match in _STREAM_RE.finditer(data):
+        header, body = match.groups()
+        if b'/FlateDecode' in header:
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                continue
+        elif b'/Filter' in header:
+            continue
+        if b'Tj' in body or b'TJ' in body:
+            yield body
+
+
+def pdf_text(data, limit=MAX_TEXT):
+    """Text shown on the pages of the PDF in ``data``, as best as can be read."""
+    if pypdf is not None:
+        import io
+        parts, size = [], 0
+        for page in pypdf.PdfReader(io.BytesIO(data)).pages:
+            parts.append(page.extract_text() or '')
+            size += len(parts[-1])
+            if size >= limit:
+                break
+        return ' '.join(parts)[:limit]
+    parts, size = [], 0
+    for stream in _page_streams(data):
+        for array, literal, breaks in _TEXT_RE.findall(stream):
+            if breaks:
+                parts.append(' ')
+                continue
+            if literal:
+                parts.append(_unescape(literal))
+                size += len(parts[-1])
+                continue
+            for string, adjustment in _ARRAY_RE.findall(array):
+                if string:
+                    parts.append(_unescape(string))
+                    size += len(parts[-1])
+                elif float(adjustment) < -WORD_GAP:
+                    parts.append(' ')
+        if size >= limit:
+            break
+    return ' '.join(''.join(parts).split())[:limit]
+
+
+def extract_text(field, limit=MAX_TEXT):
+    """Text of an uploaded ``FileField`` value; '' when none can be read."""
+    if not field:
+        return ''
+    try:
+        with field.open('rb') as upload:
+            data = upload.read()
+    except (OSError, ValueError):
+        return ''
+    return data_text(field.name, data, limit)
+
+
+def data_text(name, data, limit=MAX_TEXT):
+    """Text of a file called ``name`` whose content is ``data``."""
+    name = name.lower()
+    if name.endswith('.pdf') or data[:5] == b'%PDF-':
+        try:
+            return pdf_text(data, limit)
+        except Exception:
+            # A damaged or encrypted upload just has no searchable text.
+            return ''
+    if name.endswith(TEXT_TYPES):
+        return data[:limit * 4].decode('utf-8', 'replace')[:limit]
+    return ''
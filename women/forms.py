@@ -0,0 +1,34 @@
+from django import forms
+
+from .providers import SORTS
+
+
+class ProviderSearchForm(forms.Form):
+    q = forms.CharField(required=False, max_length=100)
+    specialization = forms.CharField(required=False, max_length=100)
+    min_fee = forms.DecimalField(required=False, min_value=0, max_digits=8, decimal_places=2)
+    max_fee = forms.DecimalField(required=False, min_value=0, max_digits=8, decimal_places=2)
+    min_rating = forms.DecimalField(required=False, min_value=0, max_value=5, max_digits=3, decimal_places=2)
+    available = forms.NullBooleanField(required=False)
+    sort = forms.ChoiceField(required=False, choices=[(s, s) for s in SORTS])
+    cursor = forms.CharField(required=False, max_length=200)
+
+    def search_params(self):
+        """Keyword arguments for providers.search_providers(); empty if invalid."""
+        if not self.is_valid():
+            return {}
+        data = dict(self.cleaned_data)
+        data['sort'] = data['sort'] or 'rating'
+        return data
+
+
+class UploadListForm(forms.Form):
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    cursor = forms.CharField(required=False, max_length=200)
+
+    def list_params(self):
+        """Keyword arguments for moderation.upload_list(); empty if invalid."""
+        if not self.is_valid():
+            return {}
+        return dict(self.cleaned_data)
@@ -0,0 +1,154 @@
+"""Growth z-scores and percentiles against the WHO Child Growth Standards.
+
+The WHO LMS tables (``growth_standards.py``) are loaded once into one
+``(sex, month, LMS)`` float array per measure. Scoring a batch of
+measurements is a single vectorised pass: interpolate L, M and S at each
+exact age, then apply the LMS formula. Weight uses the WHO's restricted
+formula beyond +/-3 SD. Scores are NaN where they are undefined: unknown sex,
+age outside 0-24 months, or a missing measurement.
+
+``faltering()`` scores every ``GrowthRecord`` in the database, streamed in
+chunks of ``CHUNK_SIZE`` baby ids, and flags babies whose latest
+weight-for-age is below ``UNDERWEIGHT_Z`` or has dropped by at least
+``FALTERING_DROP`` from their highest earlier score.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.db.models import Max, Min
+
+from .growth_standards import LMS
+from .models import GrowthRecord
+
+MEASURES = ('weight', 'length', 'head_circumference')
+SEXES = ('M', 'F')
+DAYS_PER_MONTH = 30.4375
+MAX_MONTHS = 24
+
+# Two centile spaces on the UK-WHO chart (e.g. 50th -> 9th) is about 1.33 SD.
+FALTERING_DROP = 1.33
+UNDERWEIGHT_Z = -2.0
+CHUNK_SIZE = 5000
+
+_TABLES = {
+    measure: np.array([LMS[measure][sex] for sex in SEXES], dtype=np.float64)
+    for measure in MEASURES
+}
+
+Faltering = namedtuple('Faltering', ['baby_id', 'record_date', 'weight_z', 'peak_z', 'reason'])
+
+
+def sex_index(sex):
+    """Row of the LMS tables for a ``BabyProfile.sex`` value, -1 if unknown."""
+    return SEXES.index(sex) if sex in SEXES else -1
+
+
+def zscores(measure, sexes, age_days, values):
+    """Z-scores of ``values`` (arrays of equal length) for ``measure``.
+
+    ``sexes`` holds ``sex_index()`` values and ``age_days`` ages in days.
+    """
+    table = _TABLES[measure]
+    sexes = np.asarray(sexes, dtype=np.intp)
+    age = np.asarray(age_days, dtype=np.float64) / DAYS_PER_MONTH
+    x = np.asarray(values, dtype=np.float64)
+    valid = (sexes >= 0) & (age >= 0) & (age <= MAX_MONTHS) & (x > 0)
+
+    age = np.where(valid, age, 0.0)
+    month = np.minimum(age.astype(np.intp), MAX_MONTHS - 1)
+    row = np.where(valid, sexes, 0)
+    low, high = table[row, month], table[row, month + 1]
+    lms = low + (high - low) * (age - month)[:, None]
+    L, M, S = lms[:, 0], lms[:, 1], lms[:, 2]
+    # L crosses zero between months for some weight tables; the Box-Cox
+    # limit there is log(x/M)/S, which a tiny L approximates closely.
+    L = np.where(np.abs(L) < 1e-6, 1e-6, L)
+    x = np.where(valid, x, M)
+
+    z = ((x / M) ** L - 1) / (L * S)
+    if measure == 'weight':
+        z = _restrict(z, x, L, M, S)
+    z[~valid] = np.nan
+    return z
+
+
+def _restrict(z, x, L, M, S):
+    """WHO adjustment for weight z-scores beyond +/-3."""
+    def sd(k):
+        return M * (1 + L * S * k) ** (1 / L)
+    sd3, sd2 = sd(3), sd(2)
+    z = np.where(z > 3, 3 + (x - sd3) / (sd3 - sd2), z)
+    sd3n, sd2n = sd(-3), sd(-2)
+    return np.where(z < -3, -3 + (x - sd3n) / (sd2n - sd3n), z)
+
+
+def percentiles(z):
+    """Percentiles (0-100) of standard normal ``z`` scores."""
+    z = np.asarray(z, dtype=np.float64)
+    # Abramowitz & Stegun 7.1.26, |error| < 1.5e-7; numpy has no erf.
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = ((((1.061405429 * t - 1.453152027) * t + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t
+    erf = np.sign(z) * (1 - poly * np.exp(-x * x))
+    return 50 * (1 + erf)
+
+
+def score_records(records):
+    """Set ``<measure>_z`` and ``<measure>_percentile`` on ``GrowthRecord``s.
+
+    The records' ``baby`` should be loaded (``select_related('baby')``).
+    Undefined scores are set to None. Returns ``records``.
+    """
+    records = list(records)
+    if not records:
+        return records
+    sexes = [sex_index(r.baby.sex) for r in records]
+    ages = [(r.record_date - r.baby.birth_date).days for r in records]
+    for measure in MEASURES:
+        z = zscores(measure, sexes, ages, [getattr(r, measure) or np.nan for r in records])
+        pct = percentiles(z)
+        for record, record_z, record_pct in zip(records, z, pct):
+            defined = not np.isnan(record_z)
+            setattr(record, '%s_z' % measure, round(float(record_z), 2) if defined else None)
+            setattr(record, '%s_percentile' % measure, round(float(record_pct), 1) if defined else None)
+    return records
+
+
+def faltering(drop=FALTERING_DROP, floor=UNDERWEIGHT_Z, chunk_size=CHUNK_SIZE):
+    """``Faltering`` tuples for every baby whose latest weight is of concern."""
+    bounds = GrowthRecord.objects.aggregate(lo=Min('baby_id'), hi=Max('baby_id'))
+    if bounds['lo'] is None:
+        return []
+    flagged = []
+    for lo in range(bounds['lo'], bounds['hi'] + 1, chunk_size):
+        rows = GrowthRecord.objects.filter(baby_id__gte=lo, baby_id__lt=lo + chunk_size).order_by(
+            'baby_id', 'record_date', 'id').values_list('baby_id', 'baby__sex', 'baby__birth_date', 'record_date',
+                                                        'weight')
+        flagged += _flag(list(rows.iterator()), drop, floor)
+    return flagged
+
+
+def _flag(rows, drop, floor):
+    """``Faltering`` tuples from one chunk of growth rows, grouped by baby."""
+    if not rows:
+        return []
+    babies, sexes, births, dates, weights = zip(*rows)
+    babies = np.array(babies)
+    dates = np.array(dates, dtype='datetime64[D]')
+    ages = (dates - np.array(births, dtype='datetime64[D]')).astype(np.int64)
+    codes = {sex: sex_index(sex) for sex in set(sexes)}
+    z = zscores('weight', [codes[sex] for sex in sexes], ages, np.array(weights, dtype=np.float64))
+
+    # Records are grouped by baby: reduce each group to its latest score and
+    # its highest score, ignoring undefined scores.
+    starts = np.flatnonzero(np.r_[True, babies[1:] != babies[:-1]])
+    ends = np.r_[starts[1:], len(babies)] - 1
+    latest = z[ends]
+    peak = np.fmax.reduceat(np.where(np.isnan(z), -np.inf, z), starts)
+
+    flagged = []
+    for i in np.flatnonzero(~np.isnan(latest) & ((latest < floor) | (peak - latest >= drop))):
+        reason = 'underweight' if latest[i] < floor else 'weight dropped %.1f SD' % (peak[i] - latest[i])
+        flagged.append(Faltering(int(babies[ends[i]]), dates[ends[i]].item(), round(float(latest[i]), 2),
+                                 round(float(peak[i]), 2), reason))
+    return flagged
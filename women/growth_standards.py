@@ -0,0 +1,178 @@
+"""WHO Child Growth Standards (2006): LMS parameters from birth to 24 months.
+
+One ``(L, M, S)`` row per completed month of age, for boys (``'M'``) and
+girls (``'F'``): weight-for-age (kg), length-for-age (cm) and head
+circumference-for-age (cm). Source: WHO Multicentre Growth Reference Study,
+https://www.who.int/tools/child-growth-standards/standards
+"""
+
+LMS = {
+    'weight': {
+        'M': (
+            (0.3487, 3.3464, 0.14602),
+            (0.2297, 4.4709, 0.13395),
+            (0.1970, 5.5675, 0.12385),
+            (0.1738, 6.3762, 0.11727),
+            (0.1553, 7.0023, 0.11316),
+            (0.1395, 7.5105, 0.11080),
+            (0.1257, 7.9340, 0.10958),
+            (0.1134, 8.2970, 0.10902),
+            (0.1021, 8.6151, 0.10882),
+            (0.0917, 8.9014, 0.10881),
+            (0.0820, 9.1649, 0.10891),
+            (0.0730, 9.4122, 0.10906),
+            (0.0644, 9.6479, 0.10925),
+            (0.0563, 9.8749, 0.10949),
+            (0.0487, 10.0953, 0.10976),
+            (0.0413, 10.3108, 0.11007),
+            (0.0343, 10.5228, 0.11041),
+            (0.0275, 10.7319, 0.11079),
+            (0.0211, 10.9385, 0.11119),
+            (0.0148, 11.1430, 0.11164),
+            (0.0087, 11.3462, 0.11211),
+            (0.0029, 11.5486, 0.11261),
+            (-0.0028, 11.7504, 0.11314),
+            (-0.0083, 11.9514, 0.11369),
+            (-0.0137, 12.1515, 0.11426),
+        ),
+        'F': (
+            (0.3809, 3.2322, 0.14171),
+            (0.1714, 4.1873, 0.13724),
+            (0.0962, 5.1282, 0.13000),
+            (0.0402, 5.8458, 0.12619),
+            (-0.0050, 6.4237, 0.12402),
+            (-0.0430, 6.8985, 0.12274),
+            (-0.0756, 7.2970, 0.12204),
+            (-0.1039, 7.6422, 0.12178),
+            (-0.1288, 7.9487, 0.12181),
+            (-0.1507, 8.2254, 0.12199),
+            (-0.1700, 8.4800, 0.12223),
+            (-0.1872, 8.7192, 0.12247),
+            (-0.2024, 8.9481, 0.12268),
+            (-0.2158, 9.1699, 0.12283),
+            (-0.2278, 9.3870, 0.12294),
+            (-0.2384, 9.6008, 0.12299),
+            (-0.2478, 9.8124, 0.12303),
+            (-0.2562, 10.0226, 0.12306),
+            (-0.2637, 10.2315, 0.12309),
+            (-0.2703, 10.4393, 0.12315),
+            (-0.2762, 10.6464, 0.12323),
+            (-0.2815, 10.8534, 0.12335),
+            (-0.2862, 11.0608, 0.12350),
+            (-0.2903, 11.2688, 0.12369),
+            (-0.2941, 11.4775, 0.12390),
+        ),
+    },
+    'length': {
+        'M': (
+            (1, 49.8842, 0.03795),
+            (1, 54.7244, 0.03557),
+            (1, 58.4249, 0.03424),
+            (1, 61.4292, 0.03328),
+            (1, 63.8860, 0.03257),
+            (1, 65.9026, 0.03204),
+            (1, 67.6236, 0.03165),
+            (1, 69.1645, 0.03139),
+            (1, 70.5994, 0.03124),
+            (1, 71.9687, 0.03117),
+            (1, 73.2812, 0.03118),
+            (1, 74.5388, 0.03125),
+            (1, 75.7488, 0.03137),
+            (1, 76.9186, 0.03154),
+            (1, 78.0497, 0.03174),
+            (1, 79.1458, 0.03197),
+            (1, 80.2113, 0.03222),
+            (1, 81.2487, 0.03250),
+            (1, 82.2587, 0.03279),
+            (1, 83.2418, 0.03310),
+            (1, 84.1996, 0.03342),
+            (1, 85.1348, 0.03376),
+            (1, 86.0477, 0.03410),
+            (1, 86.9410, 0.03445),
+            (1, 87.8161, 0.03479),
+        ),
+        'F': (
+            (1, 49.1477, 0.03790),
+            (1, 53.6872, 0.03640),
+            (1, 57.0673, 0.03568),
+            (1, 59.8029, 0.03520),
+            (1, 62.0899, 0.03486),
+            (1, 64.0301, 0.03463),
+            (1, 65.7311, 0.03448),
+            (1, 67.2873, 0.03441),
+            (1, 68.7498, 0.03440),
+            (1, 70.1435, 0.03444),
+            (1, 71.4818, 0.03452),
+            (1, 72.7710, 0.03464),
+            (1, 74.0150, 0.03479),
+            (1, 75.2176, 0.03496),
+            (1, 76.3817, 0.03514),
+            (1, 77.5099, 0.03534),
+            (1, 78.6055, 0.03555),
+            (1, 79.6710, 0.03576),
+            (1, 80.7079, 0.03598),
+            (1, 81.7182, 0.03620),
+            (1, 82.7036, 0.03643),
+            (1, 83.6654, 0.03666),
+            (1, 84.6040, 0.03688),
+            (1, 85.5202, 0.03711),
+            (1, 86.4153, 0.03734),
+        ),
+    },
+    'head_circumference': {
+        'M': (
+            (1, 34.4618, 0.03686),
+            (1, 37.2759, 0.03133),
+            (1, 39.1285, 0.02997),
+            (1, 40.5135, 0.02918),
+            (1, 41.6317, 0.02868),
+            (1, 42.5576, 0.02837),
+            (1, 43.3306, 0.02817),
+            (1, 43.9803, 0.02804),
+            (1, 44.5300, 0.02796),
+            (1, 44.9998, 0.02792),
+            (1, 45.4051, 0.02790),
+            (1, 45.7573, 0.02789),
+            (1, 46.0661, 0.02789),
+            (1, 46.3395, 0.02789),
+            (1, 46.5844, 0.02791),
+            (1, 46.8060, 0.02792),
+            (1, 47.0088, 0.02795),
+            (1, 47.1962, 0.02797),
+            (1, 47.3711, 0.02800),
+            (1, 47.5357, 0.02803),
+            (1, 47.6919, 0.02806),
+            (1, 47.8408, 0.02810),
+            (1, 47.9833, 0.02813),
+            (1, 48.1201, 0.02817),
+            (1, 48.2515, 0.02821),
+        ),
+        'F': (
+            (1, 33.8787, 0.03496),
+            (1, 36.5463, 0.03210),
+            (1, 38.2521, 0.03168),
+            (1, 39.5328, 0.03140),
+            (1, 40.5817, 0.03119),
+            (1, 41.4590, 0.03102),
+            (1, 42.1995, 0.03087),
+            (1, 42.8290, 0.03075),
+            (1, 43.3671, 0.03063),
+            (1, 43.8300, 0.03053),
+            (1, 44.2319, 0.03044),
+            (1, 44.5844, 0.03035),
+            (1, 44.8965, 0.03027),
+            (1, 45.1752, 0.03019),
+            (1, 45.4265, 0.03012),
+            (1, 45.6551, 0.03006),
+            (1, 45.8650, 0.02999),
+            (1, 46.0598, 0.02993),
+            (1, 46.2424, 0.02987),
+            (1, 46.4152, 0.02982),
+            (1, 46.5801, 0.02977),
+            (1, 46.7384, 0.02972),
+            (1, 46.8913, 0.02967),
+            (1, 47.0391, 0.02962),
+            (1, 47.1822, 0.02957),
+        ),
+    },
+}
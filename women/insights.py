@@ -0,0 +1,300 @@
+"""Nightly health insight generation.
+
+``generate_insights()`` walks the user id space in chunks of ``chunk_size``
+ids. For each chunk it reads one grouped query per source into numpy arrays,
+one row per user:
+
+* menstrual cycles: last period start, and the average and spread of cycle
+  length;
+* the latest pregnancy profile and its current week;
+* the latest nutrition plan week for that pregnancy;
+* the last week of MEWS readings, scored with the same bands as
+  ``MEWS_Assessment.mews_score``;
+* the latest postpartum profile, and the last two weeks of mental-health
+  check-ins.
+
+Each of ``RULES`` is then a vectorised predicate over the chunk's arrays.
+
+Every insight has a ``dedupe_key``: a hash of (user, insight type, rule,
+period). The period is what makes an insight new. It is the ISO week for
+weekly rules, the month for monthly ones, or the pregnancy, cycle or
+postpartum profile for one-off advice. Keys already stored are skipped, and
+new insights are written with ``bulk_create(ignore_conflicts=True)`` on the
+unique key. Re-running the job, or running it twice at once, never
+duplicates an insight.
+
+With ``workers > 1`` chunks are evaluated in a process pool and the parent
+does the writes. SQLite has a single writer, and reading and rule evaluation
+are where the time goes.
+"""
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from string import Formatter
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Avg, Count, Max, Min
+from django.utils import timezone
+
+from .models import (AIHealthInsight, MEWS_Assessment, MentalHealthCheck, MenstrualCycle, NutritionalPlan,
+                     PostpartumProfile, PregnancyProfile)
+from .sqlite import serialized_write
+
+CHUNK_SIZE = 5000
+# Keys per existence check, under SQLite's 999 bound parameters.
+KEY_BATCH = 500
+MEWS_DAYS = 7
+CHECKIN_DAYS = 14
+
+Rule = namedtuple('Rule', ['name', 'insight_type', 'priority', 'period', 'title', 'content', 'when'])
+Insight = namedtuple('Insight', ['user_id', 'insight_type', 'rule', 'title', 'content', 'priority', 'dedupe_key'])
+
+
+def _pregnant(f):
+    return f['pregnancy_id'] > 0
+
+
+RULES = [
+    Rule('period_late', 'general', 'medium', 'cycle', 'Your period is late',
+         'Your period is {late} days later than your usual {cycle_length}-day cycle. Consider a pregnancy test, '
+         'and see your doctor if it does not start.',
+         lambda f: ~_pregnant(f) & (f['cycles'] > 0) & (f['late'] > 7)),
+    Rule('irregular_cycles', 'general', 'low', 'month', 'Your cycles vary a lot',
+         'Your recent cycles varied by {cycle_spread} days. Mention it at your next check-up.',
+         lambda f: (f['cycles'] >= 3) & (f['cycle_spread'] > 10)),
+    Rule('folic_acid', 'nutrition', 'medium', 'pregnancy', 'Take folic acid every day',
+         'In week {week}, 400 micrograms of folic acid a day helps prevent neural tube defects.',
+         lambda f: _pregnant(f) & (f['week'] <= 12)),
+    Rule('nutrition_plan', 'nutrition', 'low', 'pregnancy_week', 'Update your nutrition plan',
+         'You are in week {week}; your nutrition plan is for week {plan_week}. Generate this week\'s plan.',
+         lambda f: _pregnant(f) & (f['plan_week'] >= 0) & (f['plan_week'] < f['week'])),
+    Rule('glucose_screening', 'general', 'medium', 'pregnancy', 'Glucose screening is due',
+         'Between weeks 24 and 28 you should be offered a gestational diabetes test.',
+         lambda f: _pregnant(f) & (f['week'] >= 24) & (f['week'] <= 28)),
+    Rule('birth_plan', 'general', 'low', 'pregnancy', 'Time to plan for the birth',
+         'In week {week}, it is a good time to write a birth plan and pack your hospital bag.',
+         lambda f: _pregnant(f) & (f['week'] >= 32) & (f['week'] <= 36)),
+    Rule('mews_high', 'general', 'high', 'week', 'Your vital signs need attention',
+         'A reading this week scored {mews_score} on the early warning score. Contact your care team.',
+         lambda f: f['mews_score'] >= 5),
+    Rule('blood_pressure', 'general', 'high', 'week', 'High blood pressure reading',
+         'You recorded {systolic}/{diastolic} this week. Blood pressure of 140/90 or more needs a check '
+         'with your midwife or doctor today.',
+         lambda f: (_pregnant(f) | (f['postpartum_days'] >= 0)) & ((f['systolic'] >= 140) | (f['diastolic'] >= 90))),
+    Rule('short_sleep', 'sleep', 'medium', 'week', 'You are short on sleep',
+         'Your check-ins average {sleep} hours of sleep. Rest when the baby sleeps and accept help at night.',
+         lambda f: (f['checkins'] >= 3) & (f['sleep'] < 5)),
+    Rule('checkin_due', 'mental_health', 'low', 'week', 'How are you feeling?',
+         'You have not done a mental health check-in for two weeks. It takes a minute.',
+         lambda f: (f['postpartum_days'] >= 0) & (f['postpartum_days'] <= 84) & (f['checkins'] == 0)),
+    Rule('postpartum_exercise', 'exercise', 'low', 'postpartum', 'Returning to exercise',
+         'At six weeks after birth, and once your doctor agrees, you can build back up to gentle exercise '
+         'and pelvic floor work.',
+         lambda f: (f['postpartum_days'] >= 42) & (f['postpartum_days'] <= 56)),
+]
+
+_FIELDS = {rule.name: [name for _, name, _, _ in Formatter().parse(rule.content) if name] for rule in RULES}
+
+
+def dedupe_key(user_id, insight_type, rule, period):
+    raw = '%s:%s:%s:%s' % (user_id, insight_type, rule, period)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _band(values, bands):
+    """Points for ``values`` from ``(low, high, points)`` bands, most severe first."""
+    score = np.zeros(len(values), dtype=np.int64)
+    for low, high, points in reversed(bands):
+        score = np.where((values < low) | (values > high), points, score)
+    return score
+
+
+def mews_scores(systolic, heart_rate, respiratory_rate, temperature, oxygen, consciousness, urine):
+    """``MEWS_Assessment.mews_score`` for arrays of readings."""
+    score = _band(systolic, [(90, 220, 3), (100, 200, 2), (110, 180, 1)])
+    score += _band(heart_rate, [(40, 130, 3), (50, 110, 2), (60, 100, 1)])
+    score += _band(respiratory_rate, [(8, 30, 3), (10, 25, 2), (12, 20, 1)])
+    score += _band(temperature, [(35.0, 38.5, 2), (35.5, 38.0, 1)])
+    score += np.select([oxygen < 91, oxygen < 93, oxygen < 95], [3, 2, 1], 0)
+    score += np.select([consciousness < 3, consciousness == 3], [3, 1], 0)
+    score += np.select([urine < 0.5, urine < 1.0], [3, 2], 0)
+    return score
+
+
+class _Features(dict):
+    """Per-user feature arrays for one chunk, aligned with ``ids``."""
+
+    def __init__(self, ids):
+        super().__init__()
+        self.ids = ids
+
+    def column(self, name, fill, dtype=np.int64):
+        self[name] = np.full(len(self.ids), fill, dtype=dtype)
+        return self[name]
+
+    def positions(self, user_ids):
+        return np.searchsorted(self.ids, np.asarray(user_ids, dtype=np.int64))
+
+
+def load_features(lo, hi, as_of):
+    """Feature arrays for users with ids in ``[lo, hi)``."""
+    users = {'user_id__gte': lo, 'user_id__lt': hi}
+    cycles = list(MenstrualCycle.objects.filter(**users).values('user_id').annotate(
+        last=Max('period_start_date'), avg=Avg('cycle_length'), spread=Max('cycle_length') - Min('cycle_length'),
+        n=Count('id')).order_by().values_list('user_id', 'last', 'avg', 'spread', 'n'))
+    pregnancies = dict((user_id, (pk, lmp)) for pk, user_id, lmp in PregnancyProfile.objects.filter(
+        **users).order_by('user_id', 'id').values_list('id', 'user_id', 'last_menstrual_period'))
+    plans = dict(NutritionalPlan.objects.filter(
+        pregnancy_profile__user_id__gte=lo, pregnancy_profile__user_id__lt=hi).values(
+        'pregnancy_profile_id').annotate(week=Max('week')).order_by().values_list('pregnancy_profile_id', 'week'))
+    readings = np.array(MEWS_Assessment.objects.filter(
+        assessment_date__gte=as_of - timedelta(days=MEWS_DAYS), assessment_date__lt=as_of, **users).values_list(
+        'user_id', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'respiratory_rate', 'temperature',
+        'oxygen_saturation', 'consciousness_level', 'urine_output'), dtype=np.float64).reshape(-1, 9)
+    postpartum = dict((user_id, (pk, delivered)) for pk, user_id, delivered in PostpartumProfile.objects.filter(
+        **users).order_by('user_id', 'id').values_list('id', 'user_id', 'delivery_date'))
+    checkins = list(MentalHealthCheck.objects.filter(
+        postpartum_profile__user_id__gte=lo, postpartum_profile__user_id__lt=hi,
+        check_date__gte=as_of.date() - timedelta(days=CHECKIN_DAYS), check_date__lte=as_of.date()).values(
+        'postpartum_profile__user_id').annotate(
+        n=Count('id'), sleep=Avg('sleep_hours')).order_by().values_list('postpartum_profile__user_id', 'n', 'sleep'))
+
+    ids = np.unique(np.concatenate([
+        np.array([row[0] for row in cycles], dtype=np.int64), np.fromiter(pregnancies, np.int64),
+        readings[:, 0].astype(np.int64), np.fromiter(postpartum, np.int64),
+    ]))
+    f = _Features(ids)
+    today = as_of.date()
+
+    f.column('cycles', 0)
+    for name in ('late', 'cycle_length', 'cycle_spread', 'cycle_start'):
+        f.column(name, -1)
+    if cycles:
+        rows = list(zip(*cycles))
+        at = f.positions(rows[0])
+        f['cycles'][at] = rows[4]
+        f['cycle_length'][at] = np.rint(np.array(rows[2], dtype=np.float64))
+        f['cycle_spread'][at] = rows[3]
+        f['cycle_start'][at] = [start.toordinal() for start in rows[1]]
+        f['late'][at] = today.toordinal() - f['cycle_start'][at] - f['cycle_length'][at]
+
+    for name in ('pregnancy_id', 'week', 'plan_week'):
+        f.column(name, 0 if name == 'pregnancy_id' else -1)
+    if pregnancies:
+        at = f.positions(list(pregnancies))
+        pks, lmps = zip(*pregnancies.values())
+        f['pregnancy_id'][at] = pks
+        f['week'][at] = np.minimum((today.toordinal() - np.array([d.toordinal() for d in lmps])) // 7, 42)
+        f['plan_week'][at] = [plans.get(pk, -1) for pk in pks]
+        ended = f['week'] >= 42
+        f['pregnancy_id'][ended] = 0
+
+    for name in ('mews_score', 'systolic', 'diastolic'):
+        f.column(name, -1)
+    if len(readings):
+        at = f.positions(readings[:, 0])
+        np.maximum.at(f['mews_score'], at, mews_scores(*readings[:, [1, 3, 4, 5, 6, 7, 8]].T))
+        np.maximum.at(f['systolic'], at, readings[:, 1].astype(np.int64))
+        np.maximum.at(f['diastolic'], at, readings[:, 2].astype(np.int64))
+
+    f.column('postpartum_id', 0)
+    f.column('postpartum_days', -1)
+    if postpartum:
+        at = f.positions(list(postpartum))
+        pks, delivered = zip(*postpartum.values())
+        f['postpartum_id'][at] = pks
+        f['postpartum_days'][at] = today.toordinal() - np.array([d.toordinal() for d in delivered])
+
+    f.column('checkins', 0)
+    f.column('sleep', np.inf, np.float64)
+    if checkins:
+        rows = list(zip(*checkins))
+        # Check-ins belong to postpartum profiles, so their users are in ``ids``.
+        at = f.positions(rows[0])
+        f['checkins'][at] = rows[1]
+        f['sleep'][at] = np.round(np.array(rows[2], dtype=np.float64), 1)
+    return f
+
+
+def _period(rule, f, i, as_of):
+    if rule.period == 'week':
+        year, week, _ = as_of.isocalendar()
+        return '%d-W%02d' % (year, week)
+    if rule.period == 'month':
+        return as_of.strftime('%Y-%m')
+    if rule.period == 'pregnancy':
+        return 'p%d' % f['pregnancy_id'][i]
+    if rule.period == 'pregnancy_week':
+        return 'p%d-w%d' % (f['pregnancy_id'][i], f['week'][i])
+    if rule.period == 'cycle':
+        return 'c%d' % f['cycle_start'][i]
+    return 'pp%d' % f['postpartum_id'][i]
+
+
+def evaluate(lo, hi, as_of):
+    """The ``Insight`` tuples the rules raise for users with ids in ``[lo, hi)``."""
+    f = load_features(lo, hi, as_of)
+    insights = []
+    if not len(f.ids):
+        return insights
+    for rule in RULES:
+        for i in np.flatnonzero(rule.when(f)):
+            user_id = int(f.ids[i])
+            values = {name: f[name][i].item() for name in _FIELDS[rule.name]}
+            insights.append(Insight(user_id, rule.insight_type, rule.name, rule.title, rule.content.format(**values),
+                                    rule.priority,
+                                    dedupe_key(user_id, rule.insight_type, rule.name, _period(rule, f, i, as_of))))
+    return insights
+
+
+def store(insights):
+    """Insert the insights not stored yet; returns how many were new."""
+    new = []
+    for start in range(0, len(insights), KEY_BATCH):
+        batch = insights[start:start + KEY_BATCH]
+        existing = set(AIHealthInsight.objects.filter(
+            dedupe_key__in=[insight.dedupe_key for insight in batch]).values_list('dedupe_key', flat=True))
+        new.extend(insight for insight in batch if insight.dedupe_key not in existing)
+    with serialized_write():
+        AIHealthInsight.objects.bulk_create(
+            [AIHealthInsight(user_id=i.user_id, insight_type=i.insight_type, title=i.title, content=i.content,
+                             priority=i.priority, dedupe_key=i.dedupe_key) for i in new],
+            batch_size=KEY_BATCH, ignore_conflicts=True)
+    return len(new)
+
+
+def _evaluate_in_worker(args):
+    try:
+        return evaluate(*args)
+    finally:
+        connections.close_all()
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def generate_insights(as_of=None, chunk_size=CHUNK_SIZE, workers=1):
+    """Raise every due insight; returns ``(raised, created)``."""
+    as_of = as_of or timezone.now()
+    bounds = User.objects.aggregate(lo=Min('id'), hi=Max('id'))
+    if bounds['lo'] is None:
+        return 0, 0
+    chunks = [(lo, lo + chunk_size, as_of) for lo in range(bounds['lo'], bounds['hi'] + 1, chunk_size)]
+    raised = created = 0
+    if workers > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as pool:
+            for insights in pool.map(_evaluate_in_worker, chunks):
+                raised += len(insights)
+                created += store(insights)
+    else:
+        for chunk in chunks:
+            insights = evaluate(*chunk)
+            raised += len(insights)
+            created += store(insights)
+    return raised, created
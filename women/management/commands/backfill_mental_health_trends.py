@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from women.mental_health import backfill_trends
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every mental-health trend from the existing check-ins.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = backfill_trends(options['chunk_size'])
+        self.stdout.write('Rebuilt %d mental-health trends' % total)
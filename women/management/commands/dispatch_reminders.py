@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from women.reminders import BATCH_SIZE, dispatch_due, prune_dispatches
+
+CATCH_UP_MINUTES = 5
+
+
+class Command(BaseCommand):
+    help = 'Send the medication reminders due in the last minute (run from cron, or with --loop).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and dispatch at the start of every minute.')
+        # Reminders already sent are skipped, so a cron run every minute can
+        # look back further and still pick up a minute whose send failed.
+        parser.add_argument('--catch-up', type=int, default=CATCH_UP_MINUTES, metavar='MINUTES',
+                            help='On start, also send reminders due this many minutes back (default %d).'
+                                 % CATCH_UP_MINUTES)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--prune', type=int, metavar='DAYS',
+                            help='Delete dispatch records older than DAYS (daily when looping).')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - timedelta(minutes=options['catch_up'])
+        pruned_on = None
+        while True:
+            if options['prune'] is not None and pruned_on != timezone.localdate(now):
+                pruned = prune_dispatches(options['prune'])
+                pruned_on = timezone.localdate(now)
+                self.stdout.write('Pruned %d dispatch records' % pruned)
+
+            started = time.monotonic()
+            stats = dispatch_due(now=now, since=since, batch_size=options['batch_size'])
+            self.stdout.write('%s: %d due, %d sent, %d already sent, %d failed (%.1fs)' % (
+                timezone.localtime(now).strftime('%Y-%m-%d %H:%M'), stats['due'], stats['sent'],
+                stats['skipped'], stats['failed'], time.monotonic() - started))
+            if not options['loop']:
+                if stats['failed']:
+                    raise CommandError('%d reminders could not be sent; the next run retries them' % stats['failed'])
+                return
+
+            # Sleep to the next minute boundary; a slow run just shortens the
+            # sleep and the next window picks up everything since this one,
+            # or since the earliest reminder that failed.
+            since = now
+            if stats['retry_from'] is not None:
+                since = min(since, stats['retry_from'] - timedelta(seconds=1))
+            current = timezone.now()
+            time.sleep(max(0, 60 - current.second - current.microsecond / 1e6))
+            now = timezone.now()
@@ -0,0 +1,22 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from women.growth import FALTERING_DROP, UNDERWEIGHT_Z, Faltering, faltering
+
+
+class Command(BaseCommand):
+    help = 'Write every baby with faltering weight gain as CSV, scored against the WHO standards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop', type=float, default=FALTERING_DROP,
+                            help='Flag a fall of this many SD from the baby\'s highest weight-for-age z-score.')
+        parser.add_argument('--floor', type=float, default=UNDERWEIGHT_Z,
+                            help='Flag a latest weight-for-age z-score below this.')
+
+    def handle(self, *args, **options):
+        flagged = faltering(options['drop'], options['floor'])
+        writer = csv.writer(self.stdout, lineterminator='\n')
+        writer.writerow(Faltering._fields)
+        writer.writerows(flagged)
+        self.stderr.write('%d babies flagged' % len(flagged))
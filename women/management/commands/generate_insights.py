@@ -0,0 +1,26 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from women.insights import CHUNK_SIZE, generate_insights
+
+
+class Command(BaseCommand):
+    help = 'Raise health insights for every user from their cycles, pregnancy, MEWS and check-ins (run nightly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Evaluate as of the end of this date (YYYY-MM-DD); default now.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='User ids per chunk')
+        parser.add_argument('--workers', type=int, default=1, help='Processes evaluating chunks')
+
+    def handle(self, *args, **options):
+        as_of = timezone.now()
+        if options['as_of']:
+            try:
+                day = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+            as_of = timezone.make_aware(datetime.combine(day, time.max))
+        raised, created = generate_insights(as_of, options['chunk_size'], options['workers'])
+        self.stdout.write('Raised %d insights, %d new' % (raised, created))
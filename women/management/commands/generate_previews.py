@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from women.previews import BACKLOG_BATCH, generate_pending
+
+
+class Command(BaseCommand):
+    help = 'Make thumbnails and text previews of reports and magazines that have none.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker threads (default: PREVIEW_WORKERS)')
+        parser.add_argument('--batch-size', type=int, default=BACKLOG_BATCH, help='Uploads fetched per batch')
+        parser.add_argument('--limit', type=int, help='Stop after this many uploads')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        done = generate_pending(options['workers'], options['batch_size'], options['limit'])
+        self.stdout.write('Previewed %d uploads' % done)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from women.vaccinations import CURRENT_SCHEDULE, SCHEDULES, backfill_schedules
+
+
+class Command(BaseCommand):
+    help = 'Create the missing scheduled vaccination records for every baby.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schedule', default=CURRENT_SCHEDULE,
+                            help='Schedule version (default %s).' % CURRENT_SCHEDULE)
+
+    def handle(self, *args, **options):
+        if options['schedule'] not in SCHEDULES:
+            raise CommandError('Unknown schedule %s; known: %s' % (options['schedule'], ', '.join(SCHEDULES)))
+        created = backfill_schedules(options['schedule'])
+        self.stdout.write('Created %d vaccination records' % created)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from women.search import EXTRACT_BATCH, enabled, extract_pending, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Extract the text of accepted reports and magazines into the full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXTRACT_BATCH, help='Uploads written per transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many uploads')
+        parser.add_argument('--rebuild', action='store_true', help='Re-index every accepted upload first')
+
+    def handle(self, *args, **options):
+        if not enabled():
+            raise CommandError('Full-text search needs the SQLite backend')
+        if options['rebuild']:
+            rebuild_index()
+        done = extract_pending(options['batch_size'], options['limit'])
+        self.stdout.write('Indexed the text of %d uploads' % done)
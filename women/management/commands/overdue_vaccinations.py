@@ -0,0 +1,36 @@
+import csv
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from women.vaccinations import OVERDUE_FIELDS, overdue_chunks
+
+
+class Command(BaseCommand):
+    help = 'Write every overdue vaccination across all babies as CSV (run nightly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Report doses due before this date (YYYY-MM-DD); default today.')
+        parser.add_argument('--output', help='CSV file to write; default stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        as_of = date.today()
+        if options['as_of']:
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+
+        out = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(OVERDUE_FIELDS + ('days_overdue',))
+            total = 0
+            for chunk in overdue_chunks(as_of, options['chunk_size']):
+                writer.writerows(row + ((as_of - row[-1]).days,) for row in chunk)
+                total += len(chunk)
+        finally:
+            if out is not self.stdout:
+                out.close()
+        self.stderr.write('%d overdue vaccinations as of %s' % (total, as_of))
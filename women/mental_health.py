@@ -0,0 +1,183 @@
+"""Postpartum mental-health trends from ``MentalHealthCheck`` check-ins.
+
+Each check-in is folded into a ``MentalHealthTrend`` row for its profile in
+constant time. The row holds a wellbeing score (0-100) built from mood,
+anxiety, sleep and appetite. It keeps a rolling window of the last
+``WINDOW`` scores with their running total, and a fast and a slow
+exponentially weighted average of the score. Each metric also has its own
+fast average.
+
+After ``MIN_CHECKINS`` check-ins the trend is assessed:
+
+* ``LOW``: the window average is under ``LOW_SCORE``, anxiety is high or sleep
+  is short;
+* ``DECLINING``: the fast average has fallen ``DECLINE_POINTS`` below the slow
+  one;
+* ``STEADY`` otherwise.
+
+An ``AIHealthInsight`` is raised whenever the level goes up, and not again
+until it has come back down. Its ``dedupe_key`` names the user, the level
+and the check-in that raised it.
+
+``backfill_trends()`` rebuilds every profile's trend from all existing
+check-ins in one ordered pass over the table, as one serialized write, so
+no check-in can create a trend halfway through. Profiles left above
+``STEADY`` get the insight of their last escalation, with the level and
+reasons it was raised with, unless it already exists, so running it again
+adds nothing.
+"""
+from .insights import dedupe_key
+from .models import AIHealthInsight, MentalHealthCheck, MentalHealthTrend
+from .sqlite import serialized_write
+
+WINDOW = 7
+FAST_ALPHA = 0.5
+SLOW_ALPHA = 0.15
+MIN_CHECKINS = 3
+
+LOW_SCORE = 40
+DECLINE_POINTS = 10
+HIGH_ANXIETY = 7.5
+SHORT_SLEEP = 5
+
+STEADY, DECLINING, LOW = 0, 1, 2
+
+METRICS = ('mood_score', 'anxiety_level', 'sleep_hours', 'appetite_level')
+CHECK_FIELDS = ('id',) + METRICS
+
+
+def wellbeing(mood_score, anxiety_level, sleep_hours, appetite_level):
+    """Wellbeing score from 0 (worst) to 100 for one check-in."""
+    parts = (
+        (mood_score - 1) / 9,
+        (10 - anxiety_level) / 9,
+        min(max(sleep_hours, 0), 8) / 8,
+        (appetite_level - 1) / 9,
+    )
+    return 100 * sum(parts) / len(parts)
+
+
+def _ewma(average, value, alpha):
+    return value if average is None else average + alpha * (value - average)
+
+
+def assess(trend):
+    """``(level, reasons)`` for the trend's current state."""
+    if trend.checkins < MIN_CHECKINS:
+        return STEADY, []
+    reasons = []
+    if trend.score < LOW_SCORE:
+        reasons.append('your average wellbeing score over recent check-ins is %d/100' % trend.score)
+    if trend.metrics['anxiety_level'] >= HIGH_ANXIETY:
+        reasons.append('your anxiety has been high')
+    if trend.metrics['sleep_hours'] < SHORT_SLEEP:
+        reasons.append('you have been sleeping under %d hours' % SHORT_SLEEP)
+    if reasons:
+        return LOW, reasons
+    if trend.fast_average <= trend.slow_average - DECLINE_POINTS:
+        return DECLINING, ['your recent check-ins are %d points below your usual'
+                           % (trend.slow_average - trend.fast_average)]
+    return STEADY, []
+
+
+def fold(trend, check):
+    """Apply one check-in (a dict of ``CHECK_FIELDS``) to ``trend`` in place.
+
+    Returns the reasons if the alert level went up, else None.
+    """
+    score = wellbeing(*(check[name] for name in METRICS))
+    trend.window.append(score)
+    trend.window_total += score
+    if len(trend.window) > WINDOW:
+        trend.window_total -= trend.window.pop(0)
+    trend.fast_average = _ewma(trend.fast_average, score, FAST_ALPHA)
+    trend.slow_average = _ewma(trend.slow_average, score, SLOW_ALPHA)
+    for name in METRICS:
+        trend.metrics[name] = _ewma(trend.metrics.get(name), check[name], FAST_ALPHA)
+    trend.checkins += 1
+    trend.last_check_id = check['id']
+
+    level, reasons = assess(trend)
+    raised = level > trend.alert_level
+    trend.alert_level = level
+    return reasons if raised else None
+
+
+def make_insight(user_id, level, reasons, check_id):
+    if level == LOW:
+        title, priority = 'Your recent check-ins suggest you may need support', 'high'
+        advice = ('Consider talking to your doctor, midwife or a postpartum support line. '
+                  'You do not have to manage this alone.')
+    else:
+        title, priority = 'Your wellbeing check-ins are trending down', 'medium'
+        advice = 'Try to rest when the baby sleeps, and reach out to people you trust.'
+    summary = '; '.join(reasons)
+    content = '%s%s. %s' % (summary[0].upper(), summary[1:], advice)
+    return AIHealthInsight(user_id=user_id, insight_type='mental_health', title=title, content=content,
+                           priority=priority, dedupe_key=dedupe_key(user_id, 'mental_health', 'trend', '%d:%d' % (
+                               level, check_id)))
+
+
+def record_checkin(check):
+    """Fold a saved ``MentalHealthCheck`` into its profile's trend."""
+    with serialized_write():
+        trend, _ = MentalHealthTrend.objects.get_or_create(postpartum_profile_id=check.postpartum_profile_id)
+        if trend.last_check_id is not None and check.pk <= trend.last_check_id:
+            return trend
+        reasons = fold(trend, dict({name: getattr(check, name) for name in METRICS}, id=check.pk))
+        trend.save()
+        if reasons and check.postpartum_profile.user_id is not None:
+            make_insight(check.postpartum_profile.user_id, trend.alert_level, reasons, check.pk).save()
+    return trend
+
+
+def checkin_saved(sender, instance, created, raw=False, **kwargs):
+    """``post_save`` handler for ``MentalHealthCheck``."""
+    if created and not raw:
+        record_checkin(instance)
+
+
+def backfill_trends(chunk_size=2000):
+    """Rebuild all trends from existing check-ins; return the number of trends.
+
+    Profiles whose rebuilt trend is not ``STEADY`` get one insight for their
+    current state.
+    """
+    rows = MentalHealthCheck.objects.order_by('postpartum_profile_id', 'id').values_list(
+        'postpartum_profile_id', 'postpartum_profile__user_id', *CHECK_FIELDS)
+    trends, insights, total = [], [], 0
+    current = user_id = raised = None
+    with serialized_write():
+        MentalHealthTrend.objects.all().delete()
+        for profile_id, profile_user_id, *values in rows.iterator(chunk_size=chunk_size):
+            if current is None or current.postpartum_profile_id != profile_id:
+                if current is not None:
+                    _finish(current, user_id, raised, trends, insights)
+                current = MentalHealthTrend(postpartum_profile_id=profile_id, window=[], metrics={})
+                user_id, raised = profile_user_id, None
+                total += 1
+            check = dict(zip(CHECK_FIELDS, values))
+            reasons = fold(current, check)
+            if reasons is not None:
+                # The insight record_checkin() raised for this check-in.
+                raised = (current.alert_level, reasons, check['id'])
+            if len(trends) >= chunk_size:
+                _flush(trends, insights)
+        if current is not None:
+            _finish(current, user_id, raised, trends, insights)
+        _flush(trends, insights)
+    return total
+
+
+def _finish(trend, user_id, raised, trends, insights):
+    trends.append(trend)
+    if trend.alert_level != STEADY and user_id is not None:
+        insights.append(make_insight(user_id, *raised))
+
+
+def _flush(trends, insights):
+    MentalHealthTrend.objects.bulk_create(trends)
+    # Insights raised before, incrementally or by an earlier backfill, are kept.
+    AIHealthInsight.objects.bulk_create(insights, ignore_conflicts=True)
+    trends.clear()
+    insights.clear()
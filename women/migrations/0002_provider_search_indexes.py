@@ -0,0 +1,33 @@
+# Generated by Django 3.1.3 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0001_initial_models'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthcareprovider',
+            index=models.Index(fields=['specialization', '-rating', 'id'], name='provider_spec_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthcareprovider',
+            index=models.Index(fields=['availability', '-rating', 'id'], name='provider_avail_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthcareprovider',
+            index=models.Index(fields=['-rating', 'id'], name='provider_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthcareprovider',
+            index=models.Index(fields=['-experience_years', 'id'], name='provider_experience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthcareprovider',
+            index=models.Index(fields=['consultation_fee', 'id'], name='provider_fee_idx'),
+        ),
+    ]
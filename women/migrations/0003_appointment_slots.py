@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-19 14:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0002_provider_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSlot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot_date', models.DateField()),
+                ('slot_time', models.TimeField()),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='women.telehealthappointment')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='women.healthcareprovider')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentslot',
+            constraint=models.UniqueConstraint(fields=('provider', 'slot_date', 'slot_time'), name='unique_provider_slot'),
+        ),
+    ]
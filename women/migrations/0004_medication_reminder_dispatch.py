@@ -0,0 +1,34 @@
+# Generated by Django 3.1.3 on 2026-10-19 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0003_appointment_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDispatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('send_date', models.DateField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='aimedicationreminder',
+            index=models.Index(condition=models.Q(is_active=True), fields=['reminder_time', 'id'], name='reminder_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='reminderdispatch',
+            name='reminder',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatches', to='women.aimedicationreminder'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminderdispatch',
+            constraint=models.UniqueConstraint(fields=('reminder', 'send_date'), name='unique_reminder_dispatch'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.3 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0004_medication_reminder_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccinationrecord',
+            name='schedule_version',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinationrecord',
+            index=models.Index(condition=models.Q(administered_date__isnull=True), fields=['due_date'], name='vaccination_pending_due_idx'),
+        ),
+    ]
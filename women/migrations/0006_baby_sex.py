@@ -0,0 +1,18 @@
+# Generated by Django 3.1.3 on 2026-10-19 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0005_vaccination_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='babyprofile',
+            name='sex',
+            field=models.CharField(blank=True, choices=[('F', 'Female'), ('M', 'Male')], help_text='Selects the WHO growth standard; leave blank if not recorded', max_length=1),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.3 on 2026-10-19 15:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0006_baby_sex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentalHealthTrend',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkins', models.PositiveIntegerField(default=0)),
+                ('last_check_id', models.IntegerField(blank=True, null=True)),
+                ('window', models.JSONField(default=list)),
+                ('window_total', models.FloatField(default=0)),
+                ('fast_average', models.FloatField(blank=True, null=True)),
+                ('slow_average', models.FloatField(blank=True, null=True)),
+                ('metrics', models.JSONField(default=dict)),
+                ('alert_level', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('postpartum_profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='mental_health_trend', to='women.postpartumprofile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.1.3 on 2026-10-19 18:20
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+SYNCED = ('menstrualcycle', 'mews_assessment', 'growthrecord')
+
+
+def fill_client_ids(apps, schema_editor):
+    # A callable default is evaluated once by AddField, so existing rows get
+    # their own ids here before the column is made unique.
+    for model_name in SYNCED:
+        model = apps.get_model('women', model_name)
+        rows = list(model.objects.only('id'))
+        for row in rows:
+            row.client_id = uuid.uuid4()
+        model.objects.bulk_update(rows, ['client_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0007_mental_health_trend'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mews_assessment',
+            name='assessment_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ] + [
+        operation for model_name in SYNCED for operation in (
+            migrations.AddField(
+                model_name=model_name,
+                name='client_id',
+                field=models.UUIDField(null=True, editable=False),
+            ),
+            migrations.AddField(
+                model_name=model_name,
+                name='updated_at',
+                field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+                preserve_default=False,
+            ),
+        )
+    ] + [
+        migrations.RunPython(fill_client_ids, migrations.RunPython.noop),
+    ] + [
+        migrations.AlterField(
+            model_name=model_name,
+            name='client_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        )
+        for model_name in SYNCED
+    ] + [
+        migrations.AddIndex(
+            model_name='menstrualcycle',
+            index=models.Index(fields=['user', 'updated_at'], name='cycle_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mews_assessment',
+            index=models.Index(fields=['user', 'updated_at'], name='mews_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='growthrecord',
+            index=models.Index(fields=['baby', 'updated_at'], name='growth_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.3 on 2026-10-19 15:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def recount_messages(apps, schema_editor):
+    # message_count was maintained by hand and may have drifted.
+    AIConversation = apps.get_model('women', 'AIConversation')
+    AIMessage = apps.get_model('women', 'AIMessage')
+    counts = AIMessage.objects.filter(conversation=OuterRef('pk')).order_by().values('conversation').annotate(
+        n=Count('id')).values('n')
+    AIConversation.objects.update(message_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0008_sync_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconversation',
+            name='summarized_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddIndex(
+            model_name='aimessage',
+            index=models.Index(fields=['conversation', 'timestamp'], name='ai_message_recent_idx'),
+        ),
+        migrations.RunPython(recount_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.3 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0009_ai_conversation_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aihealthinsight',
+            name='dedupe_key',
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True, unique=True),
+        ),
+    ]
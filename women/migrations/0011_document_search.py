@@ -0,0 +1,59 @@
+# Generated by Django 3.1.3 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+# (FTS5 table, uploads table) per searchable kind; see women/search.py.
+SEARCH_TABLES = {
+    'notes': ('women_notes_search', 'women_notes'),
+    'magazines': ('women_magazines_search', 'women_magazines'),
+}
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind, (table, source) in SEARCH_TABLES.items():
+            cursor.execute(
+                "CREATE VIRTUAL TABLE %s USING fts5("
+                "description, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')" % table)
+            cursor.execute("CREATE VIRTUAL TABLE %s_vocab USING fts5vocab(%s, 'row')" % (table, table))
+            # Index what is already accepted; the file text follows from the queue.
+            cursor.execute(
+                "INSERT INTO %s (rowid, description, body) SELECT id, COALESCE(description, ''), '' FROM %s "
+                "WHERE status = 'Accept'" % (table, source))
+            cursor.execute(
+                "INSERT INTO women_pendingextraction (kind, object_id) SELECT %%s, id FROM %s "
+                "WHERE status = 'Accept'" % source, [kind])
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table, source in SEARCH_TABLES.values():
+            cursor.execute('DROP TABLE %s_vocab' % table)
+            cursor.execute('DROP TABLE %s' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0010_insight_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingExtraction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('notes', 'Notes'), ('magazines', 'Magazines')], max_length=20)),
+                ('object_id', models.IntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pendingextraction',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_pending_extraction'),
+        ),
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.1.3 on 2026-10-19 16:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_statuses(apps, schema_editor):
+    # status was free text; anything not recognisably accepted or rejected
+    # goes back into the queue.
+    for name in ('Notes', 'Magazines'):
+        model = apps.get_model('women', name)
+        rows = model.objects.annotate(normalized=Lower(Trim('status')))
+        rows.filter(normalized__in=['accept', 'accepted']).exclude(status='Accept').update(status='Accept')
+        rows.filter(normalized__in=['reject', 'rejected']).exclude(status='Reject').update(status='Reject')
+        model.objects.exclude(status__in=['Accept', 'Reject', 'pending']).update(status='pending')
+        model.objects.filter(status__isnull=True).update(status='pending')
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # Index uploads that only now read as accepted (see 0011).
+    with schema_editor.connection.cursor() as cursor:
+        for kind, source in (('notes', 'women_notes'), ('magazines', 'women_magazines')):
+            table = source + '_search'
+            cursor.execute(
+                "INSERT INTO %s (rowid, description, body) SELECT id, COALESCE(description, ''), '' FROM %s "
+                "WHERE status = 'Accept' AND id NOT IN (SELECT rowid FROM %s)" % (table, source, table))
+            cursor.execute(
+                "INSERT OR IGNORE INTO women_pendingextraction (kind, object_id) SELECT %%s, id FROM %s "
+                "WHERE status = 'Accept'" % source, [kind])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('women', '0011_document_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='magazines',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='magazines',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(normalize_statuses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='magazines',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('Accept', 'Accepted'), ('Reject', 'Rejected')], db_index=True, default='pending', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='notes',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('Accept', 'Accepted'), ('Reject', 'Rejected')], db_index=True, default='pending', max_length=30),
+        ),
+    ]
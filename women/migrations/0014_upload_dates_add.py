@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0013_file_previews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='uploaded_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='magazines',
+            name='uploaded_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
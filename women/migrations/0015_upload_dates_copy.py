@@ -0,0 +1,109 @@
+"""Copy the upload date strings into the new ``uploaded_at`` columns.
+
+The rows are read in id order, ``BATCH`` at a time, and each batch is
+written in its own transaction. The table is never loaded or locked as a
+whole. Dates were written by ``date.today()``, so they read as YYYY-MM-DD.
+The day-first forms below are also accepted. A row whose date cannot be
+read takes the date of the upload before it, or the earliest date in the
+table when it comes first.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import migrations, transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+BATCH = 5000
+FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d')
+FIELDS = (('Notes', 'uploadingdate'), ('Magazines', 'uploadedate'))
+
+
+# Uploads of one day share a string, so each distinct string is parsed once.
+@lru_cache(maxsize=4096)
+def parse(value):
+    value = (value or '').strip()
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    for fmt in FORMATS:
+        if parsed is not None:
+            break
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    if parsed is not None and settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_default_timezone())
+    return parsed
+
+
+def runs(rows):
+    """``[first id, last id, value]`` for each run of equal values in ``rows``."""
+    run = None
+    for pk, value in rows:
+        if run is not None and run[2] == value:
+            run[1] = pk
+            continue
+        if run is not None:
+            yield run
+        run = [pk, pk, value]
+    if run is not None:
+        yield run
+
+
+def stream(model, using, source, field, convert):
+    """Set ``field`` to ``convert(source value, uploaded_at)`` on every row, batch by batch."""
+    last_id = 0
+    while True:
+        rows = list(model.objects.using(using).filter(id__gt=last_id).order_by('id')
+                    .values_list('id', source, 'uploaded_at')[:BATCH])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        # Consecutive rows of one day become one ranged UPDATE.
+        with transaction.atomic(using=using):
+            for first, last, value in runs([(pk, convert(text, when)) for pk, text, when in rows]):
+                model.objects.using(using).filter(id__gte=first, id__lte=last).update(**{field: value})
+
+
+def copy_dates(apps, schema_editor):
+    using = schema_editor.connection.alias
+    for name, source in FIELDS:
+        model = apps.get_model('women', name)
+        previous = [None]
+
+        def convert(text, when):
+            previous[0] = parse(text) or previous[0]
+            return previous[0]
+        stream(model, using, source, 'uploaded_at', convert)
+        rows = model.objects.using(using)
+        earliest = rows.aggregate(earliest=Min('uploaded_at'))['earliest'] or timezone.now()
+        rows.filter(uploaded_at__isnull=True).update(uploaded_at=earliest)
+
+
+def copy_dates_back(apps, schema_editor):
+    using = schema_editor.connection.alias
+
+    def convert(text, when):
+        if when is None:
+            return None
+        return (timezone.localtime(when) if timezone.is_aware(when) else when).date().isoformat()
+    for name, source in FIELDS:
+        stream(apps.get_model('women', name), using, 'uploaded_at', source, convert)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own rather than in one transaction.
+    atomic = False
+
+    dependencies = [
+        ('women', '0014_upload_dates_add'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_dates, copy_dates_back),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0015_upload_dates_copy'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notes',
+            name='uploadingdate',
+        ),
+        migrations.RenameField(
+            model_name='notes',
+            old_name='uploaded_at',
+            new_name='uploadingdate',
+        ),
+        migrations.AlterField(
+            model_name='notes',
+            name='uploadingdate',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['status', 'uploadingdate'], name='women_notes_status_date'),
+        ),
+        migrations.RemoveField(
+            model_name='magazines',
+            name='uploadedate',
+        ),
+        migrations.RenameField(
+            model_name='magazines',
+            old_name='uploaded_at',
+            new_name='uploadedate',
+        ),
+        migrations.AlterField(
+            model_name='magazines',
+            name='uploadedate',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='magazines',
+            index=models.Index(fields=['status', 'uploadedate'], name='women_magazines_status_date'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0016_upload_dates_swap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderdispatch',
+            name='claim',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
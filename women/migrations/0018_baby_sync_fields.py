@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+def fill_client_ids(apps, schema_editor):
+    # A callable default is evaluated once by AddField, so existing rows get
+    # their own ids here before the column is made unique.
+    BabyProfile = apps.get_model('women', 'BabyProfile')
+    rows = list(BabyProfile.objects.only('id'))
+    for row in rows:
+        row.client_id = uuid.uuid4()
+    BabyProfile.objects.bulk_update(rows, ['client_id'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0017_reminder_dispatch_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='babyprofile',
+            name='client_id',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='babyprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_client_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='babyprofile',
+            name='client_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='babyprofile',
+            index=models.Index(fields=['postpartum_profile', 'updated_at'], name='baby_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from datetime import time
+
+from django.db import migrations
+
+# The booking grid of women/booking.py when slots were introduced.
+SLOT_MINUTES = 30
+WORKDAY_START, WORKDAY_END = 9 * 60, 17 * 60
+BATCH = 500
+
+
+def slot_minutes(appointment):
+    """Grid slots an appointment booked before 0003 covers, in minutes."""
+    start = appointment.appointment_time.hour * 60 + appointment.appointment_time.minute
+    end = min(start + max(appointment.duration_minutes, 1), WORKDAY_END)
+    first = max(WORKDAY_START, start - (start - WORKDAY_START) % SLOT_MINUTES)
+    return range(first, end, SLOT_MINUTES)
+
+
+def fill_slots(apps, schema_editor):
+    # Without slots the blind-insert booking engine would book over these.
+    TelehealthAppointment = apps.get_model('women', 'TelehealthAppointment')
+    AppointmentSlot = apps.get_model('women', 'AppointmentSlot')
+    last_id = 0
+    while True:
+        batch = list(TelehealthAppointment.objects.exclude(status='cancelled').filter(id__gt=last_id)
+                     .order_by('id').only('id', 'provider_id', 'appointment_date', 'appointment_time',
+                                          'duration_minutes')[:BATCH])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        # Bookings made before 0003 may overlap; the earliest keeps the slot.
+        AppointmentSlot.objects.bulk_create(
+            [AppointmentSlot(provider_id=appointment.provider_id, appointment_id=appointment.id,
+                             slot_date=appointment.appointment_date, slot_time=time(minutes // 60, minutes % 60))
+             for appointment in batch for minutes in slot_minutes(appointment)],
+            ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('women', '0018_baby_sync_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_slots, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import uuid
+
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.utils import timezone
 from datetime import date, timedelta
 
 # Create your models here.
@@ -13,13 +18,48 @@ class Signup(models.Model):
     #     return self.user.username
 
 
+# Moderation states of uploaded reports and magazines; see women/moderation.py.
+MODERATION_STATUSES = [
+    ('pending', 'Pending'),
+    ('Accept', 'Accepted'),
+    ('Reject', 'Rejected'),
+]
+
+
+class FilePreview(models.Model):
+    """Thumbnail and text preview of an uploaded file; see women/previews.py.
+
+    Keyed by a hash of the file content, so identical uploads share one.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    # Path of the thumbnail in the media storage; '' when none could be made.
+    thumbnail = models.CharField(max_length=100, blank=True)
+    text = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.content_hash
+
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
+
+
 class Notes(models.Model):
     user = models.ForeignKey(User,on_delete=models.CASCADE,null=True)
-    uploadingdate = models.CharField(max_length=10,null=True)
+    uploadingdate = models.DateTimeField(default=timezone.now, db_index=True)
     reportfile = models.FileField(null=True)
     filetype = models.CharField(max_length=30,null=True)
     description = models.CharField(max_length=300,null=True)
-    status = models.CharField(max_length=30,null=True)
+    status = models.CharField(max_length=30, choices=MODERATION_STATUSES, default='pending', db_index=True)
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    preview = models.ForeignKey(FilePreview, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'uploadingdate'], name='women_notes_status_date'),
+        ]
 
     # def __str__(self):
     #     return self.signup.user.username+" "+self.status
@@ -27,11 +67,19 @@ class Notes(models.Model):
 
 class Magazines(models.Model):
     user = models.ForeignKey(User,on_delete=models.CASCADE,null=True)
-    uploadedate = models.CharField(max_length=10,null=True)
+    uploadedate = models.DateTimeField(default=timezone.now, db_index=True)
     magazinesfile = models.FileField(null=True)
     magazinestype = models.CharField(max_length=30,null=True)
     description = models.CharField(max_length=300,null=True)
-    status = models.CharField(max_length=30,null=True)
+    status = models.CharField(max_length=30, choices=MODERATION_STATUSES, default='pending', db_index=True)
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    preview = models.ForeignKey(FilePreview, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'uploadedate'], name='women_magazines_status_date'),
+        ]
 
     # def __str__(self):
     #     return self.signup.user.username+" "+self.status
@@ -49,6 +97,10 @@ class MenstrualCycle(models.Model):
         ('heavy', 'Heavy'),
     ])
     symptoms = models.TextField(blank=True, help_text="Note any symptoms like cramps, headaches, etc.")
+    # Offline sync (women/sync.py): the id mobile clients create records
+    # under, and the change time downloads are selected by.
+    client_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.period_start_date}"
@@ -67,6 +119,11 @@ class MenstrualCycle(models.Model):
         ovulation_day = self.period_start_date + timedelta(days=self.cycle_length - 14)
         return ovulation_day + timedelta(days=1)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='cycle_sync_idx'),
+        ]
+
 
 # Week-by-Week and Trimester-Specific Nutritional Engine
 class PregnancyProfile(models.Model):
@@ -143,6 +200,32 @@ class MentalHealthCheck(models.Model):
         return f"{self.postpartum_profile.user.username} - {self.check_date}"
 
 
+class MentalHealthTrend(models.Model):
+    """Running wellbeing state over a profile's check-ins (women/mental_health.py)."""
+    postpartum_profile = models.OneToOneField(PostpartumProfile, on_delete=models.CASCADE,
+                                              related_name='mental_health_trend')
+    checkins = models.PositiveIntegerField(default=0)
+    last_check_id = models.IntegerField(null=True, blank=True)
+    # Wellbeing scores (0-100) of the latest check-ins, oldest first, and their sum
+    window = models.JSONField(default=list)
+    window_total = models.FloatField(default=0)
+    fast_average = models.FloatField(null=True, blank=True)
+    slow_average = models.FloatField(null=True, blank=True)
+    # Per-metric exponentially weighted averages
+    metrics = models.JSONField(default=dict)
+    alert_level = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.postpartum_profile} - {self.score}"
+
+    @property
+    def score(self):
+        if not self.window:
+            return None
+        return round(self.window_total / len(self.window))
+
+
 # Pelvic Floor Rehabilitation and Kinetic Progression
 class PelvicFloorRehab(models.Model):
     postpartum_profile = models.ForeignKey(PostpartumProfile, on_delete=models.CASCADE)
@@ -179,13 +262,24 @@ class BabyProfile(models.Model):
     postpartum_profile = models.ForeignKey(PostpartumProfile, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     birth_date = models.DateField()
+    sex = models.CharField(max_length=1, blank=True, choices=[
+        ('F', 'Female'),
+        ('M', 'Male'),
+    ], help_text="Selects the WHO growth standard; leave blank if not recorded")
     birth_weight = models.FloatField(help_text="Weight in kg")
     birth_length = models.FloatField(help_text="Length in cm")
     apgar_score = models.IntegerField()
     complications = models.TextField(blank=True)
+    client_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - Born {self.birth_date}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['postpartum_profile', 'updated_at'], name='baby_sync_idx'),
+        ]
     
     @property
     def age_in_months(self):
@@ -203,6 +297,9 @@ class VaccinationRecord(models.Model):
     batch_number = models.CharField(max_length=50, blank=True)
     next_due_date = models.DateField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    # Version of the schedule table (women/vaccinations.py) the record was
+    # generated from; blank for records entered by hand.
+    schedule_version = models.CharField(max_length=20, blank=True)
     
     def __str__(self):
         return f"{self.baby.name} - {self.vaccine_name}"
@@ -213,6 +310,14 @@ class VaccinationRecord(models.Model):
             return False
         return date.today() > self.due_date
 
+    class Meta:
+        # Only pending doses are ever searched by due date (the overdue sweep),
+        # so the index leaves out everything already administered.
+        indexes = [
+            models.Index(fields=['due_date'], name='vaccination_pending_due_idx',
+                         condition=Q(administered_date__isnull=True)),
+        ]
+
 
 class GrowthRecord(models.Model):
     baby = models.ForeignKey(BabyProfile, on_delete=models.CASCADE)
@@ -222,15 +327,24 @@ class GrowthRecord(models.Model):
     head_circumference = models.FloatField(help_text="Head circumference in cm")
     milestones = models.TextField(blank=True)
     notes = models.TextField(blank=True)
+    client_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.baby.name} - {self.record_date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['baby', 'updated_at'], name='growth_sync_idx'),
+        ]
+
 
 # Maternal Early Warning System (MEWS) and Emergency SOS
 class MEWS_Assessment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
-    assessment_date = models.DateTimeField(auto_now_add=True)
+    # Defaults to now rather than auto_now_add so readings taken offline keep
+    # the time they were taken.
+    assessment_date = models.DateTimeField(default=timezone.now)
     systolic_bp = models.IntegerField()
     diastolic_bp = models.IntegerField()
     heart_rate = models.IntegerField()
@@ -239,6 +353,8 @@ class MEWS_Assessment(models.Model):
     oxygen_saturation = models.IntegerField()
     consciousness_level = models.IntegerField(choices=[(i, i) for i in range(1, 5)])
     urine_output = models.FloatField(help_text="Urine output in ml/hour")
+    client_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.user.username} - {self.assessment_date}"
@@ -311,6 +427,11 @@ class MEWS_Assessment(models.Model):
         else:
             return "NORMAL"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='mews_sync_idx'),
+        ]
+
 
 class EmergencyContact(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
@@ -352,6 +473,17 @@ class HealthcareProvider(models.Model):
     def __str__(self):
         return f"Dr. {self.name} - {self.specialization}"
 
+    class Meta:
+        # Serve the telehealth provider search (women/providers.py): equality
+        # filters first, then the keyset sort columns.
+        indexes = [
+            models.Index(fields=['specialization', '-rating', 'id'], name='provider_spec_rating_idx'),
+            models.Index(fields=['availability', '-rating', 'id'], name='provider_avail_rating_idx'),
+            models.Index(fields=['-rating', 'id'], name='provider_rating_idx'),
+            models.Index(fields=['-experience_years', 'id'], name='provider_experience_idx'),
+            models.Index(fields=['consultation_fee', 'id'], name='provider_fee_idx'),
+        ]
+
 
 class TelehealthAppointment(models.Model):
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='telehealth_appointments')
@@ -374,6 +506,44 @@ class TelehealthAppointment(models.Model):
     def __str__(self):
         return f"{self.patient.username} - {self.provider.name} - {self.appointment_date}"
 
+    # Names used by the telehealth template
+    @property
+    def doctor_name(self):
+        return f"Dr. {self.provider.name}"
+
+    @property
+    def specialization(self):
+        return self.provider.specialization
+
+    @property
+    def consultation_date(self):
+        return self.appointment_date
+
+    @property
+    def consultation_time(self):
+        return self.appointment_time
+
+
+class AppointmentSlot(models.Model):
+    """A provider calendar slot taken by an appointment.
+
+    The unique constraint is what makes booking race-free: concurrent
+    attempts on the same slot race on one index entry, and every loser gets
+    an IntegrityError (see women/booking.py).
+    """
+    provider = models.ForeignKey(HealthcareProvider, on_delete=models.CASCADE)
+    appointment = models.ForeignKey(TelehealthAppointment, on_delete=models.CASCADE, related_name='slots')
+    slot_date = models.DateField()
+    slot_time = models.TimeField()
+
+    def __str__(self):
+        return f"{self.provider.name} - {self.slot_date} {self.slot_time}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'slot_date', 'slot_time'], name='unique_provider_slot'),
+        ]
+
 
 # AI Conversational Agent Models
 class AIConversation(models.Model):
@@ -382,6 +552,9 @@ class AIConversation(models.Model):
     last_activity = models.DateTimeField(auto_now=True)
     message_count = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Rolling summary of every message but the latest; see women/assistant.py.
+    summary = models.TextField(blank=True, default='')
+    summarized_count = models.IntegerField(default=0)
     
     def __str__(self):
         return f"{self.user.username} - {self.conversation_id}"
@@ -396,6 +569,11 @@ class AIMessage(models.Model):
     def __str__(self):
         return f"{'User' if self.is_from_user else 'AI'}: {self.message_text[:50]}..."
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp'], name='ai_message_recent_idx'),
+        ]
+
 
 class AISymptomChecker(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -426,6 +604,31 @@ class AIMedicationReminder(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.medication_name}"
 
+    class Meta:
+        # The reminder dispatcher (women/reminders.py) reads the reminders due
+        # in each minute as a range scan on this index. It is partial on
+        # is_active because SQLite cannot use a composite index for the bare
+        # boolean test Django emits for is_active=True.
+        indexes = [
+            models.Index(fields=['reminder_time', 'id'], name='reminder_due_idx', condition=Q(is_active=True)),
+        ]
+
+
+class ReminderDispatch(models.Model):
+    """One sent reminder; (reminder, send_date) is the idempotency key."""
+    reminder = models.ForeignKey(AIMedicationReminder, on_delete=models.CASCADE, related_name='dispatches')
+    send_date = models.DateField()
+    # The dispatcher run that inserted this row and so owns the send.
+    claim = models.CharField(max_length=32, blank=True)
+
+    def __str__(self):
+        return f"{self.reminder} - {self.send_date}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reminder', 'send_date'], name='unique_reminder_dispatch'),
+        ]
+
 
 class AIHealthInsight(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -445,6 +648,25 @@ class AIHealthInsight(models.Model):
     ])
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Hash of (user, insight type, rule, period) for generated insights, so
+    # the nightly job never raises the same one twice; see women/insights.py.
+    dedupe_key = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
     
     def __str__(self):
-        return f"{self.user.username} - {self.title}"
\ No newline at end of file
+        return f"{self.user.username} - {self.title}"
+
+class PendingExtraction(models.Model):
+    """An accepted upload whose file text is not yet in the search index."""
+    kind = models.CharField(max_length=20, choices=[
+        ('notes', 'Notes'),
+        ('magazines', 'Magazines'),
+    ])
+    object_id = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_pending_extraction'),
+        ]
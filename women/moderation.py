@@ -0,0 +1,146 @@
+"""Moderation queue for uploaded reports (``Notes``) and ``Magazines``.
+
+Uploads start ``pending``. A moderator claims a batch of the oldest
+unclaimed pending items with ``claim()``. Claims expire after
+``settings.MODERATION_CLAIM_TIMEOUT`` seconds, so items held by someone who
+walked away go back into the queue. On PostgreSQL and MySQL the claim
+query uses ``select_for_update(skip_locked=True)``: moderators claiming at
+the same time skip each other's rows instead of waiting or taking the same
+ones. SQLite has no row locks. There the claim runs under
+``serialized_write()``, which makes it atomic across workers.
+
+``transition()`` applies an action to many items in one ``UPDATE``. It only
+touches items in a state the action applies to, and not items someone else
+holds a live claim on. The search index is then updated in bulk for the
+items that changed, since a bulk update sends no signals.
+
+``upload_list()`` pages through the admin lists newest first, optionally
+within a range of upload dates, served by the (status, upload date) index.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Magazines, Notes
+from .pagination import keyset_page, split_page
+from .search import index_many
+from .sqlite import serialized_write
+
+PENDING, ACCEPTED, REJECTED = 'pending', 'Accept', 'Reject'
+CLAIM_SIZE = 20
+PAGE_SIZE = 50
+
+KINDS = {'notes': Notes, 'magazines': Magazines}
+DATE_FIELDS = {'notes': 'uploadingdate', 'magazines': 'uploadedate'}
+
+# action: (statuses it applies to, resulting status)
+TRANSITIONS = {
+    'accept': ({PENDING, REJECTED}, ACCEPTED),
+    'reject': ({PENDING, ACCEPTED}, REJECTED),
+    'reopen': ({ACCEPTED, REJECTED}, PENDING),
+}
+
+
+def _cutoff(now):
+    return now - timedelta(seconds=getattr(settings, 'MODERATION_CLAIM_TIMEOUT', 1800))
+
+
+def _free_for(moderator, now):
+    """Items nobody but ``moderator`` holds a live claim on."""
+    return Q(claimed_by__isnull=True) | Q(claimed_by=moderator) | Q(claimed_at__lt=_cutoff(now))
+
+
+def claimed(kind, moderator, now=None):
+    """Pending items ``moderator`` holds a live claim on, oldest first."""
+    now = now or timezone.now()
+    return (KINDS[kind].objects.filter(status=PENDING, claimed_by=moderator, claimed_at__gte=_cutoff(now))
+            .select_related('user', 'preview').order_by('id'))
+
+
+def claim(kind, moderator, size=CLAIM_SIZE, now=None):
+    """Top ``moderator``'s claims up to ``size`` items; returns their claims.
+
+    Claims already held are renewed.
+    """
+    now = now or timezone.now()
+    model = KINDS[kind]
+    with serialized_write():
+        held = model.objects.filter(status=PENDING, claimed_by=moderator, claimed_at__gte=_cutoff(now))
+        wanted = size - held.update(claimed_at=now)
+        if wanted > 0:
+            free = model.objects.filter(status=PENDING).filter(Q(claimed_by__isnull=True) |
+                                                               Q(claimed_at__lt=_cutoff(now)))
+            ids = list(free.select_for_update(skip_locked=True).order_by('id').values_list('id', flat=True)[:wanted])
+            model.objects.filter(id__in=ids).update(claimed_by=moderator, claimed_at=now)
+    return list(claimed(kind, moderator, now))
+
+
+def release(kind, moderator):
+    """Give back everything ``moderator`` has claimed."""
+    with serialized_write():
+        return KINDS[kind].objects.filter(claimed_by=moderator).update(claimed_by=None, claimed_at=None)
+
+
+def transition(kind, ids, action, moderator, now=None):
+    """Apply ``action`` to the items ``ids`` in one UPDATE; returns how many changed.
+
+    Raises ``ValueError`` for an unknown action.
+    """
+    if action not in TRANSITIONS:
+        raise ValueError('Unknown action: %s' % action)
+    sources, status = TRANSITIONS[action]
+    now = now or timezone.now()
+    model = KINDS[kind]
+    with serialized_write():
+        movable = model.objects.filter(id__in=list(ids), status__in=sources).filter(_free_for(moderator, now))
+        changed = list(movable.select_for_update().values_list('id', flat=True))
+        if changed:
+            model.objects.filter(id__in=changed).update(status=status, claimed_by=None, claimed_at=None)
+            index_many(kind, changed)
+    return len(changed)
+
+
+def queue_depth(now=None):
+    """``{kind: {'pending', 'claimed', 'Accept', 'Reject'}}`` item counts."""
+    now = now or timezone.now()
+    depth = {}
+    for kind, model in KINDS.items():
+        counts = dict.fromkeys([PENDING, 'claimed', ACCEPTED, REJECTED], 0)
+        counts.update(model.objects.order_by().values_list('status').annotate(n=Count('id')))
+        counts['claimed'] = model.objects.filter(status=PENDING, claimed_by__isnull=False,
+                                                 claimed_at__gte=_cutoff(now)).count()
+        depth[kind] = counts
+    return depth
+
+
+def newest_first(kind):
+    return ('-' + DATE_FIELDS[kind], '-id')
+
+
+def _start_of(day):
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def upload_list(kind, status=None, start=None, end=None, cursor=None, size=PAGE_SIZE):
+    """Lazy queryset for one page (``size + 1`` rows) of uploads, newest first.
+
+    ``start`` and ``end`` are dates, both included. Pass the evaluated rows
+    to ``upload_page()``. Raises ``ValueError`` for a malformed cursor.
+    """
+    field = DATE_FIELDS[kind]
+    uploads = KINDS[kind].objects.select_related('user')
+    if status is not None:
+        uploads = uploads.filter(status=status)
+    if start is not None:
+        uploads = uploads.filter(**{field + '__gte': _start_of(start)})
+    if end is not None:
+        uploads = uploads.filter(**{field + '__lt': _start_of(end + timedelta(days=1))})
+    return keyset_page(uploads, newest_first(kind), cursor, size)
+
+
+def upload_page(kind, rows, size=PAGE_SIZE):
+    """``(uploads, next_cursor)`` from the rows of ``upload_list()``."""
+    return split_page(rows, newest_first(kind), size)
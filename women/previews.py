@@ -0,0 +1,220 @@
+"""First-page thumbnails and text previews of uploaded reports and magazines.
+
+Upload lists could only link to the full files, so seeing what a report
+was meant downloading it. ``generate()`` reads an upload once and hashes
+it. It then makes a ``FilePreview`` holding the first ``PREVIEW_CHARS``
+characters of the file text. It also writes a JPEG thumbnail, at most
+``THUMBNAIL_SIZE`` pixels a side, to the media storage under ``previews/``,
+named by the hash. List pages link to that file, which is a few kilobytes.
+Identical files share one preview, and a known hash is never rendered
+again.
+
+Pillow thumbnails image uploads, and poppler's ``pdftoppm`` renders the
+first page of PDFs. Both are optional. Without them uploads get only the
+text preview.
+
+New uploads are previewed after their commit, on a pool of
+``settings.PREVIEW_WORKERS`` threads (``settings.PREVIEW_IN_BACKGROUND``).
+The ``generate_previews`` command works through uploads that have no
+preview yet.
+"""
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+
+from .documents import data_text
+from .models import FilePreview, Magazines, Notes
+from .sqlite import serialized_write
+
+try:
+    from PIL import Image
+except ImportError:  # optional: image uploads get no thumbnail
+    Image = None
+
+THUMBNAIL_SIZE = 240
+THUMBNAIL_QUALITY = 70
+PREVIEW_CHARS = 300
+# Seconds pdftoppm may take over one first page.
+RENDER_TIMEOUT = 30
+BACKLOG_BATCH = 100
+IMAGE_TYPES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+KINDS = {'notes': (Notes, 'reportfile'), 'magazines': (Magazines, 'magazinesfile')}
+_KIND_OF = {model: name for name, (model, file_field) in KINDS.items()}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def thumbnail_path(digest):
+    return 'previews/%s/%s.jpg' % (digest[:2], digest)
+
+
+def image_thumbnail(data):
+    """JPEG thumbnail of the image in ``data``, or None."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Lets the JPEG decoder skip straight to a smaller scale.
+            image.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            output = io.BytesIO()
+            image.convert('RGB').save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    except Exception:
+        # Damaged, truncated or oversized images just have no thumbnail.
+        return None
+    return output.getvalue()
+
+
+def pdf_thumbnail(data):
+    """JPEG of the first page of the PDF in ``data``, or None."""
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    with tempfile.TemporaryDirectory(prefix='preview-') as workdir:
+        source = os.path.join(workdir, 'upload.pdf')
+        with open(source, 'wb') as output:
+            output.write(data)
+        try:
+            subprocess.run(
+                [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-jpegopt', 'quality=%d' % THUMBNAIL_QUALITY,
+                 '-scale-to', str(THUMBNAIL_SIZE), source, os.path.join(workdir, 'page')],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=RENDER_TIMEOUT, check=True)
+            with open(os.path.join(workdir, 'page.jpg'), 'rb') as page:
+                return page.read()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def render_thumbnail(name, data):
+    name = name.lower()
+    if name.endswith('.pdf') or data[:5] == b'%PDF-':
+        return pdf_thumbnail(data)
+    if name.endswith(IMAGE_TYPES):
+        return image_thumbnail(data)
+    return None
+
+
+def preview_for(name, data):
+    """The ``FilePreview`` of the file ``name`` holding ``data``; made if new."""
+    digest = content_hash(data)
+    preview = FilePreview.objects.filter(content_hash=digest).first()
+    if preview is not None:
+        return preview
+    thumbnail = ''
+    image = render_thumbnail(name, data)
+    if image is not None:
+        thumbnail = thumbnail_path(digest)
+        if not default_storage.exists(thumbnail):
+            thumbnail = default_storage.save(thumbnail, ContentFile(image))
+    text = ' '.join(data_text(name, data, PREVIEW_CHARS * 2).split())[:PREVIEW_CHARS]
+    try:
+        with serialized_write():
+            return FilePreview.objects.create(content_hash=digest, thumbnail=thumbnail, text=text)
+    except IntegrityError:
+        # Another worker previewed the same content first.
+        return FilePreview.objects.get(content_hash=digest)
+
+
+def generate(kind, pk):
+    """Preview the upload ``pk`` of ``kind``; returns its ``FilePreview``.
+
+    Returns None when the upload or its file is gone.
+    """
+    model, file_field = KINDS[kind]
+    upload = model.objects.filter(pk=pk).first()
+    field = getattr(upload, file_field) if upload is not None else None
+    if not field:
+        return None
+    try:
+        with field.open('rb') as source:
+            data = source.read()
+    except (OSError, ValueError):
+        return None
+    preview = preview_for(field.name, data)
+    with serialized_write():
+        # update() sends no post_save, so the search index is left alone.
+        model.objects.filter(pk=pk).update(preview=preview)
+    return preview
+
+
+def backlog(kind):
+    """Uploads of ``kind`` with a file but no preview."""
+    model, file_field = KINDS[kind]
+    return model.objects.filter(preview__isnull=True).exclude(**{file_field: ''}).exclude(
+        **{file_field + '__isnull': True})
+
+
+def _in_background(kind, pk):
+    try:
+        return generate(kind, pk)
+    finally:
+        connection.close()
+
+
+def _generate_all(kind, ids):
+    try:
+        return sum(generate(kind, pk) is not None for pk in ids)
+    finally:
+        connection.close()
+
+
+def generate_pending(workers=None, batch_size=BACKLOG_BATCH, limit=None):
+    """Preview uploads that have none on ``workers`` threads; returns how many were.
+
+    With one worker everything runs on the calling thread.
+    """
+    workers = workers or getattr(settings, 'PREVIEW_WORKERS', 2)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preview') if workers > 1 else None
+    done = 0
+    try:
+        for kind in KINDS:
+            last_id = 0
+            while limit is None or done < limit:
+                size = batch_size if limit is None else min(batch_size, limit - done)
+                ids = list(backlog(kind).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:size])
+                if not ids:
+                    break
+                last_id = ids[-1]
+                if pool is None:
+                    done += sum(generate(kind, pk) is not None for pk in ids)
+                else:
+                    # One slice per worker, so each opens one connection per batch.
+                    done += sum(pool.map(_generate_all, [kind] * workers, [ids[i::workers] for i in range(workers)]))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return done
+
+
+_executor = None
+
+
+def submit(kind, pk):
+    """Preview the upload ``pk`` of ``kind`` on the background pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PREVIEW_WORKERS', 2),
+                                       thread_name_prefix='preview')
+    return _executor.submit(_in_background, kind, pk)
+
+
+def upload_saved(sender, instance, raw=False, **kwargs):
+    """``post_save`` handler queuing a preview of an upload that has none."""
+    if raw or instance.preview_id is not None or not getattr(settings, 'PREVIEW_IN_BACKGROUND', True):
+        return
+    if not getattr(instance, KINDS[_KIND_OF[sender]][1]):
+        return
+    kind, pk = _KIND_OF[sender], instance.pk
+    transaction.on_commit(lambda: submit(kind, pk))
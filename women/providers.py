@@ -0,0 +1,176 @@
+"""Healthcare provider search for the telehealth page.
+
+Searches filter on indexed columns (specialization, fee, rating,
+availability) and page with keyset pagination, so a search costs one index
+range scan however many providers there are.
+
+Free-text queries over name and specialization can use an in-memory inverted
+index (``settings.PROVIDER_SEARCH_INDEX``). It is built once per process,
+kept current by the ``post_save``/``post_delete`` signals for saves made in
+that process, and rebuilt after ``PROVIDER_SEARCH_INDEX_TTL`` seconds to pick
+up changes from other workers. Without it, text queries fall back to
+``icontains`` lookups.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import HealthcareProvider
+from .pagination import keyset_page, split_page
+
+PAGE_SIZE = 20
+
+SORTS = {
+    'rating': ('-rating', 'id'),
+    'experience': ('-experience_years', 'id'),
+    'fee': ('consultation_fee', 'id'),
+}
+
+# Past this many matches an id__in list costs more than the LIKE scan.
+MAX_INDEX_CANDIDATES = 500
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+class ProviderIndex:
+    """Inverted index from name/specialization tokens to provider ids.
+
+    Query tokens match as prefixes, so "obst" finds "Obstetrics".
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._tokens = {}
+        self._sorted = []
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    def build(self):
+        postings, tokens = defaultdict(set), {}
+        rows = HealthcareProvider.objects.values_list('id', 'name', 'specialization')
+        for pk, name, specialization in rows.iterator(chunk_size=5000):
+            terms = frozenset(tokenize(name) + tokenize(specialization))
+            tokens[pk] = terms
+            for term in terms:
+                postings[term].add(pk)
+        with self._lock:
+            self._postings, self._tokens = postings, tokens
+            self._sorted = sorted(postings)
+            self.built_at = time.monotonic()
+
+    def update(self, provider):
+        terms = frozenset(tokenize(provider.name) + tokenize(provider.specialization))
+        with self._lock:
+            self._discard(provider.pk)
+            self._tokens[provider.pk] = terms
+            for term in terms:
+                if term not in self._postings:
+                    self._sorted.insert(bisect_left(self._sorted, term), term)
+                self._postings[term].add(provider.pk)
+
+    def remove(self, pk):
+        with self._lock:
+            self._discard(pk)
+
+    def _discard(self, pk):
+        for term in self._tokens.pop(pk, ()):
+            postings = self._postings[term]
+            postings.discard(pk)
+            if not postings:
+                del self._postings[term]
+                del self._sorted[bisect_left(self._sorted, term)]
+
+    def _prefix_matches(self, prefix):
+        matches = set()
+        start = bisect_left(self._sorted, prefix)
+        for term in self._sorted[start:]:
+            if not term.startswith(prefix):
+                break
+            matches |= self._postings[term]
+        return matches
+
+    def search(self, text):
+        """Ids of providers matching every token of ``text`` as a prefix."""
+        result = None
+        with self._lock:
+            for token in tokenize(text):
+                matches = self._prefix_matches(token)
+                result = matches if result is None else result & matches
+                if not result:
+                    break
+        return result or set()
+
+
+provider_index = ProviderIndex()
+
+
+def get_index():
+    """The process-wide index, (re)built if missing or stale; None if disabled."""
+    if not getattr(settings, 'PROVIDER_SEARCH_INDEX', False):
+        return None
+    ttl = getattr(settings, 'PROVIDER_SEARCH_INDEX_TTL', 300)
+    if provider_index.built_at is None or time.monotonic() - provider_index.built_at > ttl:
+        provider_index.build()
+    return provider_index
+
+
+def provider_saved(sender, instance, **kwargs):
+    if provider_index.built_at is not None:
+        provider_index.update(instance)
+
+
+def provider_deleted(sender, instance, **kwargs):
+    if provider_index.built_at is not None:
+        provider_index.remove(instance.pk)
+
+
+def search_providers(q='', specialization='', min_fee=None, max_fee=None, min_rating=None,
+                     available=None, sort='rating', cursor=None, size=PAGE_SIZE):
+    """Lazy queryset for one page (``size + 1`` rows) of matching providers.
+
+    Pass the evaluated rows to ``provider_page()``. Raises ``ValueError`` for
+    an unknown sort or a malformed cursor.
+    """
+    if sort not in SORTS:
+        raise ValueError('Unknown sort: %s' % sort)
+    providers = HealthcareProvider.objects.all()
+    if specialization:
+        providers = providers.filter(specialization=specialization)
+    if min_fee is not None:
+        providers = providers.filter(consultation_fee__gte=min_fee)
+    if max_fee is not None:
+        providers = providers.filter(consultation_fee__lte=max_fee)
+    if sort == 'fee':
+        providers = providers.filter(consultation_fee__isnull=False)
+    if min_rating is not None:
+        providers = providers.filter(rating__gte=min_rating)
+    if available is not None:
+        providers = providers.filter(availability=available)
+    if q:
+        providers = _text_filter(providers, q)
+    return keyset_page(providers, SORTS[sort], cursor, size)
+
+
+def _text_filter(providers, q):
+    index = get_index()
+    if index is not None:
+        ids = index.search(q)
+        if len(ids) <= MAX_INDEX_CANDIDATES:
+            return providers.filter(id__in=ids)
+    for token in tokenize(q):
+        providers = providers.filter(Q(name__icontains=token) | Q(specialization__icontains=token))
+    return providers
+
+
+def provider_page(rows, sort='rating', size=PAGE_SIZE):
+    """``(providers, next_cursor)`` from the rows of ``search_providers()``."""
+    return split_page(rows, SORTS[sort], size)
@@ -0,0 +1,171 @@
+"""Medication reminder dispatch.
+
+``dispatch_due()`` sends every active ``AIMedicationReminder`` whose
+``reminder_time`` falls in a time window (normally the last minute) and whose
+``start_date``/``end_date`` range covers the day. The ``dispatch_reminders``
+management command calls it once a minute.
+
+Due reminders are read in keyset batches over ``reminder_due_idx`` (a partial
+index on reminder_time, id for active reminders), so a minute with a million
+due reminders is a series of short index seeks rather than one huge result
+set. Each batch is claimed before it is handed to the channel by inserting
+``ReminderDispatch`` rows, unique on (reminder, send_date), stamped with the
+run's claim token. Only the rows read back with that token are sent. So when
+two dispatchers race for the same reminders, the losing insert is ignored and
+that dispatcher sends nothing. If the channel raises, the batch's claims are
+removed, the rest of the window is still sent and ``retry_from`` tells the
+caller where the next window has to start.
+
+Channels are classes with a ``send(notifications)`` method, selected with
+``settings.REMINDER_CHANNEL`` (``EmailChannel`` by default).
+``LocalOutboxChannel`` collects notifications in memory for tests.
+"""
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import AIMedicationReminder, ReminderDispatch
+from .sqlite import serialized_write
+
+# Reminders per batch. Kept under SQLite's 999 bound parameters per query.
+BATCH_SIZE = 500
+
+Notification = namedtuple('Notification', [
+    'key', 'reminder_id', 'user_id', 'email', 'medication_name', 'dosage', 'scheduled_for',
+])
+
+
+class LocalOutboxChannel:
+    """Keeps sent notifications in its ``outbox`` list."""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, notifications):
+        self.outbox.extend(notifications)
+
+
+class EmailChannel:
+    """Emails each reminder, one mail connection per batch."""
+
+    def send(self, notifications):
+        messages = [
+            EmailMessage(
+                subject='Medication reminder: %s' % n.medication_name,
+                body='Time to take %s (%s).' % (n.medication_name, n.dosage),
+                to=[n.email],
+            )
+            for n in notifications if n.email
+        ]
+        if messages:
+            get_connection().send_messages(messages)
+
+
+def get_channel():
+    return import_string(getattr(settings, 'REMINDER_CHANNEL', 'women.reminders.EmailChannel'))()
+
+
+def _windows(since, now):
+    """``(day, after, until)`` per calendar day in ``(since, now]``."""
+    day = since.date()
+    while day <= now.date():
+        after = since.time() if day == since.date() else None
+        until = now.time() if day == now.date() else None
+        yield day, after, until
+        day += timedelta(days=1)
+
+
+def _due(day, after, until, batch_size):
+    """Yield ``(reminder_time, rows)`` batches of reminders due in the window."""
+    reminders = AIMedicationReminder.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=day),
+        is_active=True,
+        start_date__lte=day,
+    )
+    window = reminders
+    if after is not None:
+        window = window.filter(reminder_time__gt=after)
+    if until is not None:
+        window = window.filter(reminder_time__lte=until)
+    times = window.order_by('reminder_time').values_list('reminder_time', flat=True).distinct()
+
+    # Seek on (reminder_time, id) one time at a time: an OR-ed keyset over
+    # the whole window makes SQLite rescan the window for every batch.
+    for reminder_time in list(times):
+        last = 0
+        while True:
+            rows = list(reminders.filter(reminder_time=reminder_time, id__gt=last).order_by('id').values_list(
+                'id', 'user_id', 'user__email', 'medication_name', 'dosage')[:batch_size])
+            if not rows:
+                break
+            yield reminder_time, rows
+            last = rows[-1][0]
+
+
+def _claim(day, rows, claim):
+    """Record dispatches of ``rows`` on ``day`` under ``claim``; return the rows this run won."""
+    with serialized_write():
+        ReminderDispatch.objects.bulk_create(
+            [ReminderDispatch(reminder_id=row[0], send_date=day, claim=claim) for row in rows],
+            ignore_conflicts=True,
+        )
+        won = set(ReminderDispatch.objects.filter(
+            send_date=day, claim=claim, reminder_id__in=[row[0] for row in rows],
+        ).values_list('reminder_id', flat=True))
+    return [row for row in rows if row[0] in won]
+
+
+def dispatch_due(now=None, since=None, channel=None, batch_size=BATCH_SIZE):
+    """Send the reminders due in ``(since, now]``, by default the last minute.
+
+    Returns a dict with the number of reminders ``due`` in the window, newly
+    ``sent``, ``skipped`` because they were already sent that day and
+    ``failed`` because the channel raised. ``retry_from`` is the time of the
+    earliest failed reminder, or None; a window starting just before it
+    sends the failed reminders again.
+    """
+    now = timezone.localtime(now).replace(tzinfo=None)
+    since = now - timedelta(minutes=1) if since is None else timezone.localtime(since).replace(tzinfo=None)
+    channel = channel or get_channel()
+    claim = uuid.uuid4().hex
+    stats = {'due': 0, 'sent': 0, 'skipped': 0, 'failed': 0, 'retry_from': None}
+
+    for day, after, until in _windows(since, now):
+        for reminder_time, rows in _due(day, after, until, batch_size):
+            claimed = _claim(day, rows, claim)
+            stats['due'] += len(rows)
+            stats['skipped'] += len(rows) - len(claimed)
+            if not claimed:
+                continue
+            scheduled_for = datetime.combine(day, reminder_time)
+            notifications = [
+                Notification('%d:%s' % (pk, day.isoformat()), pk, user_id, email, name, dosage, scheduled_for)
+                for pk, user_id, email, name, dosage in claimed
+            ]
+            try:
+                channel.send(notifications)
+            except Exception:
+                with serialized_write():
+                    ReminderDispatch.objects.filter(
+                        send_date=day, claim=claim, reminder_id__in=[n.reminder_id for n in notifications],
+                    ).delete()
+                stats['failed'] += len(claimed)
+                if stats['retry_from'] is None:
+                    stats['retry_from'] = timezone.make_aware(scheduled_for)
+                continue
+            stats['sent'] += len(claimed)
+    return stats
+
+
+def prune_dispatches(keep_days=7, today=None):
+    """Delete dispatch records older than ``keep_days``; return the count."""
+    today = today or timezone.localdate()
+    with serialized_write():
+        deleted, _ = ReminderDispatch.objects.filter(send_date__lt=today - timedelta(days=keep_days)).delete()
+    return deleted
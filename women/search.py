@@ -0,0 +1,420 @@
+"""Full-text search over accepted FAQ reports (``Notes``) and ``Magazines``.
+
+On SQLite each kind has an FTS5 table, created by migration 0011
+(``women_notes_search``, ``women_magazines_search``). Its rowid is the
+upload's id and its columns are the description and the text extracted
+from the uploaded file. Only accepted uploads are indexed. The
+``post_save``/``post_delete`` signals keep the tables current, so a status
+change in the admin pages adds a document to the index or removes it.
+
+Queries match every word as a prefix ("iro fol" finds "iron and folic
+acid"). FTS5 answers prefixes of up to three letters from its prefix
+indexes. A longer prefix would make it merge the postings of every word it
+starts, so ``Vocabulary``, the table's sorted terms with their document
+counts, expands it to the words themselves. The vocabulary is built
+once per process, gets new words from saves made in that process and is
+rebuilt in the background after ``SEARCH_VOCABULARY_TTL`` seconds.
+
+The built-in ``bm25()`` scores every document that matches, which takes
+about a millisecond per thousand matches. When the vocabulary says a query
+matches at most ``SEARCH_RANK_ALL`` documents, the best ``CANDIDATES`` by
+``bm25()`` are fetched (more for a later page). A query whose words are
+all in more documents than that gets the newest matches instead, and its
+results are marked ``partial``; the pages tell the reader to add a word.
+Either way the candidates are re-ranked here by BM25 over the start of
+the file text. Description hits weigh ``DESCRIPTION_WEIGHT`` times
+file-text hits, and word rarity comes from the vocabulary. Results carry
+the description and a snippet of the file text with matches wrapped in
+``<mark>``.
+
+Reading a file's text is slow, so it happens in the background. Accepting
+an upload indexes its description at once and queues a
+``PendingExtraction``. The queue is drained by a one-thread executor after
+the commit (``settings.SEARCH_EXTRACT_IN_BACKGROUND``) and by the
+``index_uploads`` command. On other database backends searches fall back to
+``icontains`` on the description.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .documents import extract_text
+from .models import Magazines, Notes, PendingExtraction
+from .sqlite import serialized_write
+
+PAGE_SIZE = 50
+MAX_TERMS = 8
+# Prefixes up to this long are served by the FTS5 prefix indexes.
+PREFIX_INDEX = 3
+MAX_EXPANSIONS = 30
+CANDIDATES = 300
+# Queries estimated to match more documents than this are not ranked by bm25().
+RANK_ALL = 20000
+# Only this much of the file text is scored and searched for a snippet.
+SCORE_CHARS = 5000
+DESCRIPTION_WEIGHT = 4.0
+K1, B = 1.2, 0.75
+SNIPPET_WORDS = 16
+EXTRACT_BATCH = 50
+
+Kind = namedtuple('Kind', ['model', 'table', 'file_field'])
+KINDS = {
+    'notes': Kind(Notes, 'women_notes_search', 'reportfile'),
+    'magazines': Kind(Magazines, 'women_magazines_search', 'magazinesfile'),
+}
+_KIND_OF = {kind.model: name for name, kind in KINDS.items()}
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def enabled(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def normalize(text):
+    """Lowercase ``text`` without diacritics, as the FTS5 tokenizer sees it."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def query_terms(query):
+    return list(dict.fromkeys(_WORD_RE.findall(normalize(query))))[:MAX_TERMS]
+
+
+class Vocabulary:
+    """Sorted terms of one FTS5 table and how many documents hold each."""
+
+    def __init__(self, table):
+        self.table = table
+        self._terms, self._counts = [], {}
+        self.documents = 0
+        self.built_at = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT term, doc FROM %s_vocab' % self.table)
+            counts = dict(cursor.fetchall())
+            cursor.execute('SELECT count(*) FROM %s' % self.table)
+            documents = cursor.fetchone()[0]
+        with self._lock:
+            self._terms, self._counts, self.documents = sorted(counts), counts, documents
+            self.built_at = time.monotonic()
+
+    def add(self, text):
+        """Count the words of a newly indexed text until the next build."""
+        with self._lock:
+            self.documents += 1
+            for term in set(_WORD_RE.findall(normalize(text))):
+                if term not in self._counts:
+                    self._terms.insert(bisect_left(self._terms, term), term)
+                    self._counts[term] = 0
+                self._counts[term] += 1
+
+    def _completions(self, prefix):
+        start = bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def expand(self, prefix):
+        """The known words starting with ``prefix``; None if too many."""
+        with self._lock:
+            words = []
+            for term in self._completions(prefix):
+                if len(words) == MAX_EXPANSIONS:
+                    return None
+                words.append(term)
+            return words
+
+    def frequency(self, prefix):
+        """Documents holding a word starting with ``prefix`` (at most)."""
+        with self._lock:
+            return min(self.documents, sum(self._counts[term] for term in self._completions(prefix)))
+
+
+_vocabularies = {name: Vocabulary(kind.table) for name, kind in KINDS.items()}
+
+
+def get_vocabulary(name):
+    """The process-wide vocabulary of ``name``, built on first use."""
+    vocabulary = _vocabularies[name]
+    if vocabulary.built_at is None:
+        vocabulary.build()
+    elif time.monotonic() - vocabulary.built_at > getattr(settings, 'SEARCH_VOCABULARY_TTL', 600):
+        # Keep serving the old one; stops the next search scheduling again.
+        vocabulary.built_at = time.monotonic()
+        _submit(vocabulary.build)
+    return vocabulary
+
+
+def match_expression(terms, vocabulary):
+    """FTS5 query matching every one of ``terms`` as a prefix."""
+    parts = []
+    for term in terms:
+        words = vocabulary.expand(term) if len(term) > PREFIX_INDEX else None
+        if words:
+            parts.append('(%s)' % ' OR '.join('"%s"' % word for word in words))
+        else:
+            parts.append('"%s"*' % term)
+    return ' AND '.join(parts)
+
+
+def term_pattern(terms):
+    """Regex for words starting with a term; group ``i + 1`` is ``terms[i]``."""
+    return re.compile(r'(?<!\w)(?:%s)\w*' % '|'.join('(%s)' % re.escape(term) for term in terms), re.I)
+
+
+def _count_hits(pattern, text, counts, weight=1.0):
+    for match in pattern.finditer(text):
+        counts[match.lastindex - 1] += weight
+
+
+class Results(list):
+    """Search results; ``partial`` when only the newest matches were ranked."""
+    partial = False
+
+
+def rank(terms, candidates, vocabulary):
+    """Ids of ``candidates`` (id, description, body, body length), best first."""
+    pattern = term_pattern(terms)
+    documents = max(vocabulary.documents, len(candidates))
+    idf = [math.log(1 + (documents - df + 0.5) / (df + 0.5)) for df in map(vocabulary.frequency, terms)]
+    scored = []
+    for pk, description, body, body_length in candidates:
+        counts = [0.0] * len(terms)
+        _count_hits(pattern, description, counts, DESCRIPTION_WEIGHT)
+        _count_hits(pattern, body, counts)
+        scored.append((pk, counts, DESCRIPTION_WEIGHT * len(description) + body_length))
+    average = sum(length for pk, counts, length in scored) / len(scored) or 1
+    ranked = []
+    for pk, counts, length in scored:
+        norm = K1 * (1 - B + B * length / average)
+        ranked.append((sum(weight * tf * (K1 + 1) / (tf + norm) for weight, tf in zip(idf, counts)), pk))
+    ranked.sort(reverse=True)
+    return [pk for score, pk in ranked]
+
+
+def highlight(pattern, text):
+    """``text`` escaped, with the matches of ``pattern`` in ``<mark>``."""
+    parts, end = [], 0
+    for match in pattern.finditer(text):
+        parts += [escape(text[end:match.start()]), '<mark>', escape(match.group()), '</mark>']
+        end = match.end()
+    parts.append(escape(text[end:]))
+    return mark_safe(''.join(parts))
+
+
+def snippet(pattern, text):
+    """About ``SNIPPET_WORDS`` words of ``text`` from just before its first match."""
+    match = pattern.search(text)
+    if match is None:
+        return ''
+    start = match.start()
+    before = text[max(0, start - 200):start].split()
+    if start > 200:
+        before = before[1:]  # may be cut off
+    lead = before[-(SNIPPET_WORDS // 4):]
+    rest = text[start:].split(None, SNIPPET_WORDS - len(lead))
+    shown = rest[:SNIPPET_WORDS - len(lead)]
+    cut_front = start > 200 or len(before) > len(lead)
+    cut_back = len(rest) > len(shown)
+    return mark_safe('…' * cut_front + highlight(pattern, ' '.join(lead + shown)) + '…' * cut_back)
+
+
+def index_document(instance):
+    """Add an accepted upload to its index, or drop anyone else's."""
+    name = _KIND_OF[type(instance)]
+    table = KINDS[name].table
+    with connection.cursor() as cursor:
+        if instance.status != 'Accept':
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % table, [instance.pk])
+            PendingExtraction.objects.filter(kind=name, object_id=instance.pk).delete()
+            return
+        cursor.execute('UPDATE %s SET description = %%s WHERE rowid = %%s' % table,
+                       [instance.description or '', instance.pk])
+        if cursor.rowcount:
+            return
+        cursor.execute('INSERT INTO %s (rowid, description, body) VALUES (%%s, %%s, %%s)' % table,
+                       [instance.pk, instance.description or '', ''])
+    if _vocabularies[name].built_at is not None:
+        _vocabularies[name].add(instance.description or '')
+    PendingExtraction.objects.get_or_create(kind=name, object_id=instance.pk)
+    if getattr(settings, 'SEARCH_EXTRACT_IN_BACKGROUND', False):
+        transaction.on_commit(schedule_extraction)
+
+
+def index_many(name, ids):
+    """``index_document()`` for uploads changed by a bulk ``update()``.
+
+    Call it in the updating transaction; bulk updates send no signals.
+    """
+    if not enabled() or not ids:
+        return
+    kind = KINDS[name]
+    accepted = dict(kind.model.objects.filter(id__in=ids, status='Accept').values_list('id', 'description'))
+    others = [pk for pk in ids if pk not in accepted]
+    with connection.cursor() as cursor:
+        if others:
+            cursor.execute('DELETE FROM %s WHERE rowid IN (%s)' % (kind.table, ', '.join(['%s'] * len(others))),
+                           others)
+            PendingExtraction.objects.filter(kind=name, object_id__in=others).delete()
+        if not accepted:
+            return
+        cursor.execute('SELECT rowid FROM %s WHERE rowid IN (%s)' % (kind.table, ', '.join(['%s'] * len(accepted))),
+                       list(accepted))
+        new = dict(accepted)
+        for (pk,) in cursor.fetchall():
+            del new[pk]
+        cursor.executemany('INSERT INTO %s (rowid, description, body) VALUES (%%s, %%s, %%s)' % kind.table,
+                           [(pk, description or '', '') for pk, description in new.items()])
+    if _vocabularies[name].built_at is not None:
+        for description in new.values():
+            _vocabularies[name].add(description or '')
+    PendingExtraction.objects.bulk_create([PendingExtraction(kind=name, object_id=pk) for pk in new],
+                                          ignore_conflicts=True)
+    if new and getattr(settings, 'SEARCH_EXTRACT_IN_BACKGROUND', False):
+        transaction.on_commit(schedule_extraction)
+
+
+def upload_saved(sender, instance, raw=False, **kwargs):
+    """``post_save`` handler for ``Notes`` and ``Magazines``."""
+    if raw or not enabled():
+        return
+    with serialized_write():
+        index_document(instance)
+
+
+def upload_deleted(sender, instance, **kwargs):
+    if not enabled():
+        return
+    name = _KIND_OF[sender]
+    with serialized_write():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % KINDS[name].table, [instance.pk])
+        PendingExtraction.objects.filter(kind=name, object_id=instance.pk).delete()
+
+
+def extract_pending(batch_size=EXTRACT_BATCH, limit=None):
+    """Fill in the file text of queued uploads; returns how many were done.
+
+    Files are read outside the write lock; each batch is then written in one
+    transaction.
+    """
+    done, last_id = 0, 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        batch = list(PendingExtraction.objects.filter(id__gt=last_id).order_by('id')[:size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        bodies = {}
+        for name, kind in KINDS.items():
+            ids = [item.object_id for item in batch if item.kind == name]
+            for upload in kind.model.objects.filter(id__in=ids, status='Accept'):
+                bodies[name, upload.pk] = extract_text(getattr(upload, kind.file_field))
+        with serialized_write():
+            with connection.cursor() as cursor:
+                for (name, pk), body in bodies.items():
+                    cursor.execute('UPDATE %s SET body = %%s WHERE rowid = %%s' % KINDS[name].table, [body, pk])
+            PendingExtraction.objects.filter(id__in=[item.id for item in batch]).delete()
+        for (name, pk), body in bodies.items():
+            if _vocabularies[name].built_at is not None:
+                _vocabularies[name].add(body)
+        done += len(batch)
+    return done
+
+
+def rebuild_index():
+    """Re-index every accepted upload and queue all their files again."""
+    with serialized_write():
+        with connection.cursor() as cursor:
+            for name, kind in KINDS.items():
+                source = kind.model._meta.db_table
+                cursor.execute('DELETE FROM %s' % kind.table)
+                cursor.execute(
+                    "INSERT INTO %s (rowid, description, body) SELECT id, COALESCE(description, ''), '' FROM %s "
+                    "WHERE status = 'Accept'" % (kind.table, source))
+                cursor.execute(
+                    "INSERT OR IGNORE INTO %s (kind, object_id) SELECT %%s, id FROM %s WHERE status = 'Accept'"
+                    % (PendingExtraction._meta.db_table, source), [name])
+    for vocabulary in _vocabularies.values():
+        vocabulary.built_at = None
+
+
+_executor = None
+
+
+def _in_background(fn):
+    try:
+        fn()
+    finally:
+        connection.close()
+
+
+def _submit(fn):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search')
+    return _executor.submit(_in_background, fn)
+
+
+def schedule_extraction():
+    """Drain the extraction queue on the background thread."""
+    return _submit(extract_pending)
+
+
+def search(kind, query, limit=PAGE_SIZE, offset=0):
+    """Accepted uploads of ``kind`` matching ``query``, best first.
+
+    Each result has ``highlight`` (the description) and ``snippet`` (a
+    passage of the file text, or '') with matches in ``<mark>``. The list's
+    ``partial`` is true when the query was too common to rank every match.
+    """
+    kind_ = KINDS[kind]
+    results = Results()
+    if not enabled():
+        results += (kind_.model.objects.filter(status='Accept', description__icontains=query.strip())
+                    .select_related('user', 'preview').order_by('-id')[offset:offset + limit])
+        for upload in results:
+            upload.highlight, upload.snippet = escape(upload.description or ''), ''
+        return results
+    terms = query_terms(query)
+    if not terms:
+        return results
+    vocabulary = get_vocabulary(kind)
+    # The rarest word bounds how many documents match.
+    results.partial = min(map(vocabulary.frequency, terms)) > getattr(settings, 'SEARCH_RANK_ALL', RANK_ALL)
+    # With partial results FTS5 walks the matches by rowid and stops early.
+    order = 'rowid DESC' if results.partial else 'bm25({t}, %r, 1.0)' % DESCRIPTION_WEIGHT
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ('SELECT rowid, description, substr(body, 1, %s), length(body) FROM {t} WHERE {t} MATCH %s '
+             'ORDER BY ' + order + ' LIMIT %s').format(t=kind_.table),
+            [SCORE_CHARS, match_expression(terms, vocabulary), max(CANDIDATES, offset + limit)])
+        candidates = cursor.fetchall()
+    if not candidates:
+        return results
+    page = rank(terms, candidates, vocabulary)[offset:offset + limit]
+    uploads = kind_.model.objects.select_related('user', 'preview').in_bulk(page)
+    texts = {pk: (description, body) for pk, description, body, length in candidates}
+    pattern = term_pattern(terms)
+    for pk in page:
+        upload = uploads.get(pk)
+        if upload is None or upload.status != 'Accept':
+            continue
+        description, body = texts[pk]
+        upload.highlight, upload.snippet = highlight(pattern, description), snippet(pattern, body)
+        results.append(upload)
+    return results
@@ -0,0 +1,96 @@
+from rest_framework import serializers
+
+from women.models import (AIMedicationReminder, BabyProfile, GrowthRecord, MEWS_Assessment, MenstrualCycle,
+                          NutritionalPlan, PregnancyProfile, VaccinationRecord)
+
+
+class SparseSerializer(serializers.ModelSerializer):
+    """ModelSerializer taking ``fields`` and ``expand`` keyword arguments.
+
+    ``fields`` keeps only the named fields. ``expand`` adds related objects
+    from ``expandable``, a map of name to ``(serializer class, source, many)``;
+    the view loads them with ``select_related``/``prefetch_related``.
+    """
+    expandable = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            serializer_class, source, many = self.expandable[name]
+            source = {'source': source} if source != name else {}
+            self.fields[name] = serializer_class(many=many, read_only=True, **source)
+        if fields:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+class MenstrualCycleSerializer(SparseSerializer):
+    class Meta:
+        model = MenstrualCycle
+        fields = ['id', 'period_start_date', 'period_end_date', 'cycle_length', 'flow_intensity', 'symptoms',
+                  'next_period_date', 'fertile_window_start', 'fertile_window_end']
+
+
+class NutritionalPlanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NutritionalPlan
+        exclude = ['pregnancy_profile']
+
+
+class PregnancyProfileSerializer(SparseSerializer):
+    expandable = {'nutritional_plans': (NutritionalPlanSerializer, 'nutritionalplan_set', True)}
+
+    class Meta:
+        model = PregnancyProfile
+        fields = ['id', 'last_menstrual_period', 'due_date', 'current_trimester', 'is_high_risk',
+                  'current_week', 'days_remaining']
+
+
+class MEWSAssessmentSerializer(SparseSerializer):
+    class Meta:
+        model = MEWS_Assessment
+        fields = ['id', 'assessment_date', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'respiratory_rate',
+                  'temperature', 'oxygen_saturation', 'consciousness_level', 'urine_output',
+                  'mews_score', 'risk_level']
+
+
+class BabySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BabyProfile
+        fields = ['id', 'name', 'birth_date', 'sex']
+
+
+class GrowthRecordSerializer(SparseSerializer):
+    expandable = {'baby': (BabySerializer, 'baby', False)}
+
+    class Meta:
+        model = GrowthRecord
+        fields = ['id', 'baby_id', 'record_date', 'weight', 'length', 'head_circumference', 'milestones', 'notes']
+
+
+class VaccinationRecordSerializer(SparseSerializer):
+    expandable = {'baby': (BabySerializer, 'baby', False)}
+
+    class Meta:
+        model = VaccinationRecord
+        fields = ['id', 'baby_id', 'vaccine_name', 'due_date', 'administered_date', 'administered_by',
+                  'batch_number', 'next_due_date', 'notes', 'is_overdue']
+
+
+class BabyProfileSerializer(SparseSerializer):
+    expandable = {
+        'growth_records': (GrowthRecordSerializer, 'growthrecord_set', True),
+        'vaccinations': (VaccinationRecordSerializer, 'vaccinationrecord_set', True),
+    }
+
+    class Meta:
+        model = BabyProfile
+        fields = ['id', 'name', 'birth_date', 'sex', 'birth_weight', 'birth_length', 'apgar_score',
+                  'complications', 'age_in_months']
+
+
+class MedicationReminderSerializer(SparseSerializer):
+    class Meta:
+        model = AIMedicationReminder
+        fields = ['id', 'medication_name', 'dosage', 'frequency', 'reminder_time', 'is_active', 'start_date',
+                  'end_date']
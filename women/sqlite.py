@@ -0,0 +1,149 @@
+"""SQLite deployment mode for the embedded ``db.sqlite3`` database.
+
+Every new SQLite connection gets the PRAGMAs from ``settings.SQLITE_PRAGMAS``
+(WAL journal, relaxed fsync, busy timeout) so readers never wait on writers.
+SQLite still allows only one writer at a time, so writes are funnelled through
+``serialized_write()``: a per-process lock plus an advisory file lock next to
+the database file, which lines up writers from every gunicorn worker instead
+of letting them race for the database lock and fail with "database is locked".
+``write_queue`` runs callables on a dedicated writer thread for code that
+would rather hand a write off than wait for the lock itself.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+}
+
+_process_lock = threading.RLock()
+_local = threading.local()
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` handler applying the SQLite PRAGMAs."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    for name, value in pragmas.items():
+        connection.connection.execute('PRAGMA %s = %s' % (name, value))
+
+
+def lock_path(using='default'):
+    """Path of the advisory writer lock, or None for in-memory databases."""
+    name = str(connections[using].settings_dict['NAME'])
+    if name == ':memory:' or 'mode=memory' in name:
+        return None
+    return name + '-writer.lock'
+
+
+def _serialize(using):
+    connection = connections[using]
+    return connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_SERIALIZE_WRITES', True)
+
+
+@contextmanager
+def _writer_lock(using):
+    depth = getattr(_local, 'depth', 0)
+    if depth:
+        # Already the writer in this thread; nested blocks just run.
+        _local.depth = depth + 1
+        try:
+            yield
+        finally:
+            _local.depth -= 1
+        return
+
+    path = lock_path(using)
+    with _process_lock:
+        handle = None
+        if fcntl is not None and path is not None:
+            handle = open(path, 'a')
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        _local.depth = 1
+        try:
+            yield
+        finally:
+            _local.depth = 0
+            if handle is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+
+
+@contextmanager
+def serialized_write(using='default'):
+    """Run the enclosed writes as one transaction by the single writer.
+
+    On other database vendors, or with ``SQLITE_SERIALIZE_WRITES`` off, this
+    is a plain ``transaction.atomic()``.
+    """
+    if not _serialize(using):
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _writer_lock(using), transaction.atomic(using=using):
+        yield
+
+
+class WriteQueue:
+    """FIFO of write callables executed one by one on a writer thread.
+
+    ``submit()`` returns a ``concurrent.futures.Future`` with the callable's
+    result. Each callable runs inside ``serialized_write()``, so the queue
+    also cooperates with writers in other processes.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Submit ``fn`` and block until the writer has executed it."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with serialized_write(self.using):
+                    result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                if self._queue.empty():
+                    connections[self.using].close()
+
+
+write_queue = WriteQueue()
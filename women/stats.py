@@ -0,0 +1,122 @@
+"""Page statistics for the postpartum, pelvic floor and menstrual pages.
+
+Each function issues a fixed number of queries, however much history the
+user has. Counts and averages are computed by the database with one
+``aggregate()`` call, and only the latest ``RECENT`` rows are loaded, with
+just the columns the pages display.
+
+The weekly pelvic floor curves are each one grouped query over
+``TruncWeek`` of the date column, returned column-wise (one list per
+series) for the chart endpoints.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Avg, Count, F, Max, Sum
+from django.db.models.functions import TruncWeek
+
+from .models import ExerciseProgress, MenstrualCycle, MentalHealthCheck, MentalHealthTrend, PelvicFloorRehab
+
+RECENT = 10
+
+CHECK_COLUMNS = ('check_date', 'mood_score', 'anxiety_level', 'sleep_hours', 'appetite_level', 'notes')
+REHAB_COLUMNS = ('assessment_date', 'muscle_strength', 'endurance_level', 'exercises_prescribed',
+                 'progress_notes')
+EXERCISE_COLUMNS = ('exercise_name', 'sets', 'repetitions', 'duration_minutes', 'difficulty_level',
+                    'completion_date')
+CYCLE_COLUMNS = ('period_start_date', 'period_end_date', 'cycle_length', 'flow_intensity', 'symptoms')
+
+
+def recovery_score(rehab):
+    """Pelvic floor recovery (0-100) from an assessment's strength and endurance."""
+    if rehab is None:
+        return None
+    return round(100 * (rehab.muscle_strength + rehab.endurance_level) / 10)
+
+
+def postpartum_summary(profile, recent=RECENT):
+    """Stats and recent rows for ``postpartum_care``: five queries."""
+    checks = MentalHealthCheck.objects.filter(postpartum_profile=profile)
+    rehab = PelvicFloorRehab.objects.filter(postpartum_profile=profile)
+    counts = checks.aggregate(total_checkins=Count('id'), average_mood=Avg('mood_score'))
+    recent_checks = list(checks.only(*CHECK_COLUMNS).order_by('-check_date', '-id')[:recent])
+    recent_rehab = list(rehab.only(*REHAB_COLUMNS).order_by('-assessment_date', '-id')[:recent])
+    trend = MentalHealthTrend.objects.filter(postpartum_profile=profile).only('window', 'window_total').first()
+    return {
+        'total_checkins': counts['total_checkins'],
+        'average_mood': counts['average_mood'],
+        'rehab_sessions': rehab.count(),
+        'recovery_score': recovery_score(recent_rehab[0] if recent_rehab else None),
+        'mental_health_score': trend.score if trend else None,
+        'recent_checks': recent_checks,
+        'recent_rehab': recent_rehab,
+    }
+
+
+def pelvic_floor_summary(profile, recent=RECENT):
+    """Stats and recent rows for ``pelvic_floor_rehab``: three queries."""
+    rehab = PelvicFloorRehab.objects.filter(postpartum_profile=profile)
+    exercises = ExerciseProgress.objects.filter(rehab__postpartum_profile=profile)
+    recent_rehab = list(rehab.only(*REHAB_COLUMNS).order_by('-assessment_date', '-id')[:recent])
+    totals = exercises.aggregate(
+        exercise_sessions=Count('id'),
+        exercise_minutes=Sum('duration_minutes'),
+        last_exercise_date=Max('completion_date'),
+    )
+    recent_exercises = list(exercises.only(*EXERCISE_COLUMNS).order_by('-completion_date', '-id')[:recent])
+    return dict(
+        totals,
+        exercise_minutes=totals['exercise_minutes'] or 0,
+        recovery_score=recovery_score(recent_rehab[0] if recent_rehab else None),
+        recent_rehab=recent_rehab,
+        recent_exercises=recent_exercises,
+    )
+
+
+def menstrual_summary(user, recent=RECENT):
+    """Stats and recent cycles for ``menstrual_tracking``: two queries."""
+    cycles = MenstrualCycle.objects.filter(user=user)
+    totals = cycles.aggregate(total_cycles=Count('id'), average_cycle=Avg('cycle_length'))
+    return {
+        'total_cycles': totals['total_cycles'],
+        'average_cycle': round(totals['average_cycle']) if totals['average_cycle'] is not None else None,
+        'recent_cycles': list(cycles.only(*CYCLE_COLUMNS).order_by('-period_start_date', '-id')[:recent]),
+    }
+
+
+def _columns(rows, names):
+    """``values()`` rows as ``{name: [value, ...]}``, one list per column."""
+    return {name: [row[name] for row in rows] for name in names}
+
+
+def _since(weeks):
+    return date.today() - timedelta(weeks=weeks) if weeks else None
+
+
+def weekly_strength(profile, weeks=None):
+    """Per-week average strength and endurance of the pelvic floor assessments."""
+    rehab = PelvicFloorRehab.objects.filter(postpartum_profile=profile)
+    if weeks:
+        rehab = rehab.filter(assessment_date__gte=_since(weeks))
+    rows = list(rehab.annotate(week=TruncWeek('assessment_date')).values('week').annotate(
+        strength=Avg('muscle_strength'),
+        endurance=Avg('endurance_level'),
+        assessments=Count('id'),
+    ).order_by('week'))
+    for row in rows:
+        row['strength'] = round(row['strength'], 2)
+        row['endurance'] = round(row['endurance'], 2)
+    return _columns(rows, ('week', 'strength', 'endurance', 'assessments'))
+
+
+def weekly_workload(profile, weeks=None):
+    """Per-week exercise sessions, sets, repetitions (sets x reps) and minutes."""
+    exercises = ExerciseProgress.objects.filter(rehab__postpartum_profile=profile)
+    if weeks:
+        exercises = exercises.filter(completion_date__gte=_since(weeks))
+    rows = exercises.annotate(week=TruncWeek('completion_date')).values('week').annotate(
+        sessions=Count('id'),
+        total_sets=Sum('sets'),
+        total_reps=Sum(F('sets') * F('repetitions')),
+        total_minutes=Sum('duration_minutes'),
+    ).order_by('week')
+    return _columns(list(rows), ('week', 'sessions', 'total_sets', 'total_reps', 'total_minutes'))
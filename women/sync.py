@@ -0,0 +1,223 @@
+"""Offline-first batch sync of cycles, MEWS readings, babies and growth records.
+
+A mobile client logs records offline and syncs them in one request to
+``POST /api/sync/``. The body is JSON, gzipped when the client sends
+``Content-Encoding: gzip``::
+
+    {"token": "<token from the last sync, or null>",
+     "changes": {"cycles": [{"client_id": "<uuid>", "period_start_date": "2026-10-01", ...}],
+                 "mews": [...],
+                 "babies": [{"client_id": "<uuid>", "postpartum_profile_id": 2, "sex": "F", ...}],
+                 "growth": [{"client_id": "<uuid>", "baby_id": 3, ...}]}}
+
+Uploaded records are full records keyed by ``client_id``. Records the server
+has not seen are inserted with ``bulk_create``, known ones are overwritten
+with one prepared UPDATE run over all of them, and the whole batch runs in
+one transaction. Any invalid record rejects the whole batch.
+
+The response lists each kind's records changed since ``token``, oldest
+first, read through the ``(owner, updated_at)`` indexes. There are at most
+``PAGE_SIZE`` per kind; ``more`` is true while a kind has further pages.
+The new token carries, per kind, the ``(updated_at, id)`` of the last
+record sent. Changes younger than ``SETTLE`` are held back to the next sync,
+so a write stamped earlier but committed later is not skipped. Deletions
+are not synced.
+"""
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.utils import timezone
+
+from .models import BabyProfile, GrowthRecord, MEWS_Assessment, MenstrualCycle, PostpartumProfile
+from .sqlite import serialized_write
+
+PAGE_SIZE = 2000
+SETTLE = timedelta(seconds=5)
+MAX_BATCH_BYTES = 32 * 2 ** 20
+LOOKUP_CHUNK = 500
+TOKEN_SALT = 'women.sync'
+
+Kind = namedtuple('Kind', ['model', 'owner', 'fields'])
+
+KINDS = {
+    'cycles': Kind(MenstrualCycle, 'user_id', ('period_start_date', 'period_end_date', 'cycle_length',
+                                               'flow_intensity', 'symptoms')),
+    'mews': Kind(MEWS_Assessment, 'user_id', ('assessment_date', 'systolic_bp', 'diastolic_bp', 'heart_rate',
+                                              'respiratory_rate', 'temperature', 'oxygen_saturation',
+                                              'consciousness_level', 'urine_output')),
+    'babies': Kind(BabyProfile, 'postpartum_profile_id', ('postpartum_profile_id', 'name', 'birth_date', 'sex',
+                                                          'birth_weight', 'birth_length', 'apgar_score',
+                                                          'complications')),
+    'growth': Kind(GrowthRecord, 'baby_id', ('baby_id', 'record_date', 'weight', 'length', 'head_circumference',
+                                             'milestones', 'notes')),
+}
+
+
+class SyncError(Exception):
+    """A batch or token that cannot be used; ``errors`` lists why."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def read_batch(body, content_encoding=''):
+    """The batch dict from a request body."""
+    if content_encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_BATCH_BYTES)
+        except zlib.error:
+            raise SyncError(['body is not valid gzip'])
+        if decompressor.unconsumed_tail:
+            raise SyncError(['batch is larger than %d bytes' % MAX_BATCH_BYTES])
+    try:
+        batch = json.loads(body)
+    except ValueError:
+        raise SyncError(['body is not valid JSON'])
+    if not isinstance(batch, dict) or not isinstance(batch.get('changes') or {}, dict):
+        raise SyncError(['body must be an object with "token" and "changes"'])
+    # Reject a bad token before anything is applied.
+    read_token(batch.get('token'))
+    return batch
+
+
+def make_token(marks):
+    return signing.dumps(marks, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token):
+    """``{kind: (updated_at, id)}`` from a token; empty for the first sync."""
+    if not token:
+        return {}
+    try:
+        marks = signing.loads(token, salt=TOKEN_SALT)
+        return {name: (datetime.fromisoformat(at), last_id) for name, (at, last_id) in marks.items()}
+    except (signing.BadSignature, ValueError, TypeError, AttributeError):
+        raise SyncError(['invalid sync token'])
+
+
+def _owners(kind, user):
+    """Values of ``kind.owner`` on the user's records."""
+    if kind.owner == 'baby_id':
+        return set(BabyProfile.objects.filter(postpartum_profile__user=user).values_list('id', flat=True))
+    if kind.owner == 'postpartum_profile_id':
+        return set(PostpartumProfile.objects.filter(user=user).values_list('id', flat=True))
+    return {user.id}
+
+
+def _clean(kind, name, index, record, errors):
+    """Model values of one uploaded record, or None if it is invalid."""
+    if not isinstance(record, dict):
+        errors.append('%s[%d]: not an object' % (name, index))
+        return None
+    values, valid = {}, True
+    for field_name in ('client_id',) + kind.fields:
+        field = kind.model._meta.get_field(field_name)
+        raw = record.get(field_name)
+        if raw is None and field_name != 'client_id':
+            raw = field.get_default() if field.has_default() else ('' if field.blank else None)
+        try:
+            value = field.to_python(raw)
+            if not field.is_relation:
+                field.validate(value, None)
+                field.run_validators(value)
+        except ValidationError as error:
+            errors.append('%s[%d].%s: %s' % (name, index, field_name, ' '.join(error.messages)))
+            valid = False
+            continue
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values[field_name] = value
+    return values if valid else None
+
+
+def apply_changes(user, changes):
+    """Upsert an uploaded batch; ``{kind: {'created': n, 'updated': n}}``."""
+    unknown = set(changes) - set(KINDS)
+    if unknown:
+        raise SyncError(['unknown kinds: %s' % ', '.join(sorted(unknown))])
+    errors, cleaned, owners = [], {}, {}
+    for name, records in changes.items():
+        kind = KINDS[name]
+        if not isinstance(records, list):
+            errors.append('%s: must be a list' % name)
+            continue
+        owners[name] = _owners(kind, user)
+        cleaned[name] = []
+        for index, record in enumerate(records):
+            values = _clean(kind, name, index, record, errors)
+            if values and kind.owner in kind.fields and values[kind.owner] not in owners[name]:
+                errors.append('%s[%d].%s: not one of yours' % (name, index, kind.owner))
+            cleaned[name].append(values)
+    if errors:
+        raise SyncError(errors)
+
+    applied = {}
+    with serialized_write():
+        now = timezone.now()
+        for name, records in cleaned.items():
+            kind = KINDS[name]
+            by_client = {values['client_id']: values for values in records}
+            ids, existing = list(by_client), {}
+            for start in range(0, len(ids), LOOKUP_CHUNK):
+                rows = kind.model.objects.filter(client_id__in=ids[start:start + LOOKUP_CHUNK])
+                for client_id, pk, owner in rows.values_list('client_id', 'id', kind.owner):
+                    if owner not in owners[name]:
+                        raise SyncError(['%s: client_id %s belongs to another account' % (name, client_id)])
+                    existing[client_id] = pk
+            owner = {} if kind.owner in kind.fields else {kind.owner: user.id}
+            kind.model.objects.bulk_create(
+                [kind.model(**values, **owner) for client_id, values in by_client.items()
+                 if client_id not in existing],
+                batch_size=LOOKUP_CHUNK)
+            updates = [kind.model(id=existing[client_id], updated_at=now, **values)
+                       for client_id, values in by_client.items() if client_id in existing]
+            _update_rows(kind.model, updates, kind.fields + ('updated_at',))
+            applied[name] = {'created': len(by_client) - len(updates), 'updated': len(updates)}
+    return applied
+
+
+def _update_rows(model, objs, field_names):
+    """Write ``field_names`` of ``objs`` with one ``UPDATE ... WHERE id`` per row.
+
+    The statement is prepared once and run with ``executemany()``.
+    ``bulk_update()`` instead builds a CASE over the whole batch for every
+    field, which SQLite evaluates row by row: 10k updates took ~18s.
+    """
+    if not objs:
+        return
+    connection = connections['default']
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in field_names]
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        quote(model._meta.db_table), ', '.join('%s = %%s' % quote(field.column) for field in fields),
+        quote(model._meta.pk.column))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields]
+                                 + [obj.pk] for obj in objs])
+
+
+def changes_since(user, token, now=None, page_size=PAGE_SIZE):
+    """``{'token', 'more', 'changes': {kind: [record, ...]}}`` after ``token``."""
+    marks = read_token(token)
+    until = (now or timezone.now()) - SETTLE
+    changes, more = {}, False
+    for name, kind in KINDS.items():
+        rows = kind.model.objects.filter(**{kind.owner + '__in': _owners(kind, user)}, updated_at__lt=until)
+        if name in marks:
+            at, last_id = marks[name]
+            rows = rows.filter(updated_at__gte=at).exclude(updated_at=at, id__lte=last_id)
+        rows = list(rows.order_by('updated_at', 'id').values('id', 'client_id', 'updated_at', *kind.fields)
+                    [:page_size])
+        changes[name] = rows
+        if rows:
+            marks[name] = (rows[-1]['updated_at'], rows[-1]['id'])
+        more = more or len(rows) == page_size
+    token = make_token({name: (at.isoformat(), last_id) for name, (at, last_id) in marks.items()})
+    return {'token': token, 'more': more, 'changes': changes}
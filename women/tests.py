@@ -1,3 +1,1467 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models.signals import pre_save
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+import gzip
+import importlib
+import shutil
+import tempfile
+import threading
+import json
+import os
+import tracemalloc
+import unittest
+import uuid
+import zlib
+from time import monotonic
 
-# Create your tests here.
+import numpy as np
+
+from .models import *
+from .sqlite import _local as writer_state, serialized_write, write_queue
+from .concurrency import _evaluate, batch_querysets, gather_querysets
+from .providers import ProviderIndex, provider_page, search_providers
+from .booking import ProviderSchedule, SlotUnavailable, book_appointment, cancel_appointment
+from .views import _gather, _load, emergency_services_async
+from .reminders import LocalOutboxChannel, _claim, dispatch_due
+from .mental_health import DECLINING, LOW, STEADY, backfill_trends
+from .sync import SETTLE, SyncError, apply_changes, changes_since
+from .stats import menstrual_summary, pelvic_floor_summary, postpartum_summary, weekly_strength, weekly_workload
+from .growth import faltering, percentiles, score_records, zscores
+from .assistant import (CONTEXT_MESSAGES, SUMMARY_CHARS, SUMMARY_STEP, append_message, context_window,
+                        recent_messages, reply, start_conversation)
+from .answer_cache import AnswerCache, get_cache, terms
+from .insights import generate_insights, mews_scores
+from .documents import pdf_text
+from .search import (CANDIDATES, _vocabularies, extract_pending, index_many, query_terms, search, snippet,
+                     term_pattern)
+from .moderation import claim, queue_depth, transition, upload_list, upload_page
+from .previews import Image, generate, generate_pending, thumbnail_path
+from .triage import NO_MATCH_ADVICE, TriageEngine, triage
+from .vaccinations import SCHEDULES, add_months, generate_schedule, overdue, overdue_chunks
+
+
+class SQLiteDeploymentTests(TestCase):
+    def test_pragmas_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_serialized_write_is_atomic(self):
+        user = User.objects.create_user(username='wal@example.com', password='pwd')
+        with self.assertRaises(ValueError):
+            with serialized_write():
+                EmergencyContact.objects.create(user=user, name='A', relationship='sister', phone_number='1')
+                with serialized_write():
+                    EmergencyContact.objects.create(user=user, name='B', relationship='friend', phone_number='2')
+                raise ValueError
+        self.assertFalse(EmergencyContact.objects.exists())
+
+    def test_page_writes_hold_the_writer_lock(self):
+        saves = []
+
+        def record(sender, **kwargs):
+            saves.append((sender.__name__, getattr(writer_state, 'depth', 0)))
+        pre_save.connect(record)
+        self.addCleanup(pre_save.disconnect, record)
+        self.client.post('/signup/', {'fname': 'Asha', 'lname': 'Rao', 'contact': '1', 'email': 'asha@example.com',
+                                      'pwd': 'pwd', 'role': 'patient'})
+        self.client.force_login(User.objects.get(username='asha@example.com'))
+        self.client.post('/pregnancy-profile/', {'last_menstrual_period': '2026-05-01'})
+        self.assertIn(('Signup', 1), saves)
+        self.assertIn(('PregnancyProfile', 1), saves)
+
+    def test_write_queue_runs_in_submission_order(self):
+        calls = []
+        futures = [write_queue.submit(calls.append, i) for i in range(5)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(calls, list(range(5)))
+
+
+class ConcurrentQueryTests(TransactionTestCase):
+    # Transactional: the querysets are read on other threads' connections.
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='async@example.com', password='pwd')
+        EmergencyContact.objects.create(user=self.user, name='Asha', relationship='sister', phone_number='1')
+        SOS_Alert.objects.create(user=self.user, alert_type='medical', message='Help')
+
+    def get(self, view, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = {}
+        return async_to_sync(view)(request)
+
+    def test_gather_querysets_evaluates_each_queryset(self):
+        results = async_to_sync(gather_querysets)(
+            contacts=EmergencyContact.objects.filter(user=self.user),
+            alerts=SOS_Alert.objects.filter(user=self.user),
+        )
+        self.assertEqual([c.name for c in results['contacts']], ['Asha'])
+        self.assertEqual(len(results['alerts']), 1)
+
+    def test_batch_querysets_evaluates_each_queryset(self):
+        results = batch_querysets(
+            contacts=EmergencyContact.objects.filter(user=self.user),
+            alerts=SOS_Alert.objects.filter(user=self.user),
+        )
+        self.assertEqual([c.name for c in results['contacts']], ['Asha'])
+        self.assertEqual(len(results['alerts']), 1)
+
+    def test_query_threads_keep_their_connections(self):
+        seen = {}
+
+        def run():
+            seen['rows'] = _evaluate(EmergencyContact.objects.filter(user=self.user))
+            seen['close_at'] = connections['default'].close_at
+            connections['default'].close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(seen['rows']), 1)
+        # Kept for QUERY_BATCH_CONN_MAX_AGE rather than closed at once (CONN_MAX_AGE = 0).
+        self.assertGreater(seen['close_at'], monotonic() + 30)
+
+    def test_batch_querysets_sees_uncommitted_rows_in_atomic_block(self):
+        with transaction.atomic():
+            EmergencyContact.objects.create(user=self.user, name='Ravi', relationship='partner', phone_number='2')
+            results = batch_querysets(
+                contacts=EmergencyContact.objects.filter(user=self.user),
+                alerts=SOS_Alert.objects.filter(user=self.user),
+            )
+        self.assertEqual(len(results['contacts']), 2)
+
+    def test_sync_and_async_pages_fall_back_alike(self):
+        querysets = {'contacts': EmergencyContact.objects.filter(user=self.user),
+                     'broken': SOS_Alert.objects.extra(where=['no_such_column = 1'])}
+        self.assertEqual(_load(querysets), {'contacts': [], 'broken': []})
+        self.assertEqual(async_to_sync(_gather)(querysets), {'contacts': [], 'broken': []})
+
+    def test_gather_querysets_sees_uncommitted_rows_in_atomic_block(self):
+        with transaction.atomic():
+            EmergencyContact.objects.create(user=self.user, name='Ravi', relationship='partner', phone_number='2')
+            results = async_to_sync(gather_querysets)(
+                contacts=EmergencyContact.objects.filter(user=self.user),
+                alerts=SOS_Alert.objects.filter(user=self.user),
+            )
+        self.assertEqual(len(results['contacts']), 2)
+
+    def test_emergency_services_async_renders(self):
+        response = self.get(emergency_services_async, self.user)
+        self.assertEqual(response.status_code, 200)
+
+    def test_async_view_requires_login(self):
+        response = self.get(emergency_services_async, AnonymousUser())
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response.url)
+
+
+class ProviderSearchTests(TestCase):
+    def setUp(self):
+        for i in range(7):
+            HealthcareProvider.objects.create(
+                name='Obst %d' % i, specialization='Obstetrics', experience_years=i,
+                rating='4.%d' % i, consultation_fee=50 + i * 10, availability=i % 2 == 0)
+        HealthcareProvider.objects.create(name='Lee Ann', specialization='Lactation Consultant',
+                                          experience_years=3, rating='4.9')
+
+    def page(self, **params):
+        return provider_page(search_providers(size=3, **params), params.get('sort', 'rating'), size=3)
+
+    def test_filters_and_sort(self):
+        providers, _ = self.page(specialization='Obstetrics', min_fee=70, max_fee=100, available=True)
+        self.assertEqual([p.name for p in providers], ['Obst 4', 'Obst 2'])
+
+    def test_keyset_pages_cover_all_rows_once(self):
+        seen, cursor = [], None
+        while True:
+            providers, cursor = self.page(sort='fee', cursor=cursor)
+            seen += [p.name for p in providers]
+            if not cursor:
+                break
+        self.assertEqual(seen, ['Obst %d' % i for i in range(7)])
+
+    def test_bad_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.page(cursor='not-a-cursor')
+
+    def test_text_search_without_index(self):
+        providers, _ = self.page(q='lact')
+        self.assertEqual([p.name for p in providers], ['Lee Ann'])
+
+    def test_inverted_index_prefix_match_and_incremental_update(self):
+        index = ProviderIndex()
+        index.build()
+        lee = HealthcareProvider.objects.get(name='Lee Ann')
+        self.assertEqual(index.search('lact cons'), {lee.pk})
+        lee.name = 'Leena Rao'
+        index.update(lee)
+        self.assertEqual(index.search('rao'), {lee.pk})
+        self.assertEqual(index.search('ann'), set())
+        index.remove(lee.pk)
+        self.assertEqual(index.search('lactation'), set())
+
+    def test_telehealth_page(self):
+        user = User.objects.create_user(username='tele@example.com', password='pwd')
+        self.client.force_login(user)
+        response = self.client.get('/telehealth/', {'q': 'obst', 'sort': 'experience'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['providers']), 7)
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient@example.com', password='pwd')
+        self.provider = HealthcareProvider.objects.create(name='Rao', specialization='Obstetrics', experience_years=9)
+        self.day = date.today() + timedelta(days=1)
+
+    def test_same_slot_cannot_be_booked_twice(self):
+        book_appointment(self.patient, self.provider, self.day, time(10, 0))
+        with self.assertRaises(SlotUnavailable):
+            book_appointment(self.patient, self.provider, self.day, time(10, 0))
+
+    def test_migration_gives_older_bookings_their_slots(self):
+        backfill = importlib.import_module('women.migrations.0019_backfill_appointment_slots')
+        legacy = dict(patient=self.patient, provider=self.provider, appointment_date=self.day,
+                      consultation_type='video')
+        TelehealthAppointment.objects.create(appointment_time=time(10, 0), duration_minutes=60, **legacy)
+        TelehealthAppointment.objects.create(appointment_time=time(10, 30), **legacy)
+        TelehealthAppointment.objects.create(appointment_time=time(14, 10), **legacy)
+        TelehealthAppointment.objects.create(appointment_time=time(15, 0), status='cancelled', **legacy)
+        backfill.fill_slots(django_apps, None)
+        self.assertEqual(sorted(AppointmentSlot.objects.values_list('slot_time', flat=True)),
+                         [time(10, 0), time(10, 30), time(14, 0), time(14, 30)])
+        for taken in (time(10, 30), time(14, 30)):
+            with self.assertRaises(SlotUnavailable):
+                book_appointment(self.patient, self.provider, self.day, taken)
+        book_appointment(self.patient, self.provider, self.day, time(15, 0))
+
+    def test_longer_appointment_blocks_every_covered_slot(self):
+        book_appointment(self.patient, self.provider, self.day, time(10, 0), duration_minutes=60)
+        with self.assertRaises(SlotUnavailable):
+            book_appointment(self.patient, self.provider, self.day, time(10, 30))
+        self.assertEqual(TelehealthAppointment.objects.count(), 1)
+
+    def test_off_grid_times_are_rejected(self):
+        with self.assertRaises(ValueError):
+            book_appointment(self.patient, self.provider, self.day, time(10, 15))
+        with self.assertRaises(ValueError):
+            book_appointment(self.patient, self.provider, self.day, time(16, 30), duration_minutes=60)
+
+    def test_schedule_free_intervals_and_cancellation(self):
+        appointment = book_appointment(self.patient, self.provider, self.day, time(9, 30))
+        schedule = ProviderSchedule(self.provider, self.day, days=1)
+        self.assertEqual(schedule.free_intervals(self.day), [(time(9, 0), time(9, 30)), (time(10, 0), time(17, 0))])
+        self.assertFalse(schedule.is_free(self.day, time(9, 30)))
+        cancel_appointment(appointment)
+        self.assertTrue(ProviderSchedule(self.provider, self.day, days=1).is_free(self.day, time(9, 30)))
+        book_appointment(self.patient, self.provider, self.day, time(9, 30))
+
+    def test_next_free_slot_for_a_page_of_providers(self):
+        other = HealthcareProvider.objects.create(name='Iyer', specialization='Midwifery', experience_years=4)
+        book_appointment(self.patient, self.provider, self.day, time(9, 0), duration_minutes=60)
+        with self.assertNumQueries(1):
+            schedules = ProviderSchedule.for_providers([self.provider, other], self.day, days=2)
+        morning = datetime.combine(self.day, time(8, 0))
+        self.assertEqual(schedules[self.provider.pk].next_free(morning), datetime.combine(self.day, time(10, 0)))
+        self.assertEqual(schedules[other.pk].next_free(morning), datetime.combine(self.day, time(9, 0)))
+        # A slot that has started is skipped; after hours it is the next day.
+        self.assertEqual(schedules[other.pk].next_free(datetime.combine(self.day, time(9, 0, 1))),
+                         datetime.combine(self.day, time(9, 30)))
+        self.assertEqual(schedules[other.pk].next_free(datetime.combine(self.day, time(17, 0))),
+                         datetime.combine(self.day + timedelta(days=1), time(9, 0)))
+
+    def test_telehealth_offers_and_checks_free_slots(self):
+        book_appointment(self.patient, self.provider, self.day, time(10, 0))
+        self.client.force_login(self.patient)
+        response = self.client.post('/telehealth/', {'provider_id': self.provider.pk, 'appointment_time': '10:00',
+                                                     'appointment_date': self.day.isoformat()}, follow=True)
+        self.assertContains(response, 'That time is taken. Free that day: 09:00-10:00, 10:30-17:00.')
+        self.assertEqual(TelehealthAppointment.objects.count(), 1)
+        self.assertContains(response, 'Next free:')
+
+    def test_cancelled_appointments_are_not_upcoming(self):
+        kept = book_appointment(self.patient, self.provider, self.day, time(9, 0))
+        cancel_appointment(book_appointment(self.patient, self.provider, self.day, time(11, 0)))
+        self.client.force_login(self.patient)
+        response = self.client.get('/telehealth/')
+        self.assertEqual([c.pk for c in response.context['consultations']], [kept.pk])
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_exactly_one_winner_per_slot(self):
+        User.objects.bulk_create(User(username='p%d@example.com' % i) for i in range(200))
+        patients = list(User.objects.filter(username__startswith='p'))
+        provider = HealthcareProvider.objects.create(name='Rao', specialization='Obstetrics', experience_years=9)
+        day = date.today() + timedelta(days=1)
+
+        def attempt(patient):
+            try:
+                book_appointment(patient, provider, day, time(11, 0))
+                return True
+            except SlotUnavailable:
+                return False
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            outcomes = list(pool.map(attempt, patients))
+        self.assertEqual(outcomes.count(True), 1)
+        self.assertEqual(AppointmentSlot.objects.filter(provider=provider).count(), 1)
+        self.assertEqual(TelehealthAppointment.objects.filter(provider=provider).count(), 1)
+
+
+class FailingChannel:
+    def send(self, notifications):
+        raise ConnectionError('gateway down')
+
+
+class FailOnceChannel:
+    def __init__(self, channel):
+        self.channel, self.failed = channel, False
+
+    def send(self, notifications):
+        if not self.failed:
+            self.failed = True
+            raise ConnectionError('gateway down')
+        self.channel.send(notifications)
+
+
+class ReminderDispatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com', email='mum@example.com')
+        self.today = date(2026, 3, 10)
+        self.now = timezone.make_aware(datetime(2026, 3, 10, 9, 0))
+        self.channel = LocalOutboxChannel()
+        self.channel.outbox = []
+
+    def reminder(self, name, at='09:00', **kwargs):
+        kwargs.setdefault('start_date', self.today - timedelta(days=3))
+        return AIMedicationReminder.objects.create(
+            user=self.user, medication_name=name, dosage='1 tablet', frequency='daily',
+            reminder_time=at, **kwargs)
+
+    def test_sends_due_reminders_once_per_day(self):
+        due = self.reminder('Folic acid')
+        self.reminder('Iron', at='09:01')
+        self.reminder('Paused', is_active=False)
+        self.reminder('Finished', end_date=self.today - timedelta(days=1))
+        self.reminder('Not started', start_date=self.today + timedelta(days=1))
+
+        self.assertEqual(dispatch_due(now=self.now, channel=self.channel),
+                         {'due': 1, 'sent': 1, 'skipped': 0, 'failed': 0, 'retry_from': None})
+        self.assertEqual([n.key for n in self.channel.outbox], ['%d:2026-03-10' % due.pk])
+        self.assertEqual(self.channel.outbox[0].email, 'mum@example.com')
+
+        # A restart replaying the same minute sends nothing new.
+        self.assertEqual(dispatch_due(now=self.now, channel=self.channel),
+                         {'due': 1, 'sent': 0, 'skipped': 1, 'failed': 0, 'retry_from': None})
+        self.assertEqual(len(self.channel.outbox), 1)
+
+    def test_batches_cover_the_whole_window(self):
+        for i in range(7):
+            self.reminder('Med %d' % i, at='08:%02d' % (30 + i * 4))
+        stats = dispatch_due(now=self.now, since=self.now - timedelta(hours=1), channel=self.channel, batch_size=2)
+        self.assertEqual(stats['sent'], 7)
+        self.assertEqual([n.medication_name for n in self.channel.outbox], ['Med %d' % i for i in range(7)])
+
+    def test_window_spanning_midnight(self):
+        self.reminder('Late', at='23:59')
+        self.reminder('Early', at='00:00')
+        now = timezone.make_aware(datetime(2026, 3, 11, 0, 0))
+        dispatch_due(now=now, since=now - timedelta(minutes=2), channel=self.channel)
+        self.assertEqual([(n.medication_name, n.scheduled_for) for n in self.channel.outbox], [
+            ('Late', datetime(2026, 3, 10, 23, 59)),
+            ('Early', datetime(2026, 3, 11, 0, 0)),
+        ])
+
+    def test_failed_send_is_retried(self):
+        self.reminder('Folic acid')
+        stats = dispatch_due(now=self.now, channel=FailingChannel())
+        self.assertEqual((stats['failed'], stats['retry_from']), (1, self.now))
+        self.assertFalse(ReminderDispatch.objects.exists())
+        self.assertEqual(dispatch_due(now=self.now, channel=self.channel)['sent'], 1)
+
+    def test_failed_batch_does_not_stop_the_window(self):
+        self.reminder('Iron', at='08:59')
+        self.reminder('Folic acid')
+        stats = dispatch_due(now=self.now, since=self.now - timedelta(minutes=5), channel=FailOnceChannel(self.channel))
+        self.assertEqual((stats['sent'], stats['failed']), (1, 1))
+        self.assertEqual([n.medication_name for n in self.channel.outbox], ['Folic acid'])
+
+        # The next window starts at the failed reminder, not after this one.
+        stats = dispatch_due(now=self.now + timedelta(minutes=1),
+                             since=stats['retry_from'] - timedelta(seconds=1), channel=self.channel)
+        self.assertEqual((stats['sent'], stats['skipped']), (1, 1))
+        self.assertEqual([n.medication_name for n in self.channel.outbox], ['Folic acid', 'Iron'])
+
+    def test_overlapping_dispatchers_send_once(self):
+        for i in range(3):
+            self.reminder('Med %d' % i)
+        other = LocalOutboxChannel()
+
+        class Overlapped:
+            # A second dispatcher covers the same window while the first sends.
+            def send(channel, notifications):
+                dispatch_due(now=self.now, channel=other)
+                self.channel.send(notifications)
+
+        first = dispatch_due(now=self.now, channel=Overlapped())
+        self.assertEqual((first['sent'], len(self.channel.outbox), len(other.outbox)), (3, 3, 0))
+
+        # Both saw the rows as unsent: only the claims this run inserted count.
+        rows = [(pk, None, '', '', '') for pk in AIMedicationReminder.objects.values_list('id', flat=True)]
+        ReminderDispatch.objects.all().delete()
+        self.assertEqual(len(_claim(self.today, rows, 'a')), 3)
+        self.assertEqual(_claim(self.today, rows, 'b'), [])
+
+    @override_settings(REMINDER_CHANNEL='women.reminders.EmailChannel')
+    def test_email_channel(self):
+        self.reminder('Folic acid')
+        dispatch_due(now=self.now)
+        self.assertEqual([m.subject for m in mail.outbox], ['Medication reminder: Folic acid'])
+
+
+class VaccinationScheduleTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='mum@example.com')
+        self.profile = PostpartumProfile.objects.create(
+            user=user, delivery_date=date(2026, 1, 31), delivery_type='vaginal', baby_weight=3.2)
+
+    def baby(self, name='Asha', birth_date=date(2026, 1, 31)):
+        return BabyProfile.objects.create(postpartum_profile=self.profile, name=name, birth_date=birth_date,
+                                          birth_weight=3.2, birth_length=50, apgar_score=9)
+
+    def test_new_baby_gets_full_schedule(self):
+        baby = self.baby()
+        records = {r.vaccine_name: r for r in VaccinationRecord.objects.filter(baby=baby)}
+        self.assertEqual(len(records), len(SCHEDULES['2026.1']))
+        self.assertEqual(records['BCG (dose 1)'].due_date, date(2026, 1, 31))
+        self.assertEqual(records['Hepatitis B (dose 2)'].due_date, date(2026, 2, 28))
+        self.assertEqual(records['DTaP (dose 1)'].next_due_date, date(2026, 5, 31))
+        self.assertIsNone(records['MMR (dose 1)'].next_due_date)
+        self.assertEqual(records['MMR (dose 1)'].schedule_version, '2026.1')
+
+    def test_generation_is_idempotent(self):
+        baby = self.baby()
+        self.assertEqual(generate_schedule(baby), 0)
+        VaccinationRecord.objects.filter(baby=baby, vaccine_name='MMR (dose 1)').delete()
+        self.assertEqual(generate_schedule(baby), 1)
+        VaccinationRecord.objects.filter(baby=baby, vaccine_name__startswith='Hib').delete()
+        out = StringIO()
+        call_command('generate_vaccination_schedules', stdout=out)
+        self.assertEqual(out.getvalue(), 'Created 4 vaccination records\n')
+
+    def test_add_months_clamps_to_month_end(self):
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2025, 11, 30), 3), date(2026, 2, 28))
+
+    def test_overdue_sweep_streams_pending_doses(self):
+        baby = self.baby()
+        self.baby('Ravi', birth_date=date(2026, 6, 1))
+        VaccinationRecord.objects.filter(baby=baby, vaccine_name='BCG (dose 1)').update(
+            administered_date=date(2026, 1, 31))
+        chunks = list(overdue_chunks(as_of=date(2026, 4, 1), chunk_size=3))
+        rows = [row for chunk in chunks for row in chunk]
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(rows[0][2:5], ('Asha', self.profile.user_id, 'Hepatitis B (dose 1)'))
+        self.assertEqual([row[5] for row in rows], sorted(row[5] for row in rows))
+        self.assertEqual(len(rows), overdue(date(2026, 4, 1)).count())
+
+        out = StringIO()
+        call_command('overdue_vaccinations', '--as-of', '2026-04-01', stdout=out, stderr=StringIO())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 8)
+        self.assertTrue(lines[1].endswith(',2026-01-31,60'))
+
+    def test_sweep_uses_partial_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite query plan')
+        plan = overdue(date(2026, 4, 1)).order_by('due_date', 'id').explain()
+        self.assertIn('vaccination_pending_due_idx', plan)
+
+
+class GrowthPercentileTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='mum@example.com')
+        self.profile = PostpartumProfile.objects.create(
+            user=user, delivery_date=date(2025, 1, 1), delivery_type='vaginal', baby_weight=3.3)
+
+    def baby(self, name, sex='M'):
+        return BabyProfile.objects.create(postpartum_profile=self.profile, name=name, birth_date=date(2025, 1, 1),
+                                          sex=sex, birth_weight=3.3, birth_length=50, apgar_score=9)
+
+    def weigh(self, baby, days, weight):
+        return GrowthRecord.objects.create(baby=baby, record_date=baby.birth_date + timedelta(days=days),
+                                           weight=weight, length=50, head_circumference=35)
+
+    def test_zscores_match_who_tables(self):
+        # Medians score 0; the published -2 SD cut-offs score about -2.
+        z = zscores('weight', [0, 1, 1], [0, 365, 0], [3.3464, 7.0, 3.2322])
+        self.assertAlmostEqual(z[0], 0, places=4)
+        self.assertAlmostEqual(z[1], -2, delta=0.1)
+        self.assertAlmostEqual(z[2], 0, places=4)
+        self.assertAlmostEqual(zscores('length', [1], [0], [45.4])[0], -2, delta=0.05)
+        self.assertTrue(all(np.isnan(zscores('weight', [-1, 0, 0], [10, 800, 10], [3.5, 12, np.nan]))))
+        self.assertEqual([round(p, 1) for p in percentiles([0, -1.96, 1])], [50.0, 2.5, 84.1])
+
+    def test_score_records_annotates_history(self):
+        baby = self.baby('Arjun')
+        self.weigh(baby, 0, 3.3464)
+        self.weigh(baby, 61, 5.6)
+        records = score_records(GrowthRecord.objects.filter(baby=baby).select_related('baby').order_by('record_date'))
+        self.assertEqual(records[0].weight_percentile, 50.0)
+        self.assertIsNotNone(records[1].length_z)
+
+    def test_faltering_flags_drops_and_underweight(self):
+        steady, dropping, light, unknown = (self.baby('Steady'), self.baby('Dropping', 'F'),
+                                            self.baby('Light'), self.baby('Unknown', ''))
+        for baby, weights in [(steady, [3.3, 5.6, 7.0]), (dropping, [3.8, 5.8, 6.0]),
+                              (light, [2.5, 4.4, 5.4]), (unknown, [3.3, 3.4, 3.5])]:
+            for month, weight in enumerate(weights):
+                self.weigh(baby, month * 61, weight)
+        flagged = {f.baby_id: f for f in faltering()}
+        self.assertEqual(set(flagged), {dropping.pk, light.pk})
+        self.assertEqual(faltering(chunk_size=1), faltering())
+        self.assertTrue(flagged[dropping.pk].reason.startswith('weight dropped'))
+        self.assertEqual(flagged[light.pk].reason, 'underweight')
+
+        out = StringIO()
+        call_command('flag_faltering_growth', stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_pages_record_the_babys_sex(self):
+        self.client.force_login(self.profile.user)
+        self.client.post('/baby-care/', {'baby_name': 'Mira', 'baby_sex': 'F', 'weight': '3.2', 'height': '49',
+                                         'head_circumference': '34', 'record_date': '2025-01-01'})
+        record = GrowthRecord.objects.select_related('baby').get()
+        self.assertEqual((record.baby.name, record.baby.sex), ('Mira', 'F'))
+        self.assertIsNotNone(score_records([record])[0].weight_z)
+
+        user = User.objects.create(username='new@example.com')
+        self.client.force_login(user)
+        self.client.post('/postpartum-care/', {'delivery_date': '2025-03-01', 'baby_birth_weight': '3.1',
+                                               'delivery_type': 'vaginal', 'baby_name': 'Ravi', 'baby_sex': 'M'})
+        baby = BabyProfile.objects.get(postpartum_profile__user=user)
+        self.assertEqual((baby.name, baby.sex, baby.birth_date), ('Ravi', 'M', date(2025, 3, 1)))
+
+    def test_baby_care_shows_percentiles(self):
+        self.weigh(self.baby('Arjun'), 0, 3.3464)
+        self.client.force_login(self.profile.user)
+        response = self.client.get('/baby-care/')
+        self.assertContains(response, '50.0 percentile')
+
+
+class MentalHealthTrendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com')
+        self.profile = PostpartumProfile.objects.create(
+            user=self.user, delivery_date=date.today() - timedelta(days=30), delivery_type='vaginal', baby_weight=3.2)
+
+    def checkin(self, mood, anxiety=3, sleep=7, appetite=7):
+        return MentalHealthCheck.objects.create(postpartum_profile=self.profile, mood_score=mood,
+                                                anxiety_level=anxiety, sleep_hours=sleep, appetite_level=appetite)
+
+    def trend(self):
+        return MentalHealthTrend.objects.get(postpartum_profile=self.profile)
+
+    def test_checkins_update_rolling_state(self):
+        for mood in range(1, 11):
+            self.checkin(mood)
+        trend = self.trend()
+        self.assertEqual(trend.checkins, 10)
+        self.assertEqual(len(trend.window), 7)
+        self.assertAlmostEqual(trend.window_total, sum(trend.window))
+        self.assertGreater(trend.fast_average, trend.slow_average)
+        self.assertEqual(trend.alert_level, STEADY)
+
+    def test_worsening_trend_raises_one_insight_per_escalation(self):
+        for _ in range(6):
+            self.checkin(9)
+        self.checkin(4, anxiety=6)
+        self.checkin(3, anxiety=7)
+        self.assertEqual(self.trend().alert_level, DECLINING)
+        insights = AIHealthInsight.objects.filter(user=self.user, insight_type='mental_health')
+        self.assertEqual([i.priority for i in insights], ['medium'])
+
+        self.checkin(3, anxiety=7)  # still declining: no repeat
+        self.assertEqual(insights.count(), 1)
+        for _ in range(3):
+            self.checkin(2, anxiety=9, sleep=4)
+        self.assertEqual(self.trend().alert_level, LOW)
+        self.assertEqual(list(insights.order_by('id').values_list('priority', flat=True)), ['medium', 'high'])
+
+    def test_backfill_matches_incremental_state(self):
+        for mood, anxiety in [(8, 2), (7, 3), (4, 6), (3, 8), (2, 9)]:
+            self.checkin(mood, anxiety)
+        incremental = self.trend()
+        AIHealthInsight.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_mental_health_trends', stdout=out)
+        self.assertEqual(out.getvalue(), 'Rebuilt 1 mental-health trends\n')
+        rebuilt = self.trend()
+        for field in ('checkins', 'last_check_id', 'window', 'fast_average', 'slow_average', 'metrics',
+                      'alert_level'):
+            self.assertEqual(getattr(rebuilt, field), getattr(incremental, field), field)
+        self.assertEqual(AIHealthInsight.objects.get(user=self.user).priority, 'high')
+
+    def test_backfill_never_repeats_insights(self):
+        for mood, anxiety in [(8, 2), (7, 3), (4, 6), (3, 8), (2, 9)]:
+            self.checkin(mood, anxiety)
+        raised = sorted(AIHealthInsight.objects.values_list('dedupe_key', flat=True))
+        self.assertEqual(len(raised), 2)
+        # The last escalation already has its insight, from the check-in itself.
+        backfill_trends()
+        backfill_trends()
+        self.assertEqual(sorted(AIHealthInsight.objects.values_list('dedupe_key', flat=True)), raised)
+
+    def test_backfill_after_low_relaxes_to_declining(self):
+        for mood, anxiety, appetite in [(9, 2, 9)] * 3 + [(2, 10, 3), (2, 10, 3), (6, 3, 6)]:
+            self.checkin(mood, anxiety, appetite=appetite)
+        self.assertEqual(self.trend().alert_level, DECLINING)
+        raised = sorted(AIHealthInsight.objects.values_list('dedupe_key', flat=True))
+        self.assertEqual(len(raised), 2)
+        backfill_trends()
+        backfill_trends()
+        self.assertEqual(sorted(AIHealthInsight.objects.values_list('dedupe_key', flat=True)), raised)
+
+    def test_postpartum_page_shows_trend_score(self):
+        for _ in range(3):
+            self.checkin(10, anxiety=1, sleep=8, appetite=10)
+        self.client.force_login(self.user)
+        response = self.client.get('/postpartum-care/')
+        self.assertEqual(response.context['postpartum_stats']['mental_health_score'], 100)
+
+
+class PageStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com')
+        self.profile = PostpartumProfile.objects.create(
+            user=self.user, delivery_date=date(2026, 1, 1), delivery_type='vaginal', baby_weight=3.2)
+        MentalHealthCheck.objects.bulk_create(
+            MentalHealthCheck(postpartum_profile=self.profile, mood_score=i % 10 + 1, anxiety_level=3,
+                              sleep_hours=7, appetite_level=6) for i in range(40))
+        PelvicFloorRehab.objects.bulk_create(
+            PelvicFloorRehab(postpartum_profile=self.profile, assessment_date=date(2026, 1, 1) + timedelta(days=i),
+                             muscle_strength=i % 5 + 1, endurance_level=3, exercises_prescribed='Kegels')
+            for i in range(25))
+        rehab = PelvicFloorRehab.objects.first()
+        ExerciseProgress.objects.bulk_create(
+            ExerciseProgress(rehab=rehab, exercise_name='Bridge', sets=3, repetitions=10, duration_minutes=15,
+                             difficulty_level='beginner', completion_date=date(2026, 2, 1) + timedelta(days=i),
+                             notes='x' * 500)
+            for i in range(30))
+
+    def add_cycles(self, count):
+        MenstrualCycle.objects.bulk_create(
+            MenstrualCycle(user=self.user, period_start_date=date(2020, 1, 1) + timedelta(days=28 * i),
+                           period_end_date=date(2020, 1, 5) + timedelta(days=28 * i), cycle_length=26 + i % 5,
+                           flow_intensity='medium', symptoms='cramps ' * 50)
+            for i in range(count))
+
+    def test_postpartum_summary_query_count(self):
+        with self.assertNumQueries(5):
+            stats = postpartum_summary(self.profile)
+        self.assertEqual((stats['total_checkins'], stats['rehab_sessions']), (40, 25))
+        self.assertEqual(len(stats['recent_checks']), 10)
+        # Latest assessment: day 24, strength 5 + endurance 3.
+        self.assertEqual(stats['recovery_score'], 80)
+        self.assertEqual(stats['recent_rehab'][0].assessment_date, date(2026, 1, 25))
+
+    def test_pelvic_floor_summary_loads_only_displayed_columns(self):
+        with self.assertNumQueries(3):
+            stats = pelvic_floor_summary(self.profile)
+        self.assertEqual((stats['exercise_sessions'], stats['exercise_minutes']), (30, 450))
+        self.assertEqual(len(stats['recent_exercises']), 10)
+        self.assertIn('notes', stats['recent_exercises'][0].get_deferred_fields())
+
+    def test_menstrual_summary_memory_does_not_grow_with_history(self):
+        self.add_cycles(600)
+        tracemalloc.start()
+        with self.assertNumQueries(2):
+            stats = menstrual_summary(self.user)
+        summary_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        list(MenstrualCycle.objects.filter(user=self.user))
+        full_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual((stats['total_cycles'], stats['average_cycle']), (600, 28))
+        self.assertLess(summary_peak * 10, full_peak)
+
+    def test_pages_render_with_stats(self):
+        self.add_cycles(3)
+        self.client.force_login(self.user)
+        response = self.client.get('/menstrual-tracking/')
+        self.assertEqual(response.context['avg_cycle'], 27)
+        self.assertContains(response, 'Cycles Tracked')
+        response = self.client.get('/postpartum-care/')
+        self.assertEqual(response.context['postpartum_stats']['total_checkins'], 40)
+        response = self.client.get('/pelvic-floor-rehab/')
+        self.assertEqual(response.context['rehab_stats']['exercise_sessions'], 30)
+        self.assertContains(response, '<div class="score-circle">80%</div>', html=True)
+        self.assertContains(response, '450 minutes in total')
+        self.assertContains(response, 'Mar 02, 2026')
+        self.assertContains(response, 'Jan 25, 2026')
+
+    def test_weekly_strength_is_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            curve = weekly_strength(self.profile)
+        self.assertEqual(curve['week'], [date(2025, 12, 29), date(2026, 1, 5), date(2026, 1, 12), date(2026, 1, 19)])
+        self.assertEqual(curve['assessments'], [4, 7, 7, 7])
+        # Days 0-3 have strengths 1-4.
+        self.assertEqual(curve['strength'][0], 2.5)
+        self.assertEqual(curve['endurance'], [3.0] * 4)
+
+    def test_weekly_workload_totals(self):
+        with self.assertNumQueries(1):
+            curve = weekly_workload(self.profile)
+        self.assertEqual(curve['sessions'], [1, 7, 7, 7, 7, 1])
+        self.assertEqual(curve['total_reps'], [30, 210, 210, 210, 210, 30])
+        self.assertEqual(sum(curve['total_minutes']), 450)
+        self.assertEqual(curve['week'][0], date(2026, 1, 26))
+
+    def test_rehab_chart_endpoints(self):
+        self.assertEqual(self.client.get('/api/pelvic-floor/strength/').status_code, 403)
+        self.client.force_login(self.user)
+        data = self.client.get('/api/pelvic-floor/workload/').json()
+        self.assertEqual(set(data), {'week', 'sessions', 'total_sets', 'total_reps', 'total_minutes'})
+        self.assertEqual(data['week'][0], '2026-01-26')
+        data = self.client.get('/api/pelvic-floor/strength/', {'weeks': 1}).json()
+        self.assertEqual(data['week'], [])
+        self.assertEqual(self.client.get('/api/pelvic-floor/strength/', {'weeks': 'x'}).status_code, 400)
+
+    def test_rehab_page_draws_the_weekly_curves(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/pelvic-floor-rehab/')
+        self.assertContains(response, 'data-url="/api/pelvic-floor/strength/?weeks=12"')
+        self.assertContains(response, 'data-url="/api/pelvic-floor/workload/?weeks=12"')
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com')
+        profile = PostpartumProfile.objects.create(
+            user=self.user, delivery_date=date(2026, 1, 1), delivery_type='vaginal', baby_weight=3.2)
+        for n in range(3):
+            baby = BabyProfile.objects.create(postpartum_profile=profile, name='Baby %d' % n, birth_date=date(2026, 1, 1),
+                                              sex='F', birth_weight=3.2, birth_length=50, apgar_score=9)
+            GrowthRecord.objects.bulk_create(
+                GrowthRecord(baby=baby, record_date=date(2026, 1, 1) + timedelta(days=30 * i), weight=3.2 + i,
+                             length=50 + i, head_circumference=35, notes='n' * 200)
+                for i in range(4))
+        MenstrualCycle.objects.bulk_create(
+            MenstrualCycle(user=self.user, period_start_date=date(2024, 1, 1) + timedelta(days=28 * i),
+                           period_end_date=date(2024, 1, 5) + timedelta(days=28 * i), flow_intensity='light')
+            for i in range(120))
+        other = User.objects.create(username='other@example.com')
+        MenstrualCycle.objects.create(user=other, period_start_date=date(2025, 1, 1),
+                                      period_end_date=date(2025, 1, 5), flow_intensity='light')
+        self.client.force_login(self.user)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/cycles/').status_code, 403)
+
+    def test_cursor_pagination_covers_own_rows_once(self):
+        seen, url = [], '/api/cycles/?page_size=50'
+        while url:
+            data = self.client.get(url).json()
+            seen += [row['period_start_date'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len(set(seen)), 120)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_sparse_fields_read_only_those_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/growth/', {'fields': 'id,weight'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'weight'})
+        self.assertNotIn('"notes"', queries[-1]['sql'])
+        self.assertEqual(self.client.get('/api/growth/', {'fields': 'colour'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/growth/', {'expand': 'mother'}).status_code, 400)
+
+    def test_expand_does_not_query_per_row(self):
+        # Session, user, page and one prefetch per expansion.
+        with self.assertNumQueries(5):
+            data = self.client.get('/api/babies/', {'expand': 'growth_records,vaccinations'}).json()
+        self.assertEqual([len(baby['growth_records']) for baby in data['results']], [4, 4, 4])
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/growth/', {'expand': 'baby'}).json()
+        self.assertEqual(len(data['results']), 12)
+        self.assertEqual(data['results'][0]['baby']['sex'], 'F')
+
+    def test_etag_and_gzip(self):
+        response = self.client.get('/api/cycles/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        plain = self.client.get('/api/cycles/')
+        self.assertLess(len(response.content) * 4, len(plain.content))
+        response = self.client.get('/api/cycles/', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com')
+        profile = PostpartumProfile.objects.create(
+            user=self.user, delivery_date=date(2026, 1, 1), delivery_type='vaginal', baby_weight=3.2)
+        self.baby = BabyProfile.objects.create(postpartum_profile=profile, name='Baby', birth_date=date(2026, 1, 1),
+                                               birth_weight=3.2, birth_length=50, apgar_score=9)
+        self.later = timezone.now() + SETTLE * 2
+
+    def cycles(self, count, length=28):
+        return [{'client_id': str(uuid.UUID(int=i + 1)), 'period_start_date': str(date(2026, 1, 1) + timedelta(days=28 * i)),
+                 'period_end_date': str(date(2026, 1, 5) + timedelta(days=28 * i)), 'cycle_length': length,
+                 'flow_intensity': 'light'} for i in range(count)]
+
+    def test_upload_creates_then_updates_by_client_id(self):
+        growth = [{'client_id': str(uuid.uuid4()), 'baby_id': self.baby.id, 'record_date': '2026-02-01',
+                   'weight': 4.1, 'length': 54, 'head_circumference': 37}]
+        with self.assertNumQueries(7):
+            applied = apply_changes(self.user, {'cycles': self.cycles(3), 'growth': growth})
+        self.assertEqual(applied, {'cycles': {'created': 3, 'updated': 0}, 'growth': {'created': 1, 'updated': 0}})
+        applied = apply_changes(self.user, {'cycles': self.cycles(4, length=30)})
+        self.assertEqual(applied['cycles'], {'created': 1, 'updated': 3})
+        self.assertEqual(list(MenstrualCycle.objects.values_list('cycle_length', flat=True).distinct()), [30])
+        self.assertEqual(GrowthRecord.objects.get().weight, 4.1)
+
+    def test_babies_sync_with_their_sex(self):
+        baby = {'client_id': str(uuid.uuid4()), 'postpartum_profile_id': self.baby.postpartum_profile_id,
+                'name': 'Twin', 'birth_date': '2026-01-01', 'sex': 'F', 'birth_weight': 2.9, 'birth_length': 48,
+                'apgar_score': 8}
+        self.assertEqual(apply_changes(self.user, {'babies': [baby]}), {'babies': {'created': 1, 'updated': 0}})
+        self.assertEqual(BabyProfile.objects.get(name='Twin').sex, 'F')
+        other = PostpartumProfile.objects.create(delivery_date=date(2026, 1, 1), delivery_type='vaginal',
+                                                 baby_weight=3)
+        with self.assertRaises(SyncError):
+            apply_changes(self.user, {'babies': [dict(baby, client_id=str(uuid.uuid4()),
+                                                      postpartum_profile_id=other.pk)]})
+        synced = changes_since(self.user, None, now=self.later)['changes']['babies']
+        self.assertEqual({row['name']: row['sex'] for row in synced}, {'Baby': '', 'Twin': 'F'})
+
+    def test_invalid_record_rejects_whole_batch(self):
+        cycles = self.cycles(3)
+        cycles[1]['flow_intensity'] = 'torrential'
+        other_baby = BabyProfile.objects.create(
+            postpartum_profile=PostpartumProfile.objects.create(delivery_date=date(2026, 1, 1),
+                                                                delivery_type='vaginal', baby_weight=3),
+            name='Other', birth_date=date(2026, 1, 1), birth_weight=3, birth_length=50, apgar_score=9)
+        growth = [{'client_id': str(uuid.uuid4()), 'baby_id': other_baby.id, 'record_date': '2026-02-01',
+                   'weight': 4.1, 'length': 54, 'head_circumference': 37}]
+        with self.assertRaises(SyncError) as raised:
+            apply_changes(self.user, {'cycles': cycles, 'growth': growth})
+        self.assertEqual(len(raised.exception.errors), 2)
+        self.assertIn('cycles[1].flow_intensity', raised.exception.errors[0])
+        self.assertFalse(MenstrualCycle.objects.exists())
+
+    def test_client_id_of_another_account_is_rejected(self):
+        other = User.objects.create(username='other@example.com')
+        apply_changes(other, {'cycles': self.cycles(1)})
+        with self.assertRaises(SyncError):
+            apply_changes(self.user, {'cycles': self.cycles(1)})
+        self.assertEqual(MenstrualCycle.objects.get().user, other)
+
+    def test_download_pages_through_changes(self):
+        apply_changes(self.user, {'cycles': self.cycles(5)})
+        self.assertEqual(changes_since(self.user, None)['changes']['cycles'], [])
+        token, seen = None, []
+        for _ in range(3):
+            result = changes_since(self.user, token, now=self.later, page_size=2)
+            seen += [row['client_id'] for row in result['changes']['cycles']]
+            token = result['token']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertFalse(result['more'])
+        apply_changes(self.user, {'cycles': self.cycles(1, length=30)})
+        result = changes_since(self.user, token, now=self.later + SETTLE)
+        self.assertEqual([row['cycle_length'] for row in result['changes']['cycles']], [30])
+
+    def test_sync_view_accepts_gzip(self):
+        self.client.force_login(self.user)
+        body = gzip.compress(json.dumps({'token': None, 'changes': {'cycles': self.cycles(50)}}).encode())
+        response = self.client.post('/api/sync/', body, content_type='application/json',
+                                    HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['applied']['cycles']['created'], 50)
+        self.assertTrue(data['token'])
+        response = self.client.post('/api/sync/', json.dumps({'token': 'forged', 'changes': {}}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AssistantStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='mum@example.com')
+        self.conversation = start_conversation(self.user)
+
+    def chat(self, turns):
+        for i in range(turns):
+            append_message(self.conversation, 'Question %d. Some detail.' % i)
+            append_message(self.conversation, 'Answer %d. More detail.' % i, is_from_user=False)
+
+    def test_append_counts_and_windows(self):
+        self.chat(3)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 6)
+        self.assertEqual([m.message_text for m in recent_messages(self.conversation, 2)],
+                         ['Question 2. Some detail.', 'Answer 2. More detail.'])
+        self.assertEqual(context_window(self.conversation), ('', recent_messages(self.conversation, 6)))
+
+    def test_summary_rolls_forward_and_context_stays_bounded(self):
+        self.chat(40)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 80)
+        summary, messages = context_window(self.conversation)
+        self.assertEqual(self.conversation.summarized_count + len(messages), 80)
+        self.assertTrue(CONTEXT_MESSAGES <= len(messages) < CONTEXT_MESSAGES + SUMMARY_STEP)
+        self.assertEqual(messages[-1].message_text, 'Answer 39. More detail.')
+        lines = summary.splitlines()
+        self.assertEqual(len(lines), self.conversation.summarized_count)
+        self.assertEqual(lines[:2], ['User: Question 0.', 'Assistant: Answer 0.'])
+        with self.assertNumQueries(2):
+            context_window(self.conversation)
+
+    def test_summary_is_capped(self):
+        for i in range(60):
+            append_message(self.conversation, 'x' * 500)
+        summary = context_window(self.conversation).summary
+        self.assertLessEqual(len(summary), SUMMARY_CHARS)
+        self.assertTrue(summary.endswith('...'))
+
+    def test_history_endpoint_pages_newest_first(self):
+        self.chat(30)
+        self.client.force_login(self.user)
+        url = '/api/assistant/%s/messages/' % self.conversation.conversation_id
+        first = self.client.get(url).json()
+        self.assertEqual(first['message_count'], 60)
+        self.assertEqual(first['messages'][0]['text'], 'Answer 29. More detail.')
+        self.assertTrue(first['summary'].startswith('User: Question 0.'))
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertEqual(len(first['messages']) + len(second['messages']), 60)
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['messages'][-1]['text'], 'Question 0. Some detail.')
+        self.assertEqual(self.client.get(url, {'cursor': 'junk'}).status_code, 400)
+        other = User.objects.create(username='other@example.com')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ConcurrentAssistantTests(TransactionTestCase):
+    def test_concurrent_appends_keep_count_and_summary_exact(self):
+        user = User.objects.create(username='mum@example.com')
+        conversation = start_conversation(user)
+
+        def send(i):
+            try:
+                append_message(conversation, 'Message %d.' % i, is_from_user=i % 2 == 0)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(send, range(400)))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, 400)
+        self.assertEqual(AIMessage.objects.filter(conversation=conversation).count(), 400)
+        summary, messages = context_window(conversation)
+        self.assertEqual(conversation.summarized_count + len(messages), 400)
+        self.assertEqual([m.id for m in messages], list(AIMessage.objects.filter(conversation=conversation).order_by(
+            'id').values_list('id', flat=True))[-len(messages):])
+        folded = {line.split(': ', 1)[1] for line in summary.splitlines()}
+        self.assertFalse(folded & {m.message_text for m in messages})
+
+
+class TriageTests(TestCase):
+    def test_longest_phrase_and_severity(self):
+        result = triage('Some bleeding gums and heartburn')
+        self.assertEqual(result.severity, 'low')
+        self.assertEqual([m.phrase for m in result.matches], ['bleeding gums', 'heartburn'])
+        result = triage('Bleeding  HEAVILY since this morning, and tired')
+        self.assertEqual(result.severity, 'high')
+        self.assertEqual([m.category for m in result.matches], ['bleeding', 'discomfort'])
+        self.assertTrue(result.recommendations[0].startswith('Heavy or new vaginal bleeding'))
+
+    def test_negation_stays_in_its_clause(self):
+        result = triage('No bleeding or fever, but I can’t breathe')
+        self.assertEqual([m.phrase for m in result.matches], ["can't breathe"])
+        self.assertEqual(triage('not dizzy. I feel fine').matches, [])
+        self.assertEqual(triage('I feel fine').recommendations, [NO_MATCH_ADVICE])
+
+    def test_combinations_escalate(self):
+        result = triage('headache since yesterday and swelling in my hands')
+        self.assertEqual([m.severity for m in result.matches], ['medium', 'medium'])
+        self.assertEqual(result.severity, 'high')
+        self.assertIn('pre-eclampsia', result.recommendations[0])
+
+    def test_trie_pattern_matches_every_phrase_whole(self):
+        engine = TriageEngine()
+        for phrase in engine.categories:
+            self.assertEqual([m.phrase for m in engine.matches('today: %s.' % phrase)], [phrase])
+        self.assertEqual(engine.matches('feverishness bleedings'), [])
+
+    def test_symptom_check_endpoint_saves_check(self):
+        user = User.objects.create(username='mum@example.com')
+        self.assertEqual(self.client.post('/api/symptom-check/', {'symptoms': 'fever'}).status_code, 403)
+        self.client.force_login(user)
+        self.assertEqual(self.client.post('/api/symptom-check/', {'symptoms': ' '}).status_code, 400)
+        data = self.client.post('/api/symptom-check/', {'symptoms': 'Fever and a red breast'}).json()
+        self.assertEqual(data['severity'], 'high')
+        check = AISymptomChecker.objects.get(user=user)
+        self.assertEqual((check.severity_level, check.ai_analysis), ('high', 'Recognised: fever, red breast.'))
+        self.assertEqual(check.recommendations.splitlines(), data['recommendations'])
+
+
+class AnswerCacheTests(TestCase):
+    def test_paraphrases_hit_within_the_same_trimester(self):
+        cache = AnswerCache()
+        cache.put('Is coffee safe in week 12?', 'Up to 200mg a day.')
+        self.assertEqual(cache.get('can I drink coffee at 12 weeks'), 'Up to 200mg a day.')
+        self.assertEqual(cache.get('Is coffee OK?', week=9), 'Up to 200mg a day.')
+        self.assertIsNone(cache.get('is coffee ok at week 30'))
+        self.assertIsNone(cache.get('is coffee ok'))
+        self.assertIsNone(cache.get('how much coffee per day, week 12'))
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+    def test_similar_question_found_through_minhash(self):
+        cache = AnswerCache()
+        cache.put('what are the early signs of labour in the third trimester', 'Regular contractions...')
+        self.assertEqual(terms('early labour signs third trimester?')[1],
+                         frozenset({'early', 'labour', 'sign', 'third', 'trimester'}))
+        self.assertEqual(cache.get('what are the early signs of labour in third trimester?'),
+                         'Regular contractions...')
+        self.assertEqual(cache.get('signs of early labour in my third trimester'), 'Regular contractions...')
+        self.assertIsNone(cache.get('signs of labour'))
+
+    def test_lru_size_bytes_and_ttl_bounds(self):
+        cache = AnswerCache(max_entries=2, max_bytes=100, ttl=60)
+        cache.put('is sushi safe', 'a', now=0)
+        cache.put('is cheese safe', 'b', now=0)
+        self.assertEqual(cache.get('sushi?', now=1), 'a')
+        cache.put('is tuna safe', 'c', now=1)
+        self.assertIsNone(cache.get('cheese?', now=1))
+        self.assertEqual(len(cache), 2)
+        cache.put('is salmon safe', 'x' * 100, now=1)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get('salmon', now=61))
+        self.assertEqual((len(cache), cache.evictions), (0, 3))
+
+    def test_reply_skips_generation_for_repeat_questions(self):
+        user = User.objects.create(username='mum@example.com')
+        PregnancyProfile.objects.create(user=user, last_menstrual_period=date.today() - timedelta(weeks=20),
+                                        due_date=date.today() + timedelta(weeks=20), current_trimester=2)
+        calls = []
+
+        def generate(context):
+            calls.append(context)
+            return 'Answer %d' % len(calls)
+
+        get_cache().clear()
+        conversation = start_conversation(user)
+        self.assertEqual(reply(conversation, 'Can I eat sushi?', generate).message_text, 'Answer 1')
+        self.assertEqual(calls[0].messages[-1].message_text, 'Can I eat sushi?')
+        self.assertEqual(reply(start_conversation(user), 'is sushi safe', generate).message_text, 'Answer 1')
+        self.assertEqual(reply(start_conversation(user), 'is sushi safe in week 8', generate).message_text,
+                         'Answer 2')
+        self.assertEqual(len(calls), 2)
+        # Later questions are answered from the conversation, never the cache.
+        self.assertEqual(reply(conversation, 'is sushi safe', generate).message_text, 'Answer 3')
+        self.assertEqual([m.message_text for m in calls[-1].messages],
+                         ['Can I eat sushi?', 'Answer 1', 'is sushi safe'])
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, 4)
+        get_cache().clear()
+
+    def test_cached_answers_hold_no_other_users_context(self):
+        def generate(context):
+            return ' / '.join([context.summary] + [m.message_text for m in context.messages])
+
+        get_cache().clear()
+        first = start_conversation(User.objects.create(username='a@example.com'))
+        append_message(first, 'I was diagnosed with gestational diabetes')
+        AIConversation.objects.filter(pk=first.pk).update(summary='A has gestational diabetes')
+        self.assertIn('diabetes', reply(first, 'Can I eat sushi?', generate).message_text)
+
+        second = start_conversation(User.objects.create(username='b@example.com'))
+        answer = reply(second, 'is sushi safe', generate).message_text
+        self.assertEqual(answer, ' / is sushi safe')
+        self.assertNotIn('diabetes', answer)
+        get_cache().clear()
+
+
+class InsightGenerationTests(TestCase):
+    def setUp(self):
+        self.as_of = timezone.make_aware(datetime(2026, 3, 10, 23, 0))
+        today = self.as_of.date()
+        self.late, self.pregnant, self.mum, self.quiet = (
+            User.objects.create(username=name) for name in ('late', 'pregnant', 'mum', 'quiet'))
+        for days_ago, length in ((100, 28), (72, 40), (40, 28)):
+            MenstrualCycle.objects.create(user=self.late, period_start_date=today - timedelta(days=days_ago),
+                                          period_end_date=today - timedelta(days=days_ago - 4), cycle_length=length,
+                                          flow_intensity='medium')
+        profile = PregnancyProfile.objects.create(user=self.pregnant, last_menstrual_period=today - timedelta(weeks=26),
+                                                  due_date=today + timedelta(weeks=14), current_trimester=2)
+        NutritionalPlan.objects.create(pregnancy_profile=profile, week=20, trimester=2, calories_needed=2200,
+                                       protein_grams=70, iron_mg=27, calcium_mg=1000, folic_acid_mcg=600,
+                                       foods_recommended='', foods_to_avoid='', supplements='')
+        MEWS_Assessment.objects.create(user=self.pregnant, assessment_date=self.as_of - timedelta(days=1),
+                                       systolic_bp=150, diastolic_bp=95, heart_rate=80, respiratory_rate=16,
+                                       temperature=36.8, oxygen_saturation=98, consciousness_level=4,
+                                       urine_output=60)
+        postpartum = PostpartumProfile.objects.create(user=self.mum, delivery_date=today - timedelta(days=45),
+                                                      delivery_type='vaginal', baby_weight=3.2)
+        for sleep in (4, 4.5, 5):
+            MentalHealthCheck.objects.create(postpartum_profile=postpartum, mood_score=5, anxiety_level=5,
+                                             sleep_hours=sleep, appetite_level=5)
+        MentalHealthCheck.objects.filter(postpartum_profile=postpartum).update(check_date=today - timedelta(days=2))
+        AIHealthInsight.objects.all().delete()
+
+    def raised(self):
+        return set(AIHealthInsight.objects.values_list('user__username', 'title'))
+
+    def test_rules_raise_insights_once(self):
+        self.assertEqual(generate_insights(self.as_of, chunk_size=2), (7, 7))
+        self.assertEqual(self.raised(), {
+            ('late', 'Your period is late'), ('late', 'Your cycles vary a lot'),
+            ('pregnant', 'Update your nutrition plan'), ('pregnant', 'Glucose screening is due'),
+            ('pregnant', 'High blood pressure reading'),
+            ('mum', 'You are short on sleep'), ('mum', 'Returning to exercise'),
+        })
+        late = AIHealthInsight.objects.get(user=self.late, title='Your period is late')
+        self.assertEqual(late.content.split('.')[0], 'Your period is 8 days later than your usual 32-day cycle')
+        self.assertEqual(generate_insights(self.as_of), (7, 0))
+        self.assertEqual(AIHealthInsight.objects.count(), 7)
+
+    def test_periods_decide_what_repeats(self):
+        generate_insights(self.as_of)
+        next_week = generate_insights(self.as_of + timedelta(days=7))
+        new = AIHealthInsight.objects.order_by('-id')[:next_week[1]]
+        # Weekly rules and the new pregnancy week repeat; one-off advice and
+        # the same late period do not. The MEWS reading is now too old.
+        self.assertEqual(sorted(i.title for i in new), ['Update your nutrition plan', 'You are short on sleep'])
+
+    def test_backdated_run_ignores_later_readings(self):
+        generate_insights(self.as_of - timedelta(days=3))
+        # The MEWS reading and the check-ins come after the run's date.
+        self.assertNotIn(('pregnant', 'High blood pressure reading'), self.raised())
+        self.assertNotIn(('mum', 'You are short on sleep'), self.raised())
+        self.assertIn(('mum', 'How are you feeling?'), self.raised())
+
+    def test_vectorised_mews_matches_model(self):
+        rng = np.random.RandomState(3)
+        readings = [MEWS_Assessment(systolic_bp=s, diastolic_bp=80, heart_rate=h, respiratory_rate=r, temperature=t,
+                                    oxygen_saturation=o, consciousness_level=c, urine_output=u)
+                    for s, h, r, t, o, c, u in zip(rng.randint(80, 230, 500), rng.randint(35, 140, 500),
+                                                   rng.randint(6, 32, 500), rng.uniform(34.5, 39, 500).round(1),
+                                                   rng.randint(88, 100, 500), rng.randint(1, 5, 500),
+                                                   rng.uniform(0, 2, 500).round(2))]
+        columns = [np.array([getattr(m, name) for m in readings], dtype=np.float64) for name in (
+            'systolic_bp', 'heart_rate', 'respiratory_rate', 'temperature', 'oxygen_saturation',
+            'consciousness_level', 'urine_output')]
+        self.assertEqual(list(mews_scores(*columns)), [m.mews_score for m in readings])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_insights', '--as-of', '2026-03-10', stdout=out)
+        self.assertIn('Raised 7 insights, 7 new', out.getvalue())
+
+
+def simple_pdf(content):
+    stream = zlib.compress(content)
+    return (b'%PDF-1.4\n1 0 obj\n<< /Length ' + str(len(stream)).encode() + b' /Filter /FlateDecode >>\nstream\n'
+            + stream + b'\nendstream\nendobj\ntrailer\n%%EOF\n')
+
+
+class DocumentSearchTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = override_settings(MEDIA_ROOT=self.media, SEARCH_EXTRACT_IN_BACKGROUND=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for vocabulary in _vocabularies.values():
+            vocabulary.built_at = None
+        self.user = User.objects.create(username='reader')
+
+    def note(self, description, text=b'', status='Accept', name='report.txt'):
+        return Notes.objects.create(user=self.user, description=description,
+                                    reportfile=SimpleUploadedFile(name, text), filetype='report', status=status)
+
+    def found(self, query, kind='notes'):
+        return [upload.pk for upload in search(kind, query)]
+
+    def test_only_accepted_uploads_are_found(self):
+        accepted = self.note('Iron and folic acid during pregnancy')
+        pending = self.note('Iron supplements', status='pending')
+        self.assertEqual(self.found('iron'), [accepted.pk])
+        pending.status = 'Accept'
+        pending.save()
+        self.assertEqual(set(self.found('iron')), {accepted.pk, pending.pk})
+        accepted.status = 'Reject'
+        accepted.save()
+        self.assertEqual(self.found('iron'), [pending.pk])
+        pending.delete()
+        self.assertEqual(self.found('iron'), [])
+        self.assertFalse(PendingExtraction.objects.exists())
+
+    def test_prefix_match_rank_and_highlight(self):
+        body_only = self.note('Clinic leaflet', b'Iron rich foods: spinach, lentils and red meat.')
+        described = self.note('Iron rich <b>foods</b> for anaemia')
+        self.assertEqual(extract_pending(), 2)
+        self.assertEqual(self.found('iro foo'), [described.pk, body_only.pk])
+        best, second = search('notes', 'iro foo')
+        self.assertEqual(best.highlight, '<mark>Iron</mark> rich &lt;b&gt;<mark>foods</mark>&lt;/b&gt; for anaemia')
+        self.assertIn('<mark>Iron</mark> rich <mark>foods</mark>', second.snippet)
+        self.assertEqual(self.found('lentil'), [body_only.pk])
+        self.assertEqual(self.found('iron vitamin'), [])
+        # Words saved after the vocabulary was built still expand.
+        later = self.note('Lentil soup recipes')
+        self.assertEqual(self.found('lenti'), [later.pk, body_only.pk])
+
+    def test_snippet(self):
+        pattern = term_pattern(['iron'])
+        text = ' '.join('w%d' % i for i in range(100)) + ' iron ' + ' '.join('x%d' % i for i in range(100))
+        self.assertEqual(snippet(pattern, text), '…w96 w97 w98 w99 <mark>iron</mark> x0 x1 x2 x3 x4 x5 x6 x7 x8 x9 x10…')
+        self.assertEqual(snippet(pattern, 'Take iron daily'), 'Take <mark>iron</mark> daily')
+        self.assertEqual(snippet(pattern, 'Folate only'), '')
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.note('Nausea OR vomiting')
+        self.assertEqual(query_terms('"Nausea" OR (vom* nausea'), ['nausea', 'or', 'vom'])
+        self.assertEqual(len(search('notes', 'OR( nausea -')), 1)
+        self.assertEqual(search('notes', '*"()'), [])
+
+    def test_old_matches_are_found_past_the_candidates(self):
+        old = self.note('Anaemia')
+        Notes.objects.bulk_create(
+            Notes(user=self.user, description='Clinic leaflet that mentions anaemia %d' % i,
+                  reportfile='leaflet.txt', filetype='report', status='Accept') for i in range(CANDIDATES + 50))
+        index_many('notes', list(Notes.objects.exclude(pk=old.pk).values_list('pk', flat=True)))
+        results = search('notes', 'anaemia')
+        self.assertFalse(results.partial)
+        self.assertEqual(results[0].pk, old.pk)
+        self.assertEqual(len(search('notes', 'anaemia', offset=CANDIDATES + 25)), 26)
+        with override_settings(SEARCH_RANK_ALL=100):
+            results = search('notes', 'anaemia')
+            self.assertTrue(results.partial)
+            self.assertNotIn(old.pk, [note.pk for note in results])
+            self.assertEqual(len(search('notes', 'anaemia', offset=CANDIDATES + 25)), 26)
+            self.client.force_login(self.user)
+            self.assertContains(self.client.get('/faq/', {'q': 'anaemia'}), 'only the newest matches are shown')
+            self.assertNotContains(self.client.get('/faq/', {'q': 'anaemia old'}), 'only the newest')
+
+    def test_pdf_text_is_extracted(self):
+        pdf = simple_pdf(b'BT /F1 12 Tf 72 720 Td (Gestational diabetes) Tj T* [(glucose) -250 (screening)] TJ ET')
+        self.assertEqual(pdf_text(pdf), 'Gestational diabetes glucose screening')
+        note = self.note('Test results', pdf, name='results.pdf')
+        self.assertEqual(self.found('glucose'), [])
+        call_command('index_uploads', stdout=StringIO())
+        self.assertEqual(self.found('glucose'), [note.pk])
+        self.assertFalse(PendingExtraction.objects.exists())
+
+    def test_magazines_and_views(self):
+        magazine = Magazines.objects.create(user=self.user, description='Breastfeeding tips',
+                                            magazinesfile=SimpleUploadedFile('m.txt', b''), magazinestype='guide',
+                                            status='Accept')
+        self.note('Breastfeeding positions')
+        self.assertEqual(self.found('breast', 'magazines'), [magazine.pk])
+        self.client.force_login(self.user)
+        response = self.client.get('/view_m/', {'q': 'breast'})
+        self.assertContains(response, '<mark>Breastfeeding</mark> tips')
+        response = self.client.get('/faq/', {'q': 'twins'})
+        self.assertContains(response, 'No reports match')
+
+
+class ModerationTests(TestCase):
+    def setUp(self):
+        for vocabulary in _vocabularies.values():
+            vocabulary.built_at = None
+        self.first, self.second = (User.objects.create(username=name, is_staff=True) for name in ('mod1', 'mod2'))
+        uploader = User.objects.create(username='uploader')
+        self.ids = [Notes.objects.create(user=uploader, reportfile='report%d.txt' % i,
+                                         filetype='report', description='Zinc report %d' % i).pk
+                    for i in range(30)]
+        self.now = timezone.now()
+
+    def ids_of(self, items):
+        return [item.pk for item in items]
+
+    def test_claims_do_not_overlap_and_expire(self):
+        self.assertEqual(self.ids_of(claim('notes', self.first, 10, self.now)), self.ids[:10])
+        self.assertEqual(self.ids_of(claim('notes', self.second, 10, self.now)), self.ids[10:20])
+        # Claiming again renews the claims held and tops them up.
+        self.assertEqual(self.ids_of(claim('notes', self.first, 12, self.now)), self.ids[:10] + self.ids[20:22])
+        later = self.now + timedelta(hours=1)
+        self.assertEqual(self.ids_of(claim('notes', self.second, 15, later)), self.ids[:15])
+
+    def test_bulk_transition(self):
+        claim('notes', self.first, 10, self.now)
+        claim('notes', self.second, 10, self.now)
+        with CaptureQueriesContext(connection) as queries:
+            changed = transition('notes', self.ids[:15], 'accept', self.first, self.now)
+        # Items claimed by the other moderator are left alone.
+        self.assertEqual(changed, 10)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "women_notes"') for query in queries), 1)
+        # Only the accepted items are reindexed, so none are dropped from the index.
+        self.assertFalse(any(query['sql'].startswith('DELETE FROM') for query in queries))
+        self.assertEqual(set(Notes.objects.filter(status='Accept').values_list('id', flat=True)), set(self.ids[:10]))
+        self.assertFalse(Notes.objects.filter(id__in=self.ids[:10], claimed_by__isnull=False).exists())
+        self.assertEqual(sorted(note.pk for note in search('notes', 'zinc')), self.ids[:10])
+        self.assertEqual(transition('notes', self.ids[:10], 'accept', self.first, self.now), 0)
+        self.assertEqual(transition('notes', self.ids[:5], 'reject', self.second, self.now), 5)
+        self.assertEqual(sorted(note.pk for note in search('notes', 'zinc')), self.ids[5:10])
+        self.assertEqual(transition('notes', self.ids[20:25], 'reopen', self.first, self.now), 0)
+        with self.assertRaises(ValueError):
+            transition('notes', self.ids, 'delete', self.first)
+
+    def test_queue_depth(self):
+        claim('notes', self.first, 10, self.now)
+        transition('notes', self.ids[:4], 'accept', self.first, self.now)
+        transition('notes', self.ids[4:6], 'reject', self.first, self.now)
+        depth = queue_depth(self.now)
+        self.assertEqual(depth['notes'], {'pending': 24, 'claimed': 4, 'Accept': 4, 'Reject': 2})
+        self.assertEqual(depth['magazines'], {'pending': 0, 'claimed': 0, 'Accept': 0, 'Reject': 0})
+
+    def test_view(self):
+        self.client.force_login(self.first)
+        self.client.post('/moderation/?kind=notes', {'action': 'claim'})
+        response = self.client.get('/moderation/?kind=notes')
+        self.assertEqual(self.ids_of(response.context['items']), self.ids[:20])
+        response = self.client.post('/moderation/?kind=notes', {'action': 'accept', 'ids': self.ids[:3]},
+                                    follow=True)
+        self.assertContains(response, '3 of 3 selected items updated.')
+        self.assertEqual(response.context['depth']['notes']['Accept'], 3)
+
+    def test_single_status_views_reject_unknown_statuses(self):
+        magazine = Magazines.objects.create(user=self.first, description='Guide', magazinestype='guide',
+                                            magazinesfile='guide.txt')
+        self.client.force_login(self.first)
+        response = self.client.post('/assign_status/%d' % self.ids[0], {'status': 'Published'})
+        self.assertEqual(response.context['error'], 'yes')
+        response = self.client.post('/assignstatus_m/%d' % magazine.pk, {'status': 'Published'})
+        self.assertEqual(response.context['error'], 'yes')
+        self.assertEqual(Notes.objects.get(id=self.ids[0]).status, 'pending')
+        self.assertEqual(Magazines.objects.get(id=magazine.pk).status, 'pending')
+        response = self.client.post('/assign_status/%d' % self.ids[0], {'status': 'Accept'})
+        self.assertEqual(response.context['error'], 'no')
+        self.assertEqual(Notes.objects.get(id=self.ids[0]).status, 'Accept')
+
+
+class PreviewTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = override_settings(MEDIA_ROOT=self.media, PREVIEW_IN_BACKGROUND=False,
+                                      SEARCH_EXTRACT_IN_BACKGROUND=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create(username='reader')
+
+    def note(self, name, content, status='Accept'):
+        return Notes.objects.create(user=self.user, description='Report',
+                                    reportfile=SimpleUploadedFile(name, content), filetype='report', status=status)
+
+    def test_identical_files_share_a_preview(self):
+        first = self.note('first.txt', b'Haemoglobin   11.2 g/dL\n' * 40)
+        second = self.note('second.txt', b'Haemoglobin   11.2 g/dL\n' * 40)
+        preview = generate('notes', first.pk)
+        self.assertEqual(preview.text[:40], 'Haemoglobin 11.2 g/dL Haemoglobin 11.2 g')
+        self.assertEqual(len(preview.text), 300)
+        self.assertEqual(preview.thumbnail, '')
+        self.assertEqual(generate('notes', second.pk), preview)
+        self.assertEqual(FilePreview.objects.count(), 1)
+        self.assertEqual(Notes.objects.filter(preview=preview).count(), 2)
+
+    def test_pdf_text_preview(self):
+        note = self.note('scan.pdf', simple_pdf(b'BT /F1 12 Tf (Glucose tolerance test) Tj ET'))
+        self.assertEqual(generate('notes', note.pk).text, 'Glucose tolerance test')
+        note.reportfile.delete(save=False)
+        self.assertIsNone(generate('notes', note.pk))
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_image_thumbnail(self):
+        image = tempfile.SpooledTemporaryFile()
+        Image.new('RGB', (1200, 800), 'pink').save(image, 'PNG')
+        image.seek(0)
+        note = self.note('scan.png', image.read())
+        preview = generate('notes', note.pk)
+        self.assertTrue(preview.thumbnail.startswith(thumbnail_path(preview.content_hash)[:-4]))
+        with Image.open(os.path.join(self.media, preview.thumbnail)) as thumbnail:
+            self.assertEqual(thumbnail.size, (240, 160))
+
+    def test_command_drains_backlog(self):
+        for i in range(5):
+            self.note('report%d.txt' % i, b'Report %d' % i, status='pending')
+        Magazines.objects.create(user=self.user, description='Issue',
+                                 magazinesfile=SimpleUploadedFile('issue.txt', b'Spring issue'), status='Accept')
+        out = StringIO()
+        call_command('generate_previews', '--workers', '1', '--batch-size', '2', '--limit', '3', stdout=out)
+        self.assertIn('Previewed 3 uploads', out.getvalue())
+        call_command('generate_previews', '--workers', '1', stdout=out)
+        self.assertIn('Previewed 3 uploads', out.getvalue().splitlines()[-1])
+        self.assertFalse(Notes.objects.filter(preview__isnull=True).exists())
+        self.assertEqual(generate_pending(workers=1), 0)
+        self.client.force_login(self.user)
+        response = self.client.get('/view_m/')
+        self.assertContains(response, 'Spring issue')
+
+
+class UploadDateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        start = datetime(2026, 3, 1, 9, tzinfo=timezone.utc)
+        # Two uploads a day for ten days, created out of date order.
+        self.notes = [Notes.objects.create(user=self.admin, reportfile='r%d.txt' % i, filetype='report',
+                                           status='Accept' if i % 3 else 'pending',
+                                           uploadingdate=start + timedelta(days=(i * 7) % 10, hours=i % 2))
+                      for i in range(20)]
+
+    def test_keyset_pages_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = upload_page('notes', upload_list('notes', cursor=cursor, size=6), size=6)
+            seen.extend(page)
+            if cursor is None:
+                break
+        expected = sorted(self.notes, key=lambda note: (note.uploadingdate, note.pk), reverse=True)
+        self.assertEqual([note.pk for note in seen], [note.pk for note in expected])
+
+    def test_date_range_and_status(self):
+        rows = upload_list('notes', 'Accept', start=datetime(2026, 3, 3).date(), end=datetime(2026, 3, 4).date())
+        page, cursor = upload_page('notes', rows)
+        self.assertIsNone(cursor)
+        self.assertEqual({note.uploadingdate.day for note in page}, {3, 4})
+        self.assertTrue(all(note.status == 'Accept' for note in page))
+        self.assertEqual(len(page), sum(1 for note in self.notes if note.status == 'Accept'
+                                        and note.uploadingdate.day in (3, 4)))
+
+    def test_admin_list(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/all_queries/', {'start': '2026-03-10'})
+        self.assertEqual(len(response.context['notes']), 2)
+        self.assertContains(response, '2026-03-10')
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.client.get('/all_queries/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.context['notes'], [])
+
+    def test_migration_reads_legacy_dates(self):
+        copy = importlib.import_module('women.migrations.0015_upload_dates_copy')
+        self.assertEqual(copy.parse('2026-01-05'), datetime(2026, 1, 5, tzinfo=timezone.utc))
+        self.assertEqual(copy.parse(' 07/02/2026'), datetime(2026, 2, 7, tzinfo=timezone.utc))
+        self.assertIsNone(copy.parse('yesterday'))
+        self.assertIsNone(copy.parse(None))
+        self.assertEqual(list(copy.runs([(1, 'a'), (2, 'a'), (4, 'b'), (5, 'a')])),
+                         [[1, 2, 'a'], [4, 4, 'b'], [5, 5, 'a']])
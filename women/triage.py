@@ -0,0 +1,185 @@
+"""Offline rule-based symptom triage.
+
+``LEXICON`` maps maternal warning signs and common complaints to a category,
+a severity and advice. The phrases are compiled once into a single regular
+expression shaped like a trie: phrases that share a prefix share a branch.
+The regex engine therefore tries at most one path per start position, and a
+submission is matched in one pass, however many phrases there are. Longer
+phrases win over their prefixes ("bleeding gums" over "bleeding").
+
+A match is dropped when one of ``NEGATIONS`` appears in the few words before
+it in the same clause ("no bleeding", "not dizzy"). The result's severity is
+the highest matched, raised further by ``COMBINATIONS`` of categories that
+are more serious together (headache with swelling). Text that matches
+nothing is ``low`` with advice to contact the provider if worried.
+
+``check_symptoms()`` triages a submission and stores it as an
+``AISymptomChecker`` row.
+"""
+import re
+from collections import namedtuple
+
+from .models import AISymptomChecker
+from .sqlite import serialized_write
+
+LOW, MEDIUM, HIGH = 'low', 'medium', 'high'
+RANK = {LOW: 0, MEDIUM: 1, HIGH: 2}
+
+# category: (severity, advice, phrases)
+LEXICON = {
+    'bleeding': (HIGH, 'Heavy or new vaginal bleeding needs urgent assessment: call your maternity unit now.', (
+        'bleeding', 'vaginal bleeding', 'heavy bleeding', 'bleeding heavily', 'soaking pads', 'soaking a pad',
+        'passing clots', 'large clots', 'spotting heavily')),
+    'pre-eclampsia': (HIGH, 'Severe headache, vision changes or sudden swelling can be pre-eclampsia: '
+                            'get your blood pressure checked today.', (
+        'severe headache', 'blurred vision', 'blurry vision', 'vision changes', 'seeing spots', 'flashing lights',
+        'swollen face', 'swelling in my face', 'puffy face', 'sudden swelling', 'pain under my ribs')),
+    'seizure': (HIGH, 'A fit or seizure is an emergency: call an ambulance.', (
+        'seizure', 'seizures', 'convulsion', 'convulsions', 'fitting', 'had a fit')),
+    'breathing': (HIGH, 'Chest pain or trouble breathing is an emergency: call an ambulance.', (
+        'chest pain', 'shortness of breath', 'short of breath', 'difficulty breathing', "can't breathe",
+        'cannot breathe', 'coughing blood')),
+    'blood clot': (HIGH, 'Pain or swelling in one leg can be a blood clot: seek care today.', (
+        'calf pain', 'pain in my calf', 'one swollen leg', 'swollen calf')),
+    'fetal movement': (HIGH, 'Reduced movements need checking today: call your maternity unit, do not wait.', (
+        'reduced fetal movement', 'reduced fetal movements', 'reduced movements', 'baby not moving',
+        'baby moving less', 'fewer kicks', 'no kicks', 'stopped moving')),
+    'abdominal pain': (HIGH, 'Severe or constant abdominal pain needs urgent assessment.', (
+        'severe abdominal pain', 'severe stomach pain', 'severe pain', 'constant pain', 'unbearable pain')),
+    'waters': (HIGH, 'If your waters may have broken, call your maternity unit.', (
+        'waters broke', 'water broke', 'waters have broken', 'leaking fluid', 'gush of fluid')),
+    'crisis': (HIGH, 'Please reach out now: call your local crisis line or emergency services.', (
+        'suicidal', 'kill myself', 'end my life', 'harm myself', 'harming myself', 'hurt myself',
+        'harm my baby', 'hurt my baby')),
+    'fainting': (HIGH, 'Fainting needs same-day assessment.', ('fainted', 'fainting', 'passed out', 'blacked out')),
+    'fever': (MEDIUM, 'A temperature of 38C or more needs a call to your midwife or doctor today.', (
+        'fever', 'high temperature', 'temperature', 'chills', 'shivering', 'feverish')),
+    'infection': (MEDIUM, 'Signs of infection should be seen by your doctor within a day.', (
+        'painful urination', 'burning when i pee', 'burning when urinating', 'smelly discharge',
+        'foul smelling discharge', 'wound redness', 'red wound', 'wound discharge', 'oozing wound',
+        'breast redness', 'red breast', 'hot breast', 'breast lump')),
+    'vomiting': (MEDIUM, "If you cannot keep fluids down, contact your midwife or doctor today.", (
+        'vomiting', 'throwing up', 'persistent vomiting', "can't keep food down", "can't keep fluids down")),
+    'contractions': (MEDIUM, 'Time your contractions and call your maternity unit if they become regular.', (
+        'contractions', 'tightenings', 'regular tightening', 'period like pain')),
+    'headache': (MEDIUM, 'Rest, drink water and check your blood pressure if the headache persists.', (
+        'headache', 'headaches', 'migraine')),
+    'swelling': (MEDIUM, 'Put your feet up; sudden or facial swelling needs checking the same day.', (
+        'swelling', 'swollen hands', 'swollen fingers')),
+    'dizziness': (MEDIUM, 'Sit or lie down, drink water and eat something; call if it keeps happening.', (
+        'dizzy', 'dizziness', 'lightheaded', 'light headed')),
+    'low mood': (MEDIUM, 'Talk to your midwife, health visitor or doctor about how you are feeling.', (
+        'hopeless', "can't stop crying", 'cannot stop crying', 'panic attacks', 'panic attack', 'very anxious',
+        'not bonding', 'feel numb')),
+    'discomfort': (LOW, 'Common in pregnancy and after birth; mention it at your next appointment.', (
+        'nausea', 'nauseous', 'morning sickness', 'heartburn', 'indigestion', 'constipation', 'constipated',
+        'back pain', 'backache', 'tired', 'tiredness', 'fatigue', 'leg cramps', 'swollen ankles',
+        'swollen feet', 'bleeding gums', 'stretch marks', 'insomnia', "can't sleep", 'mild cramps',
+        'breast tenderness', 'sore breasts', 'sore nipples', 'itchy skin', 'piles', 'haemorrhoids')),
+}
+
+# Categories that are more serious together: (categories, severity, advice).
+COMBINATIONS = [
+    ({'headache', 'swelling'}, HIGH, 'Headache with swelling can be pre-eclampsia: get your blood pressure '
+                                     'checked today.'),
+    ({'fever', 'infection'}, HIGH, 'Fever with signs of infection can become serious quickly: seek care today.'),
+    ({'headache', 'dizziness'}, HIGH, 'Headache with dizziness needs a blood pressure check today.'),
+]
+
+NEGATIONS = {'no', 'not', 'without', 'denies', 'never', 'nor'}
+NEGATION_WORDS = 3
+NO_MATCH_ADVICE = 'No warning signs recognised. Contact your midwife or doctor if you are worried.'
+
+Match = namedtuple('Match', ['phrase', 'category', 'severity'])
+Triage = namedtuple('Triage', ['severity', 'matches', 'recommendations'])
+
+_CLAUSE = re.compile(r'[.,;:!?]|\bbut\b')
+
+
+def trie_pattern(phrases):
+    """A regex matching any of ``phrases``, with shared prefixes merged."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+        return '(?:%s)?' % body if '' in node else body
+
+    return build(trie)
+
+
+class TriageEngine:
+    """``LEXICON`` compiled into one trie-shaped regex."""
+
+    def __init__(self, lexicon=LEXICON, combinations=COMBINATIONS):
+        self.lexicon = lexicon
+        self.combinations = combinations
+        self.categories = {}
+        for category, (severity, advice, phrases) in lexicon.items():
+            for phrase in phrases:
+                self.categories[phrase] = category
+        self.regex = re.compile(r'\b%s\b' % trie_pattern(self.categories))
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.lower().replace('’', "'").split())
+
+    def matches(self, text):
+        """``Match`` tuples in order of appearance, negated ones left out."""
+        text = self.normalize(text)
+        found = []
+        for match in self.regex.finditer(text):
+            before = _CLAUSE.split(text[max(0, match.start() - 40):match.start()])[-1].split()
+            if NEGATIONS.intersection(before[-NEGATION_WORDS:]):
+                continue
+            phrase = match.group()
+            category = self.categories[phrase]
+            found.append(Match(phrase, category, self.lexicon[category][0]))
+        return found
+
+    def triage(self, text):
+        matches = self.matches(text)
+        if not matches:
+            return Triage(LOW, [], [NO_MATCH_ADVICE])
+        categories = {}
+        for match in matches:
+            categories.setdefault(match.category, match.severity)
+        advice = [(severity, self.lexicon[category][1]) for category, severity in categories.items()]
+        advice.extend((severity, text) for needed, severity, text in self.combinations
+                      if needed <= categories.keys())
+        advice.sort(key=lambda item: -RANK[item[0]])
+        return Triage(advice[0][0], matches, [text for severity, text in advice])
+
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = TriageEngine()
+    return _engine
+
+
+def triage(text):
+    return get_engine().triage(text)
+
+
+def check_symptoms(user, symptoms):
+    """Triage ``symptoms`` and store the result as an ``AISymptomChecker``."""
+    result = triage(symptoms)
+    if result.matches:
+        analysis = 'Recognised: %s.' % ', '.join(dict.fromkeys(match.phrase for match in result.matches))
+    else:
+        analysis = 'No known symptoms recognised.'
+    with serialized_write():
+        return AISymptomChecker.objects.create(
+            user=user, symptoms=symptoms, ai_analysis=analysis, severity_level=result.severity,
+            recommendations='\n'.join(result.recommendations))
@@ -0,0 +1,149 @@
+"""Immunization schedules and the overdue sweep.
+
+``SCHEDULES`` maps a schedule version to its doses as ``(vaccine, dose,
+age_in_months)``. A new ``BabyProfile`` gets every dose of
+``CURRENT_SCHEDULE`` as ``VaccinationRecord`` rows in one bulk insert, with
+due dates counted from ``birth_date``. When the schedule changes, add a new
+version rather than editing an old one: each record keeps the version it was
+generated from. ``backfill_schedules()`` covers babies created before.
+
+``overdue_chunks()`` walks every pending dose due before a date across all
+babies. It reads tuples through the partial ``vaccination_pending_due_idx``
+index, fetching ``chunk_size`` rows at a time, and never loads model
+instances.
+"""
+import calendar
+from datetime import date
+from itertools import islice
+
+from .models import BabyProfile, VaccinationRecord
+from .sqlite import serialized_write
+
+CURRENT_SCHEDULE = '2026.1'
+
+SCHEDULES = {
+    '2026.1': (
+        ('Hepatitis B', 1, 0),
+        ('BCG', 1, 0),
+        ('Hepatitis B', 2, 1),
+        ('Rotavirus', 1, 2),
+        ('DTaP', 1, 2),
+        ('Hib', 1, 2),
+        ('Pneumococcal (PCV)', 1, 2),
+        ('Polio (IPV)', 1, 2),
+        ('Rotavirus', 2, 4),
+        ('DTaP', 2, 4),
+        ('Hib', 2, 4),
+        ('Pneumococcal (PCV)', 2, 4),
+        ('Polio (IPV)', 2, 4),
+        ('Hepatitis B', 3, 6),
+        ('Rotavirus', 3, 6),
+        ('DTaP', 3, 6),
+        ('Hib', 3, 6),
+        ('Pneumococcal (PCV)', 3, 6),
+        ('Polio (IPV)', 3, 6),
+        ('Influenza', 1, 6),
+        ('MMR', 1, 12),
+        ('Varicella', 1, 12),
+        ('Hepatitis A', 1, 12),
+        ('Hib', 4, 12),
+        ('Pneumococcal (PCV)', 4, 12),
+        ('DTaP', 4, 15),
+        ('Hepatitis A', 2, 18),
+    ),
+}
+
+
+def add_months(day, months):
+    """``day`` plus ``months`` calendar months, clamped to the month's end."""
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def dose_name(vaccine, dose):
+    return '%s (dose %d)' % (vaccine, dose)
+
+
+def schedule_records(baby, version=CURRENT_SCHEDULE):
+    """Unsaved ``VaccinationRecord`` objects for every dose of ``version``."""
+    doses = SCHEDULES[version]
+    due = {(vaccine, dose): add_months(baby.birth_date, months) for vaccine, dose, months in doses}
+    return [
+        VaccinationRecord(
+            baby=baby,
+            vaccine_name=dose_name(vaccine, dose),
+            due_date=due[vaccine, dose],
+            next_due_date=due.get((vaccine, dose + 1)),
+            schedule_version=version,
+        )
+        for vaccine, dose, months in doses
+    ]
+
+
+def generate_schedules(babies, version=CURRENT_SCHEDULE, batch_size=500):
+    """Create the missing scheduled records for ``babies``; return the count.
+
+    Doses a baby already has a record for (by name) are skipped, so running
+    it again, or after records were entered by hand, adds nothing twice.
+    """
+    babies = iter(babies)
+    created = 0
+    while True:
+        batch = list(islice(babies, batch_size))
+        if not batch:
+            return created
+        with serialized_write():
+            existing = set(VaccinationRecord.objects.filter(
+                baby__in=[baby.pk for baby in batch],
+            ).values_list('baby_id', 'vaccine_name'))
+            records = [
+                record
+                for baby in batch
+                for record in schedule_records(baby, version)
+                if (baby.pk, record.vaccine_name) not in existing
+            ]
+            VaccinationRecord.objects.bulk_create(records)
+        created += len(records)
+
+
+def generate_schedule(baby, version=CURRENT_SCHEDULE):
+    return generate_schedules([baby], version)
+
+
+def backfill_schedules(version=CURRENT_SCHEDULE, batch_size=500):
+    """Generate missing schedules for every existing baby; return the count."""
+    babies = BabyProfile.objects.order_by('id').only('id', 'birth_date')
+    return generate_schedules(babies.iterator(chunk_size=batch_size), version, batch_size)
+
+
+def baby_created(sender, instance, created, raw=False, **kwargs):
+    """``post_save`` handler scheduling a new baby's vaccinations."""
+    if created and not raw:
+        generate_schedule(instance)
+
+
+OVERDUE_FIELDS = ('id', 'baby_id', 'baby__name', 'baby__postpartum_profile__user_id',
+                  'vaccine_name', 'due_date')
+
+
+def overdue(as_of=None):
+    """Queryset of every pending dose due before ``as_of`` (default today)."""
+    return VaccinationRecord.objects.filter(
+        administered_date__isnull=True,
+        due_date__lt=as_of or date.today(),
+    )
+
+
+def overdue_chunks(as_of=None, chunk_size=2000):
+    """Yield lists of ``OVERDUE_FIELDS`` tuples, oldest due date first."""
+    rows = overdue(as_of).order_by('due_date', 'id').values_list(*OVERDUE_FIELDS)
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
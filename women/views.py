@@ -1,5 +1,5 @@
 from django.shortcuts import render,redirect
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.contrib.auth.models import User
 from . models import *
 from django.contrib.auth import authenticate,logout,login
@@ -7,6 +7,23 @@ from datetime import date
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from .sqlite import serialized_write
+from .concurrency import async_login_required, batch_querysets, gather_querysets
+from asgiref.sync import sync_to_async
+from .forms import ProviderSearchForm, UploadListForm
+from .providers import provider_page, search_providers
+from .booking import ProviderSchedule, SlotUnavailable, book_appointment
+from .growth import score_records
+from .stats import menstrual_summary, pelvic_floor_summary, postpartum_summary, weekly_strength, weekly_workload
+from .sync import SyncError, apply_changes, changes_since, read_batch
+from .assistant import message_page
+from .triage import check_symptoms
+from .search import search as search_uploads
+from .moderation import TRANSITIONS, claim, claimed, queue_depth, release, transition, upload_list, upload_page
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST
+from django.urls import reverse
+from django.utils import timezone
 
 # Create your views here.
 
@@ -31,39 +48,31 @@ def menstrual_tracking(request):
                 cycle_length = int(request.POST.get('cycle_length', 28))
                 
                 # Create menstrual cycle
-                cycle = MenstrualCycle.objects.create(
-                    user=request.user,
-                    cycle_start=cycle_start,
-                    cycle_length=cycle_length,
-                    period_length=int(request.POST.get('period_length', 5)),
-                    fertile_window_start=cycle_start + timedelta(days=8),
-                    fertile_window_end=cycle_start + timedelta(days=13),
-                    next_period_date=cycle_start + timedelta(days=cycle_length),
-                    notes=request.POST.get('notes', '')
-                )
+                with serialized_write():
+                    cycle = MenstrualCycle.objects.create(
+                        user=request.user,
+                        cycle_start=cycle_start,
+                        cycle_length=cycle_length,
+                        period_length=int(request.POST.get('period_length', 5)),
+                        fertile_window_start=cycle_start + timedelta(days=8),
+                        fertile_window_end=cycle_start + timedelta(days=13),
+                        next_period_date=cycle_start + timedelta(days=cycle_length),
+                        notes=request.POST.get('notes', '')
+                    )
                 messages.success(request, 'Menstrual cycle added successfully!')
                 return redirect('menstrual_tracking')
             except Exception as e:
                 messages.error(request, f'Error adding cycle: {str(e)}')
     
     # GET request - display existing data
-    try:
-        cycles = MenstrualCycle.objects.filter(user=request.user).order_by('-cycle_start')
-    except:
-        cycles = []
-    
-    # Calculate stats if cycles exist
-    avg_cycle = 28
+    stats = menstrual_summary(request.user)
     fertile_days = 5
-    if cycles:
-        cycle_lengths = [c.cycle_length for c in cycles]
-        if cycle_lengths:
-            avg_cycle = sum(cycle_lengths) // len(cycle_lengths)
     
     context = {
         'user': request.user,
-        'cycles': cycles,
-        'avg_cycle': avg_cycle,
+        'cycles': stats['recent_cycles'],
+        'total_cycles': stats['total_cycles'],
+        'avg_cycle': stats['average_cycle'] or 28,
         'fertile_days': fertile_days,
         'title': 'Menstrual Tracking - PregaCare'
     }
@@ -81,13 +90,14 @@ def pregnancy_profile(request):
                 due_date = lmp + timedelta(days=280)  # Approximate due date
                 
                 # Create pregnancy profile
-                profile = PregnancyProfile.objects.create(
-                    user=request.user,
-                    last_menstrual_period=lmp,
-                    due_date=due_date,
-                    current_trimester=1,  # Default to first trimester
-                    is_high_risk=request.POST.get('high_risk') == 'true'
-                )
+                with serialized_write():
+                    profile = PregnancyProfile.objects.create(
+                        user=request.user,
+                        last_menstrual_period=lmp,
+                        due_date=due_date,
+                        current_trimester=1,  # Default to first trimester
+                        is_high_risk=request.POST.get('high_risk') == 'true'
+                    )
                 messages.success(request, 'Pregnancy profile created successfully!')
                 return redirect('pregnancy_profile')
             except Exception as e:
@@ -107,16 +117,17 @@ def pregnancy_profile(request):
                 folic_acid_mcg = 400 + (week * 5)
                 
                 # Create nutritional plan
-                plan = NutritionalPlan.objects.create(
-                    pregnancy_profile=profile,
-                    week=week,
-                    trimester=(week - 1) // 13 + 1,  # Calculate trimester
-                    calories_needed=calories_needed,
-                    protein_grams=protein_grams,
-                    iron_mg=iron_mg,
-                    calcium_mg=calcium_mg,
-                    folic_acid_mcg=folic_acid_mcg
-                )
+                with serialized_write():
+                    plan = NutritionalPlan.objects.create(
+                        pregnancy_profile=profile,
+                        week=week,
+                        trimester=(week - 1) // 13 + 1,  # Calculate trimester
+                        calories_needed=calories_needed,
+                        protein_grams=protein_grams,
+                        iron_mg=iron_mg,
+                        calcium_mg=calcium_mg,
+                        folic_acid_mcg=folic_acid_mcg
+                    )
                 messages.success(request, 'Nutrition plan generated successfully!')
                 return redirect('pregnancy_profile')
             except Exception as e:
@@ -168,36 +179,37 @@ def nutrition_engine(request):
                 print(f"DEBUG: Received week: {week}")  # Debug line
                 
                 # Get or create pregnancy profile
-                profile, created = PregnancyProfile.objects.get_or_create(
-                    user=request.user,
-                    defaults={
-                        'last_menstrual_period': datetime.now().date() - timedelta(weeks=week),
-                        'due_date': datetime.now().date() + timedelta(weeks=40-week),
-                        'current_trimester': (week - 1) // 13 + 1,
-                        'is_high_risk': False
-                    }
-                )
-                print(f"DEBUG: Profile created: {created}")  # Debug line
+                with serialized_write():
+                    profile, created = PregnancyProfile.objects.get_or_create(
+                        user=request.user,
+                        defaults={
+                            'last_menstrual_period': datetime.now().date() - timedelta(weeks=week),
+                            'due_date': datetime.now().date() + timedelta(weeks=40-week),
+                            'current_trimester': (week - 1) // 13 + 1,
+                            'is_high_risk': False
+                        }
+                    )
+                    print(f"DEBUG: Profile created: {created}")  # Debug line
                 
-                # Calculate nutritional needs based on pregnancy week
-                calories_needed = 2000 + (week * 50)
-                protein_grams = 50 + (week * 2)
-                iron_mg = 27 + (week * 1)
-                calcium_mg = 1000 + (week * 10)
-                folic_acid_mcg = 400 + (week * 5)
+                    # Calculate nutritional needs based on pregnancy week
+                    calories_needed = 2000 + (week * 50)
+                    protein_grams = 50 + (week * 2)
+                    iron_mg = 27 + (week * 1)
+                    calcium_mg = 1000 + (week * 10)
+                    folic_acid_mcg = 400 + (week * 5)
                 
-                # Create nutritional plan
-                plan = NutritionalPlan.objects.create(
-                    pregnancy_profile=profile,
-                    week=week,
-                    trimester=(week - 1) // 13 + 1,
-                    calories_needed=calories_needed,
-                    protein_grams=protein_grams,
-                    iron_mg=iron_mg,
-                    calcium_mg=calcium_mg,
-                    folic_acid_mcg=folic_acid_mcg
-                )
-                print(f"DEBUG: Plan created with ID: {plan.id}")  # Debug line
+                    # Create nutritional plan
+                    plan = NutritionalPlan.objects.create(
+                        pregnancy_profile=profile,
+                        week=week,
+                        trimester=(week - 1) // 13 + 1,
+                        calories_needed=calories_needed,
+                        protein_grams=protein_grams,
+                        iron_mg=iron_mg,
+                        calcium_mg=calcium_mg,
+                        folic_acid_mcg=folic_acid_mcg
+                    )
+                    print(f"DEBUG: Plan created with ID: {plan.id}")  # Debug line
                 messages.success(request, 'Nutrition plan generated successfully!')
                 return redirect('nutrition_engine')
             except Exception as e:
@@ -320,19 +332,25 @@ def postpartum_care(request):
                 baby_weight = float(request.POST.get('baby_birth_weight', 3.0))
                 delivery_type = request.POST.get('delivery_type', 'normal')
                 
-                # Create postpartum profile
-                profile = PostpartumProfile.objects.create(
-                    user=request.user,
-                    delivery_date=delivery_date,
-                    delivery_type=delivery_type
-                )
-                
-                # Create baby profile linked to postpartum
-                BabyProfile.objects.create(
-                    postpartum_profile=profile,
-                    birth_weight=baby_weight,
-                    delivery_type=delivery_type
-                )
+                with serialized_write():
+                    # Create postpartum profile
+                    profile = PostpartumProfile.objects.create(
+                        user=request.user,
+                        delivery_date=delivery_date,
+                        delivery_type=delivery_type,
+                        baby_weight=baby_weight
+                    )
+
+                    # Create baby profile linked to postpartum
+                    BabyProfile.objects.create(
+                        postpartum_profile=profile,
+                        name=request.POST.get('baby_name') or 'Baby',
+                        birth_date=delivery_date,
+                        sex=_baby_sex(request.POST),
+                        birth_weight=baby_weight,
+                        birth_length=50,
+                        apgar_score=9
+                    )
                 
                 messages.success(request, 'Postpartum profile created successfully!')
                 return redirect('postpartum_care')
@@ -342,12 +360,9 @@ def postpartum_care(request):
     # GET request - display existing data
     try:
         profile = PostpartumProfile.objects.get(user=request.user)
-        mental_health_checks = MentalHealthCheck.objects.filter(
-            postpartum_profile=profile
-        ).order_by('-check_date')
-        pelvic_floor_rehab = PelvicFloorRehab.objects.filter(
-            postpartum_profile=profile
-        ).order_by('-assessment_date')
+        stats = postpartum_summary(profile)
+        mental_health_checks = stats['recent_checks']
+        pelvic_floor_rehab = stats['recent_rehab']
         
         # Calculate postpartum stats
         current_date = date.today()
@@ -357,10 +372,10 @@ def postpartum_care(request):
         postpartum_stats = {
             'days_postpartum': days_postpartum,
             'weeks_postpartum': weeks_postpartum,
-            'recovery_score': 85,  # Placeholder calculation
-            'mental_health_score': 90,  # Placeholder calculation
-            'total_checkins': len(mental_health_checks),
-            'rehab_sessions': len(pelvic_floor_rehab)
+            'recovery_score': stats['recovery_score'],
+            'mental_health_score': stats['mental_health_score'],
+            'total_checkins': stats['total_checkins'],
+            'rehab_sessions': stats['rehab_sessions']
         }
     except PostpartumProfile.DoesNotExist:
         profile = None
@@ -438,6 +453,31 @@ def postpartum_care(request):
     }
     return render(request, 'postpartum_care.html', context)
 
+def _baby_sex(data):
+    """The posted ``baby_sex`` if it is a ``BabyProfile.sex`` choice, else ''."""
+    sex = data.get('baby_sex', '')
+    return sex if sex in dict(BabyProfile._meta.get_field('sex').choices) else ''
+
+def _posted_baby(request):
+    """The member's baby named in the POST, added on first use; records a posted sex."""
+    profile = PostpartumProfile.objects.get(user=request.user)
+    sex = _baby_sex(request.POST)
+    baby, created = BabyProfile.objects.get_or_create(
+        postpartum_profile=profile,
+        name=request.POST.get('baby_name', 'Baby'),
+        defaults={
+            'birth_date': profile.delivery_date,
+            'sex': sex,
+            'birth_weight': profile.baby_weight,
+            'birth_length': 50,
+            'apgar_score': 9
+        }
+    )
+    if sex and baby.sex != sex:
+        baby.sex = sex
+        baby.save(update_fields=['sex', 'updated_at'])
+    return baby
+
 @login_required
 def baby_care(request):
     """Baby care page"""
@@ -459,30 +499,22 @@ def baby_care(request):
     ]
     
     if request.method == 'POST':
+        from datetime import datetime
         # Handle vaccination record creation
         if 'vaccine_name' in request.POST:
             try:
                 # Get or create baby profile
-                baby_name = request.POST.get('baby_name', 'Baby')
-                baby, created = BabyProfile.objects.get_or_create(
-                    user=request.user,
-                    defaults={
-                        'name': baby_name,
-                        'birth_date': datetime.now().date() - timedelta(days=30),
-                        'birth_weight': 3.2,
-                        'birth_length': 50,
-                        'apgar_score': 9
-                    }
-                )
+                with serialized_write():
+                    baby = _posted_baby(request)
                 
-                # Create vaccination record
-                VaccinationRecord.objects.create(
-                    baby=baby,
-                    vaccine_name=request.POST.get('vaccine_name'),
-                    scheduled_date=datetime.strptime(request.POST.get('scheduled_date'), '%Y-%m-%d').date(),
-                    administered_date=datetime.strptime(request.POST.get('administered_date'), '%Y-%m-%d').date() if request.POST.get('administered_date') else None,
-                    notes=request.POST.get('notes', '')
-                )
+                    # Create vaccination record
+                    VaccinationRecord.objects.create(
+                        baby=baby,
+                        vaccine_name=request.POST.get('vaccine_name'),
+                        due_date=datetime.strptime(request.POST.get('scheduled_date'), '%Y-%m-%d').date(),
+                        administered_date=datetime.strptime(request.POST.get('administered_date'), '%Y-%m-%d').date() if request.POST.get('administered_date') else None,
+                        notes=request.POST.get('notes', '')
+                    )
                 messages.success(request, 'Vaccination record added successfully!')
                 return redirect('baby_care')
             except Exception as e:
@@ -491,27 +523,18 @@ def baby_care(request):
         # Handle growth record creation
         elif 'weight' in request.POST:
             try:
-                baby_name = request.POST.get('baby_name', 'Baby')
-                baby, created = BabyProfile.objects.get_or_create(
-                    user=request.user,
-                    defaults={
-                        'name': baby_name,
-                        'birth_date': datetime.now().date() - timedelta(days=30),
-                        'birth_weight': 3.2,
-                        'birth_length': 50,
-                        'apgar_score': 9
-                    }
-                )
+                with serialized_write():
+                    baby = _posted_baby(request)
                 
-                # Create growth record
-                GrowthRecord.objects.create(
-                    baby=baby,
-                    weight=float(request.POST.get('weight')),
-                    height=float(request.POST.get('height', 50)),
-                    head_circumference=float(request.POST.get('head_circumference', 35)),
-                    record_date=datetime.strptime(request.POST.get('record_date'), '%Y-%m-%d').date(),
-                    notes=request.POST.get('notes', '')
-                )
+                    # Create growth record
+                    GrowthRecord.objects.create(
+                        baby=baby,
+                        weight=float(request.POST.get('weight')),
+                        length=float(request.POST.get('height', 50)),
+                        head_circumference=float(request.POST.get('head_circumference', 35)),
+                        record_date=datetime.strptime(request.POST.get('record_date'), '%Y-%m-%d').date(),
+                        notes=request.POST.get('notes', '')
+                    )
                 messages.success(request, 'Growth record added successfully!')
                 return redirect('baby_care')
             except Exception as e:
@@ -520,17 +543,8 @@ def baby_care(request):
         # Handle milestone creation
         elif 'milestone_category' in request.POST:
             try:
-                baby_name = request.POST.get('baby_name', 'Baby')
-                baby, created = BabyProfile.objects.get_or_create(
-                    user=request.user,
-                    defaults={
-                        'name': baby_name,
-                        'birth_date': datetime.now().date() - timedelta(days=30),
-                        'birth_weight': 3.2,
-                        'birth_length': 50,
-                        'apgar_score': 9
-                    }
-                )
+                with serialized_write():
+                    baby = _posted_baby(request)
                 
                 # Create milestone record (using existing model or create simple structure)
                 milestone_data = {
@@ -554,7 +568,8 @@ def baby_care(request):
         
         for baby in baby_profiles:
             vaccination_records.extend(VaccinationRecord.objects.filter(baby=baby))
-            growth_records.extend(GrowthRecord.objects.filter(baby=baby))
+            growth_records.extend(GrowthRecord.objects.filter(baby=baby).select_related('baby'))
+        score_records(growth_records)
     except PostpartumProfile.DoesNotExist:
         # Create sample data for demonstration
         baby_profiles = []
@@ -596,79 +611,176 @@ def baby_care(request):
 @login_required
 def telehealth(request):
     """Telehealth page"""
+    if request.method == 'POST':
+        # Handle appointment booking
+        if 'provider_id' in request.POST:
+            try:
+                from datetime import datetime
+                provider = HealthcareProvider.objects.get(id=request.POST.get('provider_id'))
+                appointment_date = datetime.strptime(request.POST.get('appointment_date'), '%Y-%m-%d').date()
+                appointment_time = datetime.strptime(request.POST.get('appointment_time'), '%H:%M').time()
+                schedule = ProviderSchedule(provider, appointment_date, days=1)
+                if schedule.is_free(appointment_date, appointment_time):
+                    book_appointment(
+                        patient=request.user,
+                        provider=provider,
+                        appointment_date=appointment_date,
+                        appointment_time=appointment_time,
+                        consultation_type=request.POST.get('consultation_type', 'video')
+                    )
+                    messages.success(request, f'Appointment booked with Dr. {provider.name}!')
+                    return redirect('telehealth')
+                free = ', '.join('%s-%s' % (start.strftime('%H:%M'), end.strftime('%H:%M'))
+                                 for start, end in schedule.free_intervals(appointment_date))
+                messages.error(request, 'That time is taken. Free that day: %s.' % (free or 'none'))
+            except SlotUnavailable:
+                messages.error(request, 'That slot has just been booked, please pick another time.')
+            except Exception as e:
+                messages.error(request, f'Error booking appointment: {str(e)}')
+    
+    form = ProviderSearchForm(request.GET)
+    params = form.search_params()
     try:
-        providers = HealthcareProvider.objects.all()
-        # Use a simple query without the problematic field
-        appointments = []
-    except:
-        providers = []
-        appointments = []
+        results = batch_querysets(
+            providers=search_providers(**params),
+            consultations=_upcoming_consultations(request.user),
+        )
+        providers, next_cursor = provider_page(results['providers'], params.get('sort', 'rating'))
+        appointments = results['consultations']
+    except ValueError:
+        providers, next_cursor, appointments = [], None, []
+    _offer_next_free(providers)
     
     context = {
         'user': request.user,
+        'form': form,
         'providers': providers,
+        'next_cursor': next_cursor,
         'consultations': appointments,  # Use 'consultations' to match template
         'title': 'Telehealth - PregaCare'
     }
     return render(request, 'telehealth.html', context)
 
+def _offer_next_free(providers):
+    """Set ``next_free`` on each provider: its first open slot this week"""
+    schedules = ProviderSchedule.for_providers(providers)
+    now = timezone.localtime().replace(tzinfo=None)
+    for provider in providers:
+        provider.next_free = schedules[provider.pk].next_free(now)
+
+def _upcoming_consultations(user):
+    return TelehealthAppointment.objects.filter(
+        patient=user, appointment_date__gte=date.today()
+    ).exclude(status='cancelled').select_related('provider').order_by('appointment_date', 'appointment_time')
+
+@async_login_required
+async def telehealth_async(request):
+    """Telehealth page, async variant served under ASGI"""
+    if request.method == 'POST':
+        return await sync_to_async(telehealth)(request)
+
+    form = ProviderSearchForm(request.GET)
+    params = form.search_params()
+    try:
+        results = await gather_querysets(
+            providers=search_providers(**params),
+            consultations=_upcoming_consultations(request.user),
+        )
+        providers, next_cursor = provider_page(results['providers'], params.get('sort', 'rating'))
+        appointments = results['consultations']
+    except ValueError:
+        providers, next_cursor, appointments = [], None, []
+    await sync_to_async(_offer_next_free)(providers)
+
+    context = {
+        'user': request.user,
+        'form': form,
+        'providers': providers,
+        'next_cursor': next_cursor,
+        'consultations': appointments,
+        'title': 'Telehealth - PregaCare'
+    }
+    return await sync_to_async(render)(request, 'telehealth.html', context)
+
+def _ai_assistant_querysets(user):
+    return {
+        'conversations': AIConversation.objects.filter(user=user).order_by('-last_activity'),
+        'symptom_checks': AISymptomChecker.objects.filter(user=user).order_by('-created_at'),
+        'medication_reminders': AIMedicationReminder.objects.filter(user=user, is_active=True),
+        'health_insights': AIHealthInsight.objects.filter(user=user, is_read=False).order_by('-created_at'),
+    }
+
+def _emergency_querysets(user):
+    return {
+        'mews_assessments': MEWS_Assessment.objects.filter(user=user).order_by('-assessment_date'),
+        'emergency_contacts': EmergencyContact.objects.filter(user=user),
+        'sos_alerts': SOS_Alert.objects.filter(user=user).order_by('-alert_time'),
+    }
+
+def _load(querysets):
+    """``batch_querysets()``, or empty lists if a query fails."""
+    try:
+        return batch_querysets(**querysets)
+    except Exception:
+        return {name: [] for name in querysets}
+
+async def _gather(querysets):
+    """``gather_querysets()``, or empty lists if a query fails, like ``_load()``."""
+    try:
+        return await gather_querysets(**querysets)
+    except Exception:
+        return {name: [] for name in querysets}
+
 @login_required
 def ai_assistant(request):
     """AI assistant page"""
-    try:
-        conversations = AIConversation.objects.filter(user=request.user).order_by('-last_activity')
-        symptom_checks = AISymptomChecker.objects.filter(user=request.user).order_by('-created_at')
-        medication_reminders = AIMedicationReminder.objects.filter(user=request.user, is_active=True)
-        health_insights = AIHealthInsight.objects.filter(user=request.user, is_read=False).order_by('-created_at')
-    except:
-        conversations = []
-        symptom_checks = []
-        medication_reminders = []
-        health_insights = []
-    
     context = {
         'user': request.user,
-        'conversations': conversations,
-        'symptom_checks': symptom_checks,
-        'medication_reminders': medication_reminders,
-        'health_insights': health_insights,
-        'title': 'AI Assistant - PregaCare'
+        'title': 'AI Assistant - PregaCare',
+        **_load(_ai_assistant_querysets(request.user))
     }
     return render(request, 'ai_assistant.html', context)
 
+@async_login_required
+async def ai_assistant_async(request):
+    """AI assistant page, async variant served under ASGI"""
+    context = {
+        'user': request.user,
+        'title': 'AI Assistant - PregaCare',
+        **await _gather(_ai_assistant_querysets(request.user))
+    }
+    return await sync_to_async(render)(request, 'ai_assistant.html', context)
+
 @login_required
 def emergency_services(request):
     """Emergency services page"""
-    try:
-        mews_assessments = MEWS_Assessment.objects.filter(user=request.user).order_by('-assessment_date')
-        emergency_contacts = EmergencyContact.objects.filter(user=request.user)
-        sos_alerts = SOS_Alert.objects.filter(user=request.user).order_by('-alert_time')
-    except:
-        mews_assessments = []
-        emergency_contacts = []
-        sos_alerts = []
-    
     context = {
         'user': request.user,
-        'mews_assessments': mews_assessments,
-        'emergency_contacts': emergency_contacts,
-        'sos_alerts': sos_alerts,
-        'title': 'Emergency Services - PregaCare'
+        'title': 'Emergency Services - PregaCare',
+        **_load(_emergency_querysets(request.user))
     }
     return render(request, 'emergency_services.html', context)
 
+@async_login_required
+async def emergency_services_async(request):
+    """Emergency services page, async variant served under ASGI"""
+    context = {
+        'user': request.user,
+        'title': 'Emergency Services - PregaCare',
+        **await _gather(_emergency_querysets(request.user))
+    }
+    return await sync_to_async(render)(request, 'emergency_services.html', context)
+
 @login_required
 def pelvic_floor_rehab(request):
     """Pelvic floor rehabilitation page"""
     try:
         postpartum_profile = PostpartumProfile.objects.get(user=request.user)
-        rehab_records = PelvicFloorRehab.objects.filter(
-            postpartum_profile=postpartum_profile
-        ).order_by('-assessment_date')
-        exercise_progress = ExerciseProgress.objects.filter(
-            rehab__in=rehab_records
-        ).order_by('-completion_date')
+        stats = pelvic_floor_summary(postpartum_profile)
+        rehab_records = stats.pop('recent_rehab')
+        exercise_progress = stats.pop('recent_exercises')
     except PostpartumProfile.DoesNotExist:
+        stats = {}
         rehab_records = []
         exercise_progress = []
     
@@ -676,10 +788,78 @@ def pelvic_floor_rehab(request):
         'user': request.user,
         'rehab_records': rehab_records,
         'exercise_progress': exercise_progress,
+        'rehab_stats': stats,
         'title': 'Pelvic Floor Rehabilitation - PregaCare'
     }
     return render(request, 'pelvic_floor_rehab.html', context)
 
+def _rehab_chart(request, series):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    try:
+        weeks = int(request.GET.get('weeks', 0))
+    except ValueError:
+        return JsonResponse({'error': 'weeks must be a number'}, status=400)
+    try:
+        postpartum_profile = PostpartumProfile.objects.get(user=request.user)
+    except PostpartumProfile.DoesNotExist:
+        return JsonResponse({'error': 'No postpartum profile'}, status=404)
+    return JsonResponse(series(postpartum_profile, weeks))
+
+def rehab_strength_chart(request):
+    """Weekly pelvic floor strength and endurance as JSON arrays"""
+    return _rehab_chart(request, weekly_strength)
+
+def rehab_workload_chart(request):
+    """Weekly pelvic floor exercise totals as JSON arrays"""
+    return _rehab_chart(request, weekly_workload)
+
+@gzip_page
+@require_POST
+def sync_records(request):
+    """Offline sync: apply the client's batch, return what changed since its token"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'errors': ['Not allowed']}, status=403)
+    try:
+        batch = read_batch(request.body, request.headers.get('Content-Encoding', ''))
+        applied = apply_changes(request.user, batch.get('changes') or {})
+        result = changes_since(request.user, batch.get('token'))
+    except SyncError as error:
+        return JsonResponse({'errors': error.errors}, status=400)
+    return JsonResponse(dict(result, applied=applied))
+
+@require_POST
+def symptom_check(request):
+    """Triage the posted symptoms offline and save the check"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    symptoms = request.POST.get('symptoms', '').strip()
+    if not symptoms:
+        return JsonResponse({'error': 'symptoms is required'}, status=400)
+    check = check_symptoms(request.user, symptoms)
+    return JsonResponse({'severity': check.severity_level, 'analysis': check.ai_analysis,
+                         'recommendations': check.recommendations.splitlines()})
+
+def assistant_messages(request, conversation_id):
+    """A page of an AI assistant conversation, newest first, with its summary"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    try:
+        conversation = AIConversation.objects.get(user=request.user, conversation_id=conversation_id)
+    except AIConversation.DoesNotExist:
+        return JsonResponse({'error': 'No such conversation'}, status=404)
+    try:
+        messages, next_cursor = message_page(conversation, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'summary': conversation.summary,
+        'message_count': conversation.message_count,
+        'messages': [{'text': m.message_text, 'from_user': m.is_from_user, 'timestamp': m.timestamp}
+                     for m in messages],
+        'next': next_cursor,
+    })
+
 @login_required
 def vaccination_tracker(request):
     """Vaccination tracker page"""
@@ -721,8 +901,9 @@ def signup1(request):
         p = request.POST['pwd']
         r = request.POST['role']
         try:
-            user = User.objects.create_user(username=e,password=p,first_name=f,last_name=l)
-            Signup.objects.create(user=user,contact=c,role=r)
+            with serialized_write():
+                user = User.objects.create_user(username=e,password=p,first_name=f,last_name=l)
+                Signup.objects.create(user=user,contact=c,role=r)
             error="no"
         except:
             error="yes"
@@ -775,8 +956,9 @@ def edit_profile(request):
         user.last_name = l
         data.contact = c
         user.username = u
-        user.save()
-        data.save()
+        with serialized_write():
+            user.save()
+            data.save()
         error=True
     d = {'data':data, 'user':user, 'error':error}
     return render(request, 'edit_profile.html', d)
@@ -792,8 +974,9 @@ def changepassword(request):
         c = request.POST['confirm']
         if c==n:
             u = User.objects.get(username__exact = request.user.username)
-            u.set_password(n)
-            u.save()
+            with serialized_write():
+                u.set_password(n)
+                u.save()
             error="no"
         else:
             error="yes"
@@ -834,8 +1017,9 @@ def view_users(request):
 def delete_user(request,pid):
     if not request.user.is_staff:
         return redirect('view_users')
-    user = User.objects.get(id=pid)
-    user.delete()
+    with serialized_write():
+        user = User.objects.get(id=pid)
+        user.delete()
     return redirect('view_users')
 
 @login_required
@@ -886,7 +1070,8 @@ def upload_queries(request):
         d = request.POST['description']
         u = User.objects.filter(username=request.user.username).first()
         try:
-            Notes.objects.create(user=u,uploadingdate=date.today(),reportfile=n,filetype=f,description=d,status="pending")
+            with serialized_write():
+                Notes.objects.create(user=u,reportfile=n,filetype=f,description=d,status="pending")
 
             error="no"
         except:
@@ -899,50 +1084,51 @@ def faq(request):
     if not request.user.is_authenticated:
         return redirect('login')
     user = User.objects.get(id=request.user.id)
-    notes = Notes.objects.filter(status="Accept")
+    q = request.GET.get('q', '').strip()
+    if q:
+        notes = search_uploads('notes', q)
+    else:
+        notes = Notes.objects.filter(status="Accept").select_related('preview').order_by('-uploadingdate', '-id')
 
-    d = {'notes':notes}
+    d = {'notes':notes,'q':q}
     return render(request, 'faq.html',d)
 
+def _upload_list(request, kind, status, template):
+    form = UploadListForm(request.GET)
+    try:
+        notes, next_cursor = upload_page(kind, upload_list(kind, status, **form.list_params()))
+    except ValueError:
+        notes, next_cursor = [], None
+    d = {'notes':notes,'form':form,'next_cursor':next_cursor}
+    return render(request, template, d)
+
 @staff_member_required(login_url='/login_admin/')
 def pending_queries(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Notes.objects.filter(status="pending")
-
-    d = {'notes':notes}
-    return render(request, 'pending_queries.html',d)
+    return _upload_list(request, 'notes', "pending", 'pending_queries.html')
 
 @staff_member_required(login_url='/login_admin/')
 def accepted_queries(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Notes.objects.filter(status="Accept")
-
-    d = {'notes':notes}
-    return render(request, 'accepted_queries.html',d)
+    return _upload_list(request, 'notes', "Accept", 'accepted_queries.html')
 
 @staff_member_required(login_url='/login_admin/')
 def rejected_queries(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Notes.objects.filter(status="Reject")
-
-    d = {'notes':notes}
-    return render(request, 'rejected_queries.html',d)
+    return _upload_list(request, 'notes', "Reject", 'rejected_queries.html')
 
 @staff_member_required(login_url='/login_admin/')
 def all_queries(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Notes.objects.all()
-
-    d = {'notes':notes}
-    return render(request, 'all_queries.html',d)
+    return _upload_list(request, 'notes', None, 'all_queries.html')
 
 @staff_member_required(login_url='/login_admin/')
 def assign_status(request,pid):
@@ -951,10 +1137,13 @@ def assign_status(request,pid):
     notes = Notes.objects.get(id=pid)
     error = ""
     if request.method == 'POST':
-        s = request.POST['status']
+        s = request.POST.get('status')
         try:
+            if s not in dict(MODERATION_STATUSES):
+                raise ValueError('Unknown status: %s' % s)
             notes.status = s
-            notes.save()
+            with serialized_write():
+                notes.save()
             error="no"
         except:
             error="yes"
@@ -965,49 +1154,57 @@ def assign_status(request,pid):
 def delete_notes(request,pid):
     if not request.user.is_staff:
         return redirect('login')
-    notes = Notes.objects.get(id=pid)
-    notes.delete()
+    with serialized_write():
+        notes = Notes.objects.get(id=pid)
+        notes.delete()
     return redirect('all_queries')
 
+@staff_member_required(login_url='/login_admin/')
+def moderation_queue(request):
+    kind = request.GET.get('kind')
+    if kind not in ('notes', 'magazines'):
+        kind = 'notes'
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'claim':
+            claim(kind, request.user)
+        elif action == 'release':
+            release(kind, request.user)
+        elif action in TRANSITIONS:
+            ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+            changed = transition(kind, ids, action, request.user)
+            messages.success(request, '%d of %d selected items updated.' % (changed, len(ids)))
+        return redirect('%s?kind=%s' % (reverse('moderation_queue'), kind))
+    d = {'kind': kind, 'items': claimed(kind, request.user), 'depth': queue_depth()}
+    return render(request, 'moderation_queue.html', d)
+
 @staff_member_required(login_url='/login_admin/')
 def pending_m(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Magazines.objects.filter(status="pending")
-
-    d = {'notes':notes}
-    return render(request, 'pending_m.html',d)
+    return _upload_list(request, 'magazines', "pending", 'pending_m.html')
 
 @staff_member_required(login_url='/login_admin/')
 def accepted_m(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Magazines.objects.filter(status="Accept")
-
-    d = {'notes':notes}
-    return render(request, 'accepted_m.html',d)
+    return _upload_list(request, 'magazines', "Accept", 'accepted_m.html')
 
 @staff_member_required(login_url='/login_admin/')
 def rejected_m(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Magazines.objects.filter(status="Reject")
-
-    d = {'notes':notes}
-    return render(request, 'rejected_m.html',d)
+    return _upload_list(request, 'magazines', "Reject", 'rejected_m.html')
 
 @staff_member_required(login_url='/login_admin/')
 def all_m(request):
     if not request.user.is_authenticated:
         return redirect('login_admin')
 
-    notes = Magazines.objects.all()
-
-    d = {'notes':notes}
-    return render(request, 'all_m.html',d)
+    return _upload_list(request, 'magazines', None, 'all_m.html')
 
 @staff_member_required(login_url='/login_admin/')
 def assignstatus_m(request,pid):
@@ -1016,10 +1213,13 @@ def assignstatus_m(request,pid):
     notes = Magazines.objects.get(id=pid)
     error = ""
     if request.method == 'POST':
-        s = request.POST['status']
+        s = request.POST.get('status')
         try:
+            if s not in dict(MODERATION_STATUSES):
+                raise ValueError('Unknown status: %s' % s)
             notes.status = s
-            notes.save()
+            with serialized_write():
+                notes.save()
             error="no"
         except:
             error="yes"
@@ -1030,8 +1230,9 @@ def assignstatus_m(request,pid):
 def delete_m(request,pid):
     if not request.user.is_staff:
         return redirect('login')
-    notes = Magazines.objects.get(id=pid)
-    notes.delete()
+    with serialized_write():
+        notes = Magazines.objects.get(id=pid)
+        notes.delete()
     return redirect('all_notes')
 
 @login_required
@@ -1045,7 +1246,8 @@ def upload_m(request):
         d = request.POST['description']
         u = User.objects.filter(username=request.user.username).first()
         try:
-            Magazines.objects.create(user=u,uploadedate=date.today(),magazinesfile=n,magazinestype=f,description=d,status="pending")
+            with serialized_write():
+                Magazines.objects.create(user=u,magazinesfile=n,magazinestype=f,description=d,status="pending")
 
             error="no"
         except:
@@ -1058,7 +1260,11 @@ def view_m(request):
     if not request.user.is_authenticated:
         return redirect('login')
     user = User.objects.get(id=request.user.id)
-    notes = Magazines.objects.filter(status="Accept")
+    q = request.GET.get('q', '').strip()
+    if q:
+        notes = search_uploads('magazines', q)
+    else:
+        notes = Magazines.objects.filter(status="Accept").select_related('user', 'preview').order_by('-uploadedate', '-id')
 
-    d = {'notes':notes}
+    d = {'notes':notes,'q':q}
     return render(request, 'view_m.html',d)
\ No newline at end of file